@@ -13,6 +13,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 from config import DEFAULT_TTS_MODEL, DEFAULT_SAMPLE_RATE, DEVICE
+from stage_metrics import span
 
 # Load environment variables from .env file
 # Look for .env in project root (parent of src directory)
@@ -189,35 +190,36 @@ class CoquiTTSGenerator:
             return None
 
         try:
-            # Prioritize voice cloning if file path provided and exists
-            if speaker_wav and os.path.exists(speaker_wav):
-                # Voice cloning mode - use latents for proper voice encoding
-                gpt_cond_latent, speaker_embedding = self.get_speaker_latents(speaker_wav)
-
-                # Use the lower-level inference API with computed latents
-                out = self.model.synthesizer.tts_model.inference(
-                    text=text,
-                    language=language,
-                    gpt_cond_latent=gpt_cond_latent,
-                    speaker_embedding=speaker_embedding
-                )
-
-                # XTTS returns waveform in 'wav' key
-                audio = out["wav"]
-            elif speaker_name:
-                # Built-in speaker mode - use high-level API
-                audio = self.model.tts(
-                    text=text,
-                    speaker=speaker_name,
-                    language=language
-                )
-            else:
-                # Fallback to default young, upbeat speaker
-                audio = self.model.tts(
-                    text=text,
-                    speaker="Claribel Dervla",  # Young, upbeat default
-                    language=language
-                )
+            with span("tts_inference", characters=len(text)):
+                # Prioritize voice cloning if file path provided and exists
+                if speaker_wav and os.path.exists(speaker_wav):
+                    # Voice cloning mode - use latents for proper voice encoding
+                    gpt_cond_latent, speaker_embedding = self.get_speaker_latents(speaker_wav)
+
+                    # Use the lower-level inference API with computed latents
+                    out = self.model.synthesizer.tts_model.inference(
+                        text=text,
+                        language=language,
+                        gpt_cond_latent=gpt_cond_latent,
+                        speaker_embedding=speaker_embedding
+                    )
+
+                    # XTTS returns waveform in 'wav' key
+                    audio = out["wav"]
+                elif speaker_name:
+                    # Built-in speaker mode - use high-level API
+                    audio = self.model.tts(
+                        text=text,
+                        speaker=speaker_name,
+                        language=language
+                    )
+                else:
+                    # Fallback to default young, upbeat speaker
+                    audio = self.model.tts(
+                        text=text,
+                        speaker="Claribel Dervla",  # Young, upbeat default
+                        language=language
+                    )
 
             # Convert to numpy array if needed
             if isinstance(audio, list):
@@ -329,7 +331,8 @@ class CoquiTTSGenerator:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
             # Save as WAV file
-            sf.write(output_path, audio, self.sample_rate)
+            with span("wav_write"):
+                sf.write(output_path, audio, self.sample_rate)
             return True
 
         except Exception as e:
@@ -0,0 +1,282 @@
+"""
+Per-chapter audio manifest: hashes, sample counts and durations of sentence WAVs.
+
+The audio stage knows every sentence's exact length when it writes the WAV,
+so it records it here (audio_cache/chapter_XX_audio_manifest.json) together
+with the file's SHA-256, size and mtime. The video stage plans a chapter from
+the manifest (image durations, chapter length, frame counts) without opening
+any media file. An entry only counts as current while the WAV on disk still
+has the recorded size and mtime; anything else is re-recorded by the audio
+stage on its next run.
+
+Usage:
+    manifest = ChapterManifest.load(1)
+    manifest.record(audio_path, scene_num=1, sentence_num=3, sample_rate=24000, num_samples=52800)
+    manifest.save()
+
+    timeline = ChapterManifest.load(1).planned_timeline(pairs)  # None if incomplete
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from chapter_audio import ChapterTimeline, TimelineEntry
+from config import AUDIO_MANIFEST_DIR
+
+
+@dataclass
+class ManifestEntry:
+    """Recorded facts about one sentence WAV."""
+    filename: str
+    scene_num: int
+    sentence_num: int
+    sample_rate: int
+    num_samples: int
+    sha256: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def duration_seconds(self) -> float:
+        """Length of the audio in seconds."""
+        return self.num_samples / self.sample_rate if self.sample_rate else 0.0
+
+
+def file_sha256(filepath: Path) -> str:
+    """
+    SHA-256 of a file, read in 1 MB blocks.
+
+    Args:
+        filepath: File to hash
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_path(chapter_num: int, manifest_dir: str = AUDIO_MANIFEST_DIR) -> Path:
+    """Path of a chapter's audio manifest."""
+    return Path(manifest_dir) / f"chapter_{chapter_num:02d}_audio_manifest.json"
+
+
+class ChapterManifest:
+    """Audio manifest of one chapter, keyed by WAV filename."""
+
+    def __init__(self, chapter_num: int, manifest_dir: str = AUDIO_MANIFEST_DIR):
+        """
+        Initialize an empty manifest.
+
+        Args:
+            chapter_num: Chapter number
+            manifest_dir: Directory holding the manifest files
+        """
+        self.chapter_num = chapter_num
+        self.path = manifest_path(chapter_num, manifest_dir)
+        self.entries: Dict[str, ManifestEntry] = {}
+
+    @classmethod
+    def load(cls, chapter_num: int, manifest_dir: str = AUDIO_MANIFEST_DIR) -> "ChapterManifest":
+        """
+        Load a chapter's manifest (empty if missing or unreadable).
+
+        Args:
+            chapter_num: Chapter number
+            manifest_dir: Directory holding the manifest files
+
+        Returns:
+            ChapterManifest
+        """
+        manifest = cls(chapter_num, manifest_dir)
+        if not manifest.path.exists():
+            return manifest
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for item in data["entries"]:
+                entry = ManifestEntry(**{key: item[key] for key in ManifestEntry.__dataclass_fields__})
+                manifest.entries[entry.filename] = entry
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Warning: Failed to load audio manifest {manifest.path}: {e}")
+        return manifest
+
+    def save(self):
+        """Write the manifest in chapter order (atomically)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        ordered = self.ordered_entries()
+        data = {
+            "chapter": self.chapter_num,
+            "updated_at": datetime.now().isoformat(),
+            "total_duration_seconds": sum(entry.duration_seconds for entry in ordered),
+            "entries": [{**asdict(entry), "duration_seconds": entry.duration_seconds} for entry in ordered],
+        }
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def ordered_entries(self) -> List[ManifestEntry]:
+        """Entries sorted by scene and sentence number."""
+        return sorted(self.entries.values(), key=lambda entry: (entry.scene_num, entry.sentence_num, entry.filename))
+
+    def record(self, audio_path: Path, scene_num: int, sentence_num: int,
+               sample_rate: int, num_samples: int) -> ManifestEntry:
+        """
+        Record a freshly written sentence WAV.
+
+        Args:
+            audio_path: Path of the WAV file
+            scene_num: Scene number within the chapter
+            sentence_num: Sentence number within the scene
+            sample_rate: Sample rate of the audio
+            num_samples: Length of the audio in samples
+
+        Returns:
+            The new entry
+        """
+        audio_path = Path(audio_path)
+        stat = audio_path.stat()
+        entry = ManifestEntry(
+            filename=audio_path.name,
+            scene_num=scene_num,
+            sentence_num=sentence_num,
+            sample_rate=sample_rate,
+            num_samples=num_samples,
+            sha256=file_sha256(audio_path),
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns
+        )
+        self.entries[entry.filename] = entry
+        return entry
+
+    def current_entry(self, audio_path: Path) -> Optional[ManifestEntry]:
+        """
+        Entry of a WAV file if it still matches the file on disk.
+
+        Only stat() is used; the file is not opened.
+
+        Args:
+            audio_path: Path of the WAV file
+
+        Returns:
+            ManifestEntry, or None if missing or stale
+        """
+        audio_path = Path(audio_path)
+        entry = self.entries.get(audio_path.name)
+        if entry is None:
+            return None
+        try:
+            stat = audio_path.stat()
+        except OSError:
+            return None
+        if stat.st_size != entry.size or stat.st_mtime_ns != entry.mtime_ns:
+            return None
+        return entry
+
+    def ensure_entry(self, audio_path: Path, scene_num: int, sentence_num: int) -> Tuple[ManifestEntry, bool]:
+        """
+        Make sure an existing WAV has a current entry (re-reading its header if needed).
+
+        Args:
+            audio_path: Path of the WAV file
+            scene_num: Scene number within the chapter
+            sentence_num: Sentence number within the scene
+
+        Returns:
+            Tuple of (entry, changed) where changed is True if the entry was (re)recorded
+        """
+        entry = self.current_entry(audio_path)
+        if entry is not None and (entry.scene_num, entry.sentence_num) == (scene_num, sentence_num):
+            return entry, False
+
+        import soundfile as sf
+        info = sf.info(str(audio_path))
+        return self.record(audio_path, scene_num, sentence_num, info.samplerate, info.frames), True
+
+    def prune(self, existing_files: List[str]) -> int:
+        """
+        Drop entries whose WAV is no longer part of the chapter.
+
+        Args:
+            existing_files: Filenames that should be kept
+
+        Returns:
+            Number of entries removed
+        """
+        keep = set(existing_files)
+        removed = [name for name in self.entries if name not in keep]
+        for name in removed:
+            del self.entries[name]
+        return len(removed)
+
+    def planned_timeline(self, pairs: List[Tuple[Path, Path]]) -> Optional[ChapterTimeline]:
+        """
+        Chapter timeline computed from the manifest alone.
+
+        Matches what chapter_audio.build_chapter_master() will produce for
+        the same files, as long as all sentences share one sample rate.
+
+        Args:
+            pairs: (image_path, audio_path) tuples in chapter order
+
+        Returns:
+            ChapterTimeline, or None if any sentence lacks a current entry or
+            the sample rates differ
+        """
+        if not pairs:
+            return None
+        entries = [self.current_entry(audio_path) for _, audio_path in pairs]
+        if any(entry is None for entry in entries) or len({entry.sample_rate for entry in entries}) != 1:
+            return None
+
+        timeline = ChapterTimeline(self.chapter_num, entries[0].sample_rate)
+        position = 0
+        for (image_path, audio_path), entry in zip(pairs, entries):
+            timeline.entries.append(TimelineEntry(audio_path.name, image_path.name, position, entry.num_samples))
+            timeline.sources[audio_path.name] = [entry.size, entry.mtime_ns]
+            position += entry.num_samples
+        return timeline
+
+
+def main():
+    """Record synthetic sentence WAVs and plan a timeline without reading them."""
+    import tempfile
+    import numpy as np
+    import soundfile as sf
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp = Path(temp_dir)
+        manifest = ChapterManifest(1, temp_dir)
+        pairs = []
+        for i, seconds in enumerate([1.37, 0.52, 2.05], start=1):
+            audio_path = temp / f"chapter_01_scene_01_sent_{i:03d}_demo.wav"
+            audio = np.zeros(int(seconds * 24000), dtype=np.float32)
+            sf.write(str(audio_path), audio, 24000)
+            manifest.record(audio_path, 1, i, 24000, len(audio))
+            pairs.append((audio_path.with_suffix(".png"), audio_path))
+        manifest.save()
+
+        loaded = ChapterManifest.load(1, temp_dir)
+        timeline = loaded.planned_timeline(pairs)
+        print(f"Manifest: {manifest.path.name} ({len(loaded.entries)} entries)")
+        for index, entry in enumerate(timeline.entries):
+            print(f"  {entry.audio_file}: start {timeline.start_seconds(index):.3f}s, "
+                  f"{timeline.duration_seconds(index):.3f}s")
+        print(f"Planned duration: {timeline.duration:.3f}s, {sum(timeline.frame_counts(30))} frames at 30 fps")
+
+        # Rewriting a file makes its entry stale until the audio stage re-records it
+        sf.write(str(pairs[1][1]), np.zeros(100, dtype=np.float32), 24000)
+        print(f"After external edit: plan available = {loaded.planned_timeline(pairs) is not None}")
+
+
+if __name__ == "__main__":
+    main()
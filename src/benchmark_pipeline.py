@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+CPU-only benchmark of the pipeline orchestration code.
+
+Runs the real parsing, prompt, change-detection, caching and video assembly
+code on the manuscript in book/manuscript, with deterministic fake backends
+(see fake_backends.py) standing in for SDXL, Coqui TTS, the Anthropic client
+and Ollama. Fake latencies default to zero so the numbers measure our own
+overhead; set them to simulate realistic end-to-end timings.
+
+Results are written as JSON and compared against a stored baseline.
+
+Usage:
+    # Run all stages and compare against the baseline
+    python benchmark_pipeline.py
+
+    # Record a new baseline
+    python benchmark_pipeline.py --save-baseline
+
+    # Only some stages, fail (exit 1) on regressions
+    python benchmark_pipeline.py --stages parse prompt detection --fail-on-regression
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from scene_parser import parse_all_chapters, parse_scene_sentences, Sentence
+from prompt_generator import generate_prompt, get_negative_prompt, get_scene_features
+from render_planner import plan_chapter, calculate_seed
+from stage_metrics import percentile, span, start_run, finish_run
+from fake_backends import FakeSDXLGenerator, FakeTTSGenerator, FakeAnthropicClient, FakeOllamaServer
+from config import (
+    DEFAULT_WIDTH,
+    DEFAULT_HEIGHT,
+    BENCHMARK_DIR,
+    BENCHMARK_BASELINE_FILE,
+    BENCHMARK_REGRESSION_THRESHOLD
+)
+
+
+@dataclass
+class BenchmarkContext:
+    """Inputs shared by all benchmark stages."""
+    chapters: Optional[List[int]]
+    sentences: List[Sentence] = field(default_factory=list)
+    backend_sentences: List[Sentence] = field(default_factory=list)
+    work_dir: Path = None
+    sdxl_latency: float = 0.0
+    tts_latency: float = 0.0
+    llm_latency: float = 0.0
+    ollama_latency: float = 0.0
+    image_width: int = DEFAULT_WIDTH
+    image_height: int = DEFAULT_HEIGHT
+
+    @property
+    def project_dir(self) -> Path:
+        """Scratch project root with images/ and audio/ for video assembly."""
+        return self.work_dir / "project"
+
+
+def _bench_basename(sentence: Sentence) -> str:
+    """Filename stem shared by the benchmark image and audio for a sentence."""
+    return f"chapter_{sentence.chapter_num:02d}_scene_{sentence.scene_num:02d}_sent_{sentence.sentence_num:03d}_bench"
+
+
+def stage_parse(ctx: BenchmarkContext) -> int:
+    """Parse chapters into scenes and sentences."""
+    scenes = parse_all_chapters(chapter_numbers=ctx.chapters)
+    sentences = []
+    for scene in scenes:
+        sentences.extend(parse_scene_sentences(scene))
+    return len(sentences)
+
+
+def stage_prompt(ctx: BenchmarkContext) -> int:
+    """Keyword prompt generation for every sentence (cold scene-feature cache)."""
+    get_scene_features.cache_clear()
+    for sentence in ctx.sentences:
+        generate_prompt(sentence.content, scene_context=sentence.scene_context)
+    return len(ctx.sentences)
+
+
+def stage_detection(ctx: BenchmarkContext) -> int:
+    """Whole-chapter planning with smart change detection."""
+    get_scene_features.cache_clear()
+    sentences_by_chapter: Dict[int, List[Sentence]] = {}
+    for sentence in ctx.sentences:
+        sentences_by_chapter.setdefault(sentence.chapter_num, []).append(sentence)
+
+    for chapter_sentences in sentences_by_chapter.values():
+        plan_chapter(chapter_sentences, enable_smart_detection=True, log=lambda message: None)
+    return len(ctx.sentences)
+
+
+def stage_storyboard_cold(ctx: BenchmarkContext) -> int:
+    """Storyboard analysis with an empty cache (every sentence calls the fake client)."""
+    from storyboard_analyzer import StoryboardAnalyzer
+
+    cache_dir = ctx.work_dir / "storyboard_cache"
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    analyzer = StoryboardAnalyzer(
+        cache_dir=str(cache_dir),
+        images_dir=str(ctx.project_dir / "images"),
+        client=FakeAnthropicClient(latency=ctx.llm_latency)
+    )
+    for sentence in ctx.backend_sentences:
+        analyzer.analyze_sentence(sentence)
+    return len(ctx.backend_sentences)
+
+
+def stage_storyboard_scene(ctx: BenchmarkContext) -> int:
+    """Scene-batch storyboard analysis with an empty cache (one fake call per scene window)."""
+    from storyboard_analyzer import StoryboardAnalyzer
+    from render_planner import group_scene_sentences
+
+    cache_dir = ctx.work_dir / "storyboard_scene_cache"
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    analyzer = StoryboardAnalyzer(
+        cache_dir=str(cache_dir),
+        images_dir=str(ctx.project_dir / "images"),
+        client=FakeAnthropicClient(latency=ctx.llm_latency),
+        scene_batch=True
+    )
+    for scene_sentences in group_scene_sentences(ctx.backend_sentences).values():
+        analyzer.analyze_scene(scene_sentences)
+        for sentence in scene_sentences:
+            analyzer.analyze_sentence(sentence)
+    return len(ctx.backend_sentences)
+
+
+def stage_storyboard_warm(ctx: BenchmarkContext) -> int:
+    """Storyboard analysis served entirely from the cache written by the cold stage."""
+    from storyboard_analyzer import StoryboardAnalyzer
+
+    cache_dir = ctx.work_dir / "storyboard_cache"
+    if not cache_dir.exists():
+        stage_storyboard_cold(ctx)
+
+    analyzer = StoryboardAnalyzer(
+        cache_dir=str(cache_dir),
+        images_dir=str(ctx.project_dir / "images"),
+        client=FakeAnthropicClient(latency=ctx.llm_latency)
+    )
+    for sentence in ctx.backend_sentences:
+        analyzer.analyze_sentence(sentence)
+    return len(ctx.backend_sentences)
+
+
+def stage_ollama_prompt(ctx: BenchmarkContext) -> int:
+    """LLM prompt generation against a local fake Ollama endpoint."""
+    import requests  # noqa: F401 - required by generate_prompt_with_ollama
+    import prompt_generator
+
+    original_url = prompt_generator.OLLAMA_BASE_URL
+    with FakeOllamaServer(latency=ctx.ollama_latency) as server:
+        prompt_generator.OLLAMA_BASE_URL = server.base_url
+        try:
+            for sentence in ctx.backend_sentences:
+                prompt_generator.generate_prompt_with_ollama(sentence.content, sentence.scene_context)
+        finally:
+            prompt_generator.OLLAMA_BASE_URL = original_url
+    return len(ctx.backend_sentences)
+
+
+def stage_image_render(ctx: BenchmarkContext) -> int:
+    """Prompt, fake diffusion and PNG save for each backend sentence."""
+    images_dir = ctx.project_dir / "images"
+    shutil.rmtree(images_dir, ignore_errors=True)
+    images_dir.mkdir(parents=True)
+
+    generator = FakeSDXLGenerator(latency=ctx.sdxl_latency)
+    generator.load_model()
+    negative_prompt = get_negative_prompt()
+
+    for sentence in ctx.backend_sentences:
+        prompt = generate_prompt(sentence.content, scene_context=sentence.scene_context)
+        image = generator.generate_image(
+            prompt=prompt,
+            negative_prompt=negative_prompt,
+            width=ctx.image_width,
+            height=ctx.image_height,
+            seed=calculate_seed(sentence)
+        )
+        with span("png_save"):
+            image.save(images_dir / f"{_bench_basename(sentence)}.png")
+
+    generator.unload_model()
+    return len(ctx.backend_sentences)
+
+
+def stage_audio_render(ctx: BenchmarkContext) -> int:
+    """Fake TTS and WAV write for each backend sentence."""
+    audio_dir = ctx.project_dir / "audio"
+    shutil.rmtree(audio_dir, ignore_errors=True)
+    audio_dir.mkdir(parents=True)
+
+    generator = FakeTTSGenerator(latency=ctx.tts_latency)
+    generator.load_model()
+
+    for sentence in ctx.backend_sentences:
+        audio = generator.generate_speech_chunked(sentence.content)
+        generator.save_audio(audio, str(audio_dir / f"{_bench_basename(sentence)}.wav"))
+
+    generator.unload_model()
+    return len(ctx.backend_sentences)
+
+
+def stage_video_assembly(ctx: BenchmarkContext) -> int:
+    """
+    Assemble the benchmark images and audio into a chapter video.
+
+    Uses the direct FFmpeg path (CPU encoding) when ffmpeg is on PATH,
+    otherwise only measures pair discovery and precompositing.
+    """
+    from generate_video import VideoGenerator
+
+    images_dir = ctx.project_dir / "images"
+    audio_dir = ctx.project_dir / "audio"
+    if not any(images_dir.glob("*.png")) or not any(audio_dir.glob("*.wav")):
+        raise RuntimeError("image_render and audio_render stages must run first")
+
+    output_dir = ctx.project_dir / "videos"
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    generator = VideoGenerator(ctx.project_dir, output_dir, enable_gpu=False)
+    chapter_num = ctx.backend_sentences[0].chapter_num
+
+    if shutil.which("ffmpeg"):
+        generator.generate_chapter_video_direct_ffmpeg(chapter_num, output_filename="benchmark.mp4")
+    else:
+        for image_path, _ in generator.find_sentence_pairs(chapter_num):
+            generator.precomposite_image_with_background(image_path).unlink(missing_ok=True)
+
+    return len(ctx.backend_sentences)
+
+
+# Stage name -> function, in execution order (later stages may use earlier output)
+STAGES: Dict[str, Callable[[BenchmarkContext], int]] = {
+    "parse": stage_parse,
+    "prompt": stage_prompt,
+    "detection": stage_detection,
+    "storyboard_cold": stage_storyboard_cold,
+    "storyboard_warm": stage_storyboard_warm,
+    "storyboard_scene": stage_storyboard_scene,
+    "ollama_prompt": stage_ollama_prompt,
+    "image_render": stage_image_render,
+    "audio_render": stage_audio_render,
+    "video_assembly": stage_video_assembly,
+}
+
+
+def run_stage(name: str, func: Callable[[BenchmarkContext], int], ctx: BenchmarkContext, repeat: int) -> Dict:
+    """
+    Run a stage several times and summarize its wall time.
+
+    Console output from the pipeline code is suppressed while timing.
+    Stages whose optional dependencies are missing are reported as skipped.
+
+    Returns:
+        Dict with item count and min/p50/max seconds, or a "skipped" reason
+    """
+    times = []
+    items = 0
+    try:
+        for _ in range(repeat):
+            with redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                items = func(ctx)
+                times.append(time.perf_counter() - start)
+    except ImportError as e:
+        return {"skipped": f"missing dependency: {e.name or e}"}
+    except RuntimeError as e:
+        return {"skipped": str(e)}
+
+    p50 = percentile(times, 0.50)
+    return {
+        "items": items,
+        "runs": len(times),
+        "min_seconds": min(times),
+        "p50_seconds": p50,
+        "max_seconds": max(times),
+        "p50_ms_per_item": (p50 / items * 1000) if items else 0.0,
+    }
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Print a comparison table and return the stages that regressed.
+
+    Args:
+        results: Current benchmark results
+        baseline: Baseline benchmark results
+        threshold: Relative slowdown (e.g. 0.2 = 20%) that counts as a regression
+
+    Returns:
+        Names of stages slower than baseline by more than threshold
+    """
+    if results["settings"] != baseline.get("settings"):
+        print("WARNING: Benchmark settings differ from baseline, comparison may be meaningless")
+
+    regressions = []
+    print(f"\n{'Stage':18s} {'Baseline p50':>13s} {'Current p50':>12s} {'Change':>8s}")
+    print("-" * 80)
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if "skipped" in current or not previous or "skipped" in previous:
+            print(f"{stage:18s} {'-':>13s} {'-':>12s} {'n/a':>8s}")
+            continue
+
+        change = (current["p50_seconds"] - previous["p50_seconds"]) / previous["p50_seconds"] if previous["p50_seconds"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  << REGRESSION"
+            regressions.append(stage)
+        print(f"{stage:18s} {previous['p50_seconds']:12.3f}s {current['p50_seconds']:11.3f}s {change:+7.1%}{flag}")
+
+    return regressions
+
+
+def print_results(results: Dict):
+    """Print per-stage timings."""
+    print("\n" + "=" * 80)
+    print("Pipeline Benchmark Results")
+    print("=" * 80)
+    print(f"{'Stage':18s} {'Items':>6s} {'p50 s':>9s} {'min s':>9s} {'max s':>9s} {'ms/item':>9s}")
+    print("-" * 80)
+    for stage, stats in results["stages"].items():
+        if "skipped" in stats:
+            print(f"{stage:18s} skipped ({stats['skipped']})")
+            continue
+        print(f"{stage:18s} {stats['items']:6d} {stats['p50_seconds']:9.3f} {stats['min_seconds']:9.3f} "
+              f"{stats['max_seconds']:9.3f} {stats['p50_ms_per_item']:9.3f}")
+    print("=" * 80)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='CPU-only benchmark of pipeline orchestration with fake SDXL/TTS/LLM backends'
+    )
+    parser.add_argument('--chapters', type=int, nargs='+', help='Chapters to benchmark (default: all)')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES.keys()), help='Stages to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage; p50 is reported (default: 3)')
+    parser.add_argument(
+        '--backend-limit',
+        type=int,
+        default=40,
+        help='Sentences sent through the fake backends, from the first chapter (default: 40)'
+    )
+    parser.add_argument('--sdxl-latency', type=float, default=0.0, help='Fake SDXL seconds per image')
+    parser.add_argument('--tts-latency', type=float, default=0.0, help='Fake TTS seconds per call')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Fake Anthropic seconds per call')
+    parser.add_argument('--ollama-latency', type=float, default=0.0, help='Fake Ollama seconds per request')
+    parser.add_argument('--output', type=str, help='Results file (default: benchmark_<timestamp>.json in the benchmark dir)')
+    parser.add_argument('--baseline', type=str, default=BENCHMARK_BASELINE_FILE, help='Baseline file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=BENCHMARK_REGRESSION_THRESHOLD,
+        help=f'Relative slowdown counted as a regression (default: {BENCHMARK_REGRESSION_THRESHOLD})'
+    )
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on regressions')
+
+    args = parser.parse_args()
+    stage_names = args.stages or list(STAGES.keys())
+
+    # Parse once up front; the parse stage re-parses on its own
+    print("Parsing manuscript...")
+    scenes = parse_all_chapters(chapter_numbers=args.chapters)
+    sentences = []
+    for scene in scenes:
+        sentences.extend(parse_scene_sentences(scene))
+    if not sentences:
+        print("ERROR: No sentences found in manuscript")
+        sys.exit(1)
+
+    first_chapter = sentences[0].chapter_num
+    backend_sentences = [s for s in sentences if s.chapter_num == first_chapter][:args.backend_limit]
+    print(f"Found {len(sentences)} sentences; {len(backend_sentences)} go through the fake backends")
+
+    metrics = start_run("benchmark")
+    with tempfile.TemporaryDirectory(prefix="novel_benchmark_") as work_dir:
+        ctx = BenchmarkContext(
+            chapters=args.chapters,
+            sentences=sentences,
+            backend_sentences=backend_sentences,
+            work_dir=Path(work_dir),
+            sdxl_latency=args.sdxl_latency,
+            tts_latency=args.tts_latency,
+            llm_latency=args.llm_latency,
+            ollama_latency=args.ollama_latency,
+        )
+
+        stage_results = {}
+        for name in stage_names:
+            print(f"  Running {name}...")
+            stage_results[name] = run_stage(name, STAGES[name], ctx, args.repeat)
+
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "chapters": args.chapters,
+            "repeat": args.repeat,
+            "backend_limit": args.backend_limit,
+            "sentences": len(sentences),
+            "sdxl_latency": args.sdxl_latency,
+            "tts_latency": args.tts_latency,
+            "llm_latency": args.llm_latency,
+            "ollama_latency": args.ollama_latency,
+        },
+        "stages": stage_results,
+        "spans": metrics.summarize(),
+    }
+    finish_run()
+
+    print_results(results)
+
+    # Save results
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    output_path = args.output or os.path.join(
+        BENCHMARK_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {output_path}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to: {args.baseline}")
+        return
+
+    # Compare against baseline
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} (run with --save-baseline to create one)")
+        return
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print("\nNo regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""
+Chapter audio master track: one sample-accurate WAV per chapter.
+
+Encoding each sentence's WAV to AAC separately starts the AAC encoder once
+per sentence, and every segment adds encoder priming samples at its concat
+boundary, so audio slowly drifts against the images. Instead the sentence
+WAVs are concatenated with numpy into a single chapter master WAV, which is
+encoded to AAC exactly once and muxed against the video stream.
+
+Building the master also yields a timeline: the sample offset and length of
+every sentence. The video stage derives image durations from it, rounding
+the cumulative offsets (not each duration) to frames so image changes never
+drift from their audio by more than half a frame.
+
+Usage:
+    timeline = build_chapter_master(1, pairs, master_dir)
+    encode_master_aac(master_dir / "chapter_01_master.wav", master_dir / "chapter_01_master.m4a")
+"""
+
+import json
+import os
+import subprocess
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from stage_metrics import span
+from config import AUDIO_MASTER_DIR, VIDEO_AUDIO_CODEC, VIDEO_AUDIO_BITRATE
+
+
+@dataclass
+class TimelineEntry:
+    """One sentence on the chapter timeline."""
+    audio_file: str
+    image_file: str
+    start_sample: int
+    num_samples: int
+
+
+@dataclass
+class ChapterTimeline:
+    """Sample offsets of every sentence in a chapter master track."""
+    chapter_num: int
+    sample_rate: int
+    entries: List[TimelineEntry] = field(default_factory=list)
+    sources: Dict[str, List[int]] = field(default_factory=dict)  # audio_file -> [size, mtime_ns]
+
+    @property
+    def total_samples(self) -> int:
+        """Length of the master track in samples."""
+        if not self.entries:
+            return 0
+        last = self.entries[-1]
+        return last.start_sample + last.num_samples
+
+    @property
+    def duration(self) -> float:
+        """Length of the master track in seconds."""
+        return self.total_samples / self.sample_rate if self.sample_rate else 0.0
+
+    def start_seconds(self, index: int) -> float:
+        """Start time of an entry in seconds."""
+        return self.entries[index].start_sample / self.sample_rate
+
+    def duration_seconds(self, index: int) -> float:
+        """Duration of an entry in seconds."""
+        return self.entries[index].num_samples / self.sample_rate
+
+    def frame_counts(self, fps: int) -> List[int]:
+        """
+        Frames per entry at a fixed frame rate.
+
+        Cumulative start times are rounded to frame boundaries, so rounding
+        errors never accumulate over the chapter. Every entry gets at least
+        one frame.
+
+        Args:
+            fps: Video frame rate
+
+        Returns:
+            Frame count per entry (sums to about duration * fps)
+        """
+        boundaries = [round(entry.start_sample * fps / self.sample_rate) for entry in self.entries]
+        boundaries.append(round(self.total_samples * fps / self.sample_rate))
+        return [max(1, end - start) for start, end in zip(boundaries, boundaries[1:])]
+
+    def save(self, filepath: Path):
+        """Write the timeline as JSON (atomically)."""
+        data = {
+            "chapter": self.chapter_num,
+            "sample_rate": self.sample_rate,
+            "total_samples": self.total_samples,
+            "duration_seconds": self.duration,
+            "generated_at": datetime.now().isoformat(),
+            "entries": [
+                {**asdict(entry),
+                 "start_seconds": entry.start_sample / self.sample_rate,
+                 "duration_seconds": entry.num_samples / self.sample_rate}
+                for entry in self.entries
+            ],
+            "sources": self.sources,
+        }
+        temp_path = filepath.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, filepath)
+
+    @classmethod
+    def load(cls, filepath: Path) -> Optional["ChapterTimeline"]:
+        """Load a timeline written by save(), or None if missing or unreadable."""
+        if not filepath.exists():
+            return None
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = [
+                TimelineEntry(entry["audio_file"], entry["image_file"], entry["start_sample"], entry["num_samples"])
+                for entry in data["entries"]
+            ]
+            return cls(data["chapter"], data["sample_rate"], entries, data.get("sources", {}))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Failed to load timeline {filepath}: {e}")
+            return None
+
+
+def master_paths(chapter_num: int, master_dir: Path = Path(AUDIO_MASTER_DIR)) -> Tuple[Path, Path, Path]:
+    """
+    Paths of a chapter's master WAV, encoded AAC track and timeline.
+
+    Args:
+        chapter_num: Chapter number
+        master_dir: Directory for master tracks
+
+    Returns:
+        Tuple of (wav_path, aac_path, timeline_path)
+    """
+    stem = master_dir / f"chapter_{chapter_num:02d}_master"
+    return stem.with_suffix(".wav"), stem.with_suffix(".m4a"), Path(f"{stem}_timeline.json")
+
+
+def _source_signature(audio_path: Path) -> List[int]:
+    stat = audio_path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def is_master_current(timeline: Optional[ChapterTimeline], pairs: List[Tuple[Path, Path]]) -> bool:
+    """
+    True if a timeline was built from exactly these (unchanged) sentence files.
+
+    Args:
+        timeline: Previously built timeline (or None)
+        pairs: (image_path, audio_path) tuples in chapter order
+
+    Returns:
+        True if the master track can be reused
+    """
+    if timeline is None or len(timeline.entries) != len(pairs):
+        return False
+    for entry, (image_path, audio_path) in zip(timeline.entries, pairs):
+        if entry.audio_file != audio_path.name or entry.image_file != image_path.name:
+            return False
+        if timeline.sources.get(audio_path.name) != _source_signature(audio_path):
+            return False
+    return True
+
+
+def build_chapter_master(chapter_num: int, pairs: List[Tuple[Path, Path]],
+                         master_dir: Path = Path(AUDIO_MASTER_DIR)) -> ChapterTimeline:
+    """
+    Concatenate sentence WAVs into one chapter master WAV and save its timeline.
+
+    Sentences are streamed one at a time (memory stays flat). Stereo input
+    is downmixed to mono; input at another sample rate is resampled to the
+    rate of the first sentence.
+
+    Args:
+        chapter_num: Chapter number
+        pairs: (image_path, audio_path) tuples in chapter order
+        master_dir: Directory for master tracks
+
+    Returns:
+        ChapterTimeline of the master track
+    """
+    import numpy as np
+    import soundfile as sf
+
+    master_dir.mkdir(parents=True, exist_ok=True)
+    wav_path, _, timeline_path = master_paths(chapter_num, master_dir)
+
+    sample_rate = sf.info(str(pairs[0][1])).samplerate
+    timeline = ChapterTimeline(chapter_num, sample_rate)
+    position = 0
+
+    temp_wav = wav_path.with_suffix(f".{os.getpid()}.tmp.wav")
+    with span("audio_master", chapter=chapter_num, sentences=len(pairs)):
+        with sf.SoundFile(str(temp_wav), mode='w', samplerate=sample_rate, channels=1, subtype='PCM_16') as master:
+            for image_path, audio_path in pairs:
+                audio, rate = sf.read(str(audio_path), dtype='float32', always_2d=True)
+                audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+                if rate != sample_rate:
+                    from math import gcd
+                    from scipy.signal import resample_poly
+                    divisor = gcd(rate, sample_rate)
+                    audio = resample_poly(audio, sample_rate // divisor, rate // divisor).astype(np.float32)
+
+                master.write(audio)
+                timeline.entries.append(TimelineEntry(audio_path.name, image_path.name, position, len(audio)))
+                timeline.sources[audio_path.name] = _source_signature(audio_path)
+                position += len(audio)
+
+    os.replace(temp_wav, wav_path)
+    timeline.save(timeline_path)
+    return timeline
+
+
+def encode_master_aac(wav_path: Path, aac_path: Path, bitrate: str = VIDEO_AUDIO_BITRATE):
+    """
+    Encode the chapter master WAV to AAC once.
+
+    Args:
+        wav_path: Master WAV
+        aac_path: Output .m4a path
+        bitrate: AAC bitrate (e.g. "192k")
+
+    Raises:
+        RuntimeError: If FFmpeg fails
+    """
+    cmd = [
+        'ffmpeg', '-y',
+        '-i', str(wav_path),
+        '-c:a', VIDEO_AUDIO_CODEC,
+        '-b:a', bitrate,
+        str(aac_path)
+    ]
+    with span("ffmpeg_audio_encode"):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg failed to encode {wav_path.name}: {result.stderr[-500:]}")
+
+
+def prepare_chapter_audio(chapter_num: int, pairs: List[Tuple[Path, Path]],
+                          master_dir: Path = Path(AUDIO_MASTER_DIR),
+                          planned: Optional[ChapterTimeline] = None) -> Tuple[ChapterTimeline, Path]:
+    """
+    Build (or reuse) the chapter master track and its single AAC encode.
+
+    Args:
+        chapter_num: Chapter number
+        pairs: (image_path, audio_path) tuples in chapter order
+        master_dir: Directory for master tracks
+        planned: Timeline planned from the audio manifest; a saved master
+                 whose sentence lengths differ from it is rebuilt
+
+    Returns:
+        Tuple of (timeline, path to the encoded AAC track)
+    """
+    wav_path, aac_path, timeline_path = master_paths(chapter_num, master_dir)
+    timeline = ChapterTimeline.load(timeline_path)
+    current = is_master_current(timeline, pairs) and wav_path.exists()
+    if current and planned is not None and timeline.entries != planned.entries:
+        current = False
+
+    if not current:
+        timeline = build_chapter_master(chapter_num, pairs, master_dir)
+        aac_path.unlink(missing_ok=True)
+
+    if not aac_path.exists():
+        encode_master_aac(wav_path, aac_path)
+
+    return timeline, aac_path
+
+
+def main():
+    """Build a master track from synthetic sentence WAVs and show its timeline."""
+    import tempfile
+    import numpy as np
+    import soundfile as sf
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp = Path(temp_dir)
+        pairs = []
+        for i, seconds in enumerate([1.37, 0.52, 2.05, 0.04], start=1):
+            audio_path = temp / f"chapter_01_scene_01_sent_{i:03d}_demo.wav"
+            t = np.arange(int(seconds * 22050)) / 22050
+            sf.write(str(audio_path), 0.2 * np.sin(2 * np.pi * 220 * i * t), 22050)
+            pairs.append((audio_path.with_suffix(".png"), audio_path))
+
+        timeline = build_chapter_master(1, pairs, temp / "master")
+        print(f"Master: {timeline.total_samples} samples ({timeline.duration:.3f}s) at {timeline.sample_rate} Hz")
+        for index, (entry, frames) in enumerate(zip(timeline.entries, timeline.frame_counts(30))):
+            print(f"  {entry.audio_file}: start {timeline.start_seconds(index):.3f}s, "
+                  f"{timeline.duration_seconds(index):.3f}s -> {frames} frames")
+        print(f"Frames total: {sum(timeline.frame_counts(30))} (exact: {timeline.duration * 30:.1f})")
+        print(f"Reusable without rebuild: {is_master_current(timeline, pairs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,10 +30,14 @@ from typing import Dict, List, Tuple
 CLEANUP_TARGETS = {
     'audio': ['*.wav', '*.mp3'],
     'audio_cache': ['*.json'],
+    'audio_master': ['*.wav', '*.m4a', '*.json'],
     'images': ['*.png', '*.jpg', '*.jpeg'],
-    'videos': ['*.mp4', '*.avi', '*.mov'],
+    'image_store': ['*/*.png'],
+    'image_similarity': ['*.npy', '*.json'],
+    'videos': ['*.mp4', '*.avi', '*.mov', '*.chapters.txt', '*.encode.json'],
+    'videos_proxy': ['*.mp4', '*.chapters.txt', '*.encode.json'],
     'logs': ['*.log'],
-    'prompt_cache': ['*.txt'],
+    'prompt_cache': ['*.txt', 'llm/*/*.json'],
 }
 
 # Directories to completely remove (will be recreated by scripts as needed)
@@ -164,8 +168,12 @@ def print_summary(stats: Dict[str, Tuple[int, int]]):
     category_names = {
         'audio': 'Audio files',
         'audio_cache': 'Audio cache',
+        'audio_master': 'Chapter audio masters',
         'images': 'Images',
+        'image_store': 'Image store',
+        'image_similarity': 'Image similarity index',
         'videos': 'Videos',
+        'videos_proxy': 'Proxy videos',
         'logs': 'Logs',
         'prompt_cache': 'Prompt cache',
         'pycache': 'Python cache',
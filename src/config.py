@@ -25,9 +25,23 @@ VOICES_DIR = "../voices"
 # Video directories
 VIDEO_DIR = "../videos"
 
+# Chapter master audio tracks and timelines (see chapter_audio.py)
+AUDIO_MASTER_DIR = "../audio_master"
+
+# Per-chapter audio manifests: sample counts and hashes of sentence WAVs (see audio_manifest.py)
+AUDIO_MANIFEST_DIR = "../audio_cache"
+
 # Temporary directories
 TEMP_DIR = "../temp"
 
+# Per-run stage timing/resource metrics (see stage_metrics.py)
+METRICS_DIR = "../metrics"
+
+# CPU-only benchmark results (see benchmark_pipeline.py)
+BENCHMARK_DIR = "../benchmarks"
+BENCHMARK_BASELINE_FILE = "../benchmarks/baseline.json"
+BENCHMARK_REGRESSION_THRESHOLD = 0.20  # Flag stages more than 20% slower than baseline
+
 # Video generation parameters
 VIDEO_WIDTH = 1080
 VIDEO_HEIGHT = 1920
@@ -38,7 +52,17 @@ VIDEO_PRESET_CPU = 'medium'
 VIDEO_PRESET_GPU = 'p5'  # NVENC preset p5 ≈ x264 'medium'
 VIDEO_CRF = 18
 VIDEO_AUDIO_CODEC = 'aac'
+VIDEO_AUDIO_BITRATE = '192k'
 ENABLE_GPU_ENCODING = True  # Auto-fallback to CPU if unavailable
+VIDEO_STILL_MODE = 'vfr'  # 'vfr': one frame per image change, 'cfr': every frame at VIDEO_FPS
+VIDEO_VFR_MAX_FRAME_SECONDS = 1.0  # Long stills are repeated so no frame lasts longer than this
+
+# Proxy renders for chapter review (generate_video.py --proxy, written to videos_proxy/)
+VIDEO_PROXY_WIDTH = 360
+VIDEO_PROXY_HEIGHT = 640
+VIDEO_PROXY_PRESET_CPU = 'ultrafast'
+VIDEO_PROXY_PRESET_GPU = 'p1'  # Fastest NVENC preset
+VIDEO_PROXY_CRF = 30
 
 # Character reference directories
 CHARACTER_REFERENCES_DIR = "../character_references"
@@ -59,6 +83,7 @@ os.makedirs(TEMP_DIR, exist_ok=True)
 os.makedirs(CHARACTER_REFERENCES_DIR, exist_ok=True)
 os.makedirs(STORYBOARD_CACHE_DIR, exist_ok=True)
 os.makedirs(STORYBOARD_REPORT_DIR, exist_ok=True)
+os.makedirs(METRICS_DIR, exist_ok=True)
 
 # Model settings
 DEFAULT_MODEL = "stabilityai/stable-diffusion-xl-base-1.0"
@@ -149,15 +174,85 @@ OLLAMA_MODEL = "llama3.1:8b"
 ANTHROPIC_MODEL = "claude-3-5-haiku-20241022"
 ANTHROPIC_MAX_TOKENS = 200  # Prompts are short, 200 tokens is plenty
 
+# Shared HTTP clients for Ollama and Anthropic (see llm_clients.py)
+LLM_CONNECT_TIMEOUT = 10   # Seconds to establish a connection
+LLM_READ_TIMEOUT = 120     # Seconds to wait for a response (local models can be slow)
+LLM_MAX_RETRIES = 3        # Retries for connection errors, timeouts, 429 and 5xx
+LLM_RETRY_BASE_DELAY = 0.5  # First retry waits up to this long (doubles per retry, jittered)
+LLM_RETRY_MAX_DELAY = 8.0   # Upper bound for a single retry delay
+LLM_POOL_SIZE = 8          # Keep-alive connections per backend
+
+# Read-through cache for LLM-generated prompts (see llm_prompt_cache.py)
+LLM_PROMPT_CACHE_ENABLED = True  # Disable per run with --no-prompt-cache
+
+# --llm compare: backends run concurrently and sentences are pipelined
+COMPARE_OLLAMA_WORKERS = 1   # Concurrent Ollama requests (raise with OLLAMA_NUM_PARALLEL on the server)
+COMPARE_HAIKU_WORKERS = 4    # Concurrent Haiku requests
+COMPARE_PIPELINE_DEPTH = 8   # Sentences submitted ahead of the one being processed
+
 # Claude Haiku 3.5 pricing (as of January 2025)
 # Source: https://platform.claude.com/docs/en/about-claude/pricing
 HAIKU_INPUT_COST_PER_MILLION = 0.80   # $0.80 per million input tokens
 HAIKU_OUTPUT_COST_PER_MILLION = 4.00  # $4.00 per million output tokens
+HAIKU_CACHE_WRITE_COST_PER_MILLION = 1.00  # $1.00 per million tokens written to the prompt cache (1.25x input)
+HAIKU_CACHE_READ_COST_PER_MILLION = 0.08   # $0.08 per million tokens read from the prompt cache (0.1x input)
+
+# Prompt caching for storyboard analysis
+# The system prompt (and per-chapter character context) are marked as cacheable
+# prefixes. The API only caches prefixes above a model-specific minimum length
+# (2048 tokens for Haiku 3.5); shorter prefixes are billed as normal input, which
+# shows up as zero cache read/write tokens in the storyboard stats.
+# The chapter character context only replaces the per-sentence one when the
+# prefix (system prompt + chapter context, estimated at 4 characters per token)
+# reaches STORYBOARD_CACHE_MIN_PREFIX_TOKENS. Off by default: the current
+# prefixes are about 700-750 tokens, so nothing would be cached.
+STORYBOARD_PROMPT_CACHING = False
+STORYBOARD_CACHE_MIN_PREFIX_TOKENS = 2048
+
+# Bulk storyboard analysis via the Message Batches API (see storyboard_batch.py)
+STORYBOARD_BATCH_POLL_SECONDS = 60  # Seconds between batch status checks
+STORYBOARD_BATCH_MAX_REQUESTS = 10000  # Requests per batch (API limit: 100,000 / 256 MB)
+STORYBOARD_BATCH_COST_MULTIPLIER = 0.5  # Batches are billed at 50% of standard prices
+
+# Scene-level storyboard analysis (one API call per scene window instead of per sentence)
+STORYBOARD_SCENE_BATCH = False  # Opt-in (--storyboard-scene-batch)
+STORYBOARD_SCENE_WINDOW = 12  # Max sentences per request; longer scenes are split into windows
+STORYBOARD_SCENE_MAX_OUTPUT_TOKENS = 8192  # Haiku 3.5 output limit; windows shrink to fit
+
+# Failed storyboard calls (see storyboard_retry.py)
+# Failures are stored as negative cache entries instead of caching a placeholder;
+# while an entry is fresh, sentences use the placeholder without calling the API.
+STORYBOARD_FAILURE_TTL_SECONDS = 900  # Negative entries suppress synchronous calls for 15 minutes
+STORYBOARD_RETRY_MAX_ATTEMPTS = 4     # Background retries per sentence and run
+STORYBOARD_RETRY_BASE_DELAY = 5.0     # First background retry waits up to this long (jittered, doubling)
+STORYBOARD_RETRY_MAX_DELAY = 120.0    # Upper bound for a single retry delay
+STORYBOARD_RETRY_DRAIN_SECONDS = 180  # Max wait at the end of a run for pending retries
 
 # Visual change detection settings (for smart image generation)
 ENABLE_SMART_DETECTION = False  # Opt-in initially, set to True once validated
 FORCE_NEW_IMAGE_AT_SCENE_START = True  # Always generate new image at scene boundaries
+SMART_DETECTION_STRATEGY = "rules"  # "rules" (VisualChangeDetector) or "embedding" (see embedding_change_detector.py)
+EMBEDDING_DETECTION_THRESHOLD = 0.15  # Min TextTiling depth of a similarity dip for a new image (whole book: 0.1 ~940 images, 0.15 ~740, 0.3 ~280)
+EMBEDDING_DETECTION_WINDOW = 3  # Sentences compared on each side of a gap
+EMBEDDING_DETECTION_MIN_SENTENCES = 3  # Minimum sentences per image within a scene
 IMAGE_MAPPING_DIR = "../audio_cache"  # Directory for image-audio mapping metadata
+RENDER_PLAN_DIR = "../render_plans"  # Whole-chapter render plans (see render_planner.py)
+PLAN_WORKERS = 1  # Processes planning fully storyboard-cached chapters in parallel (1 = serial)
+
+# Content-addressed store of rendered images (see image_store.py)
+IMAGE_STORE_DIR = "../image_store"
+IMAGE_STORE_QUOTA_GB = 20.0  # Least recently used renders are evicted beyond this
+IMAGE_STORE_ENABLED = True  # Disable per run with --no-image-store
+
+# Similarity-based image reuse across sentences and chapters (see image_similarity.py)
+ENABLE_SIMILARITY_REUSE = False  # Opt-in per run with --similarity-reuse
+IMAGE_SIMILARITY_INDEX_DIR = "../image_similarity"
+IMAGE_SIMILARITY_THRESHOLD = 0.92  # Minimum cosine similarity of shot features to reuse an image
+IMAGE_SIMILARITY_DIM = 2048  # Hashed feature vector size
+
+# Manuscript diff settings (see manuscript_diff.py)
+MANUSCRIPT_SNAPSHOT_DIR = "../manuscript_snapshots"  # Sentence snapshots saved by manuscript_diff.py --save-snapshot / --apply
+MANUSCRIPT_DIFF_SIMILARITY = 0.6  # Edited sentences at least this similar count as modified, not delete+insert
 
 # IP-Adapter settings (for character consistency)
 IP_ADAPTER_MODEL = "h94/IP-Adapter-FaceID"
@@ -1,18 +1,36 @@
 """
 Cost tracking system for Claude Haiku API usage.
 
-Tracks token usage (input/output) for all Haiku API calls and maintains
-cumulative cost history in the .costs/ directory.
+Tracks token usage (input/output and prompt cache reads/writes) for all
+Haiku API calls and maintains
+cumulative cost history in the .costs/ directory:
+
+- haiku_ledger.jsonl: append-only ledger, one JSON line per session
+- haiku_totals.json: running totals plus per-day and per-model rollups,
+  updated incrementally from the ledger (it records how many ledger bytes
+  it has applied, so a crash between the two writes is caught up later)
+
+Writers hold an exclusive lock on .costs/ledger.lock, so concurrent runs
+never lose each other's sessions. Totals are O(1) to read and recent
+history is read from the end of the ledger (O(limit)).
 """
 
 import json
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # Import pricing from centralized config
-from config import HAIKU_INPUT_COST_PER_MILLION, HAIKU_OUTPUT_COST_PER_MILLION
+from config import (
+    ANTHROPIC_MODEL,
+    HAIKU_INPUT_COST_PER_MILLION,
+    HAIKU_OUTPUT_COST_PER_MILLION,
+    HAIKU_CACHE_WRITE_COST_PER_MILLION,
+    HAIKU_CACHE_READ_COST_PER_MILLION
+)
 
 
 # Get project root (parent of src/)
@@ -20,7 +38,12 @@ PROJECT_ROOT = Path(__file__).parent.parent
 
 # Cost directory in project root
 COST_DIR = PROJECT_ROOT / ".costs"
-COST_FILE = COST_DIR / "haiku_usage.json"
+LEDGER_FILE = COST_DIR / "haiku_ledger.jsonl"
+TOTALS_FILE = COST_DIR / "haiku_totals.json"
+LOCK_FILE = COST_DIR / "ledger.lock"
+LEGACY_COST_FILE = COST_DIR / "haiku_usage.json"  # Whole-history JSON used before the ledger
+
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
 
 
 def ensure_cost_dir():
@@ -28,38 +51,226 @@ def ensure_cost_dir():
     COST_DIR.mkdir(exist_ok=True)
 
 
-def load_cost_history() -> Dict:
+@contextmanager
+def ledger_lock() -> Iterator[None]:
+    """Hold the exclusive cross-process ledger lock (fcntl on POSIX, msvcrt on Windows)."""
+    ensure_cost_dir()
+    with open(LOCK_FILE, 'a+b') as lock_file:
+        if os.name == 'nt':
+            import msvcrt
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10 seconds; keep waiting
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _empty_rollup() -> Dict:
+    rollup = {field: 0 for field in TOKEN_FIELDS}
+    rollup.update({"api_calls": 0, "sessions": 0, "cost_usd": 0.0})
+    return rollup
+
+
+def _empty_totals() -> Dict:
+    return {
+        "total_input_tokens": 0,
+        "total_output_tokens": 0,
+        "total_cache_read_tokens": 0,
+        "total_cache_write_tokens": 0,
+        "total_cost_usd": 0.0,
+        "sessions": 0,
+        "ledger_bytes": 0,
+        "by_day": {},
+        "by_model": {},
+    }
+
+
+def _add_to_rollup(rollup: Dict, record: Dict, cost_usd: float, api_calls: int, sessions: int = 1):
+    for field in TOKEN_FIELDS:
+        rollup[field] += record.get(field, 0)
+    rollup["api_calls"] += api_calls
+    rollup["sessions"] += sessions
+    rollup["cost_usd"] += cost_usd
+
+
+def _apply_session(totals: Dict, session: Dict):
+    """Fold one ledger session into the totals and rollups."""
+    totals["total_input_tokens"] += session.get("input_tokens", 0)
+    totals["total_output_tokens"] += session.get("output_tokens", 0)
+    totals["total_cache_read_tokens"] += session.get("cache_read_tokens", 0)
+    totals["total_cache_write_tokens"] += session.get("cache_write_tokens", 0)
+    totals["total_cost_usd"] += session.get("cost_usd", 0.0)
+    totals["sessions"] += 1
+
+    day = session.get("timestamp", "")[:10] or "unknown"
+    day_rollup = totals["by_day"].setdefault(day, _empty_rollup())
+    _add_to_rollup(day_rollup, session, session.get("cost_usd", 0.0), session.get("api_calls", 0))
+
+    models = session.get("models") or {"unknown": session}
+    for model, usage in models.items():
+        model_rollup = totals["by_model"].setdefault(model, _empty_rollup())
+        _add_to_rollup(model_rollup, usage, usage.get("cost_usd", 0.0), usage.get("api_calls", 0))
+
+
+def _read_totals() -> Dict:
+    if not TOTALS_FILE.exists():
+        return _empty_totals()
+    try:
+        with open(TOTALS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Rebuilding cost totals from the ledger ({TOTALS_FILE}: {e})")
+        return _empty_totals()
+
+
+def _write_totals(totals: Dict):
+    temp_path = TOTALS_FILE.with_suffix(".tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(totals, f, indent=2)
+    os.replace(temp_path, TOTALS_FILE)
+
+
+def _sync_totals() -> Dict:
     """
-    Load cost history from JSON file.
+    Apply ledger lines not yet in the totals (caller holds the ledger lock).
 
     Returns:
-        Dictionary with cost history
+        Up-to-date totals
     """
-    ensure_cost_dir()
+    _migrate_legacy_history()
+    totals = _read_totals()
+    ledger_size = LEDGER_FILE.stat().st_size if LEDGER_FILE.exists() else 0
+    if totals["ledger_bytes"] > ledger_size:
+        totals = _empty_totals()  # Ledger was replaced or truncated
+    if totals["ledger_bytes"] == ledger_size:
+        return totals
+
+    with open(LEDGER_FILE, 'rb') as f:
+        f.seek(totals["ledger_bytes"])
+        for raw_line in f:
+            if not raw_line.endswith(b"\n"):
+                break  # Partial line from an interrupted write; not applied yet
+            totals["ledger_bytes"] += len(raw_line)
+            if not raw_line.strip():
+                continue
+            try:
+                _apply_session(totals, json.loads(raw_line))
+            except ValueError:
+                print(f"Warning: Skipping corrupt ledger line at byte {totals['ledger_bytes'] - len(raw_line)}")
+
+    _write_totals(totals)
+    return totals
+
+
+def _append_ledger_lines(records: List[Dict]):
+    """Append records to the ledger (caller holds the ledger lock)."""
+    with open(LEDGER_FILE, 'ab') as f:
+        if f.tell() > 0:
+            with open(LEDGER_FILE, 'rb') as check:
+                check.seek(-1, os.SEEK_END)
+                if check.read(1) != b"\n":
+                    f.write(b"\n")  # Terminate a partial line left by a crash
+        for record in records:
+            f.write((json.dumps(record) + "\n").encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _migrate_legacy_history():
+    """Import sessions from the old haiku_usage.json once (caller holds the lock)."""
+    if not LEGACY_COST_FILE.exists():
+        return
+    if LEDGER_FILE.exists():
+        # Already imported (the rename below was interrupted); set it aside
+        os.replace(LEGACY_COST_FILE, LEGACY_COST_FILE.with_suffix(".json.migrated"))
+        return
+    with open(LEGACY_COST_FILE, 'r', encoding='utf-8') as f:
+        legacy = json.load(f)
+    _append_ledger_lines(legacy.get("sessions", []))
+    os.replace(LEGACY_COST_FILE, LEGACY_COST_FILE.with_suffix(".json.migrated"))
+    print(f"Migrated {len(legacy.get('sessions', []))} sessions from {LEGACY_COST_FILE.name} to {LEDGER_FILE.name}")
+
+
+def append_session(session_record: Dict) -> Dict:
+    """
+    Append a session to the ledger and update the totals.
 
-    if not COST_FILE.exists():
-        return {
-            "total_input_tokens": 0,
-            "total_output_tokens": 0,
-            "total_cost_usd": 0.0,
-            "sessions": []
-        }
+    Args:
+        session_record: Session dictionary (see CostTracker.save_session)
 
-    with open(COST_FILE, 'r') as f:
-        return json.load(f)
+    Returns:
+        Totals including the new session
+    """
+    with ledger_lock():
+        _migrate_legacy_history()
+        _append_ledger_lines([session_record])
+        return _sync_totals()
 
 
-def save_cost_history(history: Dict):
+def load_cost_totals() -> Dict:
     """
-    Save cost history to JSON file.
+    Load cumulative totals and rollups (O(1) in the size of the history).
 
-    Args:
-        history: Cost history dictionary
+    Returns:
+        Dictionary with total_* fields, session count, by_day and by_model
     """
-    ensure_cost_dir()
+    totals = _read_totals()
+    ledger_size = LEDGER_FILE.stat().st_size if LEDGER_FILE.exists() else 0
+    if totals["ledger_bytes"] != ledger_size or (LEGACY_COST_FILE.exists() and not LEDGER_FILE.exists()):
+        with ledger_lock():
+            totals = _sync_totals()
+    return totals
 
-    with open(COST_FILE, 'w') as f:
-        json.dump(history, f, indent=2)
+
+def read_recent_sessions(limit: int = 10) -> List[Dict]:
+    """
+    Read the last sessions from the end of the ledger (O(limit)).
+
+    Args:
+        limit: Number of sessions to return
+
+    Returns:
+        Sessions, oldest first
+    """
+    if not LEDGER_FILE.exists() or limit <= 0:
+        return []
+
+    block_size = 8192
+    with open(LEDGER_FILE, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= limit:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+
+    lines = data.split(b"\n")
+    if position > 0:
+        lines = lines[1:]  # First line may be cut off
+    sessions = []
+    for line in lines:
+        if line.strip():
+            try:
+                sessions.append(json.loads(line))
+            except ValueError:
+                continue  # Partial or corrupt line
+    return sessions[-limit:]
 
 
 def get_pricing_info() -> Dict[str, float]:
@@ -72,29 +283,38 @@ def get_pricing_info() -> Dict[str, float]:
     return {
         'input_per_million': HAIKU_INPUT_COST_PER_MILLION,
         'output_per_million': HAIKU_OUTPUT_COST_PER_MILLION,
+        'cache_write_per_million': HAIKU_CACHE_WRITE_COST_PER_MILLION,
+        'cache_read_per_million': HAIKU_CACHE_READ_COST_PER_MILLION,
         'input_per_thousand': HAIKU_INPUT_COST_PER_MILLION / 1000,
         'output_per_thousand': HAIKU_OUTPUT_COST_PER_MILLION / 1000
     }
 
 
-def calculate_cost(input_tokens: int, output_tokens: int) -> float:
+def calculate_cost(input_tokens: int, output_tokens: int,
+                   cache_read_tokens: int = 0, cache_write_tokens: int = 0) -> float:
     """
     Calculate USD cost for Haiku API call.
 
     Uses pricing from config.py:
     - Input: ${HAIKU_INPUT_COST_PER_MILLION} per million tokens
     - Output: ${HAIKU_OUTPUT_COST_PER_MILLION} per million tokens
+    - Cache write: ${HAIKU_CACHE_WRITE_COST_PER_MILLION} per million tokens
+    - Cache read: ${HAIKU_CACHE_READ_COST_PER_MILLION} per million tokens
 
     Args:
-        input_tokens: Number of input tokens
+        input_tokens: Number of uncached input tokens
         output_tokens: Number of output tokens
+        cache_read_tokens: Number of input tokens read from the prompt cache
+        cache_write_tokens: Number of input tokens written to the prompt cache
 
     Returns:
         Cost in USD
     """
     input_cost = (input_tokens / 1_000_000) * HAIKU_INPUT_COST_PER_MILLION
     output_cost = (output_tokens / 1_000_000) * HAIKU_OUTPUT_COST_PER_MILLION
-    return input_cost + output_cost
+    cache_read_cost = (cache_read_tokens / 1_000_000) * HAIKU_CACHE_READ_COST_PER_MILLION
+    cache_write_cost = (cache_write_tokens / 1_000_000) * HAIKU_CACHE_WRITE_COST_PER_MILLION
+    return input_cost + output_cost + cache_read_cost + cache_write_cost
 
 
 class CostTracker:
@@ -110,7 +330,12 @@ class CostTracker:
         self.session_name = session_name
         self.session_input_tokens = 0
         self.session_output_tokens = 0
+        self.session_cache_read_tokens = 0
+        self.session_cache_write_tokens = 0
+        self.session_cost_adjustment_usd = 0.0  # Discounts such as Message Batches pricing
         self.session_api_calls = 0
+        self.session_models: Dict[str, Dict] = {}  # Per-model usage for the by_model rollup
+        self._lock = threading.Lock()
         self.session_start_time = None
 
     def __enter__(self):
@@ -122,17 +347,40 @@ class CostTracker:
         """End session and save costs."""
         self.save_session()
 
-    def add_api_call(self, input_tokens: int, output_tokens: int):
+    def add_api_call(self, input_tokens: int, output_tokens: int,
+                     cache_read_tokens: int = 0, cache_write_tokens: int = 0,
+                     cost_multiplier: float = 1.0, model: str = ANTHROPIC_MODEL):
         """
         Record a single API call.
 
         Args:
-            input_tokens: Input tokens used
+            input_tokens: Uncached input tokens used
             output_tokens: Output tokens generated
+            cache_read_tokens: Input tokens read from the prompt cache
+            cache_write_tokens: Input tokens written to the prompt cache
+            cost_multiplier: Price multiplier for this call (0.5 for batch requests)
+            model: Model that served the call
         """
-        self.session_input_tokens += input_tokens
-        self.session_output_tokens += output_tokens
-        self.session_api_calls += 1
+        call_cost = calculate_cost(input_tokens, output_tokens, cache_read_tokens, cache_write_tokens)
+
+        # Calls may come from several threads (--llm compare pipelining)
+        with self._lock:
+            if cost_multiplier != 1.0:
+                self.session_cost_adjustment_usd += (cost_multiplier - 1.0) * call_cost
+
+            usage = self.session_models.setdefault(model, _empty_rollup())
+            _add_to_rollup(usage, {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cache_read_tokens": cache_read_tokens,
+                "cache_write_tokens": cache_write_tokens,
+            }, cost_multiplier * call_cost, api_calls=1, sessions=0)
+
+            self.session_input_tokens += input_tokens
+            self.session_output_tokens += output_tokens
+            self.session_cache_read_tokens += cache_read_tokens
+            self.session_cache_write_tokens += cache_write_tokens
+            self.session_api_calls += 1
 
     def get_session_cost(self) -> float:
         """
@@ -141,7 +389,12 @@ class CostTracker:
         Returns:
             Cost in USD
         """
-        return calculate_cost(self.session_input_tokens, self.session_output_tokens)
+        return calculate_cost(
+            self.session_input_tokens,
+            self.session_output_tokens,
+            self.session_cache_read_tokens,
+            self.session_cache_write_tokens
+        ) + self.session_cost_adjustment_usd
 
     def get_session_stats(self) -> Dict:
         """
@@ -153,6 +406,8 @@ class CostTracker:
         return {
             "input_tokens": self.session_input_tokens,
             "output_tokens": self.session_output_tokens,
+            "cache_read_tokens": self.session_cache_read_tokens,
+            "cache_write_tokens": self.session_cache_write_tokens,
             "total_tokens": self.session_input_tokens + self.session_output_tokens,
             "api_calls": self.session_api_calls,
             "cost_usd": self.get_session_cost()
@@ -164,31 +419,28 @@ class CostTracker:
             # No API calls made, don't save
             return
 
-        # Load existing history
-        history = load_cost_history()
-
-        # Update totals
-        history["total_input_tokens"] += self.session_input_tokens
-        history["total_output_tokens"] += self.session_output_tokens
-        history["total_cost_usd"] += self.get_session_cost()
-
         # Add session record
         session_record = {
             "timestamp": self.session_start_time.isoformat(),
             "session_name": self.session_name,
             "input_tokens": self.session_input_tokens,
             "output_tokens": self.session_output_tokens,
+            "cache_read_tokens": self.session_cache_read_tokens,
+            "cache_write_tokens": self.session_cache_write_tokens,
             "api_calls": self.session_api_calls,
-            "cost_usd": round(self.get_session_cost(), 6)
+            "cost_usd": round(self.get_session_cost(), 6),
+            "models": {
+                model: {field: value for field, value in usage.items() if field != "sessions"}
+                for model, usage in self.session_models.items()
+            }
         }
-        history["sessions"].append(session_record)
 
-        # Save updated history
-        save_cost_history(history)
+        # Append to the ledger (totals and rollups are updated incrementally)
+        append_session(session_record)
 
     def print_summary(self):
         """Print session and cumulative cost summary."""
-        history = load_cost_history()
+        history = load_cost_totals()
 
         print("\n" + "="*80)
         print("HAIKU API COST SUMMARY")
@@ -198,23 +450,31 @@ class CostTracker:
         print(f"\nPricing (Claude Haiku 3.5):")
         print(f"  Input:  ${HAIKU_INPUT_COST_PER_MILLION:.2f} / million tokens")
         print(f"  Output: ${HAIKU_OUTPUT_COST_PER_MILLION:.2f} / million tokens")
+        print(f"  Cache write: ${HAIKU_CACHE_WRITE_COST_PER_MILLION:.2f} / million tokens")
+        print(f"  Cache read:  ${HAIKU_CACHE_READ_COST_PER_MILLION:.2f} / million tokens")
 
         # Session costs
         print(f"\nCurrent Session: {self.session_name}")
         print(f"  API Calls: {self.session_api_calls}")
         print(f"  Input Tokens: {self.session_input_tokens:,}")
         print(f"  Output Tokens: {self.session_output_tokens:,}")
+        print(f"  Cache Write Tokens: {self.session_cache_write_tokens:,}")
+        print(f"  Cache Read Tokens: {self.session_cache_read_tokens:,}")
         print(f"  Total Tokens: {self.session_input_tokens + self.session_output_tokens:,}")
         print(f"  Session Cost: ${self.get_session_cost():.6f} USD")
 
         # Cumulative costs (including this session)
         total_input = history["total_input_tokens"] + self.session_input_tokens
         total_output = history["total_output_tokens"] + self.session_output_tokens
+        total_cache_read = history["total_cache_read_tokens"] + self.session_cache_read_tokens
+        total_cache_write = history["total_cache_write_tokens"] + self.session_cache_write_tokens
         total_cost = history["total_cost_usd"] + self.get_session_cost()
 
         print(f"\nCumulative Total (All Time):")
         print(f"  Total Input Tokens: {total_input:,}")
         print(f"  Total Output Tokens: {total_output:,}")
+        print(f"  Total Cache Write Tokens: {total_cache_write:,}")
+        print(f"  Total Cache Read Tokens: {total_cache_read:,}")
         print(f"  Total Tokens: {total_input + total_output:,}")
         print(f"  Total Cost: ${total_cost:.6f} USD")
 
@@ -228,7 +488,7 @@ def get_total_cost() -> Tuple[int, int, float]:
     Returns:
         Tuple of (total_input_tokens, total_output_tokens, total_cost_usd)
     """
-    history = load_cost_history()
+    history = load_cost_totals()
     return (
         history["total_input_tokens"],
         history["total_output_tokens"],
@@ -243,22 +503,47 @@ def print_cost_history(limit: int = 10):
     Args:
         limit: Number of recent sessions to show
     """
-    history = load_cost_history()
+    history = load_cost_totals()
 
     print("\n" + "="*80)
     print(f"RECENT HAIKU API USAGE (Last {limit} Sessions)")
     print("="*80)
 
-    sessions = history["sessions"][-limit:]
+    sessions = read_recent_sessions(limit)
 
     for session in sessions:
         print(f"\n[{session['timestamp']}] {session['session_name']}")
         print(f"  API Calls: {session['api_calls']}")
         print(f"  Tokens: {session['input_tokens']:,} in / {session['output_tokens']:,} out")
+        if session.get('cache_read_tokens') or session.get('cache_write_tokens'):
+            print(f"  Cache: {session.get('cache_write_tokens', 0):,} written / {session.get('cache_read_tokens', 0):,} read")
         print(f"  Cost: ${session['cost_usd']:.6f} USD")
 
     print("\n" + "="*80)
-    print(f"Total Cost (All Time): ${history['total_cost_usd']:.6f} USD")
+    print(f"Total Cost (All Time): ${history['total_cost_usd']:.6f} USD ({history['sessions']} sessions)")
+    print("="*80)
+
+
+def print_cost_rollups(days: int = 7):
+    """
+    Print per-day and per-model cost rollups.
+
+    Args:
+        days: Number of most recent days to show
+    """
+    history = load_cost_totals()
+
+    print("\n" + "="*80)
+    print(f"HAIKU API COST BY DAY (Last {days} Days)")
+    print("="*80)
+    for day in sorted(history["by_day"])[-days:]:
+        rollup = history["by_day"][day]
+        print(f"  {day}: ${rollup['cost_usd']:.6f} USD ({rollup['sessions']} sessions, {rollup['api_calls']} calls)")
+
+    print("\nBy Model:")
+    for model, rollup in sorted(history["by_model"].items(), key=lambda item: -item[1]["cost_usd"]):
+        print(f"  {model}: ${rollup['cost_usd']:.6f} USD ({rollup['api_calls']} calls, "
+              f"{rollup['input_tokens']:,} in / {rollup['output_tokens']:,} out)")
     print("="*80)
 
 
@@ -276,6 +561,7 @@ def main():
 
     # Show history
     print_cost_history(limit=5)
+    print_cost_rollups()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,354 @@
+"""
+Embedding-based visual change detection, decided for a whole chapter at once.
+
+VisualChangeDetector compares keyword categories of one sentence with the
+current image, using hand-written rules. This detector instead embeds every
+sentence of a chapter as a TF-IDF vector (numpy only, no model download),
+compares the text before and after every sentence gap in one vectorized
+pass, and places image boundaries at the deepest similarity dips.
+
+Sentence features are stemmed content words plus the setting, time of day
+and character keywords the prompt generator detects in the sentence, so
+"Emma's desk" and "the desks Emma passed" share "emma", "desk" and the
+character, and "office" and "cubicle" share the office setting. A single sentence is still too short for a
+stable vector, so each gap compares windows of EMBEDDING_DETECTION_WINDOW
+sentences on either side (clipped to the scene) - the block comparison of
+TextTiling.
+
+Most windows of short narrative sentences share no feature at all, so an
+absolute similarity cutoff is crossed at nearly every gap. Boundaries are
+chosen from relative drops instead: each gap gets the TextTiling depth score
+(how far the similarity falls below the nearest peaks on both sides), and
+gaps with a depth of at least EMBEDDING_DETECTION_THRESHOLD become image
+boundaries, deepest first, keeping EMBEDDING_DETECTION_MIN_SENTENCES
+sentences per image. Scene starts are boundaries too (with
+FORCE_NEW_IMAGE_AT_SCENE_START).
+
+The detector answers the same calls as VisualChangeDetector, so it plugs
+into decide_image_reuse() unchanged; select it with
+SMART_DETECTION_STRATEGY = "embedding" (or --detection-strategy embedding).
+Decisions come from the text alone, also in storyboard mode.
+
+Usage:
+    detector = EmbeddingChangeDetector().prepare(chapter_sentences)
+    needs_new_image, reason = detector.needs_new_image(detector.analyze_sentence(sentence))
+"""
+
+import bisect
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from scene_parser import Sentence
+from config import (
+    EMBEDDING_DETECTION_THRESHOLD,
+    EMBEDDING_DETECTION_WINDOW,
+    EMBEDDING_DETECTION_MIN_SENTENCES,
+    FORCE_NEW_IMAGE_AT_SCENE_START
+)
+
+
+STOPWORDS = frozenset("""
+a about after again all also an and any are as at back be been before being but by can could did do
+does down even for from had has have he her here him his how i if in into is it its just like me more
+my no not now of off on one only or our out over said she so some than that the their them then there
+these they this through to too up very was we were what when where which while who will with would you your
+""".split())
+
+_TOKEN_PATTERN = re.compile(r"[a-z][a-z']+")
+
+# Suffixes removed by stem(), longest first
+_SUFFIXES = ("ingly", "edly", "ing", "ies", "ed", "ly", "s")
+
+# Keyword categories from prompt_generator.match_keywords() used as features
+FEATURE_CATEGORIES = ("setting", "time", "character")
+
+SentenceKey = Tuple[int, int, int]  # (chapter_num, scene_num, sentence_num)
+
+
+def stem(token: str) -> str:
+    """
+    Strip a possessive and one inflection suffix ("desks" -> "desk", "walked" -> "walk").
+
+    Deliberately crude: it only has to map the forms of a word in one chapter
+    onto the same feature, not produce dictionary words.
+    """
+    if token.endswith("'s"):
+        token = token[:-2]
+    token = token.strip("'")
+    if token.endswith("ss"):
+        return token
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)] + ("y" if suffix == "ies" else "")
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Stemmed content words of a sentence (stopwords and words under 3 letters removed)."""
+    return [stem(token) for token in _TOKEN_PATTERN.findall(text.lower())
+            if token not in STOPWORDS and len(token) > 2]
+
+
+def sentence_features(text: str) -> List[str]:
+    """
+    Features of one sentence: stemmed content words plus detected keyword labels.
+
+    Keyword labels ("setting:office", "character:emma") join different words
+    for the same place, time or person into one feature.
+
+    Args:
+        text: Sentence text
+
+    Returns:
+        Feature tokens (repeated tokens count as term frequency)
+    """
+    from prompt_generator import match_keywords
+
+    features = tokenize(text)
+    hits = match_keywords(text)
+    for category in FEATURE_CATEGORIES:
+        features.extend(f"{category}:{label}" for label in hits[category])
+    return features
+
+
+def tfidf_matrix(documents: List[List[str]]) -> np.ndarray:
+    """
+    L2-normalized TF-IDF rows (sublinear tf, smoothed idf) for tokenized documents.
+
+    Args:
+        documents: Token lists, one per sentence
+
+    Returns:
+        float32 array of shape (len(documents), vocabulary size)
+    """
+    vocabulary: Dict[str, int] = {}
+    for tokens in documents:
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+
+    matrix = np.zeros((len(documents), max(1, len(vocabulary))), dtype=np.float32)
+    for row, tokens in enumerate(documents):
+        for token, count in Counter(tokens).items():
+            matrix[row, vocabulary[token]] = 1.0 + np.log(count)
+
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1.0
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def gap_similarities(embeddings: np.ndarray, scene_ids: np.ndarray, window: int) -> np.ndarray:
+    """
+    Cosine similarity of the sentence windows before and after every gap.
+
+    Gap i lies between sentences i-1 and i. Windows are clipped to the scene
+    of sentence i, so text from another scene never smooths a gap.
+
+    Args:
+        embeddings: Sentence embeddings (rows), in reading order
+        scene_ids: Scene number of each sentence (non-decreasing)
+        window: Sentences per side
+
+    Returns:
+        Array of len(embeddings) similarities; entry 0 and scene starts are 0.0
+    """
+    count = len(embeddings)
+    if count < 2:
+        return np.zeros(count, dtype=np.float32)
+
+    cumulative = np.vstack([np.zeros((1, embeddings.shape[1]), dtype=np.float32), np.cumsum(embeddings, axis=0)])
+    index = np.arange(count)
+    scene_start = np.searchsorted(scene_ids, scene_ids, side="left")
+    scene_end = np.searchsorted(scene_ids, scene_ids, side="right")
+
+    left = cumulative[index] - cumulative[np.maximum(index - window, scene_start)]
+    right = cumulative[np.minimum(index + window, scene_end)] - cumulative[index]
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    similarities = np.einsum("ij,ij->i", left, right) / np.maximum(norms, 1e-12)
+    similarities[index == scene_start] = 0.0
+    return similarities.astype(np.float32)
+
+
+def depth_scores(similarities: np.ndarray, scene_ids: np.ndarray) -> np.ndarray:
+    """
+    TextTiling depth score of every gap.
+
+    From each gap, climb left and right while the similarity keeps rising;
+    the depth is the sum of both climbs. A gap inside a flat stretch scores
+    0, however low the similarity, and a dip between two similar passages
+    scores high. Climbs stay within the scene.
+
+    Args:
+        similarities: Gap similarities from gap_similarities()
+        scene_ids: Scene number of each sentence (non-decreasing)
+
+    Returns:
+        Array of len(similarities) depths; entry 0 and scene starts are 0.0
+    """
+    count = len(similarities)
+    depths = np.zeros(count, dtype=np.float32)
+    scene_start = np.searchsorted(scene_ids, scene_ids, side="left")
+    scene_end = np.searchsorted(scene_ids, scene_ids, side="right")
+
+    for gap in range(count):
+        if gap == scene_start[gap]:
+            continue
+        left = gap
+        while left - 1 > scene_start[gap] and similarities[left - 1] >= similarities[left]:
+            left -= 1
+        right = gap
+        while right + 1 < scene_end[gap] and similarities[right + 1] >= similarities[right]:
+            right += 1
+        depths[gap] = similarities[left] + similarities[right] - 2 * similarities[gap]
+    return depths
+
+
+class EmbeddingChangeDetector:
+    """
+    Chapter-level image boundary detection from TF-IDF sentence embeddings.
+
+    Call prepare() with the sentences before asking for decisions; decisions
+    are precomputed and looked up per sentence.
+    """
+
+    def __init__(self, threshold: float = EMBEDDING_DETECTION_THRESHOLD,
+                 window: int = EMBEDDING_DETECTION_WINDOW,
+                 min_sentences: int = EMBEDDING_DETECTION_MIN_SENTENCES):
+        """
+        Initialize detector.
+
+        Args:
+            threshold: Minimum depth score of a similarity dip for a new image (0-2)
+            window: Sentences compared on each side of a gap
+            min_sentences: Minimum sentences shown with one image
+        """
+        self.threshold = threshold
+        self.window = max(1, window)
+        self.min_sentences = max(1, min_sentences)
+        self.decisions: Dict[SentenceKey, Tuple[bool, str]] = {}
+        self.similarities: Dict[SentenceKey, float] = {}
+        self.depths: Dict[SentenceKey, float] = {}
+
+    def prepare(self, sentences: List[Sentence]) -> "EmbeddingChangeDetector":
+        """
+        Decide image boundaries for every sentence (one pass per chapter).
+
+        Args:
+            sentences: Sentences in reading order (one or more chapters)
+
+        Returns:
+            self, for chaining
+        """
+        chapters: Dict[int, List[Sentence]] = {}
+        for sentence in sentences:
+            chapters.setdefault(sentence.chapter_num, []).append(sentence)
+
+        for chapter_sentences in chapters.values():
+            embeddings = tfidf_matrix([sentence_features(sentence.content) for sentence in chapter_sentences])
+            scene_ids = np.array([sentence.scene_num for sentence in chapter_sentences])
+            similarities = gap_similarities(embeddings, scene_ids, self.window)
+            depths = depth_scores(similarities, scene_ids)
+
+            # Fixed boundaries: chapter start, scene starts, and the chapter end
+            # (so the last image also gets min_sentences)
+            count = len(chapter_sentences)
+            reasons = {0: "first_sentence"}
+            if FORCE_NEW_IMAGE_AT_SCENE_START:
+                for position in range(1, count):
+                    if scene_ids[position] != scene_ids[position - 1]:
+                        reasons[position] = "scene_start"
+            taken = sorted(reasons) + [count]
+
+            # Deepest dips first, each at least min_sentences from every boundary
+            for position in np.argsort(-depths, kind="stable"):
+                depth = float(depths[position])
+                if depth < self.threshold:
+                    break
+                insert_at = bisect.bisect_left(taken, position)
+                if (position - taken[insert_at - 1] >= self.min_sentences
+                        and taken[insert_at] - position >= self.min_sentences):
+                    taken.insert(insert_at, int(position))
+                    reasons[int(position)] = f"embedding_change: depth {depth:.2f}"
+
+            for position, sentence in enumerate(chapter_sentences):
+                key = (sentence.chapter_num, sentence.scene_num, sentence.sentence_num)
+                self.similarities[key] = float(similarities[position])
+                self.depths[key] = float(depths[position])
+                reason = reasons.get(position)
+                self.decisions[key] = (True, reason) if reason else (False, "no_significant_change")
+
+        return self
+
+    def decide(self, sentence: Sentence) -> Tuple[bool, str]:
+        """
+        Precomputed decision for a sentence.
+
+        Args:
+            sentence: Sentence passed to prepare()
+
+        Returns:
+            Tuple of (needs_new_image: bool, reason: str); sentences that were
+            not prepared always get a new image
+        """
+        key = (sentence.chapter_num, sentence.scene_num, sentence.sentence_num)
+        return self.decisions.get(key, (True, "not_prepared"))
+
+    # VisualChangeDetector interface, as used by decide_image_reuse()
+
+    def analyze_sentence(self, sentence: Sentence) -> Sentence:
+        """The visual state is the sentence itself (decisions are precomputed)."""
+        return sentence
+
+    def needs_new_image(self, new_state: Sentence) -> Tuple[bool, str]:
+        """Precomputed decision for the sentence returned by analyze_sentence()."""
+        return self.decide(new_state)
+
+    def update_state(self, new_state):
+        """No per-sentence state to update."""
+
+    def analyze_with_storyboard(self, sentence: Sentence, storyboard) -> Tuple[bool, str]:
+        """Precomputed decision (the storyboard analysis is not used for boundaries)."""
+        return self.decide(sentence)
+
+    def update_storyboard_state(self, storyboard):
+        """No per-sentence state to update."""
+
+    def reset(self):
+        """Decisions are per chapter; nothing to reset at scene starts."""
+
+
+def main():
+    """Compare embedding boundaries with the rule-based detector on chapter 1."""
+    from scene_parser import parse_all_chapters, parse_scene_sentences
+    from visual_change_detector import create_change_detector
+    from render_planner import decide_image_reuse
+
+    scenes = parse_all_chapters(chapter_numbers=[1])
+    sentences = [s for scene in scenes for s in parse_scene_sentences(scene)]
+
+    for strategy in ("rules", "embedding"):
+        detector = create_change_detector(sentences, strategy)
+        images = 0
+        current_image = None
+        for sentence in sentences:
+            needs_new_image, _ = decide_image_reuse(detector, sentence, None, current_image)
+            if needs_new_image:
+                images += 1
+                current_image = f"image_{images}"
+        print(f"{strategy:10s}: {images} images for {len(sentences)} sentences")
+
+    embedding = EmbeddingChangeDetector().prepare(sentences)
+    for sentence in sentences[:12]:
+        needs_new_image, reason = embedding.decide(sentence)
+        key = (sentence.chapter_num, sentence.scene_num, sentence.sentence_num)
+        marker = "NEW" if needs_new_image else "   "
+        print(f"{marker} sc{sentence.scene_num:02d} s{sentence.sentence_num:03d} "
+              f"sim {embedding.similarities[key]:.2f} depth {embedding.depths[key]:.2f} {reason:28s} {' '.join(sentence.content.split())[:60]}")
+
+
+if __name__ == "__main__":
+    main()
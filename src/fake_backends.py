@@ -0,0 +1,801 @@
+"""
+Deterministic fake backends for CPU-only benchmarking.
+
+Stand-ins for the GPU and network services used by the pipeline:
+- FakeSDXLGenerator: same interface as image_generator.SDXLGenerator
+- FakeTTSGenerator: same interface as audio_generator.CoquiTTSGenerator
+- FakeAnthropicClient: client.messages.create() and messages.batches for
+  StoryboardAnalyzer and storyboard_batch
+- FakeAnthropicServer: local HTTP stub of the Messages (and Message Batches)
+  API for the real SDK
+- FakeOllamaServer: local HTTP endpoint serving /api/generate
+
+Every fake has a configurable latency (seconds per call) and derives its
+output from the input, so repeated runs produce identical files. The
+Anthropic fakes also simulate prompt caching, so cache read/write accounting
+can be checked without the real API.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import wave
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+
+from config import DEFAULT_WIDTH, DEFAULT_HEIGHT, DEFAULT_SAMPLE_RATE
+from prompt_generator import extract_characters, extract_setting, extract_mood, extract_time_of_day
+from stage_metrics import span
+
+
+def _stable_hash(text: str) -> int:
+    """Deterministic integer hash of a string (unlike hash(), not salted per process)."""
+    return int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+
+
+class FakeSDXLGenerator:
+    """SDXLGenerator stand-in that returns solid-color images after a fixed delay."""
+
+    def __init__(self, latency: float = 0.0, enable_ip_adapter: bool = False):
+        """
+        Initialize fake generator.
+
+        Args:
+            latency: Seconds to sleep per generated image
+            enable_ip_adapter: Accepted for interface compatibility
+        """
+        self.latency = latency
+        self.enable_ip_adapter = enable_ip_adapter
+        self.ip_adapter_loaded = enable_ip_adapter
+        self.pipe = None
+        self.images_generated = 0
+
+    def load_model(self):
+        """Pretend to load the model."""
+        self.pipe = object()
+
+    def generate_image(
+        self,
+        prompt: str,
+        negative_prompt: str,
+        width: int = DEFAULT_WIDTH,
+        height: int = DEFAULT_HEIGHT,
+        num_inference_steps: int = 30,
+        guidance_scale: float = 7.5,
+        seed: int = 42
+    ):
+        """
+        Return a solid-color image whose color depends on seed and prompt.
+
+        Returns:
+            PIL Image of the requested size
+        """
+        from PIL import Image
+
+        if self.pipe is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+
+        with span("diffusion", width=width, height=height, steps=num_inference_steps, fake=True):
+            time.sleep(self.latency)
+            value = _stable_hash(f"{seed}:{prompt}")
+            color = (value & 0xFF, (value >> 8) & 0xFF, (value >> 16) & 0xFF)
+            image = Image.new('RGB', (width, height), color)
+
+        self.images_generated += 1
+        return image
+
+    def generate_with_character_ref(
+        self,
+        prompt: str,
+        negative_prompt: str,
+        character_name: str,
+        width: int = DEFAULT_WIDTH,
+        height: int = DEFAULT_HEIGHT,
+        num_inference_steps: int = 30,
+        guidance_scale: float = 7.5,
+        seed: int = 42,
+        ip_adapter_scale: float = None,
+        faceid_scale: float = None
+    ):
+        """Same as generate_image; the character only affects the color."""
+        return self.generate_image(
+            f"{character_name}:{prompt}", negative_prompt, width, height,
+            num_inference_steps, guidance_scale, seed
+        )
+
+    def unload_model(self):
+        """Pretend to free VRAM."""
+        self.pipe = None
+
+
+class FakeTTSGenerator:
+    """CoquiTTSGenerator stand-in that returns silence sized to the text."""
+
+    # Seconds of audio per word (roughly natural narration pace)
+    SECONDS_PER_WORD = 0.35
+
+    def __init__(self, latency: float = 0.0, sample_rate: int = DEFAULT_SAMPLE_RATE):
+        """
+        Initialize fake TTS generator.
+
+        Args:
+            latency: Seconds to sleep per synthesized chunk
+            sample_rate: Output sample rate in Hz
+        """
+        self.latency = latency
+        self.sample_rate = sample_rate
+        self.model = None
+        self.device = "cpu"
+
+    def load_model(self) -> bool:
+        """Pretend to load the model."""
+        self.model = object()
+        return True
+
+    def generate_speech(
+        self,
+        text: str,
+        speaker_wav: Optional[str] = None,
+        speaker_name: Optional[str] = None,
+        language: str = "en"
+    ):
+        """
+        Return silence whose length depends on the word count.
+
+        Returns:
+            float32 numpy array, or None for empty text
+        """
+        import numpy as np
+
+        if self.model is None or not text.strip():
+            return None
+
+        with span("tts_inference", characters=len(text), fake=True):
+            time.sleep(self.latency)
+            duration = max(1, len(text.split())) * self.SECONDS_PER_WORD
+            audio = np.zeros(int(duration * self.sample_rate), dtype=np.float32)
+
+        return audio
+
+    def generate_speech_chunked(
+        self,
+        text: str,
+        speaker_wav: Optional[str] = None,
+        speaker_name: Optional[str] = None,
+        language: str = "en",
+        max_chunk_size: int = 500
+    ):
+        """Chunking is irrelevant for silence; delegates to generate_speech."""
+        return self.generate_speech(text, speaker_wav, speaker_name, language)
+
+    def save_audio(self, audio, output_path: str) -> bool:
+        """
+        Write audio as 16-bit PCM WAV with the standard library.
+
+        Returns:
+            True if successful, False otherwise
+        """
+        import numpy as np
+
+        try:
+            with span("wav_write"):
+                pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+                with wave.open(output_path, 'wb') as wav_file:
+                    wav_file.setnchannels(1)
+                    wav_file.setsampwidth(2)
+                    wav_file.setframerate(self.sample_rate)
+                    wav_file.writeframes(pcm.tobytes())
+            return True
+        except Exception as e:
+            print(f"Error saving audio: {e}")
+            return False
+
+    def get_audio_duration(self, audio) -> float:
+        """Get duration of audio in seconds."""
+        return len(audio) / self.sample_rate
+
+    def unload_model(self):
+        """Pretend to free memory."""
+        self.model = None
+
+
+class FakePromptCache:
+    """
+    Simulates Anthropic prompt caching for the fake Anthropic backends.
+
+    Content blocks marked with cache_control are cache breakpoints. A request
+    reads the longest previously written prefix ending at one of its
+    breakpoints and writes the prefix up to its last breakpoint. Prefixes
+    shorter than min_cacheable_tokens are not cached, as with the real API.
+    Tokens are estimated as characters / 4.
+    """
+
+    def __init__(self, min_cacheable_tokens: int = 0):
+        """
+        Initialize an empty cache.
+
+        Args:
+            min_cacheable_tokens: Minimum prefix length that can be cached
+        """
+        self.min_cacheable_tokens = min_cacheable_tokens
+        self._prefixes = set()
+
+    @staticmethod
+    def _segments(system, messages: List[dict]) -> List[tuple]:
+        """Flatten system and message content into (text, is_breakpoint) segments."""
+        segments = []
+        for content in [system] + [message["content"] for message in messages]:
+            if not content:
+                continue
+            if isinstance(content, str):
+                segments.append((content, False))
+                continue
+            for block in content:
+                segments.append((block.get("text", ""), "cache_control" in block))
+        return segments
+
+    def account(self, system, messages: List[dict]) -> Dict[str, int]:
+        """
+        Split a request's input tokens into uncached, cache-read and cache-write.
+
+        Returns:
+            Dict with input_tokens, cache_read_input_tokens and
+            cache_creation_input_tokens
+        """
+        segments = self._segments(system, messages)
+
+        cumulative = []
+        digest = hashlib.md5()
+        total = 0
+        for text, is_breakpoint in segments:
+            total += len(text) // 4
+            digest.update(text.encode())
+            cumulative.append((total, digest.hexdigest(), is_breakpoint))
+
+        breakpoints = [(tokens, key) for tokens, key, is_breakpoint in cumulative
+                       if is_breakpoint and tokens >= self.min_cacheable_tokens]
+
+        read = 0
+        for tokens, key in reversed(breakpoints):
+            if key in self._prefixes:
+                read = tokens
+                break
+
+        write = 0
+        if breakpoints and breakpoints[-1][0] > read:
+            write = breakpoints[-1][0] - read
+        for _, key in breakpoints:
+            self._prefixes.add(key)
+
+        return {
+            "input_tokens": total - read - write,
+            "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": write,
+        }
+
+
+_SENTENCE_PATTERN = re.compile(r'SENTENCE: "(.*?)"\s*\n', re.DOTALL)
+_SCENE_SENTENCE_PATTERN = re.compile(r'^\[(\d+)\] "(.*)"$', re.MULTILINE)
+_FRAMINGS = ["close-up", "medium shot", "wide shot", "extreme close-up", "medium close-up"]
+_ANGLES = ["level", "low angle", "high angle", "over-the-shoulder"]
+
+
+def _fake_analysis(sentence: str) -> dict:
+    """Canned storyboard analysis derived from keyword extraction on a sentence."""
+    value = _stable_hash(sentence)
+    time_of_day = extract_time_of_day(sentence)
+    return {
+        "characters_present": extract_characters(sentence),
+        "character_roles": {},
+        "camera_framing": _FRAMINGS[value % len(_FRAMINGS)],
+        "camera_angle": _ANGLES[(value >> 4) % len(_ANGLES)],
+        "composition": "rule of thirds",
+        "visual_focus": sentence[:60],
+        "expressions": {},
+        "body_language": {},
+        "props": [],
+        "spatial_context": extract_setting(sentence),
+        "mood": extract_mood(sentence, time_of_day),
+        "tone": "neutral",
+        "lighting_suggestion": time_of_day,
+        "confidence": 0.9,
+        "attribute_changes": [],
+    }
+
+
+def fake_message(body: dict, prompt_cache: FakePromptCache) -> dict:
+    """
+    Build a Messages API response (as JSON-ready dict) with canned storyboard JSON.
+
+    The analysis is derived from keyword extraction on the sentence in the
+    user prompt, so it is stable across runs. Scene-level requests (numbered
+    SENTENCES list) get a JSON array with one analysis per sentence.
+
+    Args:
+        body: Request body (model, max_tokens, system, messages)
+        prompt_cache: Cache used for cache read/write accounting
+
+    Returns:
+        Response dict shaped like the Messages API response
+    """
+    messages = body["messages"]
+    user_content = messages[-1]["content"]
+    if isinstance(user_content, list):
+        user_content = "".join(block.get("text", "") for block in user_content)
+
+    if "SENTENCES:" in user_content:
+        # Scene-level request: one analysis per numbered sentence
+        analysis = []
+        for number, sentence in _SCENE_SENTENCE_PATTERN.findall(user_content):
+            item = _fake_analysis(sentence)
+            item["sentence_num"] = int(number)
+            analysis.append(item)
+        value = _stable_hash(user_content)
+    else:
+        match = _SENTENCE_PATTERN.search(user_content)
+        sentence = match.group(1) if match else user_content
+        analysis = _fake_analysis(sentence)
+        value = _stable_hash(sentence)
+
+    text = json.dumps(analysis)
+
+    usage = prompt_cache.account(body.get("system"), messages)
+    usage["output_tokens"] = len(text) // 4
+
+    return {
+        "id": f"msg_fake_{value:08x}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", ""),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": usage,
+    }
+
+
+class FakeBatchStore:
+    """
+    Message Batches simulated on disk.
+
+    Batches are JSON files in a directory, so a batch submitted by one
+    process can be polled and read by another (for resumability tests).
+    A batch stays "in_progress" for processing_seconds after creation;
+    the first retrieve() after that processes every request and ends it.
+    """
+
+    def __init__(self, directory: str, prompt_cache: FakePromptCache,
+                 processing_seconds: float = 0.0, failing_custom_ids: Iterable[str] = ()):
+        """
+        Initialize batch store.
+
+        Args:
+            directory: Directory holding batch files
+            prompt_cache: Cache used for usage accounting of batch requests
+            processing_seconds: Time a batch stays in progress
+            failing_custom_ids: Requests that end as "errored" results
+        """
+        self.directory = directory
+        self.prompt_cache = prompt_cache
+        self.processing_seconds = processing_seconds
+        self.failing_custom_ids = set(failing_custom_ids)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.json")
+
+    def _load(self, batch_id: str) -> dict:
+        with open(self._path(batch_id), 'r') as f:
+            return json.load(f)
+
+    def _save(self, record: dict):
+        with open(self._path(record["batch"]["id"]), 'w') as f:
+            json.dump(record, f)
+
+    def create(self, requests: List[dict]) -> dict:
+        """Store a new batch and return its batch object."""
+        created_at = datetime.now()
+        digest = hashlib.md5(f"{created_at.isoformat()}:{len(requests)}".encode()).hexdigest()[:16]
+        batch = {
+            "id": f"msgbatch_fake_{digest}",
+            "type": "message_batch",
+            "processing_status": "in_progress",
+            "request_counts": {"processing": len(requests), "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": created_at.isoformat(),
+            "ended_at": None,
+            "expires_at": (created_at + timedelta(hours=24)).isoformat(),
+            "results_url": None,
+        }
+        self._save({"batch": batch, "requests": requests, "results": None})
+        return batch
+
+    def retrieve(self, batch_id: str) -> dict:
+        """Return the batch object, processing it once its time is up."""
+        record = self._load(batch_id)
+        batch = record["batch"]
+
+        elapsed = (datetime.now() - datetime.fromisoformat(batch["created_at"])).total_seconds()
+        if batch["processing_status"] == "in_progress" and elapsed >= self.processing_seconds:
+            results = []
+            for request in record["requests"]:
+                if request["custom_id"] in self.failing_custom_ids:
+                    result = {"type": "errored", "error": {"type": "error", "error": {
+                        "type": "invalid_request_error", "message": "Simulated failure"}}}
+                else:
+                    result = {"type": "succeeded", "message": fake_message(request["params"], self.prompt_cache)}
+                results.append({"custom_id": request["custom_id"], "result": result})
+
+            errored = sum(1 for r in results if r["result"]["type"] == "errored")
+            batch["processing_status"] = "ended"
+            batch["ended_at"] = datetime.now().isoformat()
+            batch["request_counts"].update(processing=0, succeeded=len(results) - errored, errored=errored)
+            record["results"] = results
+            self._save(record)
+
+        return batch
+
+    def results(self, batch_id: str) -> List[dict]:
+        """Return individual results of an ended batch."""
+        record = self._load(batch_id)
+        if record["results"] is None:
+            raise RuntimeError(f"Batch {batch_id} has not ended yet")
+        return record["results"]
+
+
+def _to_namespace(value):
+    """Recursively convert API JSON into attribute-access objects like the SDK's."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+class _FakeBatches:
+    """Implements messages.batches.create/retrieve/results() on a FakeBatchStore."""
+
+    def __init__(self, store: FakeBatchStore):
+        self.store = store
+
+    def create(self, requests: List[dict], **kwargs):
+        return _to_namespace(self.store.create(requests))
+
+    def retrieve(self, message_batch_id: str, **kwargs):
+        return _to_namespace(self.store.retrieve(message_batch_id))
+
+    def results(self, message_batch_id: str, **kwargs):
+        return iter(_to_namespace(self.store.results(message_batch_id)))
+
+
+class _FakeMessages:
+    """Implements messages.create() on top of fake_message()."""
+
+    def __init__(self, client: "FakeAnthropicClient"):
+        self.client = client
+        self.batches = _FakeBatches(client.batch_store)
+
+    def create(self, model: str, max_tokens: int, messages: List[dict], system=None, **kwargs):
+        """Return a response object shaped like anthropic.types.Message."""
+        time.sleep(self.client.latency)
+        body = dict(kwargs, model=model, max_tokens=max_tokens, messages=messages)
+        if system is not None:
+            body["system"] = system
+        self.client.requests.append(body)
+
+        return _to_namespace(fake_message(body, self.client.prompt_cache))
+
+
+class FakeAnthropicClient:
+    """Anthropic client stand-in for StoryboardAnalyzer(client=...)."""
+
+    def __init__(self, latency: float = 0.0, min_cacheable_tokens: int = 0,
+                 batch_dir: Optional[str] = None, batch_processing_seconds: float = 0.0,
+                 failing_custom_ids: Iterable[str] = ()):
+        """
+        Initialize fake client.
+
+        Args:
+            latency: Seconds to sleep per messages.create() call
+            min_cacheable_tokens: Minimum prefix length for simulated prompt caching
+            batch_dir: Directory for simulated batches (default: a temp dir
+                       owned by the client, removed by close());
+                       reuse it across processes to test resuming
+            batch_processing_seconds: Time a batch stays in progress
+            failing_custom_ids: Batch requests that end as "errored" results
+        """
+        self.latency = latency
+        self.requests: List[dict] = []
+        self.prompt_cache = FakePromptCache(min_cacheable_tokens)
+        self._batch_temp_dir = None if batch_dir else tempfile.TemporaryDirectory(prefix="fake_batches_")
+        self.batch_store = FakeBatchStore(
+            batch_dir or self._batch_temp_dir.name,
+            self.prompt_cache,
+            processing_seconds=batch_processing_seconds,
+            failing_custom_ids=failing_custom_ids
+        )
+        self.messages = _FakeMessages(self)
+
+    @property
+    def calls(self) -> int:
+        """Number of messages.create() calls made."""
+        return len(self.requests)
+
+    def close(self):
+        """Remove the client's own batch directory (a given batch_dir is kept)."""
+        if self._batch_temp_dir is not None:
+            self._batch_temp_dir.cleanup()
+            self._batch_temp_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class _FakeHTTPServer:
+    """Background ThreadingHTTPServer on a free localhost port."""
+
+    def __init__(self):
+        self._server = None
+        self._thread = None
+
+    def _make_handler(self):
+        raise NotImplementedError
+
+    @property
+    def base_url(self) -> str:
+        """Base URL of the running server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving on a free localhost port in a background thread."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Request handler helpers shared by the fake servers."""
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, data: dict, status: int = 200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+
+class FakeAnthropicServer(_FakeHTTPServer):
+    """
+    Local HTTP stub of the Anthropic Messages API.
+
+    Serves POST /v1/messages, POST /v1/messages/batches,
+    GET /v1/messages/batches/<id> and GET /v1/messages/batches/<id>/results.
+
+    Point the real SDK at it to verify request shape and usage accounting:
+        with FakeAnthropicServer() as server:
+            client = Anthropic(base_url=server.base_url, api_key="fake")
+            analyzer = StoryboardAnalyzer(client=client)
+            ...
+            server.requests  # Request bodies as sent over the wire
+    """
+
+    def __init__(self, latency: float = 0.0, min_cacheable_tokens: int = 0,
+                 batch_dir: Optional[str] = None, batch_processing_seconds: float = 0.0,
+                 failing_custom_ids: Iterable[str] = ()):
+        """
+        Initialize fake server (started by start() or the context manager).
+
+        Args:
+            latency: Seconds to sleep per request
+            min_cacheable_tokens: Minimum prefix length for simulated prompt caching
+            batch_dir: Directory for simulated batches (default: a temp dir
+                       owned by the server, removed when the context exits)
+            batch_processing_seconds: Time a batch stays in progress
+            failing_custom_ids: Batch requests that end as "errored" results
+        """
+        super().__init__()
+        self.latency = latency
+        self.requests: List[dict] = []
+        self.prompt_cache = FakePromptCache(min_cacheable_tokens)
+        self._batch_temp_dir = None if batch_dir else tempfile.TemporaryDirectory(prefix="fake_batches_")
+        self.batch_store = FakeBatchStore(
+            batch_dir or self._batch_temp_dir.name,
+            self.prompt_cache,
+            processing_seconds=batch_processing_seconds,
+            failing_custom_ids=failing_custom_ids
+        )
+
+    def close(self):
+        """Stop the server and remove its own batch directory (a given batch_dir is kept)."""
+        self.stop()
+        if self._batch_temp_dir is not None:
+            self._batch_temp_dir.cleanup()
+            self._batch_temp_dir = None
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _make_handler(self):
+        server = self
+        batches_prefix = "/v1/messages/batches"
+
+        class Handler(_JSONHandler):
+            def send_not_found(self):
+                self.send_json({"type": "error", "error": {"type": "not_found_error", "message": self.path}}, status=404)
+
+            def do_POST(self):
+                path = self.path.split("?")[0].rstrip("/")
+                body = self.read_json()
+                time.sleep(server.latency)
+
+                if path == "/v1/messages":
+                    server.requests.append(body)
+                    self.send_json(fake_message(body, server.prompt_cache))
+                elif path == batches_prefix:
+                    server.requests.extend(request["params"] for request in body["requests"])
+                    self.send_json(server.batch_store.create(body["requests"]))
+                else:
+                    self.send_not_found()
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if not path.startswith(batches_prefix + "/"):
+                    self.send_not_found()
+                    return
+
+                parts = path[len(batches_prefix) + 1:].split("/")
+                try:
+                    if len(parts) == 1:
+                        batch = server.batch_store.retrieve(parts[0])
+                        if batch["processing_status"] == "ended":
+                            batch["results_url"] = f"{server.base_url}{batches_prefix}/{parts[0]}/results"
+                        self.send_json(batch)
+                    elif len(parts) == 2 and parts[1] == "results":
+                        lines = "\n".join(json.dumps(r) for r in server.batch_store.results(parts[0]))
+                        body = lines.encode()
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/binary")
+                        self.send_header("Content-Length", str(len(body)))
+                        self.end_headers()
+                        self.wfile.write(body)
+                    else:
+                        self.send_not_found()
+                except (FileNotFoundError, RuntimeError):
+                    self.send_not_found()
+
+        return Handler
+
+
+class FakeOllamaServer(_FakeHTTPServer):
+    """
+    Local HTTP server that answers Ollama /api/generate requests.
+
+    Usage:
+        with FakeOllamaServer(latency=0.05) as server:
+            prompt_generator.OLLAMA_BASE_URL = server.base_url
+    """
+
+    def __init__(self, latency: float = 0.0, fail_first: int = 0):
+        """
+        Initialize fake server (started by start() or the context manager).
+
+        Args:
+            latency: Seconds to sleep per request
+            fail_first: Answer this many initial requests with 503 (exercises retries)
+        """
+        super().__init__()
+        self.latency = latency
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(_JSONHandler):
+            def do_POST(self):
+                request = self.read_json()
+                time.sleep(server.latency)
+                server.calls += 1
+
+                if server.calls <= server.fail_first:
+                    self.send_json({"error": "model is loading"}, status=503)
+                    return
+
+                value = _stable_hash(request.get("prompt", ""))
+                self.send_json({
+                    "model": request.get("model", ""),
+                    "response": f"A graphic novel panel, variation {value % 1000}, clean line art",
+                    "done": True,
+                })
+
+        return Handler
+
+
+def main():
+    """Exercise the fakes that need no optional dependencies."""
+    from scene_parser import Sentence
+    from storyboard_analyzer import StoryboardAnalyzer
+    import tempfile
+
+    print("Fake Backends Test")
+    print("=" * 80)
+
+    scene = "Emma walked into the factory at dawn. She looked at the assembly line. Wei waved."
+    sentences = [
+        Sentence(content=text, chapter_num=1, scene_num=1, sentence_num=i, scene_context=scene, word_count=len(text.split()))
+        for i, text in enumerate(["Emma walked into the factory at dawn.", "She looked at the assembly line.", "Wei waved."], start=1)
+    ]
+
+    # Storyboard analysis through the in-process fake client with prompt caching
+    client = FakeAnthropicClient()
+    with client, tempfile.TemporaryDirectory() as cache_dir:
+        analyzer = StoryboardAnalyzer(cache_dir=cache_dir, images_dir=cache_dir, client=client,
+                                      prompt_caching=True, cache_min_prefix_tokens=0)
+        analyzer.set_chapter_character_context(1, "Emma: analytical engineer\nWei: factory worker")
+        for sentence in sentences:
+            analysis = analyzer.analyze_sentence(sentence)
+            print(f"  -> {analysis.camera_framing}, characters: {analysis.characters_present}")
+
+    print(f"\nFirst request system block: {json.dumps(client.requests[0]['system'])[:120]}...")
+    print(f"Storyboard stats: {analyzer.stats}")
+
+    # Same request shape over HTTP (what the SDK would send to the stub server)
+    from urllib.request import Request, urlopen
+    with FakeAnthropicServer() as server:
+        for body in client.requests[:2]:
+            request = Request(
+                f"{server.base_url}/v1/messages",
+                data=json.dumps(body).encode(),
+                headers={"Content-Type": "application/json"}
+            )
+            with urlopen(request) as response:
+                print(f"Anthropic stub at {server.base_url}: usage {json.load(response)['usage']}")
+
+    with FakeOllamaServer() as server:
+        request = Request(
+            f"{server.base_url}/api/generate",
+            data=json.dumps({"model": "fake", "prompt": "test"}).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        with urlopen(request) as response:
+            print(f"Ollama fake at {server.base_url}: {json.load(response)['response']}")
+
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,8 @@ from dialogue_parser import parse_scene_text, DialogueSegment
 from audio_filename_generator import generate_audio_filename
 from audio_generator import CoquiTTSGenerator
 from voice_config import get_voice_for_speaker
+from audio_manifest import ChapterManifest
+from stage_metrics import span, start_run, finish_run
 from config import (
     AUDIO_DIR,
     AUDIO_CACHE_DIR,
@@ -100,12 +102,69 @@ def save_metadata_to_cache(filename: str, metadata: dict):
         json.dump(metadata, f, indent=2, ensure_ascii=False)
 
 
+def update_audio_manifest(manifest: ChapterManifest, sentence: Sentence, output_path: str,
+                          sample_rate: int = None, num_samples: int = None):
+    """
+    Record a sentence's audio file in its chapter's audio manifest.
+
+    The video stage plans chapters from the manifest instead of probing
+    every audio file. Freshly generated audio passes its sample rate and
+    length; for existing files the entry is only refreshed (from the file
+    header) when it is missing or stale. The manifest is saved once per
+    chapter by finish_chapter_manifest().
+
+    Args:
+        manifest: Manifest of the sentence's chapter
+        sentence: Sentence the audio belongs to
+        output_path: Path of the audio file
+        sample_rate: Sample rate of freshly generated audio
+        num_samples: Length in samples of freshly generated audio
+    """
+    if num_samples is not None:
+        manifest.record(Path(output_path), sentence.scene_num, sentence.sentence_num, sample_rate, num_samples)
+    else:
+        manifest.ensure_entry(Path(output_path), sentence.scene_num, sentence.sentence_num)
+
+
+def finish_chapter_manifest(manifest: ChapterManifest, log_file: str, chapter_files: list = None):
+    """
+    Save a chapter's audio manifest, optionally dropping entries of removed sentences.
+
+    Args:
+        manifest: Manifest to save
+        log_file: Path to log file
+        chapter_files: Audio filenames of every sentence in the chapter; only
+                       pass this once the whole chapter has been processed
+    """
+    if chapter_files is not None:
+        removed = manifest.prune(chapter_files)
+        if removed:
+            log_message(log_file, f"Removed {removed} stale entries from the chapter {manifest.chapter_num} audio manifest")
+    try:
+        manifest.save()
+    except OSError as e:
+        log_message(log_file, f"⚠ WARNING: Could not save audio manifest for chapter {manifest.chapter_num}: {e}")
+
+
+def sentence_audio_filename(sentence: Sentence, audio_format: str) -> str:
+    """Audio filename of a sentence."""
+    return generate_audio_filename(
+        sentence.chapter_num,
+        sentence.scene_num,
+        sentence.content,
+        ext=audio_format,
+        sentence_num=sentence.sentence_num,
+        scene_context=sentence.scene_context
+    )
+
+
 def process_sentence(
     sentence: Sentence,
     generator: CoquiTTSGenerator,
     log_file: str,
     args: argparse.Namespace,
-    dry_run: bool = False
+    dry_run: bool = False,
+    manifest: ChapterManifest = None
 ) -> bool:
     """
     Process a single sentence: generate audio, save file.
@@ -116,19 +175,13 @@ def process_sentence(
         log_file: Path to log file
         args: Command-line arguments
         dry_run: If True, only show what would be generated without creating audio
+        manifest: Audio manifest of the sentence's chapter (required unless dry_run)
 
     Returns:
         True if successful, False if error occurred
     """
     # Generate filename
-    filename = generate_audio_filename(
-        sentence.chapter_num,
-        sentence.scene_num,
-        sentence.content,
-        ext=args.audio_format,
-        sentence_num=sentence.sentence_num,
-        scene_context=sentence.scene_context
-    )
+    filename = sentence_audio_filename(sentence, args.audio_format)
     output_path = os.path.join(AUDIO_DIR, filename)
 
     # Log sentence info
@@ -147,6 +200,10 @@ def process_sentence(
     # Check if audio already exists
     if os.path.exists(output_path) and not args.skip_cache:
         log_message(log_file, f"⊙ Audio already exists, skipping: {filename}")
+        try:
+            update_audio_manifest(manifest, sentence, output_path)
+        except Exception as e:
+            log_message(log_file, f"⚠ WARNING: Could not update audio manifest for {filename}: {e}")
         return True
 
     try:
@@ -203,9 +260,12 @@ def process_sentence(
             'sentence': sentence.sentence_num,
             'word_count': sentence.word_count,
             'duration_seconds': duration,
+            'sample_rate': generator.sample_rate,
+            'num_samples': len(audio),
             'generated_at': datetime.now().isoformat()
         }
         save_metadata_to_cache(filename, metadata)
+        update_audio_manifest(manifest, sentence, output_path, generator.sample_rate, len(audio))
 
         # Log success
         elapsed = (datetime.now() - start_time).total_seconds()
@@ -236,6 +296,12 @@ def main():
         help='Specific chapter numbers to process (e.g., --chapters 1 3)'
     )
 
+    parser.add_argument(
+        '--all-scenes',
+        action='store_true',
+        help='Process every scene even when a single chapter is given'
+    )
+
     parser.add_argument(
         '--resume',
         type=int,
@@ -294,8 +360,8 @@ def main():
 
     # Parse chapters
     log_message(log_file, "\nParsing chapters...")
-    # If only one chapter specified, process only first scene
-    first_scene_only = args.chapters is not None and len(args.chapters) == 1
+    # If only one chapter specified, process only first scene (unless --all-scenes)
+    first_scene_only = args.chapters is not None and len(args.chapters) == 1 and not args.all_scenes
     scenes = parse_all_chapters(chapter_numbers=args.chapters, first_scene_only=first_scene_only)
 
     if first_scene_only and scenes:
@@ -316,6 +382,13 @@ def main():
 
     log_message(log_file, f"Found {len(all_sentences)} sentences to process")
 
+    # Every audio file of each fully parsed chapter, for pruning its manifest
+    chapter_files = {}
+    if not first_scene_only:
+        for sentence in all_sentences:
+            chapter_files.setdefault(sentence.chapter_num, []).append(
+                sentence_audio_filename(sentence, args.audio_format))
+
     # Filter sentences if resuming
     if args.resume:
         resume_chapter, resume_scene = args.resume
@@ -339,51 +412,73 @@ def main():
 
     # Load TTS model
     log_message(log_file, "\nLoading Coqui TTS model...")
-    generator = CoquiTTSGenerator()
-
-    if not generator.load_model():
-        log_message(log_file, "ERROR: Failed to load TTS model")
-        log_message(log_file, "Please install Coqui TTS: pip install TTS")
-        log_message(log_file, "Note: Ensure PyTorch with CUDA is installed first!")
-        sys.exit(1)
-
-    # Process sentences
-    log_message(log_file, f"\nProcessing {len(all_sentences)} sentences...")
-    log_message(log_file, f"Estimated time: {len(all_sentences) * 0.5 / 60:.1f} hours\n")
+    start_run("audio")
+    try:
+        generator = CoquiTTSGenerator()
 
-    success_count = 0
-    error_count = 0
+        with span("model_load"):
+            model_loaded = generator.load_model()
 
-    try:
-        for i, sentence in enumerate(all_sentences, start=1):
-            log_message(log_file, f"\n--- Sentence {i}/{len(all_sentences)} ---")
+        if not model_loaded:
+            log_message(log_file, "ERROR: Failed to load TTS model")
+            log_message(log_file, "Please install Coqui TTS: pip install TTS")
+            log_message(log_file, "Note: Ensure PyTorch with CUDA is installed first!")
+            sys.exit(1)
 
-            success = process_sentence(sentence, generator, log_file, args)
+        # Process sentences
+        log_message(log_file, f"\nProcessing {len(all_sentences)} sentences...")
+        log_message(log_file, f"Estimated time: {len(all_sentences) * 0.5 / 60:.1f} hours\n")
 
-            if success:
-                success_count += 1
-            else:
-                error_count += 1
+        success_count = 0
+        error_count = 0
+        manifest = None
 
-    except KeyboardInterrupt:
-        log_message(log_file, "\n\n⚠ Generation interrupted by user")
+        try:
+            for i, sentence in enumerate(all_sentences, start=1):
+                if manifest is None or manifest.chapter_num != sentence.chapter_num:
+                    if manifest is not None:
+                        finish_chapter_manifest(manifest, log_file, chapter_files.get(manifest.chapter_num))
+                    manifest = ChapterManifest.load(sentence.chapter_num)
+
+                log_message(log_file, f"\n--- Sentence {i}/{len(all_sentences)} ---")
+
+                success = process_sentence(sentence, generator, log_file, args, manifest=manifest)
+
+                if success:
+                    success_count += 1
+                else:
+                    error_count += 1
+
+            if manifest is not None:
+                finish_chapter_manifest(manifest, log_file, chapter_files.get(manifest.chapter_num))
+                manifest = None
+
+        except KeyboardInterrupt:
+            log_message(log_file, "\n\n⚠ Generation interrupted by user")
+
+        finally:
+            # Cleanup
+            log_message(log_file, "\nCleaning up...")
+            generator.unload_model()
+            if manifest is not None:
+                # Interrupted mid-chapter: keep what was recorded, prune nothing
+                finish_chapter_manifest(manifest, log_file)
+
+            # Final summary
+            log_message(log_file, "\n" + "="*80)
+            log_message(log_file, "Generation Summary")
+            log_message(log_file, "="*80)
+            log_message(log_file, f"Total sentences: {len(all_sentences)}")
+            log_message(log_file, f"Successful: {success_count}")
+            log_message(log_file, f"Errors: {error_count}")
+            log_message(log_file, f"Audio files saved to: {AUDIO_DIR}")
+            log_message(log_file, f"Metadata cached to: {AUDIO_CACHE_DIR}")
+            log_message(log_file, f"Log saved to: {log_file}")
+            log_message(log_file, "="*80)
 
     finally:
-        # Cleanup
-        log_message(log_file, "\nCleaning up...")
-        generator.unload_model()
-
-        # Final summary
-        log_message(log_file, "\n" + "="*80)
-        log_message(log_file, "Generation Summary")
-        log_message(log_file, "="*80)
-        log_message(log_file, f"Total sentences: {len(all_sentences)}")
-        log_message(log_file, f"Successful: {success_count}")
-        log_message(log_file, f"Errors: {error_count}")
-        log_message(log_file, f"Audio files saved to: {AUDIO_DIR}")
-        log_message(log_file, f"Metadata cached to: {AUDIO_CACHE_DIR}")
-        log_message(log_file, f"Log saved to: {log_file}")
-        log_message(log_file, "="*80)
+        # Print and save per-stage timing metrics (also if the model fails to load)
+        finish_run()
 
 
 if __name__ == "__main__":
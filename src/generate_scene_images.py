@@ -13,13 +13,25 @@ from pathlib import Path
 
 from scene_parser import parse_all_chapters, Scene, parse_scene_sentences, Sentence
 from prompt_generator import (
-    generate_prompt,
     generate_filename,
     get_negative_prompt,
-    generate_prompt_with_llm,
     generate_prompts_comparison,
-    extract_characters,
-    generate_storyboard_informed_prompt
+    ComparisonPipeline
+)
+from render_planner import (
+    RenderPlan,
+    RenderJob,
+    plan_chapter,
+    plan_cached_chapters_parallel,
+    prepare_chapter_character_context,
+    analyze_with_storyboard,
+    group_scene_sentences,
+    prefetch_scene_storyboard,
+    decide_image_reuse,
+    build_sentence_prompt,
+    select_character_reference,
+    refresh_job_prompt,
+    calculate_seed
 )
 from config import (
     OUTPUT_DIR,
@@ -30,14 +42,23 @@ from config import (
     DEFAULT_WIDTH,
     DEFAULT_HEIGHT,
     ENABLE_SMART_DETECTION,
+    SMART_DETECTION_STRATEGY,
+    ENABLE_SIMILARITY_REUSE,
     IMAGE_MAPPING_DIR,
     ENABLE_IP_ADAPTER,
     STORYBOARD_CACHE_DIR,
-    STORYBOARD_REPORT_DIR
+    STORYBOARD_REPORT_DIR,
+    STORYBOARD_SCENE_BATCH,
+    STORYBOARD_RETRY_DRAIN_SECONDS,
+    RENDER_PLAN_DIR,
+    PLAN_WORKERS
 )
 from cost_tracker import CostTracker
-from visual_change_detector import VisualChangeDetector
+from llm_prompt_cache import get_llm_prompt_cache, set_llm_prompt_cache_enabled
+from visual_change_detector import DETECTION_STRATEGIES, create_change_detector
 from image_mapping_metadata import ImageMappingMetadata
+from image_store import generation_key, get_image_store, set_image_store_enabled
+from stage_metrics import span, start_run, finish_run, record_spans
 
 
 def setup_logging() -> str:
@@ -93,6 +114,28 @@ def save_prompt_to_cache(filename: str, prompt: str, negative_prompt: str, metho
         f.write(negative_prompt)
 
 
+def image_store_key(generator, prompt: str, negative_prompt: str, seed: int,
+                    character_name: str, args: argparse.Namespace) -> str:
+    """
+    Key of an image in the content-addressed image store.
+
+    Args:
+        generator: Loaded SDXLGenerator
+        prompt: Positive prompt
+        negative_prompt: Negative prompt
+        seed: Random seed
+        character_name: Character reference used (or None)
+        args: Command-line arguments (size, steps, guidance)
+
+    Returns:
+        Store key covering every generation input
+    """
+    return generation_key(
+        prompt, negative_prompt, seed, args.steps, args.guidance, args.width, args.height,
+        generator.generation_fingerprint(character_name)
+    )
+
+
 def process_sentence(
     sentence: Sentence,
     generator,  # SDXLGenerator or None for dry-run
@@ -100,13 +143,15 @@ def process_sentence(
     args: argparse.Namespace,
     dry_run: bool = False,
     cost_tracker: CostTracker = None,
-    detector: VisualChangeDetector = None,
+    detector=None,
     current_image_filename: str = None,
     metadata: ImageMappingMetadata = None,
     storyboard_analyzer=None,
     novel_context=None,
     scene_history=None,
-    attribute_manager=None
+    attribute_manager=None,
+    comparison_pipeline=None,
+    deferred_renders: list = None
 ) -> tuple:
     """
     Process a single sentence: generate prompt, create image, save files.
@@ -118,12 +163,17 @@ def process_sentence(
         args: Command-line arguments
         dry_run: If True, only generate and display prompts without creating images
         cost_tracker: Cost tracker for API usage
-        detector: Visual change detector (for smart detection mode)
+        detector: Visual change detector (for smart detection mode, see create_change_detector)
         current_image_filename: Current image filename (for reuse)
         metadata: Image mapping metadata tracker
         storyboard_analyzer: StoryboardAnalyzer for storyboard mode (optional)
         novel_context: NovelContext for character descriptions (optional)
         scene_history: SceneVisualHistory for continuity tracking (optional)
+        attribute_manager: AttributeStateManager for attribute changes (optional)
+        comparison_pipeline: ComparisonPipeline serving --llm compare prompts (optional)
+        deferred_renders: List collecting (sentence, image_filename) of new images
+                          whose storyboard call failed, instead of rendering
+                          them (see render_deferred_sentences)
 
     Returns:
         Tuple of (success: bool, image_filename: str)
@@ -138,57 +188,23 @@ def process_sentence(
     # Storyboard analysis (if enabled)
     storyboard_analysis = None
     if storyboard_analyzer:
-        # Get character context
-        char_context = ""
-        if novel_context:
-            characters = extract_characters(sentence.content)
-            char_context = novel_context.get_all_character_contexts(characters)
-
-        # Get scene continuity context
-        scene_continuity = ""
-        if scene_history:
-            scene_continuity = scene_history.get_continuity_context(manager=attribute_manager)
-
-        # Analyze sentence with storyboard
-        storyboard_analysis = storyboard_analyzer.analyze_sentence(
+        storyboard_analysis = analyze_with_storyboard(
             sentence,
-            character_context=char_context,
-            scene_continuity=scene_continuity
+            storyboard_analyzer,
+            novel_context=novel_context,
+            scene_history=scene_history,
+            attribute_manager=attribute_manager
         )
 
-        # Apply attribute changes to manager (if detected)
-        if attribute_manager and storyboard_analysis.attribute_changes:
-            storyboard_analyzer.apply_attribute_changes_to_manager(
-                storyboard_analysis,
-                attribute_manager,
-                sentence.sentence_num
-            )
-
-        # Update scene history with manager
-        if scene_history:
-            scene_history.update_from_storyboard(storyboard_analysis, manager=attribute_manager)
-
     # Smart detection: Check if new image is needed
     needs_new_image = True
     detection_reason = "generation_mode"
     image_filename = None
 
-    if storyboard_analysis and detector and current_image_filename and not dry_run:
-        # Use storyboard-enhanced detection
-        needs_new_image, detection_reason = detector.analyze_with_storyboard(sentence, storyboard_analysis)
-
-        if not needs_new_image:
-            # Reuse current image
-            image_filename = current_image_filename
-            log_message(log_file, f"✓ Reusing image: {image_filename} ({detection_reason})")
-        else:
-            log_message(log_file, f"-> New image needed: {detection_reason}")
-            detector.update_storyboard_state(storyboard_analysis)
-
-    elif detector and current_image_filename and not dry_run:
-        # Analyze visual state (non-storyboard mode)
-        visual_state = detector.analyze_sentence(sentence)
-        needs_new_image, detection_reason = detector.needs_new_image(visual_state)
+    if detector and current_image_filename and not dry_run:
+        needs_new_image, detection_reason = decide_image_reuse(
+            detector, sentence, storyboard_analysis, current_image_filename
+        )
 
         if not needs_new_image:
             # Reuse current image
@@ -196,7 +212,6 @@ def process_sentence(
             log_message(log_file, f"✓ Reusing image: {image_filename} ({detection_reason})")
         else:
             log_message(log_file, f"-> New image needed: {detection_reason}")
-            detector.update_state(visual_state)
 
     # Generate filename (same for all methods)
     # This is the audio filename - always generated per sentence
@@ -230,7 +245,10 @@ def process_sentence(
     # Handle comparison mode - generate prompts with all methods
     if args.llm == "compare":
         log_message(log_file, "Mode: COMPARISON (keyword, ollama, haiku)")
-        prompts = generate_prompts_comparison(sentence.content, scene_context=sentence.scene_context, cost_tracker=cost_tracker)
+        if comparison_pipeline:
+            prompts = comparison_pipeline.get(sentence)
+        else:
+            prompts = generate_prompts_comparison(sentence.content, scene_context=sentence.scene_context, cost_tracker=cost_tracker)
         negative_prompt = get_negative_prompt()
 
         # Save all prompts to cache
@@ -252,32 +270,14 @@ def process_sentence(
         return (True, filename)
 
     # Single method: generate prompt with specified method
-    if storyboard_analysis:
-        # Use storyboard-informed prompt generation
-        log_message(log_file, "Mode: STORYBOARD")
-        prompt = generate_storyboard_informed_prompt(
-            sentence.content,
-            storyboard_analysis,
-            scene_context=sentence.scene_context,
-            attribute_manager=attribute_manager
-        )
-    elif args.llm in ["ollama", "haiku"]:
-        log_message(log_file, f"Mode: LLM ({args.llm})")
-        prompt, input_tokens, output_tokens = generate_prompt_with_llm(
-            sentence.content,
-            scene_context=sentence.scene_context,
-            method=args.llm,
-            cost_tracker=cost_tracker
-        )
-        if not prompt:
-            log_message(log_file, f"Failed to generate prompt with {args.llm}, falling back to keyword method")
-            prompt = generate_prompt(sentence.content, scene_context=sentence.scene_context)
-        elif args.llm == "haiku" and input_tokens > 0:
-            log_message(log_file, f"Tokens: {input_tokens} in / {output_tokens} out")
-    else:
-        # Default: keyword-based
-        log_message(log_file, "Mode: KEYWORD")
-        prompt = generate_prompt(sentence.content, scene_context=sentence.scene_context)
+    prompt = build_sentence_prompt(
+        sentence,
+        llm_method=args.llm,
+        storyboard_analysis=storyboard_analysis,
+        attribute_manager=attribute_manager,
+        cost_tracker=cost_tracker,
+        log=lambda message: log_message(log_file, message)
+    )
 
     negative_prompt = get_negative_prompt()
     log_message(log_file, f"Filename: {filename}")
@@ -286,53 +286,9 @@ def process_sentence(
     # Detect character and use IP-Adapter if enabled (before dry-run check so we can verify)
     character_name = None
     if generator and generator.enable_ip_adapter and generator.ip_adapter_loaded:
-            # Map character full names to short names for metadata lookup
-            char_mapping = {
-                'emma': 'emma', 'emma chen': 'emma',
-                'tyler': 'tyler', 'tyler chen': 'tyler',
-                'elena': 'elena', 'elena volkov': 'elena',
-                'maxim': 'maxim', 'maxim orlov': 'maxim',
-                'amara': 'amara', 'amara okafor': 'amara',
-                'wei': 'wei', 'wei chen': 'wei'
-            }
-
-            # Try storyboard analysis first (more reliable than keyword extraction)
-            characters = []
-            if storyboard_analysis and storyboard_analysis.characters_present:
-                # Extract characters from storyboard analysis
-                storyboard_chars = storyboard_analysis.characters_present
-                log_message(log_file, f"-> Storyboard characters: {storyboard_chars}")
-
-                # Map full names to short names
-                for char in storyboard_chars:
-                    char_lower = char.lower()
-                    if char_lower in char_mapping:
-                        characters.append(char_mapping[char_lower])
-
-                # Prioritize "acting" characters over "referenced" ones
-                if characters and storyboard_analysis.character_roles:
-                    acting_chars = [
-                        char for char in characters
-                        if any(
-                            role in ['acting', 'acting/speaking', 'acting/listening']
-                            for name, role in storyboard_analysis.character_roles.items()
-                            if name.lower() in char_mapping and char_mapping[name.lower()] == char
-                        )
-                    ]
-                    if acting_chars:
-                        character_name = acting_chars[0]  # Use first acting character
-                    else:
-                        character_name = characters[0]  # Fall back to first character
-                elif characters:
-                    character_name = characters[0]
-
-            # Fallback: Extract characters from sentence text (original method)
-            if not character_name:
-                characters = extract_characters(sentence.content)
-                for char in characters:
-                    if char in char_mapping:
-                        character_name = char_mapping[char]
-                        break
+        if storyboard_analysis and storyboard_analysis.characters_present:
+            log_message(log_file, f"-> Storyboard characters: {storyboard_analysis.characters_present}")
+        character_name = select_character_reference(sentence, storyboard_analysis)
 
     # Log character detection result
     if character_name:
@@ -354,14 +310,55 @@ def process_sentence(
         log_message(log_file, f"⊙ Image already exists, skipping: {filename}")
         return (True, filename)
 
+    # A placeholder analysis (failed storyboard call) must not be rendered
+    # under the final filename; render it once the background retry recovers
+    from storyboard_analyzer import is_placeholder_analysis
+    if deferred_renders is not None and storyboard_analysis is not None \
+            and is_placeholder_analysis(storyboard_analysis):
+        deferred_renders.append((sentence, filename))
+        log_message(log_file, f"-> Storyboard call failed, deferring render: {filename}")
+        return (True, filename)
+
+    success = render_sentence_image(generator, sentence, filename, prompt, negative_prompt, character_name, args, log_file)
+    return (success, filename)
+
+
+def render_sentence_image(generator, sentence: Sentence, filename: str, prompt: str, negative_prompt: str,
+                          character_name: str, args: argparse.Namespace, log_file: str) -> bool:
+    """
+    Render a sentence's image (or link it from the image store) and save its prompt.
+
+    Args:
+        generator: Loaded SDXLGenerator
+        sentence: Sentence being illustrated (sets the seed)
+        filename: Image filename
+        prompt: Positive prompt
+        negative_prompt: Negative prompt
+        character_name: Character reference for IP-Adapter (or None)
+        args: Command-line arguments (size, steps, guidance, llm)
+        log_file: Path to log file
+
+    Returns:
+        True if the image was saved, False on error
+    """
+    output_path = os.path.join(OUTPUT_DIR, filename)
+    method_suffix = f"_{args.llm.upper()}" if args.llm != "keyword" else ""
+
+    # Calculate seed based on chapter, scene, and sentence for variety
+    seed = calculate_seed(sentence)
+
+    # Identical inputs rendered before (renamed file, cleared images/, same prompt elsewhere)
+    store_key = image_store_key(generator, prompt, negative_prompt, seed, character_name, args)
+    if get_image_store().materialize(store_key, output_path):
+        log_message(log_file, f"⊙ Image store hit, linked: {filename}")
+        save_prompt_to_cache(filename, prompt, negative_prompt, method_suffix=method_suffix)
+        return True
+
     try:
         # Generate image
         start_time = datetime.now()
         log_message(log_file, f">> Generating image...")
 
-        # Calculate seed based on chapter, scene, and sentence for variety
-        seed = 42 + (sentence.chapter_num * 1000) + (sentence.scene_num * 100) + sentence.sentence_num
-
         # Generate image with or without character reference
         if character_name:
             image = generator.generate_with_character_ref(
@@ -386,10 +383,11 @@ def process_sentence(
             )
 
         # Save image
-        image.save(output_path)
+        with span("png_save"):
+            image.save(output_path)
+        get_image_store().add(store_key, output_path)
 
         # Save prompt to cache
-        method_suffix = f"_{args.llm.upper()}" if args.llm != "keyword" else ""
         save_prompt_to_cache(filename, prompt, negative_prompt, method_suffix=method_suffix)
 
         # Log success
@@ -399,14 +397,348 @@ def process_sentence(
             f"✓ Image saved: {filename} (took {elapsed/60:.1f} minutes)"
         )
 
-        return (True, filename)
+        return True
 
     except Exception as e:
         log_message(log_file, f"ERROR generating image: {str(e)}")
         # Save prompt anyway for manual retry
-        method_suffix = f"_{args.llm.upper()}" if args.llm != "keyword" else ""
         save_prompt_to_cache(filename, prompt, negative_prompt, method_suffix=method_suffix)
-        return (False, filename)
+        return False
+
+
+def render_deferred_sentences(generator, deferred_renders: list, retry_queue, storyboard_analyzer,
+                              args: argparse.Namespace, log_file: str, cost_tracker: CostTracker = None) -> tuple:
+    """
+    Render images whose storyboard call failed, from the analyses recovered by retries.
+
+    Call after finish_storyboard_retries(). Sentences that never recovered
+    are not rendered: their failure is not cached, so the next run analyzes
+    and renders them again. The attribute state at analysis time is not
+    kept, so prompts use canonical character attributes.
+
+    Args:
+        generator: Loaded SDXLGenerator
+        deferred_renders: (sentence, image_filename) tuples from process_sentence()
+        retry_queue: Finished StoryboardRetryQueue
+        storyboard_analyzer: StoryboardAnalyzer (for cache keys)
+        args: Command-line arguments
+        log_file: Path to log file
+        cost_tracker: Cost tracker for API usage
+
+    Returns:
+        Tuple of (rendered, errors, skipped) counts
+    """
+    rendered = errors = skipped = 0
+    negative_prompt = get_negative_prompt()
+    for sentence, filename in deferred_renders:
+        recovered = retry_queue.recovered.get(storyboard_analyzer._generate_cache_key(sentence))
+        if not recovered:
+            log_message(log_file, f"⚠ Storyboard still failing, not rendered (retried next run): {filename}")
+            skipped += 1
+            continue
+
+        prompt = build_sentence_prompt(
+            sentence,
+            llm_method=args.llm,
+            storyboard_analysis=recovered,
+            cost_tracker=cost_tracker,
+            log=lambda message: log_message(log_file, message)
+        )
+        character_name = None
+        if generator.enable_ip_adapter and generator.ip_adapter_loaded:
+            character_name = select_character_reference(sentence, recovered)
+        log_message(log_file, f"Recovered storyboard, rendering: {filename}")
+        if render_sentence_image(generator, sentence, filename, prompt, negative_prompt, character_name, args, log_file):
+            rendered += 1
+        else:
+            errors += 1
+    return rendered, errors, skipped
+
+
+def render_job(generator, job: RenderJob, args: argparse.Namespace, log_file: str) -> bool:
+    """
+    Render a single planned image on the GPU and save it.
+
+    Args:
+        generator: Loaded SDXLGenerator
+        job: RenderJob from a RenderPlan
+        args: Command-line arguments (size, steps, guidance, llm)
+        log_file: Path to log file
+
+    Returns:
+        True if the image was saved (or already existed), False on error
+    """
+    output_path = os.path.join(OUTPUT_DIR, job.image_filename)
+    if os.path.exists(output_path):
+        log_message(log_file, f"⊙ Image already exists, skipping: {job.image_filename}")
+        return True
+
+    method_suffix = f"_{args.llm.upper()}" if args.llm != "keyword" else ""
+
+    store_key = image_store_key(generator, job.prompt, job.negative_prompt, job.seed, job.character_name, args)
+    if get_image_store().materialize(store_key, output_path):
+        log_message(log_file, f"⊙ Image store hit, linked: {job.image_filename}")
+        save_prompt_to_cache(job.image_filename, job.prompt, job.negative_prompt, method_suffix=method_suffix)
+        return True
+
+    try:
+        start_time = datetime.now()
+        log_message(log_file, f">> Generating image: {job.image_filename} ({len(job.covers)} sentences)")
+
+        generation_params = dict(
+            prompt=job.prompt,
+            negative_prompt=job.negative_prompt,
+            width=args.width,
+            height=args.height,
+            num_inference_steps=args.steps,
+            guidance_scale=args.guidance,
+            seed=job.seed
+        )
+
+        # generate_with_character_ref falls back to standard generation
+        # when IP-Adapter is not loaded or the reference is missing
+        if job.character_name:
+            log_message(log_file, f"-> Using character reference: {job.character_name}")
+            image = generator.generate_with_character_ref(character_name=job.character_name, **generation_params)
+        else:
+            image = generator.generate_image(**generation_params)
+
+        with span("png_save"):
+            image.save(output_path)
+        get_image_store().add(store_key, output_path)
+        save_prompt_to_cache(job.image_filename, job.prompt, job.negative_prompt, method_suffix=method_suffix)
+
+        elapsed = (datetime.now() - start_time).total_seconds()
+        log_message(log_file, f"✓ Image saved: {job.image_filename} (took {elapsed/60:.1f} minutes)")
+        return True
+
+    except Exception as e:
+        log_message(log_file, f"ERROR generating image: {str(e)}")
+        # Save prompt anyway for manual retry
+        save_prompt_to_cache(job.image_filename, job.prompt, job.negative_prompt, method_suffix=method_suffix)
+        return False
+
+
+def finish_storyboard_retries(retry_queue, log_file: str, timeout: float = STORYBOARD_RETRY_DRAIN_SECONDS):
+    """
+    Stop background storyboard retries and log the per-run retry report.
+
+    Args:
+        retry_queue: Running StoryboardRetryQueue
+        log_file: Path to log file
+        timeout: Seconds pending retries may still take
+    """
+    retry_queue.finish(timeout)
+    if retry_queue.recovered or retry_queue.gave_up:
+        log_message(log_file, "\n" + retry_queue.report())
+        log_message(log_file, f"Retry report saved to: {retry_queue.save_report()}")
+
+
+def run_planned_generation(all_sentences: list, args: argparse.Namespace, log_file: str):
+    """
+    Plan every chapter on CPU first, then render the unique images.
+
+    The planning pass performs storyboard lookups, attribute tracking, prompt
+    building and change detection for all sentences, so the number of images
+    is known before SDXL is loaded. Plans are saved to RENDER_PLAN_DIR and
+    the GPU stage renders their jobs.
+
+    Args:
+        all_sentences: Sentences to process (all chapters)
+        args: Command-line arguments
+        log_file: Path to log file
+    """
+    from storyboard_analyzer import StoryboardAnalyzer
+    from storyboard_retry import StoryboardRetryQueue
+    from novel_context import NovelContext
+
+    # Group sentences by chapter, preserving reading order
+    sentences_by_chapter = {}
+    for sentence in all_sentences:
+        sentences_by_chapter.setdefault(sentence.chapter_num, []).append(sentence)
+
+    cache_dir = args.storyboard_cache_dir if args.storyboard_cache_dir else STORYBOARD_CACHE_DIR
+    session_name = f"plan_images_chapters_{'_'.join(map(str, args.chapters)) if args.chapters else 'all'}"
+
+    with CostTracker(session_name) as cost_tracker:
+        storyboard_analyzer = StoryboardAnalyzer(
+            cache_dir=cache_dir,
+            rebuild_cache=args.rebuild_storyboard,
+            images_dir=OUTPUT_DIR,
+            cost_tracker=cost_tracker,
+            scene_batch=args.storyboard_scene_batch
+        )
+        novel_context = NovelContext()
+        # Failed storyboard calls are retried in the background during rendering
+        retry_queue = StoryboardRetryQueue(storyboard_analyzer, log=lambda message: log_message(log_file, message)).start()
+
+        similarity_index = None
+        if args.similarity_reuse:
+            from image_similarity import ImageSimilarityIndex
+            similarity_index = ImageSimilarityIndex.load()
+            removed = similarity_index.prune_missing(OUTPUT_DIR)
+            log_message(log_file, f"Similarity index: {len(similarity_index)} images"
+                        + (f" ({removed} missing images dropped)" if removed else ""))
+
+        # Planning pass (CPU only)
+        log_message(log_file, f"\nPlanning {len(all_sentences)} sentences across {len(sentences_by_chapter)} chapters...")
+        parallel_results = {}
+        if args.plan_workers > 1 and len(sentences_by_chapter) > 1:
+            if similarity_index is not None:
+                log_message(log_file, "Similarity reuse plans chapters in order; ignoring --plan-workers")
+            elif args.rebuild_storyboard:
+                log_message(log_file, "Rebuilding the storyboard cache needs API calls; ignoring --plan-workers")
+            else:
+                log_message(log_file, f"Planning fully cached chapters in {args.plan_workers} worker processes...")
+                parallel_results = plan_cached_chapters_parallel(
+                    sentences_by_chapter,
+                    args.plan_workers,
+                    storyboard_cache_dir=cache_dir,
+                    images_dir=OUTPUT_DIR,
+                    enable_smart_detection=args.enable_smart_detection,
+                    detection_strategy=args.detection_strategy
+                )
+                planned_in_pool = sum(1 for result in parallel_results.values() if result is not None)
+                log_message(log_file, f"-> {planned_in_pool}/{len(sentences_by_chapter)} chapters planned in parallel, "
+                                      f"the rest need storyboard API calls and are planned here")
+
+        # Chapters are merged in reading order, whichever process planned them
+        plans = []
+        for chapter_num, chapter_sentences in sentences_by_chapter.items():
+            result = parallel_results.get(chapter_num)
+            if result is not None:
+                if result.output:
+                    print(result.output, end="")
+                for message in result.log_messages:
+                    log_message(log_file, message)
+                for stat, value in result.storyboard_stats.items():
+                    storyboard_analyzer.stats[stat] += value
+                record_spans(result.spans)
+                plan = result.plan
+            else:
+                plan = plan_chapter(
+                    chapter_sentences,
+                    storyboard_analyzer=storyboard_analyzer,
+                    novel_context=novel_context,
+                    enable_smart_detection=args.enable_smart_detection,
+                    llm_method=args.llm,
+                    cost_tracker=cost_tracker,
+                    similarity_index=similarity_index,
+                    detection_strategy=args.detection_strategy,
+                    log=lambda message: log_message(log_file, message)
+                )
+            filepath = plan.save(RENDER_PLAN_DIR)
+            log_message(log_file, f"  ✓ Saved render plan for Chapter {chapter_num}: {filepath}")
+            plan.print_summary()
+            plans.append(plan)
+
+        total_jobs = sum(len(plan.jobs) for plan in plans)
+        pending_jobs = [job for plan in plans for job in plan.pending_jobs(OUTPUT_DIR)]
+        log_message(log_file, f"\nPlan: {total_jobs} unique images for {len(all_sentences)} sentences ({len(pending_jobs)} not yet rendered)")
+        if args.llm in ["ollama", "haiku"]:
+            log_message(log_file, get_llm_prompt_cache().get_summary())
+        if similarity_index is not None:
+            similarity_index.save()
+            log_message(log_file, similarity_index.get_summary())
+
+        total_cost, cost_report = storyboard_analyzer.get_cost_estimate()
+        log_message(log_file, "\n" + "="*80)
+        log_message(log_file, cost_report)
+        log_message(log_file, "="*80)
+
+        if args.plan_only:
+            finish_storyboard_retries(retry_queue, log_file)
+            log_message(log_file, f"Plan-only mode: plans saved to {RENDER_PLAN_DIR}, no images rendered")
+            return
+
+        # Save image mapping metadata up front - it no longer depends on rendering
+        if args.enable_smart_detection or similarity_index is not None:
+            for plan in plans:
+                filepath = plan.to_image_mapping().save(IMAGE_MAPPING_DIR)
+                log_message(log_file, f"  ✓ Saved metadata for Chapter {plan.chapter_num}: {filepath}")
+
+        if not pending_jobs:
+            finish_storyboard_retries(retry_queue, log_file)
+            log_message(log_file, "All planned images already exist, nothing to render")
+            return
+
+        # Rendering pass (GPU)
+        log_message(log_file, "\nLoading SDXL model...")
+        from image_generator import SDXLGenerator
+        generator = SDXLGenerator(enable_ip_adapter=args.enable_ip_adapter)
+        with span("model_load"):
+            generator.load_model()
+
+        success_count = 0
+        error_count = 0
+        interrupted = False
+        retries_finished = False
+
+        try:
+            # Jobs planned from a failed storyboard call go last, giving retries time
+            deferred = []
+            for plan in plans:
+                for batch in plan.iter_batches(batch_size=1, output_dir=OUTPUT_DIR):
+                    for job in batch:
+                        if job.storyboard_failed:
+                            deferred.append((plan, job))
+                        elif render_job(generator, job, args, log_file):
+                            success_count += 1
+                        else:
+                            error_count += 1
+
+            if deferred:
+                log_message(log_file, f"\n{len(deferred)} images were planned from failed storyboard calls")
+                finish_storyboard_retries(retry_queue, log_file)
+                retries_finished = True
+
+                sentences_by_key = {
+                    (sentence.chapter_num, sentence.scene_num, sentence.sentence_num): sentence
+                    for sentence in all_sentences
+                }
+                refreshed_plans = {}
+                for plan, job in deferred:
+                    sentence = sentences_by_key[(job.chapter_num, job.scene_num, job.sentence_num)]
+                    recovered = retry_queue.recovered.get(storyboard_analyzer._generate_cache_key(sentence))
+                    if not recovered:
+                        log_message(log_file, f"⚠ Storyboard still failing, not rendered (retried next run): {job.image_filename}")
+                        continue
+                    refresh_job_prompt(job, sentence, recovered, log=lambda message: log_message(log_file, message))
+                    refreshed_plans[plan.chapter_num] = plan
+                    if render_job(generator, job, args, log_file):
+                        success_count += 1
+                    else:
+                        error_count += 1
+
+                for plan in refreshed_plans.values():
+                    plan.save(RENDER_PLAN_DIR)
+
+        except KeyboardInterrupt:
+            interrupted = True
+            log_message(log_file, "\n\n⚠ Generation interrupted by user")
+
+        finally:
+            if not retries_finished:
+                finish_storyboard_retries(retry_queue, log_file, timeout=0 if interrupted else STORYBOARD_RETRY_DRAIN_SECONDS)
+
+            log_message(log_file, "\nCleaning up...")
+            generator.unload_model()
+
+            log_message(log_file, "\n" + "="*80)
+            log_message(log_file, "Generation Summary")
+            log_message(log_file, "="*80)
+            log_message(log_file, f"Total sentences: {len(all_sentences)}")
+            log_message(log_file, f"Planned images: {total_jobs}")
+            log_message(log_file, f"Rendered: {success_count}")
+            log_message(log_file, f"Errors: {error_count}")
+            log_message(log_file, f"Images saved to: {OUTPUT_DIR}")
+            log_message(log_file, f"Render plans saved to: {RENDER_PLAN_DIR}")
+            log_message(log_file, get_image_store().get_summary())
+            log_message(log_file, f"Log saved to: {log_file}")
+            log_message(log_file, "="*80)
+
+            if cost_tracker.session_api_calls > 0:
+                cost_tracker.print_summary()
 
 
 def main():
@@ -422,6 +754,12 @@ def main():
         help='Specific chapter numbers to process (e.g., --chapters 1 3)'
     )
 
+    parser.add_argument(
+        '--all-scenes',
+        action='store_true',
+        help='Process every scene even when a single chapter is given'
+    )
+
     parser.add_argument(
         '--resume',
         type=int,
@@ -479,6 +817,20 @@ def main():
         help='Enable smart visual change detection to reduce image generation'
     )
 
+    parser.add_argument(
+        '--detection-strategy',
+        choices=DETECTION_STRATEGIES,
+        default=SMART_DETECTION_STRATEGY,
+        help=f'Smart detection strategy: keyword rules or chapter-wide TF-IDF embeddings (default: {SMART_DETECTION_STRATEGY})'
+    )
+
+    parser.add_argument(
+        '--similarity-reuse',
+        action='store_true',
+        default=ENABLE_SIMILARITY_REUSE,
+        help='With --plan/--plan-only: reuse an existing image (any chapter) when a new shot is similar enough'
+    )
+
     parser.add_argument(
         '--enable-ip-adapter',
         action='store_true',
@@ -498,14 +850,62 @@ def main():
         help='Force rebuild of storyboard cache and delete existing images for specified chapters'
     )
 
+    parser.add_argument(
+        '--storyboard-scene-batch',
+        action='store_true',
+        default=STORYBOARD_SCENE_BATCH,
+        help='Analyze each scene with one storyboard API call (windowed) instead of one call per sentence'
+    )
+
+    parser.add_argument(
+        '--no-prompt-cache',
+        action='store_true',
+        help='Always query the LLM for prompts (skip reading and writing the LLM prompt cache)'
+    )
+
+    parser.add_argument(
+        '--no-image-store',
+        action='store_true',
+        help='Do not reuse or store renders in the content-addressed image store'
+    )
+
     parser.add_argument(
         '--clear-cache',
         action='store_true',
         help='Clear storyboard cache and images for specified chapters, then exit (no generation)'
     )
 
+    parser.add_argument(
+        '--plan',
+        action='store_true',
+        help='Plan all images on CPU (storyboard, prompts, reuse) before loading SDXL, then render the plan'
+    )
+
+    parser.add_argument(
+        '--plan-workers',
+        type=int,
+        default=PLAN_WORKERS,
+        help=f'With --plan/--plan-only: plan fully storyboard-cached chapters in this many processes (default: {PLAN_WORKERS})'
+    )
+
+    parser.add_argument(
+        '--plan-only',
+        action='store_true',
+        help='Write render plans to the render plan directory and exit without rendering'
+    )
+
     args = parser.parse_args()
 
+    if args.no_prompt_cache:
+        set_llm_prompt_cache_enabled(False)
+    if args.no_image_store:
+        set_image_store_enabled(False)
+
+    if (args.plan or args.plan_only) and args.llm == "compare":
+        parser.error("--plan/--plan-only cannot be combined with --llm compare")
+    if args.plan_workers < 1:
+        parser.error("--plan-workers must be at least 1")
+
     # Handle --clear-cache mode (early exit, no image generation)
     if args.clear_cache:
         from storyboard_analyzer import StoryboardAnalyzer
@@ -546,7 +946,7 @@ def main():
     log_message(log_file, "="*80)
 
     # Check CUDA availability
-    if not args.dry_run:
+    if not args.dry_run and not args.plan_only:
         try:
             import torch
         except ImportError:
@@ -562,8 +962,8 @@ def main():
 
     # Parse chapters
     log_message(log_file, "\nParsing chapters...")
-    # If only one chapter specified, process only first scene
-    first_scene_only = args.chapters is not None and len(args.chapters) == 1
+    # If only one chapter specified, process only first scene (unless --all-scenes)
+    first_scene_only = args.chapters is not None and len(args.chapters) == 1 and not args.all_scenes
     scenes = parse_all_chapters(chapter_numbers=args.chapters, first_scene_only=first_scene_only)
 
     if first_scene_only and scenes:
@@ -623,6 +1023,15 @@ def main():
             f"Resuming from Chapter {resume_chapter}, Scene {resume_scene} ({len(all_sentences)} sentences)"
         )
 
+    # Planned mode - decide every image before any GPU work
+    if args.plan or args.plan_only:
+        start_run("images_planned")
+        try:
+            run_planned_generation(all_sentences, args, log_file)
+        finally:
+            finish_run()
+        return
+
     # Dry run mode - just show prompts
     if args.dry_run:
         log_message(log_file, "\n=== DRY RUN MODE ===\n")
@@ -631,7 +1040,7 @@ def main():
         session_name = f"dry_run_chapters_{'_'.join(map(str, args.chapters)) if args.chapters else 'all'}"
         with CostTracker(session_name) as cost_tracker:
             # Initialize detector and metadata for dry run
-            detector = VisualChangeDetector() if args.enable_smart_detection else None
+            detector = create_change_detector(all_sentences, args.detection_strategy) if args.enable_smart_detection else None
             metadata = ImageMappingMetadata(chapter_num=1)
             current_image = None
 
@@ -656,20 +1065,32 @@ def main():
             if not storyboard_analyzer_early:
                 log_message(log_file, "-> Storyboard analysis enabled")
 
-            for sentence in all_sentences[:10]:  # Show first 10 sentences
-                success, image_file = process_sentence(
-                    sentence, None, log_file, args, dry_run=True,
-                    cost_tracker=cost_tracker, detector=detector,
-                    current_image_filename=current_image, metadata=metadata,
-                    storyboard_analyzer=storyboard_analyzer,
-                    novel_context=novel_context,
-                    scene_history=scene_history,
-                    attribute_manager=attribute_manager
-                )
-                if success and image_file:
-                    current_image = image_file
+            dry_run_sentences = all_sentences[:10]  # Show first 10 sentences
+            comparison_pipeline = None
+            if args.llm == "compare":
+                comparison_pipeline = ComparisonPipeline(dry_run_sentences, cost_tracker=cost_tracker)
+
+            try:
+                for sentence in dry_run_sentences:
+                    success, image_file = process_sentence(
+                        sentence, None, log_file, args, dry_run=True,
+                        cost_tracker=cost_tracker, detector=detector,
+                        current_image_filename=current_image, metadata=metadata,
+                        storyboard_analyzer=storyboard_analyzer,
+                        novel_context=novel_context,
+                        scene_history=scene_history,
+                        attribute_manager=attribute_manager,
+                        comparison_pipeline=comparison_pipeline
+                    )
+                    if success and image_file:
+                        current_image = image_file
+            finally:
+                if comparison_pipeline:
+                    comparison_pipeline.close()
 
             log_message(log_file, f"\nDry run complete. Would generate {len(all_sentences)} images.")
+            if args.llm != "keyword":
+                log_message(log_file, get_llm_prompt_cache().get_summary())
 
             # Print smart detection stats if enabled
             if args.enable_smart_detection and metadata:
@@ -689,171 +1110,237 @@ def main():
         return
 
     # Load SDXL model
-    log_message(log_file, "\nLoading SDXL model...")
-    from image_generator import SDXLGenerator
-    generator = SDXLGenerator(enable_ip_adapter=args.enable_ip_adapter)
-    generator.load_model()
-
-    # Log IP-Adapter status
-    if args.enable_ip_adapter:
-        if generator.ip_adapter_loaded:
-            log_message(log_file, "IP-Adapter: ENABLED (character consistency active)")
-        else:
-            log_message(log_file, "IP-Adapter: FAILED TO LOAD (falling back to standard generation)")
-
-    # Create cost tracker for this session
-    session_name = f"generate_images_chapters_{'_'.join(map(str, args.chapters)) if args.chapters else 'all'}"
-    with CostTracker(session_name) as cost_tracker:
-        # Process sentences
-        log_message(log_file, f"\nProcessing {len(all_sentences)} sentences...")
-        if args.enable_smart_detection:
-            log_message(log_file, "Smart detection: ENABLED")
-
-        success_count = 0
-        error_count = 0
-
-        # Initialize detector and metadata trackers per chapter
-        detector_by_chapter = {}
-        metadata_by_chapter = {}
-        current_image_by_chapter = {}
-
-        # Initialize storyboard components
-        from storyboard_analyzer import StoryboardAnalyzer, SceneVisualHistory
-        from novel_context import NovelContext
-        from attribute_state_manager import AttributeStateManager
-
-        scene_history_by_chapter = {}
-        attribute_manager_by_chapter = {}  # Track attribute state per chapter
-
-        # Only log initialization if not already done early
-        if not storyboard_analyzer_early:
-            log_message(log_file, "Initializing storyboard analysis...")
-        cache_dir = args.storyboard_cache_dir if args.storyboard_cache_dir else STORYBOARD_CACHE_DIR
-
-        # Cache/images already deleted early if rebuild mode was active
-        # Just create the analyzer now
-        storyboard_analyzer = StoryboardAnalyzer(
-            cache_dir=cache_dir,
-            rebuild_cache=args.rebuild_storyboard,
-            images_dir=OUTPUT_DIR
-        )
-        novel_context = NovelContext()
-        if not storyboard_analyzer_early:
-            log_message(log_file, "-> Storyboard analyzer ready")
-
-        # Group sentences by chapter for metadata tracking
-        chapters_processed = set()
-
-        try:
-            for i, sentence in enumerate(all_sentences, start=1):
-                log_message(log_file, f"\n--- Sentence {i}/{len(all_sentences)} ---")
-
-                chapter_num = sentence.chapter_num
-                scene_num = sentence.scene_num
-
-                # Initialize detector/metadata for this chapter if needed
-                if chapter_num not in detector_by_chapter:
-                    if args.enable_smart_detection:
-                        detector_by_chapter[chapter_num] = VisualChangeDetector()
-                        metadata_by_chapter[chapter_num] = ImageMappingMetadata(chapter_num)
-                        current_image_by_chapter[chapter_num] = None
-                        log_message(log_file, f"-> Initialized detection for Chapter {chapter_num}")
-
-                    from storyboard_analyzer import SceneVisualHistory
-                    from attribute_state_manager import AttributeStateManager
-                    scene_history_by_chapter[chapter_num] = SceneVisualHistory()
-                    attribute_manager_by_chapter[chapter_num] = AttributeStateManager(chapter_num)
-                    log_message(log_file, f"-> Initialized attribute manager for Chapter {chapter_num}")
-
-                # Get detector/metadata for this chapter
-                detector = detector_by_chapter.get(chapter_num) if args.enable_smart_detection else None
-                metadata = metadata_by_chapter.get(chapter_num) if args.enable_smart_detection else None
-                current_image = current_image_by_chapter.get(chapter_num)
-                scene_history = scene_history_by_chapter.get(chapter_num)
-                attribute_manager = attribute_manager_by_chapter.get(chapter_num)
-
-                # Process sentence
-                success, image_file = process_sentence(
-                    sentence, generator, log_file, args,
-                    cost_tracker=cost_tracker, detector=detector,
-                    current_image_filename=current_image, metadata=metadata,
-                    storyboard_analyzer=storyboard_analyzer,
-                    novel_context=novel_context,
-                    scene_history=scene_history,
-                    attribute_manager=attribute_manager
-                )
-
-                if success:
-                    success_count += 1
-                    # Update current image for this chapter
-                    if image_file:
-                        current_image_by_chapter[chapter_num] = image_file
-                else:
-                    error_count += 1
-
-                chapters_processed.add(chapter_num)
-
-        except KeyboardInterrupt:
-            log_message(log_file, "\n\n⚠ Generation interrupted by user")
+    start_run("images")
+    try:
+        log_message(log_file, "\nLoading SDXL model...")
+        from image_generator import SDXLGenerator
+        generator = SDXLGenerator(enable_ip_adapter=args.enable_ip_adapter)
+        with span("model_load"):
+            generator.load_model()
+
+        # Log IP-Adapter status
+        if args.enable_ip_adapter:
+            if generator.ip_adapter_loaded:
+                log_message(log_file, "IP-Adapter: ENABLED (character consistency active)")
+            else:
+                log_message(log_file, "IP-Adapter: FAILED TO LOAD (falling back to standard generation)")
 
-        finally:
-            # Save metadata files for each chapter processed
-            if args.enable_smart_detection and metadata_by_chapter:
-                log_message(log_file, "\nSaving image mapping metadata...")
-                for chapter_num, metadata in metadata_by_chapter.items():
-                    if metadata:
-                        filepath = metadata.save(IMAGE_MAPPING_DIR)
-                        log_message(log_file, f"  ✓ Saved metadata for Chapter {chapter_num}: {filepath}")
-                        # Print statistics for this chapter
-                        metadata.print_statistics()
-
-            # Cleanup
-            log_message(log_file, "\nCleaning up...")
-            generator.unload_model()
+        # Create cost tracker for this session
+        session_name = f"generate_images_chapters_{'_'.join(map(str, args.chapters)) if args.chapters else 'all'}"
+        with CostTracker(session_name) as cost_tracker:
+            # Process sentences
+            log_message(log_file, f"\nProcessing {len(all_sentences)} sentences...")
+            if args.enable_smart_detection:
+                log_message(log_file, f"Smart detection: ENABLED ({args.detection_strategy})")
 
-            # Final summary
-            log_message(log_file, "\n" + "="*80)
-            log_message(log_file, "Generation Summary")
-            log_message(log_file, "="*80)
-            log_message(log_file, f"Total sentences: {len(all_sentences)}")
-            log_message(log_file, f"Successful: {success_count}")
-            log_message(log_file, f"Errors: {error_count}")
-            log_message(log_file, f"Images saved to: {OUTPUT_DIR}")
-            log_message(log_file, f"Prompts cached to: {PROMPT_CACHE_DIR}")
+            success_count = 0
+            error_count = 0
 
-            if args.enable_smart_detection:
-                log_message(log_file, f"Metadata saved to: {IMAGE_MAPPING_DIR}")
+            # Initialize detector and metadata trackers per chapter
+            detector_by_chapter = {}
+            metadata_by_chapter = {}
+            current_image_by_chapter = {}
 
-            log_message(log_file, f"Log saved to: {log_file}")
-            log_message(log_file, "="*80)
+            # Initialize storyboard components
+            from storyboard_analyzer import StoryboardAnalyzer, SceneVisualHistory
+            from novel_context import NovelContext
+            from attribute_state_manager import AttributeStateManager
 
-            # Print cost summary if haiku was used
-            if args.llm in ["haiku", "compare"] and cost_tracker.session_api_calls > 0:
-                cost_tracker.print_summary()
+            scene_history_by_chapter = {}
+            attribute_manager_by_chapter = {}  # Track attribute state per chapter
 
-            # Print storyboard analysis cost summary
-            if storyboard_analyzer:
-                total_cost, cost_report = storyboard_analyzer.get_cost_estimate()
-                log_message(log_file, "\n" + "="*80)
-                log_message(log_file, cost_report)
-                log_message(log_file, "="*80)
+            # Only log initialization if not already done early
+            if not storyboard_analyzer_early:
+                log_message(log_file, "Initializing storyboard analysis...")
+            cache_dir = args.storyboard_cache_dir if args.storyboard_cache_dir else STORYBOARD_CACHE_DIR
 
-            # Print attribute change statistics
-            if attribute_manager_by_chapter:
+            # Cache/images already deleted early if rebuild mode was active
+            # Just create the analyzer now
+            storyboard_analyzer = StoryboardAnalyzer(
+                cache_dir=cache_dir,
+                rebuild_cache=args.rebuild_storyboard,
+                images_dir=OUTPUT_DIR,
+                cost_tracker=cost_tracker,
+                scene_batch=args.storyboard_scene_batch
+            )
+            novel_context = NovelContext()
+            if not storyboard_analyzer_early:
+                log_message(log_file, "-> Storyboard analyzer ready")
+
+            # Failed storyboard calls are retried in the background while images render
+            from storyboard_retry import StoryboardRetryQueue
+            retry_queue = StoryboardRetryQueue(storyboard_analyzer, log=lambda message: log_message(log_file, message)).start()
+            interrupted = False
+            retries_finished = False
+            deferred_renders = []
+
+            # Chapter-wide character context (cacheable prompt prefix)
+            sentences_by_chapter = {}
+            for sentence in all_sentences:
+                sentences_by_chapter.setdefault(sentence.chapter_num, []).append(sentence)
+            for chapter_sentences in sentences_by_chapter.values():
+                prepare_chapter_character_context(storyboard_analyzer, novel_context, chapter_sentences)
+
+            # Group sentences by chapter for metadata tracking
+            chapters_processed = set()
+            scenes = group_scene_sentences(all_sentences)
+            previous_scene = None
+
+            # Compare mode: Ollama/Haiku requests for upcoming sentences run ahead
+            comparison_pipeline = None
+            if args.llm == "compare":
+                comparison_pipeline = ComparisonPipeline(all_sentences, cost_tracker=cost_tracker)
+
+            try:
+                for i, sentence in enumerate(all_sentences, start=1):
+                    log_message(log_file, f"\n--- Sentence {i}/{len(all_sentences)} ---")
+
+                    chapter_num = sentence.chapter_num
+                    scene_num = sentence.scene_num
+
+                    # Initialize detector/metadata for this chapter if needed
+                    if chapter_num not in detector_by_chapter:
+                        if args.enable_smart_detection:
+                            detector_by_chapter[chapter_num] = create_change_detector(
+                                sentences_by_chapter[chapter_num], args.detection_strategy
+                            )
+                            metadata_by_chapter[chapter_num] = ImageMappingMetadata(chapter_num)
+                            current_image_by_chapter[chapter_num] = None
+                            log_message(log_file, f"-> Initialized detection for Chapter {chapter_num}")
+
+                        from storyboard_analyzer import SceneVisualHistory
+                        from attribute_state_manager import AttributeStateManager
+                        scene_history_by_chapter[chapter_num] = SceneVisualHistory()
+                        attribute_manager_by_chapter[chapter_num] = AttributeStateManager(chapter_num)
+                        log_message(log_file, f"-> Initialized attribute manager for Chapter {chapter_num}")
+
+                    # Get detector/metadata for this chapter
+                    detector = detector_by_chapter.get(chapter_num) if args.enable_smart_detection else None
+                    metadata = metadata_by_chapter.get(chapter_num) if args.enable_smart_detection else None
+                    current_image = current_image_by_chapter.get(chapter_num)
+                    scene_history = scene_history_by_chapter.get(chapter_num)
+                    attribute_manager = attribute_manager_by_chapter.get(chapter_num)
+
+                    # Scene-batch mode: analyze the whole scene at its first sentence
+                    if (chapter_num, scene_num) != previous_scene:
+                        prefetch_scene_storyboard(
+                            scenes[(chapter_num, scene_num)],
+                            storyboard_analyzer,
+                            novel_context=novel_context,
+                            scene_history=scene_history,
+                            attribute_manager=attribute_manager
+                        )
+                        previous_scene = (chapter_num, scene_num)
+
+                    # Process sentence
+                    success, image_file = process_sentence(
+                        sentence, generator, log_file, args,
+                        cost_tracker=cost_tracker, detector=detector,
+                        current_image_filename=current_image, metadata=metadata,
+                        storyboard_analyzer=storyboard_analyzer,
+                        novel_context=novel_context,
+                        scene_history=scene_history,
+                        attribute_manager=attribute_manager,
+                        comparison_pipeline=comparison_pipeline,
+                        deferred_renders=deferred_renders
+                    )
+
+                    if success:
+                        success_count += 1
+                        # Update current image for this chapter
+                        if image_file:
+                            current_image_by_chapter[chapter_num] = image_file
+                    else:
+                        error_count += 1
+
+                    chapters_processed.add(chapter_num)
+
+                # Images from failed storyboard calls go last, giving retries time
+                if deferred_renders:
+                    log_message(log_file, f"\n{len(deferred_renders)} images were deferred after failed storyboard calls")
+                    finish_storyboard_retries(retry_queue, log_file)
+                    retries_finished = True
+                    _, deferred_errors, skipped = render_deferred_sentences(
+                        generator, deferred_renders, retry_queue, storyboard_analyzer, args, log_file, cost_tracker
+                    )
+                    error_count += deferred_errors
+                    success_count -= deferred_errors + skipped
+
+            except KeyboardInterrupt:
+                interrupted = True
+                log_message(log_file, "\n\n⚠ Generation interrupted by user")
+
+            finally:
+                if comparison_pipeline:
+                    comparison_pipeline.close()
+
+                if not retries_finished:
+                    finish_storyboard_retries(retry_queue, log_file, timeout=0 if interrupted else STORYBOARD_RETRY_DRAIN_SECONDS)
+
+                # Save metadata files for each chapter processed
+                if args.enable_smart_detection and metadata_by_chapter:
+                    log_message(log_file, "\nSaving image mapping metadata...")
+                    for chapter_num, metadata in metadata_by_chapter.items():
+                        if metadata:
+                            filepath = metadata.save(IMAGE_MAPPING_DIR)
+                            log_message(log_file, f"  ✓ Saved metadata for Chapter {chapter_num}: {filepath}")
+                            # Print statistics for this chapter
+                            metadata.print_statistics()
+
+                # Cleanup
+                log_message(log_file, "\nCleaning up...")
+                generator.unload_model()
+
+                # Final summary
                 log_message(log_file, "\n" + "="*80)
-                log_message(log_file, "Attribute Change Statistics")
+                log_message(log_file, "Generation Summary")
                 log_message(log_file, "="*80)
-                for chapter_num in sorted(attribute_manager_by_chapter.keys()):
-                    manager = attribute_manager_by_chapter[chapter_num]
-                    stats = manager.get_statistics()
-                    log_message(log_file, f"\nChapter {chapter_num}:")
-                    log_message(log_file, f"  Total changes: {stats['total_changes']}")
-                    log_message(log_file, f"  Characters tracked: {stats['characters_tracked']}")
-                    if stats['total_changes'] > 0:
-                        log_message(log_file, f"  Changes by character: {stats['changes_by_character']}")
-                        log_message(log_file, f"  Changes by type: {stats['changes_by_type']}")
+                log_message(log_file, f"Total sentences: {len(all_sentences)}")
+                log_message(log_file, f"Successful: {success_count}")
+                log_message(log_file, f"Errors: {error_count}")
+                log_message(log_file, f"Images saved to: {OUTPUT_DIR}")
+                log_message(log_file, f"Prompts cached to: {PROMPT_CACHE_DIR}")
+                if args.llm != "keyword":
+                    log_message(log_file, get_llm_prompt_cache().get_summary())
+                log_message(log_file, get_image_store().get_summary())
+
+                if args.enable_smart_detection:
+                    log_message(log_file, f"Metadata saved to: {IMAGE_MAPPING_DIR}")
+
+                log_message(log_file, f"Log saved to: {log_file}")
                 log_message(log_file, "="*80)
 
+                # Print cost summary if haiku was used (prompts or storyboard analysis)
+                if cost_tracker.session_api_calls > 0:
+                    cost_tracker.print_summary()
+
+                # Print storyboard analysis cost summary
+                if storyboard_analyzer:
+                    total_cost, cost_report = storyboard_analyzer.get_cost_estimate()
+                    log_message(log_file, "\n" + "="*80)
+                    log_message(log_file, cost_report)
+                    log_message(log_file, "="*80)
+
+                # Print attribute change statistics
+                if attribute_manager_by_chapter:
+                    log_message(log_file, "\n" + "="*80)
+                    log_message(log_file, "Attribute Change Statistics")
+                    log_message(log_file, "="*80)
+                    for chapter_num in sorted(attribute_manager_by_chapter.keys()):
+                        manager = attribute_manager_by_chapter[chapter_num]
+                        stats = manager.get_statistics()
+                        log_message(log_file, f"\nChapter {chapter_num}:")
+                        log_message(log_file, f"  Total changes: {stats['total_changes']}")
+                        log_message(log_file, f"  Characters tracked: {stats['characters_tracked']}")
+                        if stats['total_changes'] > 0:
+                            log_message(log_file, f"  Changes by character: {stats['changes_by_character']}")
+                            log_message(log_file, f"  Changes by type: {stats['changes_by_type']}")
+                    log_message(log_file, "="*80)
+
+    finally:
+        # Print and save per-stage timing metrics (also if the model fails to load)
+        finish_run()
+
 
 if __name__ == "__main__":
     main()
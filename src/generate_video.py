@@ -15,23 +15,39 @@ Usage:
     # Generate video for all available chapters
     python generate_video.py --all
 
+    # Join chapters into one video with chapter markers (per-chapter MP4s are reused)
+    python generate_video.py --chapters 1 2 3 --combine
+
     # Custom output directory
     python generate_video.py --chapter 1 --output-dir ../videos
+
+    # Fast low-resolution preview for review (written to videos_proxy/)
+    python generate_video.py --chapters 3 --proxy
+
+    # Encode every frame at VIDEO_FPS instead of one frame per image
+    python generate_video.py --chapter 1 --still-mode cfr
 """
 
 import argparse
+import json
 import logging
+import math
 import os
 import subprocess
 import sys
 import tempfile
 import time
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from PIL import Image
 from moviepy import ImageClip, AudioFileClip, concatenate_videoclips
 from tqdm import tqdm
 
+from stage_metrics import span, start_run, finish_run
+from chapter_audio import ChapterTimeline, prepare_chapter_audio
+from audio_manifest import ChapterManifest
+from image_mapping_metadata import load_image_mapping
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -67,7 +83,10 @@ try:
         VIDEO_WIDTH, VIDEO_HEIGHT, VIDEO_FPS,
         VIDEO_CODEC_CPU, VIDEO_CODEC_GPU,
         VIDEO_PRESET_CPU, VIDEO_PRESET_GPU,
-        VIDEO_CRF, VIDEO_AUDIO_CODEC, ENABLE_GPU_ENCODING
+        VIDEO_CRF, VIDEO_AUDIO_CODEC, ENABLE_GPU_ENCODING,
+        VIDEO_STILL_MODE, VIDEO_VFR_MAX_FRAME_SECONDS,
+        VIDEO_PROXY_WIDTH, VIDEO_PROXY_HEIGHT,
+        VIDEO_PROXY_PRESET_CPU, VIDEO_PROXY_PRESET_GPU, VIDEO_PROXY_CRF
     )
     YOUTUBE_WIDTH = VIDEO_WIDTH
     YOUTUBE_HEIGHT = VIDEO_HEIGHT
@@ -86,12 +105,24 @@ except ImportError:
     VIDEO_CRF = 18
     AUDIO_CODEC = 'aac'
     ENABLE_GPU_ENCODING = True
+    VIDEO_STILL_MODE = 'vfr'
+    VIDEO_VFR_MAX_FRAME_SECONDS = 1.0
+    VIDEO_PROXY_WIDTH = 360
+    VIDEO_PROXY_HEIGHT = 640
+    VIDEO_PROXY_PRESET_CPU = 'ultrafast'
+    VIDEO_PROXY_PRESET_GPU = 'p1'
+    VIDEO_PROXY_CRF = 30
+
+# Still images read through the concat demuxer get the image2 time base
+# (1/25 s), so VFR frame timestamps always sit on this grid
+VFR_TIMESTAMP_RATE = 25
 
 
 class VideoGenerator:
     """Generate video from scene images and audio files."""
 
-    def __init__(self, project_root: Path, output_dir: Path, enable_gpu: bool = True):
+    def __init__(self, project_root: Path, output_dir: Path, enable_gpu: bool = True,
+                 still_mode: str = VIDEO_STILL_MODE, proxy: bool = False):
         """
         Initialize the video generator.
 
@@ -99,17 +130,35 @@ class VideoGenerator:
             project_root: Root directory of the project
             output_dir: Directory to save generated videos
             enable_gpu: Enable GPU-accelerated encoding (auto-falls back to CPU if unavailable)
+            still_mode: 'vfr' (one frame per image) or 'cfr' (every frame at VIDEO_FPS)
+                for the direct FFmpeg method
+            proxy: Render low-resolution, fast-preset previews for review. Proxies
+                reuse the composite and audio master caches but never write
+                full-quality artifacts; output_dir must differ from videos/.
         """
+        if still_mode not in ('vfr', 'cfr'):
+            raise ValueError(f"Unknown still mode: {still_mode} (expected 'vfr' or 'cfr')")
+        if proxy and output_dir.resolve() == (project_root / 'videos').resolve():
+            raise ValueError("Proxy renders need their own output directory (e.g. videos_proxy)")
+        self.still_mode = still_mode
+        self.proxy = proxy
+        self.crf = VIDEO_PROXY_CRF if proxy else VIDEO_CRF
         self.project_root = project_root
         self.images_dir = project_root / 'images'
         self.audio_dir = project_root / 'audio'
+        self.audio_master_dir = project_root / 'audio_master'
+        self.audio_manifest_dir = project_root / 'audio_cache'
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Create temp directory for MoviePy temporary files
-        self.temp_dir = project_root / 'temp' / 'video'
+        # Create temp directory for MoviePy temporary files (proxies get their own)
+        self.temp_dir = project_root / 'temp' / ('video_proxy' if proxy else 'video')
         self.temp_dir.mkdir(parents=True, exist_ok=True)
 
+        # Full-resolution composites are cached across runs and shared with proxy renders
+        self.composite_dir = project_root / 'temp' / 'composites' / f"{YOUTUBE_WIDTH}x{YOUTUBE_HEIGHT}"
+        self.composite_dir.mkdir(parents=True, exist_ok=True)
+
         # Set MoviePy's temp directory via environment variable
         os.environ['TMPDIR'] = str(self.temp_dir)
         os.environ['TEMP'] = str(self.temp_dir)
@@ -130,6 +179,9 @@ class VideoGenerator:
             logger.info("GPU encoding disabled by configuration")
             logger.info(f"Using CPU encoding: codec={VIDEO_CODEC_CPU}, preset={VIDEO_PRESET_CPU}")
 
+        logger.info(f"Still image mode: {self.still_mode}")
+        if self.proxy:
+            logger.info(f"Proxy render: {VIDEO_PROXY_WIDTH}x{VIDEO_PROXY_HEIGHT}, CRF {self.crf}")
         logger.info(f"Images directory: {self.images_dir}")
         logger.info(f"Audio directory: {self.audio_dir}")
         logger.info(f"Output directory: {self.output_dir}")
@@ -139,6 +191,9 @@ class VideoGenerator:
         """
         Find matching image and audio file pairs for a chapter (sentence-level).
 
+        A sentence without an image of its own shows the image recorded for it
+        in the chapter's image mapping (smart detection or similarity reuse).
+
         Args:
             chapter_num: Chapter number (1-12)
             first_scene_only: If True, only return pairs from scene 1
@@ -155,10 +210,17 @@ class VideoGenerator:
         else:
             audio_files = sorted(self.audio_dir.glob(f"{chapter_str}_scene_*_sent_*.wav"))
 
+        mapped_images = {
+            mapping['audio_file']: mapping['image_file']
+            for mapping in load_image_mapping(chapter_num, str(self.audio_manifest_dir)).get_mappings()
+        }
+
         for audio_file in audio_files:
             # Construct corresponding image filename
             # chapter_01_scene_01_sent_001_description.wav -> chapter_01_scene_01_sent_001_description.png
             image_file = self.images_dir / audio_file.name.replace('.wav', '.png')
+            if not image_file.exists() and audio_file.name in mapped_images:
+                image_file = self.images_dir / mapped_images[audio_file.name]
 
             if image_file.exists():
                 pairs.append((image_file, audio_file))
@@ -170,6 +232,58 @@ class VideoGenerator:
         logger.info(f"Found {len(pairs)} sentence pairs for chapter {chapter_num} ({scene_info})")
         return pairs
 
+    def plan_chapter(self, chapter_num: int, sentence_pairs: List[Tuple[Path, Path]]) -> Optional[ChapterTimeline]:
+        """
+        Plan a chapter from its audio manifest, without opening any media file.
+
+        The audio stage records the sample count of every sentence WAV in
+        audio_cache/chapter_XX_audio_manifest.json (see audio_manifest.py).
+
+        Args:
+            chapter_num: Chapter number (1-12)
+            sentence_pairs: (image_path, audio_path) tuples in chapter order
+
+        Returns:
+            Planned ChapterTimeline, or None if the manifest is missing or stale
+        """
+        manifest = ChapterManifest.load(chapter_num, str(self.audio_manifest_dir))
+        timeline = manifest.planned_timeline(sentence_pairs)
+        if timeline is None:
+            logger.warning(f"Audio manifest for chapter {chapter_num} is missing or stale "
+                           f"(re-run generate_scene_audio.py to refresh it); "
+                           f"durations will come from the master track")
+        else:
+            logger.info(f"Planned chapter {chapter_num} from audio manifest: "
+                        f"{len(timeline.entries)} sentences, {timeline.duration:.2f}s")
+        return timeline
+
+    def chapter_timeline(self, chapter_num: int,
+                         sentence_pairs: List[Tuple[Path, Path]]) -> Tuple[ChapterTimeline, Path]:
+        """
+        Timeline and encoded master audio track of a chapter.
+
+        Image durations come from the audio manifest plan; the master track
+        is rebuilt if it disagrees with the plan, so images and audio always
+        share one timeline. Without a current manifest the master track's
+        own timeline is used.
+
+        Args:
+            chapter_num: Chapter number (1-12)
+            sentence_pairs: (image_path, audio_path) tuples in chapter order
+
+        Returns:
+            Tuple of (timeline, path to the encoded AAC track)
+        """
+        planned = self.plan_chapter(chapter_num, sentence_pairs)
+        timeline, audio_track = prepare_chapter_audio(chapter_num, sentence_pairs, self.audio_master_dir, planned)
+        if planned is None:
+            return timeline, audio_track
+        if planned.entries != timeline.entries:
+            logger.warning(f"Master track ({timeline.duration:.2f}s) differs from the audio manifest "
+                           f"({planned.duration:.2f}s); using the master track")
+            return timeline, audio_track
+        return planned, audio_track
+
     def precomposite_image_with_background(self, image_path: Path) -> Path:
         """
         Pre-composite image with black background using Pillow.
@@ -177,12 +291,20 @@ class VideoGenerator:
         This eliminates MoviePy's per-frame CPU compositing bottleneck by creating
         a single pre-composited image that can be used directly with ImageClip.
 
+        Composites are cached: each one carries the mtime of its source image and
+        is reused as long as the source still has that mtime.
+
         Args:
             image_path: Path to the original image file
 
         Returns:
-            Path to the pre-composited image in temp directory
+            Path to the pre-composited image in the composite cache
         """
+        composite_path = self.composite_dir / f"composited_{image_path.name}"
+        source_mtime = image_path.stat().st_mtime_ns
+        if composite_path.exists() and composite_path.stat().st_mtime_ns == source_mtime:
+            return composite_path
+
         # Load original image
         img = Image.open(image_path)
 
@@ -208,30 +330,29 @@ class VideoGenerator:
         # Paste resized image onto canvas
         canvas.paste(img_resized, (x_offset, y_offset))
 
-        # Save to temp directory
-        temp_filename = f"composited_{image_path.name}"
-        temp_path = self.temp_dir / temp_filename
-        canvas.save(temp_path)
+        # Save to the composite cache (atomically, proxy and full renders may share it)
+        temp_path = composite_path.with_suffix(f".{os.getpid()}.tmp")
+        canvas.save(temp_path, format='PNG')
+        os.utime(temp_path, ns=(source_mtime, source_mtime))
+        os.replace(temp_path, composite_path)
 
-        return temp_path
+        return composite_path
 
-    def create_scene_clip(self, image_path: Path, audio_path: Path) -> ImageClip:
+    def create_scene_clip(self, image_path: Path, duration: float) -> ImageClip:
         """
-        Create a video clip for a single scene.
+        Create a silent video clip for a single scene.
 
         Uses pre-composited images to avoid MoviePy's CPU frame-by-frame compositing.
+        The duration comes from the chapter timeline, so the audio file is not
+        opened; audio is attached once per chapter from the master track.
 
         Args:
             image_path: Path to the scene image
-            audio_path: Path to the scene audio
+            duration: Clip duration in seconds
 
         Returns:
-            VideoClip with image and audio combined
+            ImageClip showing the image for the given duration
         """
-        # Load audio to get duration
-        audio_clip = AudioFileClip(str(audio_path))
-        duration = audio_clip.duration
-
         # Pre-composite image with black background using Pillow (FAST - done once)
         composited_image_path = self.precomposite_image_with_background(image_path)
 
@@ -239,11 +360,35 @@ class VideoGenerator:
         video_clip = ImageClip(str(composited_image_path))
         video_clip = video_clip.with_duration(duration)
 
-        # Add audio
-        video_clip = video_clip.with_audio(audio_clip)
-
         return video_clip
 
+    def create_chapter_clip(self, chapter_num: int, sentence_pairs: List[Tuple[Path, Path]]):
+        """
+        Create the MoviePy clip of a chapter: timed images plus the master audio track.
+
+        Args:
+            chapter_num: Chapter number (1-12)
+            sentence_pairs: (image_path, audio_path) tuples in chapter order
+
+        Returns:
+            Tuple of (chapter clip, list of clips to close after writing)
+        """
+        timeline, audio_track = self.chapter_timeline(chapter_num, sentence_pairs)
+
+        clips = []
+        for idx, (image_path, _) in enumerate(tqdm(sentence_pairs, desc=f"Chapter {chapter_num}")):
+            try:
+                clip = self.create_scene_clip(image_path, timeline.duration_seconds(idx))
+                clips.append(clip)
+                logger.debug(f"Created clip for {image_path.name} (duration: {clip.duration:.2f}s)")
+            except Exception as e:
+                logger.error(f"Error creating clip for {image_path.name}: {e}")
+                raise
+
+        audio_clip = AudioFileClip(str(audio_track))
+        chapter_clip = concatenate_videoclips(clips, method="compose").with_audio(audio_clip)
+        return chapter_clip, clips + [audio_clip]
+
     def _get_encoding_params(self) -> dict:
         """
         Get FFmpeg encoding parameters based on GPU availability.
@@ -255,9 +400,9 @@ class VideoGenerator:
             # NVENC GPU encoding
             return {
                 'codec': VIDEO_CODEC_GPU,
-                'preset': VIDEO_PRESET_GPU,
+                'preset': VIDEO_PROXY_PRESET_GPU if self.proxy else VIDEO_PRESET_GPU,
                 'ffmpeg_params': [
-                    '-cq', str(VIDEO_CRF),  # Constant quality mode (like CRF for x264)
+                    '-cq', str(self.crf),  # Constant quality mode (like CRF for x264)
                     '-rc', 'vbr_hq',  # Variable bitrate high quality mode
                     '-rc-lookahead', '32',  # Look ahead 32 frames for better quality
                     '-spatial-aq', '1',  # Enable spatial adaptive quantization
@@ -270,11 +415,93 @@ class VideoGenerator:
             # CPU encoding (libx264)
             return {
                 'codec': VIDEO_CODEC_CPU,
-                'preset': VIDEO_PRESET_CPU,
-                'ffmpeg_params': ['-crf', str(VIDEO_CRF)],
+                'preset': VIDEO_PROXY_PRESET_CPU if self.proxy else VIDEO_PRESET_CPU,
+                'ffmpeg_params': ['-crf', str(self.crf)],
                 'threads': 4
             }
 
+    def encode_settings(self, first_scene_only: bool = False) -> dict:
+        """
+        Settings that must be identical for chapter files to be joined by stream copy.
+
+        Args:
+            first_scene_only: Whether the render covers only the first scene
+
+        Returns:
+            JSON-serializable settings dictionary
+        """
+        params = self._get_encoding_params()
+        width, height = (VIDEO_PROXY_WIDTH, VIDEO_PROXY_HEIGHT) if self.proxy else (YOUTUBE_WIDTH, YOUTUBE_HEIGHT)
+        return {
+            'codec': params['codec'],
+            'preset': params['preset'],
+            'crf': self.crf,
+            'still_mode': self.still_mode,
+            'fps': YOUTUBE_FPS,
+            'width': width,
+            'height': height,
+            'audio_codec': AUDIO_CODEC,
+            'first_scene_only': first_scene_only,
+        }
+
+    @staticmethod
+    def input_signature(sentence_pairs: List[Tuple[Path, Path]]) -> List[list]:
+        """
+        Names, sizes and mtimes of a chapter's source images and sentence WAVs.
+
+        Args:
+            sentence_pairs: (image_path, audio_path) tuples in chapter order
+
+        Returns:
+            One [image, image mtime, audio, audio size, audio mtime] list per sentence
+        """
+        signature = []
+        for image_path, audio_path in sentence_pairs:
+            audio_stat = audio_path.stat()
+            signature.append([image_path.name, image_path.stat().st_mtime_ns,
+                              audio_path.name, audio_stat.st_size, audio_stat.st_mtime_ns])
+        return signature
+
+    @staticmethod
+    def encode_record_path(video_path: Path) -> Path:
+        """Sidecar file recording how a chapter video was encoded."""
+        return video_path.with_suffix('.encode.json')
+
+    def check_chapter_video(self, video_path: Path, sentence_pairs: List[Tuple[Path, Path]]) -> Optional[str]:
+        """
+        Check that an existing chapter video can be joined into a book as is.
+
+        Args:
+            video_path: Existing chapter MP4
+            sentence_pairs: Current (image_path, audio_path) tuples of the chapter
+
+        Returns:
+            None if the file is usable, otherwise the reason it is not
+        """
+        record_path = self.encode_record_path(video_path)
+        try:
+            with open(record_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return "no encode record"
+
+        if record.get('settings') != self.encode_settings(first_scene_only=False):
+            return f"encoded with different settings ({record.get('settings')})"
+        if record.get('inputs') != self.input_signature(sentence_pairs):
+            return "images or audio changed since it was encoded"
+
+        duration = self.probe_duration(video_path)
+        expected = record.get('duration', 0.0)
+        if abs(duration - expected) > 1.0 / YOUTUBE_FPS + 0.05:
+            return f"container is {duration:.2f}s but its timeline is {expected:.2f}s"
+        return None
+
+    def _scale_args(self) -> List[str]:
+        """FFmpeg filter arguments that downscale proxy renders (none for full quality)."""
+        if not self.proxy:
+            return []
+        return ['-vf', f"scale={VIDEO_PROXY_WIDTH}:{VIDEO_PROXY_HEIGHT}:flags=fast_bilinear"]
+
     def generate_chapter_video_direct_ffmpeg(self, chapter_num: int, output_filename: str = None, first_scene_only: bool = False) -> Path:
         """
         Generate video using direct FFmpeg concat - BYPASSES MoviePy frame iteration.
@@ -284,6 +511,15 @@ class VideoGenerator:
         2. Uses FFmpeg concat demuxer to combine image+audio pairs directly
         3. GPU encodes without any Python frame iteration
 
+        Audio is not encoded per segment: the sentence WAVs are joined into one
+        sample-accurate chapter master track (chapter_audio.py), encoded to AAC
+        once and muxed against the video stream. Image durations come from the
+        master timeline.
+
+        The video stream is encoded according to self.still_mode: 'vfr' emits
+        one frame per image (see _encode_still_images_vfr), 'cfr' encodes one
+        segment per image at YOUTUBE_FPS (see _encode_segments_cfr).
+
         Args:
             chapter_num: Chapter number (1-12)
             output_filename: Optional custom output filename
@@ -303,7 +539,7 @@ class VideoGenerator:
             logger.info(f"Video already exists, skipping: {output_path}")
             return output_path
 
-        logger.info(f"Generating video for Chapter {chapter_num} (Direct FFmpeg method)")
+        logger.info(f"Generating video for Chapter {chapter_num} (Direct FFmpeg method, {self.still_mode.upper()})")
 
         # Find all sentence pairs for this chapter
         sentence_pairs = self.find_sentence_pairs(chapter_num, first_scene_only=first_scene_only)
@@ -317,16 +553,157 @@ class VideoGenerator:
         # Pre-composite all images
         composited_images = []
         for image_path, audio_path in tqdm(sentence_pairs, desc="Pre-compositing"):
-            composited_path = self.precomposite_image_with_background(image_path)
+            with span("precomposite"):
+                composited_path = self.precomposite_image_with_background(image_path)
             composited_images.append((composited_path, audio_path))
 
+        # One master track and AAC encode per chapter; its timeline sets image durations
+        logger.info("Building chapter audio master track...")
+        timeline, audio_track = self.chapter_timeline(chapter_num, sentence_pairs)
+
+        encode_start = time.time()
+        if self.still_mode == 'vfr':
+            frames = self._encode_still_images_vfr(chapter_num, composited_images, timeline, audio_track, output_path)
+        else:
+            frames = self._encode_segments_cfr(chapter_num, composited_images, timeline, audio_track, output_path)
+
+        encode_time = time.time() - encode_start
+        total_duration = timeline.duration
+
+        # Lets multi-chapter joins verify this file before stream-copying it
+        record = {
+            'settings': self.encode_settings(first_scene_only),
+            'inputs': self.input_signature(sentence_pairs),
+            'duration': total_duration,
+        }
+        with open(self.encode_record_path(output_path), 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2)
+
+        logger.info(f"Encoding completed in {encode_time:.2f}s ({frames} frames for {total_duration:.2f}s of video)")
+        logger.info(f"Video generation complete: {output_path}")
+        logger.info(f"File size: {output_path.stat().st_size / (1024*1024):.2f} MB")
+
+        return output_path
+
+    def _encode_still_images_vfr(self, chapter_num: int, composited_images: List[Tuple[Path, Path]],
+                                 timeline: ChapterTimeline, audio_track: Path, output_path: Path) -> int:
+        """
+        Encode the chapter as variable-frame-rate video, one frame per image.
+
+        A single FFmpeg run reads an ffconcat list of the composited images with
+        per-image durations from the audio timeline. Frame timestamps sit on
+        the 1/VFR_TIMESTAMP_RATE s grid, so durations are whole ticks with
+        cumulative rounding: image changes stay within half a tick of their
+        audio offsets and never drift, independent of the output frame rate.
+        Images longer than VIDEO_VFR_MAX_FRAME_SECONDS are listed repeatedly;
+        the repeats encode as near-empty P-frames but keep frame gaps short
+        enough for players and YouTube ingest to seek smoothly. A keyframe is
+        forced at every image change, half a tick before its frame timestamp.
+
+        Args:
+            chapter_num: Chapter number
+            composited_images: (composited_image_path, audio_path) tuples in chapter order
+            timeline: ChapterTimeline of the chapter master track
+            audio_track: Encoded AAC master track
+            output_path: Output MP4 path
+
+        Returns:
+            Number of video frames encoded
+
+        Raises:
+            RuntimeError: If FFmpeg fails
+        """
+        concat_file = self.temp_dir / f"vfr_chapter_{chapter_num:02d}.ffconcat"
+        keyframe_times = []
+        frames = 0
+
+        max_frame_ticks = max(1, round(VIDEO_VFR_MAX_FRAME_SECONDS * VFR_TIMESTAMP_RATE))
+        start_tick = 0
+        with open(concat_file, 'w') as f:
+            f.write("ffconcat version 1.0\n")
+            image_ticks = timeline.frame_counts(VFR_TIMESTAMP_RATE)
+            for (image_path, _), ticks in zip(composited_images, image_ticks):
+                repeats = math.ceil(ticks / max_frame_ticks)
+                # Half a tick early: the frame at start_tick is never before its forced time
+                keyframe_times.append(f"{max(0.0, (start_tick - 0.5) / VFR_TIMESTAMP_RATE):.6f}")
+                for repeat in range(repeats):
+                    repeat_ticks = ticks * (repeat + 1) // repeats - ticks * repeat // repeats
+                    f.write(f"file '{image_path.absolute()}'\n")
+                    f.write(f"duration {repeat_ticks / VFR_TIMESTAMP_RATE:.6f}\n")
+                start_tick += ticks
+                frames += repeats
+            # The concat demuxer ignores the duration of the last entry unless it is repeated
+            f.write(f"file '{composited_images[-1][0].absolute()}'\n")
+
+        encoding_params = self._get_encoding_params()
+        cmd = [
+            'ffmpeg',
+            '-y',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', str(concat_file),
+            '-i', str(audio_track),
+            '-map', '0:v',
+            '-map', '1:a',
+            '-c:v', encoding_params['codec'],
+            '-preset', encoding_params['preset'],
+            *self._scale_args(),
+            '-pix_fmt', 'yuv420p',  # Pixel format for compatibility
+            '-fps_mode', 'vfr',  # Keep the per-image timestamps, no frame duplication
+            '-force_key_frames', ','.join(keyframe_times),
+            '-video_track_timescale', '90000',
+        ]
+
+        if self.gpu_encoding_enabled:
+            cmd.extend(['-gpu', '0', '-rc', 'vbr_hq', '-cq', str(self.crf)])
+        else:
+            cmd.extend(['-crf', str(self.crf), '-tune', 'stillimage'])
+
+        cmd.extend([
+            '-c:a', 'copy',  # Audio is the pre-encoded chapter master track
+            '-movflags', '+faststart',
+            str(output_path)
+        ])
+
+        logger.info(f"Encoding {len(composited_images)} images as {frames} VFR frames...")
+        with span("ffmpeg_vfr_encode", chapter=chapter_num, images=len(composited_images), frames=frames):
+            result = subprocess.run(cmd, capture_output=True, text=True)
+        concat_file.unlink(missing_ok=True)
+        if result.returncode != 0:
+            logger.error(f"FFmpeg VFR encode error: {result.stderr}")
+            raise RuntimeError("FFmpeg VFR encoding failed")
+
+        return frames
+
+    def _encode_segments_cfr(self, chapter_num: int, composited_images: List[Tuple[Path, Path]],
+                             timeline: ChapterTimeline, audio_track: Path, output_path: Path) -> int:
+        """
+        Encode one constant-frame-rate segment per image and stream-copy concat them.
+
+        Segment lengths come from the master timeline, in whole frames.
+
+        Args:
+            chapter_num: Chapter number
+            composited_images: (composited_image_path, audio_path) tuples in chapter order
+            timeline: ChapterTimeline of the chapter master track
+            audio_track: Encoded AAC master track
+            output_path: Output MP4 path
+
+        Returns:
+            Number of video frames encoded
+
+        Raises:
+            RuntimeError: If FFmpeg fails
+        """
+        frame_counts = timeline.frame_counts(YOUTUBE_FPS)
+
         # Create FFmpeg concat file listing all segments
         concat_file = self.temp_dir / f"concat_chapter_{chapter_num}.txt"
         segment_files = []
 
         logger.info(f"Creating {len(composited_images)} video segments with FFmpeg...")
 
-        # Create individual video segments for each image+audio pair
+        # Create individual video-only segments, one per image
         for idx, (image_path, audio_path) in enumerate(tqdm(composited_images, desc="Creating segments")):
             segment_file = self.temp_dir / f"segment_{chapter_num:02d}_{idx:03d}.mp4"
             segment_files.append(segment_file)
@@ -334,32 +711,33 @@ class VideoGenerator:
             # Get encoding parameters
             encoding_params = self._get_encoding_params()
 
-            # Build FFmpeg command to create segment from image + audio
+            # Build FFmpeg command to create segment from the image
             cmd = [
                 'ffmpeg',
                 '-y',  # Overwrite output
                 '-loop', '1',  # Loop the image
+                '-framerate', str(YOUTUBE_FPS),
                 '-i', str(image_path),  # Input image
-                '-i', str(audio_path),  # Input audio
+                '-frames:v', str(frame_counts[idx]),  # Length from the audio timeline
                 '-c:v', encoding_params['codec'],  # Video codec
                 '-preset', encoding_params['preset'],  # Preset
                 '-r', str(YOUTUBE_FPS),  # Frame rate
+                *self._scale_args(),
                 '-pix_fmt', 'yuv420p',  # Pixel format for compatibility
-                '-shortest',  # End when shortest input ends (audio)
-                '-c:a', 'aac',  # Audio codec
-                '-b:a', '192k',  # Audio bitrate
+                '-an',  # Audio comes from the chapter master track
             ]
 
             # Add NVENC-specific parameters
             if self.gpu_encoding_enabled:
-                cmd.extend(['-gpu', '0', '-rc', 'vbr_hq', '-cq', str(VIDEO_CRF)])
+                cmd.extend(['-gpu', '0', '-rc', 'vbr_hq', '-cq', str(self.crf)])
             else:
-                cmd.extend(['-crf', str(VIDEO_CRF)])
+                cmd.extend(['-crf', str(self.crf)])
 
             cmd.append(str(segment_file))
 
             # Run FFmpeg silently
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            with span("ffmpeg_segment", chapter=chapter_num, segment=idx):
+                result = subprocess.run(cmd, capture_output=True, text=True)
             if result.returncode != 0:
                 logger.error(f"FFmpeg error creating segment {idx}: {result.stderr}")
                 raise RuntimeError(f"FFmpeg failed on segment {idx}")
@@ -370,39 +748,33 @@ class VideoGenerator:
             for segment_file in segment_files:
                 f.write(f"file '{segment_file.absolute()}'\n")
 
-        # Concatenate all segments into final video
-        encode_start = time.time()
+        # Concatenate all segments and mux the single AAC master track
         concat_cmd = [
             'ffmpeg',
             '-y',
             '-f', 'concat',
             '-safe', '0',
             '-i', str(concat_file),
+            '-i', str(audio_track),
+            '-map', '0:v',
+            '-map', '1:a',
             '-c', 'copy',  # Copy streams without re-encoding
+            '-movflags', '+faststart',
             str(output_path)
         ]
 
-        result = subprocess.run(concat_cmd, capture_output=True, text=True)
+        with span("ffmpeg_concat", chapter=chapter_num, segments=len(segment_files)):
+            result = subprocess.run(concat_cmd, capture_output=True, text=True)
         if result.returncode != 0:
             logger.error(f"FFmpeg concat error: {result.stderr}")
             raise RuntimeError("FFmpeg concatenation failed")
 
-        encode_time = time.time() - encode_start
-        total_duration = sum((AudioFileClip(str(audio)).duration for _, audio in composited_images))
-        encode_fps = total_duration * YOUTUBE_FPS / encode_time if encode_time > 0 else 0
-
-        logger.info(f"Encoding completed in {encode_time:.2f}s ({encode_fps:.2f} fps)")
-        logger.info(f"Video generation complete: {output_path}")
-        logger.info(f"File size: {output_path.stat().st_size / (1024*1024):.2f} MB")
-
         # Cleanup temp files
         for segment_file in segment_files:
             segment_file.unlink(missing_ok=True)
         concat_file.unlink(missing_ok=True)
-        for composited_path, _ in composited_images:
-            composited_path.unlink(missing_ok=True)
 
-        return output_path
+        return sum(frame_counts)
 
     def generate_chapter_video(self, chapter_num: int, output_filename: str = None, first_scene_only: bool = False) -> Path:
         """
@@ -436,22 +808,9 @@ class VideoGenerator:
             logger.error(f"No sentence pairs found for chapter {chapter_num}")
             raise ValueError(f"No sentences found for chapter {chapter_num}")
 
-        # Create clips for each sentence
-        clips = []
+        # Create clips for each sentence, timed from the audio manifest
         logger.info(f"Creating {len(sentence_pairs)} sentence clips...")
-
-        for image_path, audio_path in tqdm(sentence_pairs, desc="Creating clips"):
-            try:
-                clip = self.create_scene_clip(image_path, audio_path)
-                clips.append(clip)
-                logger.debug(f"Created clip for {image_path.name} (duration: {clip.duration:.2f}s)")
-            except Exception as e:
-                logger.error(f"Error creating clip for {image_path.name}: {e}")
-                raise
-
-        # Concatenate all clips
-        logger.info("Concatenating clips...")
-        final_video = concatenate_videoclips(clips, method="compose")
+        final_video, clips = self.create_chapter_clip(chapter_num, sentence_pairs)
 
         # Write video file
         logger.info(f"Writing video to {output_path}")
@@ -462,17 +821,18 @@ class VideoGenerator:
         logger.info(f"Encoding with: codec={encoding_params['codec']}, preset={encoding_params['preset']}")
 
         encode_start = time.time()
-        final_video.write_videofile(
-            str(output_path),
-            fps=YOUTUBE_FPS,
-            codec=encoding_params['codec'],
-            audio_codec=AUDIO_CODEC,
-            preset=encoding_params['preset'],
-            ffmpeg_params=encoding_params['ffmpeg_params'],
-            threads=encoding_params['threads'],
-            logger='bar',  # Show progress bar
-            temp_audiofile=str(self.temp_dir / 'audio.mp4')
-        )
+        with span("moviepy_encode", duration_seconds=final_video.duration):
+            final_video.write_videofile(
+                str(output_path),
+                fps=YOUTUBE_FPS,
+                codec=encoding_params['codec'],
+                audio_codec=AUDIO_CODEC,
+                preset=encoding_params['preset'],
+                ffmpeg_params=encoding_params['ffmpeg_params'],
+                threads=encoding_params['threads'],
+                logger='bar',  # Show progress bar
+                temp_audiofile=str(self.temp_dir / 'audio.mp4')
+            )
 
         encode_time = time.time() - encode_start
         encode_fps = final_video.duration * YOUTUBE_FPS / encode_time if encode_time > 0 else 0
@@ -488,10 +848,61 @@ class VideoGenerator:
 
         return output_path
 
+    @staticmethod
+    def probe_duration(video_path: Path) -> float:
+        """
+        Container duration of a video file, read by ffprobe without decoding.
+
+        Args:
+            video_path: Video file
+
+        Returns:
+            Duration in seconds
+        """
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(video_path)],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Could not determine duration of {video_path.name}: {result.stderr}")
+        return float(result.stdout.strip())
+
+    def write_chapter_metadata(self, chapters: List[Tuple[str, float]], metadata_file: Path):
+        """
+        Write chapter markers as an FFMETADATA file.
+
+        Args:
+            chapters: (title, duration_seconds) tuples in playback order
+            metadata_file: Output path
+        """
+        lines = [";FFMETADATA1"]
+        start_ms = 0
+        elapsed = 0.0
+        for title, duration in chapters:
+            elapsed += duration
+            end_ms = round(elapsed * 1000)
+            lines += ["", "[CHAPTER]", "TIMEBASE=1/1000", f"START={start_ms}", f"END={end_ms}", f"title={title}"]
+            start_ms = end_ms
+        with open(metadata_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
     def generate_multi_chapter_video(self, chapter_nums: List[int], output_filename: str = None) -> Path:
         """
         Generate a single video containing multiple chapters.
 
+        Each chapter is rendered (or reused) as its own MP4 by the direct
+        FFmpeg method, and the chapter files are joined with the concat
+        demuxer by stream copy. Nothing is decoded or re-encoded, so memory
+        stays flat however many chapters are combined. Chapter markers are
+        written into the container metadata, and YouTube description
+        timestamps are saved next to the video.
+
+        An existing chapter file is only reused if its encode record shows
+        the current encode settings and source files and its container
+        duration matches; otherwise it is re-encoded, so stream copy never
+        joins mismatched or stale chapters. Markers use the probed duration
+        of each file actually joined.
+
         Args:
             chapter_nums: List of chapter numbers to include
             output_filename: Optional custom output filename
@@ -513,65 +924,81 @@ class VideoGenerator:
 
         logger.info(f"Generating multi-chapter video for chapters: {chapter_nums}")
 
-        all_clips = []
-
+        chapter_videos = []
+        chapters = []
         for chapter_num in chapter_nums:
             # Multiple chapters mode: process all scenes
             sentence_pairs = self.find_sentence_pairs(chapter_num, first_scene_only=False)
-
             if not sentence_pairs:
                 logger.warning(f"No sentence pairs found for chapter {chapter_num}, skipping")
                 continue
 
-            logger.info(f"Adding {len(sentence_pairs)} sentences from Chapter {chapter_num}")
+            video_path = self.output_dir / f"The_Obsolescence_Chapter_{chapter_num:02d}.mp4"
+            if video_path.exists():
+                problem = self.check_chapter_video(video_path, sentence_pairs)
+                if problem:
+                    logger.warning(f"Re-encoding {video_path.name}: {problem}")
+                    video_path.unlink()
+                    self.encode_record_path(video_path).unlink(missing_ok=True)
 
-            for image_path, audio_path in tqdm(sentence_pairs, desc=f"Chapter {chapter_num}"):
-                try:
-                    clip = self.create_scene_clip(image_path, audio_path)
-                    all_clips.append(clip)
-                except Exception as e:
-                    logger.error(f"Error creating clip for {image_path.name}: {e}")
-                    raise
+            video_path = self.generate_chapter_video_direct_ffmpeg(chapter_num, first_scene_only=False)
+            chapter_videos.append(video_path)
+            chapters.append((f"Chapter {chapter_num}", self.probe_duration(video_path)))
 
-        if not all_clips:
-            logger.error("No clips created for any chapter")
+        if not chapter_videos:
+            logger.error("No videos created for any chapter")
             raise ValueError("No sentences found for specified chapters")
 
-        # Concatenate all clips
-        logger.info(f"Concatenating {len(all_clips)} total clips...")
-        final_video = concatenate_videoclips(all_clips, method="compose")
-
-        # Write video file
-        logger.info(f"Writing video to {output_path}")
-        logger.info(f"Total duration: {final_video.duration:.2f}s ({final_video.duration/60:.2f} minutes)")
+        concat_file = self.temp_dir / f"concat_{output_path.stem}.txt"
+        metadata_file = self.temp_dir / f"chapters_{output_path.stem}.txt"
+        with open(concat_file, 'w') as f:
+            for video_path in chapter_videos:
+                f.write(f"file '{video_path.absolute()}'\n")
+        self.write_chapter_metadata(chapters, metadata_file)
 
-        # Get encoding parameters
-        encoding_params = self._get_encoding_params()
-        logger.info(f"Encoding with: codec={encoding_params['codec']}, preset={encoding_params['preset']}")
+        # Join chapter files without re-encoding; markers come from the metadata input
+        logger.info(f"Joining {len(chapter_videos)} chapter videos by stream copy...")
+        concat_cmd = [
+            'ffmpeg',
+            '-y',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', str(concat_file),
+            '-f', 'ffmetadata',
+            '-i', str(metadata_file),
+            '-map', '0',
+            '-map_metadata', '1',
+            '-map_chapters', '1',
+            '-c', 'copy',
+            '-movflags', '+faststart',
+            str(output_path)
+        ]
 
         encode_start = time.time()
-        final_video.write_videofile(
-            str(output_path),
-            fps=YOUTUBE_FPS,
-            codec=encoding_params['codec'],
-            audio_codec=AUDIO_CODEC,
-            preset=encoding_params['preset'],
-            ffmpeg_params=encoding_params['ffmpeg_params'],
-            threads=encoding_params['threads'],
-            logger='bar',
-            temp_audiofile=str(self.temp_dir / 'audio.mp4')
-        )
-
-        encode_time = time.time() - encode_start
-        encode_fps = final_video.duration * YOUTUBE_FPS / encode_time if encode_time > 0 else 0
-        logger.info(f"Encoding completed in {encode_time:.2f}s ({encode_fps:.2f} fps)")
-
-        # Clean up
-        final_video.close()
-        for clip in all_clips:
-            clip.close()
-
+        with span("ffmpeg_chapter_concat", chapters=len(chapter_videos)):
+            result = subprocess.run(concat_cmd, capture_output=True, text=True)
+        concat_file.unlink(missing_ok=True)
+        metadata_file.unlink(missing_ok=True)
+        if result.returncode != 0:
+            logger.error(f"FFmpeg chapter concat error: {result.stderr}")
+            raise RuntimeError("FFmpeg chapter concatenation failed")
+
+        # YouTube reads chapters from timestamps in the video description
+        timestamps_path = output_path.with_suffix('.chapters.txt')
+        with open(timestamps_path, 'w', encoding='utf-8') as f:
+            elapsed = 0.0
+            for title, duration in chapters:
+                minutes, seconds = divmod(int(elapsed), 60)
+                hours, minutes = divmod(minutes, 60)
+                stamp = f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+                f.write(f"{stamp} {title}\n")
+                elapsed += duration
+
+        total_duration = sum(duration for _, duration in chapters)
+        logger.info(f"Joined in {time.time() - encode_start:.2f}s")
+        logger.info(f"Total duration: {total_duration:.2f}s ({total_duration/60:.2f} minutes)")
         logger.info(f"Video generation complete: {output_path}")
+        logger.info(f"Chapter timestamps: {timestamps_path}")
         logger.info(f"File size: {output_path.stat().st_size / (1024*1024):.2f} MB")
 
         return output_path
@@ -604,8 +1031,7 @@ def main():
     parser.add_argument(
         '--output-dir',
         type=str,
-        default='videos',
-        help='Output directory for generated videos (default: videos)'
+        help='Output directory for generated videos (default: videos, or videos_proxy with --proxy)'
     )
     parser.add_argument(
         '--output-filename',
@@ -622,16 +1048,29 @@ def main():
         action='store_true',
         help='Disable GPU encoding and use CPU (libx264) instead'
     )
+    parser.add_argument(
+        '--still-mode',
+        choices=['vfr', 'cfr'],
+        default=VIDEO_STILL_MODE,
+        help=f'vfr: one frame per image change; cfr: every frame at {YOUTUBE_FPS} fps (default: {VIDEO_STILL_MODE})'
+    )
+    parser.add_argument(
+        '--proxy',
+        action='store_true',
+        help=f'Fast {VIDEO_PROXY_WIDTH}x{VIDEO_PROXY_HEIGHT} preview render for review (written to videos_proxy/)'
+    )
 
     args = parser.parse_args()
 
     # Determine project root (parent of src/)
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
-    output_dir = project_root / args.output_dir
+    output_dir = project_root / (args.output_dir or ('videos_proxy' if args.proxy else 'videos'))
 
     # Create video generator
-    generator = VideoGenerator(project_root, output_dir, enable_gpu=not args.no_gpu)
+    generator = VideoGenerator(project_root, output_dir, enable_gpu=not args.no_gpu,
+                               still_mode=args.still_mode, proxy=args.proxy)
+    start_run("video")
 
     try:
         if args.chapter:
@@ -674,6 +1113,9 @@ def main():
         logger.error(f"Video generation failed: {e}", exc_info=True)
         sys.exit(1)
 
+    finally:
+        finish_run()
+
 
 if __name__ == '__main__':
     main()
@@ -28,6 +28,8 @@ from config import (
     MAX_REFERENCE_IMAGES,
     REFERENCE_EMBEDDING_AVERAGING
 )
+from stage_metrics import span, instrument_method
+from image_store import character_reference_hash
 
 
 class SDXLGenerator:
@@ -96,6 +98,11 @@ class SDXLGenerator:
         )
         print("  [OK] DPM++ scheduler configured")
 
+        # Record prompt encoding (tokenizers + text encoders) and VAE decode
+        # as separate stages inside each diffusion span
+        instrument_method(self.pipe, "encode_prompt", "prompt_encode")
+        instrument_method(self.pipe.vae, "decode", "vae_decode")
+
         # 6. Load IP-Adapter if enabled
         if self.enable_ip_adapter:
             self._load_ip_adapter()
@@ -106,6 +113,34 @@ class SDXLGenerator:
         else:
             print(f"Expected VRAM usage: 8-9GB during generation")
 
+    def generation_fingerprint(self, character_name: str = None) -> dict:
+        """
+        Generator state that, with the prompt and sampling parameters, determines an image.
+
+        Used to key the content-addressed image store (see image_store.py).
+        Character references only count when IP-Adapter is loaded and the
+        reference exists, mirroring the fallbacks of generate_with_character_ref.
+
+        Args:
+            character_name: Character reference the image would use (or None)
+
+        Returns:
+            Dictionary of model ID, scheduler and (if used) IP-Adapter inputs
+        """
+        scheduler = type(self.pipe.scheduler).__name__ if self.pipe is not None else DPMSolverMultistepScheduler.__name__
+        fingerprint = {"model_id": self.model_id, "scheduler": scheduler}
+
+        if character_name and self.enable_ip_adapter and self.ip_adapter_loaded:
+            reference_hash = character_reference_hash(character_name)
+            if reference_hash is not None:
+                fingerprint.update({
+                    "ip_adapter": f"{IP_ADAPTER_MODEL}/{IP_ADAPTER_SUBFOLDER}{IP_ADAPTER_WEIGHT_NAME}",
+                    "character": character_name,
+                    "character_reference": reference_hash,
+                    "embedding_averaging": REFERENCE_EMBEDDING_AVERAGING,
+                })
+        return fingerprint
+
     def generate_image(
         self,
         prompt: str,
@@ -144,15 +179,16 @@ class SDXLGenerator:
             # Generate image
             print(f"Generating image ({width}x{height}, {num_inference_steps} steps)...")
 
-            result = self.pipe(
-                prompt=prompt,
-                negative_prompt=negative_prompt,
-                width=width,
-                height=height,
-                num_inference_steps=num_inference_steps,
-                guidance_scale=guidance_scale,
-                generator=generator
-            )
+            with span("diffusion", width=width, height=height, steps=num_inference_steps):
+                result = self.pipe(
+                    prompt=prompt,
+                    negative_prompt=negative_prompt,
+                    width=width,
+                    height=height,
+                    num_inference_steps=num_inference_steps,
+                    guidance_scale=guidance_scale,
+                    generator=generator
+                )
 
             image = result.images[0]
 
@@ -179,15 +215,17 @@ class SDXLGenerator:
 
                 print(f"Retrying with {reduced_width}x{reduced_height}...")
 
-                result = self.pipe(
-                    prompt=prompt,
-                    negative_prompt=negative_prompt,
-                    width=reduced_width,
-                    height=reduced_height,
-                    num_inference_steps=num_inference_steps,
-                    guidance_scale=guidance_scale,
-                    generator=generator
-                )
+                with span("diffusion", width=reduced_width, height=reduced_height,
+                          steps=num_inference_steps, oom_retry=True):
+                    result = self.pipe(
+                        prompt=prompt,
+                        negative_prompt=negative_prompt,
+                        width=reduced_width,
+                        height=reduced_height,
+                        num_inference_steps=num_inference_steps,
+                        guidance_scale=guidance_scale,
+                        generator=generator
+                    )
 
                 image = result.images[0]
                 self._cleanup_memory()
@@ -455,21 +493,23 @@ class SDXLGenerator:
             # CRITICAL: Must pass BOTH face_image AND faceid_embeds for proper character consistency
             print(f"  [INFO] IP-Adapter scale: {ip_scale}, FaceID scale: {face_scale}")
 
-            image = self.ip_adapter.generate(
-                prompt=prompt,
-                negative_prompt=negative_prompt,
-                face_image=reference_image,  # CRITICAL: Pass PIL Image for CLIP encoding
-                faceid_embeds=face_embedding,  # CRITICAL: Pass FaceID embedding for face structure
-                scale=ip_scale,  # CRITICAL: IP-Adapter scale (controls image embedding influence)
-                s_scale=face_scale,  # FaceID scale (controls face structure influence)
-                width=width,
-                height=height,
-                num_inference_steps=num_inference_steps,
-                guidance_scale=guidance_scale,
-                num_samples=1,
-                seed=seed,
-                shortcut=True  # Enable FaceID shortcut for better face consistency
-            )[0]
+            with span("diffusion", width=width, height=height, steps=num_inference_steps,
+                      character=character_name):
+                image = self.ip_adapter.generate(
+                    prompt=prompt,
+                    negative_prompt=negative_prompt,
+                    face_image=reference_image,  # CRITICAL: Pass PIL Image for CLIP encoding
+                    faceid_embeds=face_embedding,  # CRITICAL: Pass FaceID embedding for face structure
+                    scale=ip_scale,  # CRITICAL: IP-Adapter scale (controls image embedding influence)
+                    s_scale=face_scale,  # FaceID scale (controls face structure influence)
+                    width=width,
+                    height=height,
+                    num_inference_steps=num_inference_steps,
+                    guidance_scale=guidance_scale,
+                    num_samples=1,
+                    seed=seed,
+                    shortcut=True  # Enable FaceID shortcut for better face consistency
+                )[0]
 
             # Clean up memory
             self._cleanup_memory()
@@ -37,7 +37,8 @@ class ImageMappingMetadata:
         image_file: str,
         sentence_num: int,
         scene_num: int,
-        reason: str
+        reason: str,
+        similarity_score: float = None
     ):
         """
         Add a sentence-to-image mapping.
@@ -48,14 +49,18 @@ class ImageMappingMetadata:
             sentence_num: Sentence number within scene
             scene_num: Scene number within chapter
             reason: Reason for decision (e.g., "first_sentence", "changed: character", "no_significant_change")
+            similarity_score: Shot similarity when image_file was proposed by the similarity index
         """
-        self.mappings.append({
+        mapping = {
             'audio_file': audio_file,
             'image_file': image_file,
             'sentence_num': sentence_num,
             'scene_num': scene_num,
             'reason': reason
-        })
+        }
+        if similarity_score is not None:
+            mapping['similarity_score'] = round(similarity_score, 4)
+        self.mappings.append(mapping)
 
     def get_mappings(self) -> List[Dict]:
         """
@@ -132,13 +137,15 @@ class ImageMappingMetadata:
             - total_sentences: Total number of sentences
             - unique_images: Number of unique images generated
             - reuse_percentage: Percentage of sentences that reused images
+            - similarity_reused: Sentences showing an image proposed by the similarity index
             - reason_counts: Breakdown of decision reasons
         """
         total_sentences = len(self.mappings)
         unique_images = len(set(m['image_file'] for m in self.mappings))
 
         # Calculate reuse percentage
-        reused_count = sum(1 for m in self.mappings if 'no_significant_change' in m['reason'])
+        reused_count = sum(1 for m in self.mappings if 'no_significant_change' in m['reason'] or 'similarity_score' in m)
+        similarity_reused = sum(1 for m in self.mappings if 'similarity_score' in m)
         reuse_percentage = (reused_count / total_sentences * 100) if total_sentences > 0 else 0
 
         # Count reasons
@@ -151,6 +158,7 @@ class ImageMappingMetadata:
             'total_sentences': total_sentences,
             'unique_images': unique_images,
             'reused_sentences': reused_count,
+            'similarity_reused': similarity_reused,
             'reuse_percentage': reuse_percentage,
             'images_saved': total_sentences - unique_images,
             'reduction_percentage': ((total_sentences - unique_images) / total_sentences * 100) if total_sentences > 0 else 0,
@@ -166,6 +174,8 @@ class ImageMappingMetadata:
         print(f"Total sentences:      {stats['total_sentences']}")
         print(f"Unique images:        {stats['unique_images']}")
         print(f"Reused sentences:     {stats['reused_sentences']}")
+        if stats['similarity_reused']:
+            print(f"  by similarity:      {stats['similarity_reused']}")
         print(f"Images saved:         {stats['images_saved']}")
         print(f"Reduction:            {stats['reduction_percentage']:.1f}%")
         print()
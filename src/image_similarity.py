@@ -0,0 +1,381 @@
+"""
+Similarity index over normalized storyboard features, for image reuse across sentences and chapters.
+
+VisualChangeDetector only compares a sentence with the image currently on
+screen. Many sentences elsewhere in the book describe the same shot (same
+characters, framing, location and mood) and would each cost a full diffusion
+run. This index keeps one feature vector per planned image and proposes an
+existing image when a new sentence is similar enough.
+
+Features are normalized tokens per field (characters, framing, angle,
+location, mood, lighting, expressions, props, focus), taken from the
+storyboard analysis or, without one, from the keyword features of the
+sentence and scene. Tokens are hashed into a fixed-size vector (weighted per
+field) and L2-normalized, so one matrix-vector product scores the whole
+index. Candidates must show exactly the same characters; a different cast is
+never proposed, however similar the rest of the shot is.
+
+The index persists in IMAGE_SIMILARITY_INDEX_DIR so later chapters and runs
+can reuse earlier images.
+
+Usage:
+    index = ImageSimilarityIndex.load()
+    vector, cast = index.describe(sentence, storyboard_analysis)
+    match = index.propose(vector, cast)  # (image_filename, score) or None
+    index.add("chapter_01_scene_01_sent_001_emma.png", vector, cast, chapter_num=1)
+    index.save()
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from scene_parser import Sentence
+from config import (
+    IMAGE_SIMILARITY_INDEX_DIR,
+    IMAGE_SIMILARITY_THRESHOLD,
+    IMAGE_SIMILARITY_DIM
+)
+
+
+# Relative importance of each feature field in the similarity score
+FIELD_WEIGHTS = {
+    "framing": 1.5,
+    "angle": 1.0,
+    "location": 2.0,
+    "mood": 1.0,
+    "lighting": 1.0,
+    "expression": 1.0,
+    "props": 0.75,
+    "focus": 0.75,
+    "action": 1.0,
+}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or the their there this to with".split()
+)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_tokens(text) -> List[str]:
+    """
+    Lowercase word tokens without stopwords or trailing plural 's'.
+
+    Args:
+        text: String, or list/dict of strings (dict values are used)
+
+    Returns:
+        Sorted unique tokens
+    """
+    if not text:
+        return []
+    if isinstance(text, dict):
+        text = " ".join(str(value) for value in text.values())
+    elif isinstance(text, (list, tuple)):
+        text = " ".join(str(value) for value in text)
+    tokens = set()
+    for token in _TOKEN_PATTERN.findall(str(text).lower()):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.add(token)
+    return sorted(tokens)
+
+
+def sentence_features(sentence: Sentence, storyboard_analysis=None) -> Tuple[Dict[str, List[str]], str]:
+    """
+    Normalized feature tokens of a sentence's shot.
+
+    Args:
+        sentence: Sentence being planned
+        storyboard_analysis: Optional StoryboardAnalysis (preferred source)
+
+    Returns:
+        Tuple of (field -> tokens, cast signature). The cast signature is the
+        sorted, lowercased list of characters present, joined by '|'.
+    """
+    from prompt_generator import get_scene_features, extract_characters, extract_action
+
+    scene_features = get_scene_features(sentence.scene_context or sentence.content)
+
+    if storyboard_analysis is not None:
+        characters = storyboard_analysis.characters_present or []
+        features = {
+            "framing": normalize_tokens(storyboard_analysis.camera_framing),
+            "angle": normalize_tokens(storyboard_analysis.camera_angle),
+            "location": normalize_tokens(f"{storyboard_analysis.spatial_context} {scene_features.setting}"),
+            "mood": normalize_tokens(storyboard_analysis.mood),
+            "lighting": normalize_tokens(storyboard_analysis.lighting_suggestion),
+            "expression": normalize_tokens(storyboard_analysis.expressions),
+            "props": normalize_tokens(storyboard_analysis.props),
+            "focus": normalize_tokens(storyboard_analysis.visual_focus),
+        }
+    else:
+        characters = extract_characters(sentence.content)
+        features = {
+            "location": normalize_tokens(f"{scene_features.setting} {scene_features.time_of_day}"),
+            "mood": normalize_tokens(scene_features.mood),
+            "action": normalize_tokens(extract_action(sentence.content)),
+        }
+
+    cast = "|".join(sorted({name.strip().lower() for name in characters if name and name.strip()}))
+    return features, cast
+
+
+def _bucket(field_name: str, token: str, dim: int) -> Tuple[int, float]:
+    """Hash a field token to a vector index and sign."""
+    digest = hashlib.blake2b(f"{field_name}:{token}".encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, (1.0 if (value >> 63) & 1 else -1.0)
+
+
+def vectorize(features: Dict[str, List[str]], dim: int = IMAGE_SIMILARITY_DIM) -> np.ndarray:
+    """
+    Hash feature tokens into an L2-normalized vector.
+
+    Each field contributes its weight spread over its tokens, so a field
+    with many tokens does not dominate one with few.
+
+    Args:
+        features: Field -> tokens (from sentence_features)
+        dim: Vector size
+
+    Returns:
+        float32 vector of length dim (all zeros if there are no features)
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for field_name, tokens in features.items():
+        if not tokens:
+            continue
+        weight = FIELD_WEIGHTS.get(field_name, 1.0) / np.sqrt(len(tokens))
+        for token in tokens:
+            index, sign = _bucket(field_name, token, dim)
+            vector[index] += sign * weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class ImageSimilarityIndex:
+    """Feature vectors of planned images, searchable by cosine similarity."""
+
+    def __init__(self, index_dir: str = IMAGE_SIMILARITY_INDEX_DIR,
+                 threshold: float = IMAGE_SIMILARITY_THRESHOLD, dim: int = IMAGE_SIMILARITY_DIM):
+        """
+        Initialize an empty index.
+
+        Args:
+            index_dir: Directory the index is saved to
+            threshold: Minimum cosine similarity for a proposal
+            dim: Feature vector size
+        """
+        self.index_dir = index_dir
+        self.threshold = threshold
+        self.dim = dim
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        self.entries: List[Dict] = []  # image_file, cast, chapter_num
+        self.stats = {"queries": 0, "proposals": 0}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def describe(self, sentence: Sentence, storyboard_analysis=None) -> Tuple[np.ndarray, str]:
+        """
+        Feature vector and cast signature of a sentence.
+
+        Args:
+            sentence: Sentence being planned
+            storyboard_analysis: Optional StoryboardAnalysis
+
+        Returns:
+            Tuple of (vector, cast signature)
+        """
+        features, cast = sentence_features(sentence, storyboard_analysis)
+        return vectorize(features, self.dim), cast
+
+    def add(self, image_file: str, vector: np.ndarray, cast: str, chapter_num: int):
+        """
+        Add a planned image.
+
+        Args:
+            image_file: Image filename
+            vector: Feature vector from describe()
+            cast: Cast signature from describe()
+            chapter_num: Chapter the image belongs to
+        """
+        count = len(self.entries)
+        if count == len(self._vectors):
+            grown = np.zeros((count * 2, self.dim), dtype=np.float32)
+            grown[:count] = self._vectors
+            self._vectors = grown
+        self._vectors[count] = vector
+        self.entries.append({"image_file": image_file, "cast": cast, "chapter_num": chapter_num})
+
+    def propose(self, vector: np.ndarray, cast: str, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """
+        Most similar existing image with the same cast, if above the threshold.
+
+        Args:
+            vector: Feature vector from describe()
+            cast: Cast signature from describe()
+            exclude: Image filename that must not be proposed (e.g. the one on screen)
+
+        Returns:
+            Tuple of (image_filename, similarity), or None
+        """
+        self.stats["queries"] += 1
+        count = len(self.entries)
+        if count == 0 or not vector.any():
+            return None
+
+        scores = self._vectors[:count] @ vector
+        casts = np.array([entry["cast"] for entry in self.entries], dtype=object)
+        scores = np.where(casts == cast, scores, -1.0)
+        if exclude is not None:
+            scores = np.where(np.array([entry["image_file"] == exclude for entry in self.entries]), -1.0, scores)
+
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < self.threshold:
+            return None
+        self.stats["proposals"] += 1
+        return self.entries[best]["image_file"], score
+
+    def drop_chapter(self, chapter_num: int) -> int:
+        """
+        Remove a chapter's images (before it is planned again).
+
+        Args:
+            chapter_num: Chapter number
+
+        Returns:
+            Number of entries removed
+        """
+        keep = [i for i, entry in enumerate(self.entries) if entry["chapter_num"] != chapter_num]
+        removed = len(self.entries) - len(keep)
+        if removed:
+            vectors = self._vectors[keep] if keep else np.zeros((0, self.dim), dtype=np.float32)
+            self.entries = [self.entries[i] for i in keep]
+            self._vectors = np.zeros((max(64, len(keep) * 2), self.dim), dtype=np.float32)
+            self._vectors[:len(keep)] = vectors
+        return removed
+
+    def prune_missing(self, images_dir: str) -> int:
+        """
+        Remove entries whose image file no longer exists.
+
+        Args:
+            images_dir: Directory holding rendered images
+
+        Returns:
+            Number of entries removed
+        """
+        keep = [i for i, entry in enumerate(self.entries)
+                if os.path.exists(os.path.join(images_dir, entry["image_file"]))]
+        removed = len(self.entries) - len(keep)
+        if removed:
+            vectors = self._vectors[keep]
+            self.entries = [self.entries[i] for i in keep]
+            self._vectors = np.zeros((max(64, len(keep) * 2), self.dim), dtype=np.float32)
+            self._vectors[:len(keep)] = vectors
+        return removed
+
+    def save(self) -> str:
+        """
+        Save vectors (.npy) and entries (.json) to the index directory.
+
+        Returns:
+            Path to the entries file
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        vectors_path = os.path.join(self.index_dir, "vectors.npy")
+        entries_path = os.path.join(self.index_dir, "entries.json")
+        temp_vectors = f"{vectors_path}.{os.getpid()}.tmp"
+        with open(temp_vectors, 'wb') as f:
+            np.save(f, self._vectors[:len(self.entries)])
+        os.replace(temp_vectors, vectors_path)
+        temp_entries = f"{entries_path}.{os.getpid()}.tmp"
+        with open(temp_entries, 'w', encoding='utf-8') as f:
+            json.dump({"dim": self.dim, "entries": self.entries}, f, indent=2)
+        os.replace(temp_entries, entries_path)
+        return entries_path
+
+    @classmethod
+    def load(cls, index_dir: str = IMAGE_SIMILARITY_INDEX_DIR,
+             threshold: float = IMAGE_SIMILARITY_THRESHOLD) -> "ImageSimilarityIndex":
+        """
+        Load a saved index (empty if missing, unreadable or built with another dim).
+
+        Args:
+            index_dir: Directory the index was saved to
+            threshold: Minimum cosine similarity for a proposal
+
+        Returns:
+            ImageSimilarityIndex
+        """
+        index = cls(index_dir, threshold)
+        entries_path = os.path.join(index_dir, "entries.json")
+        vectors_path = os.path.join(index_dir, "vectors.npy")
+        if not (os.path.exists(entries_path) and os.path.exists(vectors_path)):
+            return index
+        try:
+            with open(entries_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            vectors = np.load(vectors_path)
+            if data["dim"] != index.dim or len(vectors) != len(data["entries"]):
+                print(f"  WARNING: Similarity index in {index_dir} does not match this configuration, starting empty")
+                return index
+            for entry, vector in zip(data["entries"], vectors):
+                index.add(entry["image_file"], vector, entry["cast"], entry["chapter_num"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"  WARNING: Error loading similarity index from {index_dir}: {e}")
+        return index
+
+    def get_summary(self) -> str:
+        """One-line summary for run logs."""
+        return (f"Similarity reuse: {self.stats['proposals']}/{self.stats['queries']} new shots reused an existing image "
+                f"(index: {len(self.entries)} images, threshold {self.threshold:.2f})")
+
+
+def main():
+    """Score a few synthetic storyboard shots against each other."""
+    from types import SimpleNamespace
+
+    def shot(characters, framing, location, mood, expression):
+        return SimpleNamespace(
+            characters_present=characters, camera_framing=framing, camera_angle="eye level",
+            spatial_context=location, mood=mood, lighting_suggestion="soft window light",
+            expressions={name: expression for name in characters}, props=["tablet"], visual_focus="Emma's face"
+        )
+
+    scene = "Emma sat in the quiet kitchen. Morning light filled the room."
+    shots = [
+        ("ch01 kitchen close-up", shot(["Emma"], "close-up", "kitchen table", "quiet tension", "worried")),
+        ("ch03 kitchen close-up", shot(["Emma"], "close-up", "kitchen table", "quiet tension", "anxious")),
+        ("ch03 factory wide", shot(["Emma"], "wide shot", "factory floor", "bustling", "focused")),
+        ("ch03 kitchen, Tyler too", shot(["Emma", "Tyler"], "close-up", "kitchen table", "quiet tension", "worried")),
+    ]
+
+    index = ImageSimilarityIndex(index_dir="", threshold=0.8)
+    first = Sentence(chapter_num=1, scene_num=1, sentence_num=1, content="Emma stared at the tablet.",
+                     word_count=5, scene_context=scene)
+    vector, cast = index.describe(first, shots[0][1])
+    index.add("chapter_01_scene_01_sent_001_emma.png", vector, cast, chapter_num=1)
+
+    for label, analysis in shots[1:]:
+        sentence = Sentence(chapter_num=3, scene_num=2, sentence_num=4, content="Emma stared at the tablet.",
+                            word_count=5, scene_context=scene)
+        vector, cast = index.describe(sentence, analysis)
+        scores = index._vectors[:len(index)] @ vector
+        match = index.propose(vector, cast)
+        print(f"{label:26s} cosine {scores[0]:.2f} -> {'reuse ' + match[0] if match else 'render new image'}")
+    print(index.get_summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Content-addressed store of rendered images, keyed by the full generation inputs.
+
+generate_scene_images used to skip a render only when images/ already held a
+file with the derived name, so a rename, a cleared images/ directory or the
+same prompt in another chapter meant another diffusion run. Every render is
+now also kept here under a hash of everything that determines the pixels:
+prompt, negative prompt, seed, steps, guidance, size, scheduler, model ID,
+IP-Adapter weights and a hash of the character reference (metadata and
+reference images, from which the FaceID embedding is computed).
+
+A hit is materialized in images/ as a hard link (a copy where linking is not
+possible), so it costs no disk space and no time. The store is bounded by a
+size quota; least recently used renders are evicted first. Note that an
+evicted render only frees disk space once no image in images/ links to it.
+
+Layout: <IMAGE_STORE_DIR>/<key[:2]>/<key>.png
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import (
+    IMAGE_STORE_DIR,
+    IMAGE_STORE_QUOTA_GB,
+    IMAGE_STORE_ENABLED,
+    CHARACTER_REFERENCES_DIR,
+    MAX_REFERENCE_IMAGES
+)
+
+
+def generation_key(prompt: str, negative_prompt: str, seed: int, steps: int, guidance: float,
+                   width: int, height: int, fingerprint: Dict[str, str]) -> str:
+    """
+    Hash every input that determines a rendered image.
+
+    Args:
+        prompt: Positive prompt
+        negative_prompt: Negative prompt
+        seed: Random seed
+        steps: Number of inference steps
+        guidance: Guidance scale
+        width: Image width in pixels
+        height: Image height in pixels
+        fingerprint: Generator state from SDXLGenerator.generation_fingerprint()
+            (model ID, scheduler, IP-Adapter weights, character reference hash)
+
+    Returns:
+        64-hex-digit store key
+    """
+    inputs = {
+        "prompt": prompt,
+        "negative_prompt": negative_prompt,
+        "seed": seed,
+        "steps": steps,
+        "guidance": float(guidance),
+        "width": width,
+        "height": height,
+        **fingerprint,
+    }
+    canonical = json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+_reference_hashes: Dict[str, Optional[str]] = {}
+
+
+def character_reference_hash(character_name: str, references_dir: str = CHARACTER_REFERENCES_DIR) -> Optional[str]:
+    """
+    Hash a character reference: its metadata and the reference images used.
+
+    The FaceID embedding is a deterministic function of these files, so the
+    hash stands in for the embedding without loading the face encoder.
+    Results are memoized for the process.
+
+    Args:
+        character_name: Character directory name (emma, tyler, ...)
+        references_dir: Character references directory
+
+    Returns:
+        Hex digest, or None if the character has no usable reference
+    """
+    cache_key = f"{references_dir}/{character_name}"
+    if cache_key in _reference_hashes:
+        return _reference_hashes[cache_key]
+
+    character_dir = Path(references_dir) / character_name
+    metadata_path = character_dir / "metadata.json"
+    digest = None
+    try:
+        with open(metadata_path, 'rb') as f:
+            metadata_bytes = f.read()
+        reference_files = json.loads(metadata_bytes).get("reference_images", [])[:MAX_REFERENCE_IMAGES]
+        sha = hashlib.sha256(metadata_bytes)
+        found = False
+        for reference_file in reference_files:
+            reference_path = character_dir / reference_file
+            if reference_path.exists():
+                sha.update(reference_file.encode("utf-8"))
+                sha.update(reference_path.read_bytes())
+                found = True
+        digest = sha.hexdigest() if found else None
+    except (OSError, ValueError):
+        digest = None
+
+    _reference_hashes[cache_key] = digest
+    return digest
+
+
+def _link_or_copy(source: Path, target: Path):
+    """Hard-link source to target (atomically), copying if linking is not possible."""
+    temp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copy2(source, temp_path)
+    os.replace(temp_path, target)
+
+
+class ImageStore:
+    """Content-addressed image store with hard-link materialization and LRU quota eviction."""
+
+    def __init__(self, store_dir: str = IMAGE_STORE_DIR, quota_gb: float = IMAGE_STORE_QUOTA_GB,
+                 enabled: bool = IMAGE_STORE_ENABLED):
+        """
+        Initialize image store.
+
+        Args:
+            store_dir: Directory for stored renders
+            quota_gb: Size quota in GB; least recently used renders are evicted beyond it
+            enabled: If False, every lookup is a miss and nothing is stored
+        """
+        self.store_dir = Path(store_dir)
+        self.quota_bytes = int(quota_gb * 1024 ** 3)
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+        self._total_bytes: Optional[int] = None  # Scanned on first need
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.store_dir / key[:2] / f"{key}.png"
+
+    def contains(self, key: str) -> bool:
+        """True if a render with this key is stored."""
+        return self.enabled and self._path(key).exists()
+
+    def materialize(self, key: str, output_path: str) -> bool:
+        """
+        Place a stored render at output_path (hard link, or copy across devices).
+
+        Args:
+            key: Key from generation_key()
+            output_path: Where the image should appear (e.g. images/<filename>.png)
+
+        Returns:
+            True on a hit, False if the key is not stored (or the store is disabled)
+        """
+        if not self.enabled:
+            return False
+        stored = self._path(key)
+        try:
+            _link_or_copy(stored, Path(output_path))
+        except FileNotFoundError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return False
+
+        # Access time drives eviction; the mtime (shared with the link) stays untouched
+        stat = stored.stat()
+        os.utime(stored, ns=(time.time_ns(), stat.st_mtime_ns))
+        with self._lock:
+            self.stats["hits"] += 1
+        return True
+
+    def add(self, key: str, image_path: str):
+        """
+        Store a freshly rendered image and enforce the quota.
+
+        Args:
+            key: Key from generation_key()
+            image_path: Rendered image file
+        """
+        if not self.enabled:
+            return
+        stored = self._path(key)
+        if stored.exists():
+            return
+        stored.parent.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(Path(image_path), stored)
+
+        with self._lock:
+            self.stats["stores"] += 1
+            if self._total_bytes is not None:
+                self._total_bytes += stored.stat().st_size
+        self.enforce_quota()
+
+    def _scan(self):
+        """All stored renders as (path, size, last_used)."""
+        entries = []
+        for path in self.store_dir.glob("*/*.png"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, max(stat.st_atime_ns, stat.st_mtime_ns)))
+        return entries
+
+    def total_bytes(self) -> int:
+        """Size of all stored renders."""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            return self._total_bytes
+
+    def enforce_quota(self) -> int:
+        """
+        Evict least recently used renders until the store is 10% under quota.
+
+        Returns:
+            Number of renders evicted
+        """
+        if self.total_bytes() <= self.quota_bytes:
+            return 0
+
+        with self._lock:
+            entries = sorted(self._scan(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            target = int(self.quota_bytes * 0.9)
+            evicted = 0
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+            self._total_bytes = total
+            self.stats["evicted"] += evicted
+        return evicted
+
+    def get_summary(self) -> str:
+        """
+        Format hit/miss statistics for run summaries.
+
+        Returns:
+            One-line summary string
+        """
+        if not self.enabled:
+            return "Image store: disabled"
+        lookups = self.stats["hits"] + self.stats["misses"]
+        summary = (f"Image store: {self.stats['hits']}/{lookups} hits, {self.stats['stores']} stored, "
+                   f"{self.total_bytes() / 1024 ** 3:.2f}/{self.quota_bytes / 1024 ** 3:.0f} GB")
+        if self.stats["evicted"]:
+            summary += f", {self.stats['evicted']} evicted"
+        return summary
+
+
+# Process-wide store used by generate_scene_images
+_default_store: Optional[ImageStore] = None
+
+
+def get_image_store() -> ImageStore:
+    """Return the process-wide image store (created on first use)."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ImageStore()
+    return _default_store
+
+
+def set_image_store_enabled(enabled: bool):
+    """Enable or disable the process-wide image store (e.g. --no-image-store)."""
+    get_image_store().enabled = enabled
+
+
+def main():
+    """Store, materialize and evict a few fake renders in a temporary directory."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp = Path(temp_dir)
+        images_dir = temp / "images"
+        images_dir.mkdir()
+        store = ImageStore(str(temp / "store"), quota_gb=2.5 / 1024)  # 2.5 MB quota
+        fingerprint = {"model_id": "stabilityai/stable-diffusion-xl-base-1.0",
+                       "scheduler": "DPMSolverMultistepScheduler"}
+
+        keys = []
+        for i in range(4):
+            key = generation_key(f"prompt {i}", "blurry", 1000 + i, 35, 7.5, 1024, 1024, fingerprint)
+            render = images_dir / f"chapter_01_scene_01_sent_{i + 1:03d}_demo.png"
+            render.write_bytes(os.urandom(1024 * 1024))  # 1 MB stand-in for a PNG
+            store.add(key, str(render))
+            keys.append(key)
+            time.sleep(0.01)
+
+        # A renamed sentence with identical inputs is linked, not rendered
+        renamed = images_dir / "chapter_01_scene_01_sent_009_renamed.png"
+        print(f"Hit for last render: {store.materialize(keys[-1], str(renamed))}")
+        print(f"Hard link count: {renamed.stat().st_nlink}")
+        print(f"Oldest render still stored: {store.contains(keys[0])}")
+        print(store.get_summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Multi-pattern keyword matcher (Aho-Corasick) for scene text analysis.
+
+Compiles several keyword tables (settings, moods, actions, ...) into a single
+automaton so a text is scanned once, regardless of how many keywords exist.
+Matches are word-boundary aware: "wei" matches "Wei said" but not "weird".
+A keyword also matches its plural ("street" in "streets", "lunch" in
+"lunches"), so the right boundary may follow an "s"/"es" suffix.
+"""
+
+from collections import deque
+from typing import Dict, List, Set, Tuple
+
+
+# Keyword tables: category -> label -> keywords
+KeywordTables = Dict[str, Dict[str, List[str]]]
+
+# Match results: category -> label -> keywords found in the text
+KeywordHits = Dict[str, Dict[str, Set[str]]]
+
+
+def plural_suffix(keyword: str) -> str:
+    """Regular English plural suffix of a keyword ("es" after s, x, z, ch, sh; else "s")."""
+    return "es" if keyword.endswith(("s", "x", "z", "ch", "sh")) else "s"
+
+
+def _is_word_end(text: str, index: int) -> bool:
+    """True if index is the end of text or a non-alphanumeric character."""
+    return index >= len(text) or not text[index].isalnum()
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton built once from a set of keyword tables.
+
+    Each keyword is tagged with the (category, label) it belongs to. A single
+    pass over the lowercased text reports every keyword occurrence that is
+    bounded by non-alphanumeric characters (or the ends of the text), with
+    an optional plural suffix before the right boundary.
+    """
+
+    def __init__(self, tables: KeywordTables):
+        """
+        Build the automaton.
+
+        Args:
+            tables: Mapping of category -> label -> list of keywords,
+                    e.g. {"setting": {"factory": ["factory", "assembly line"]}}
+        """
+        self.categories = list(tables.keys())
+
+        # Trie transitions, failure links and per-state outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, str, str, str]]] = [[]]
+
+        for category, labels in tables.items():
+            for label, keywords in labels.items():
+                for keyword in keywords:
+                    self._add_keyword(keyword.lower(), category, label)
+
+        self._build_failure_links()
+
+    def _add_keyword(self, keyword: str, category: str, label: str):
+        """Insert a keyword into the trie."""
+        if not keyword:
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+
+        self._output[state].append((len(keyword), category, label, keyword))
+
+    def _build_failure_links(self):
+        """Compute failure links breadth-first and merge suffix outputs."""
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                # Follow failure links until a state with this transition is found
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+
+                # Keywords ending at the failure state also end here
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def match(self, text: str) -> KeywordHits:
+        """
+        Find all whole-word keyword occurrences (and their plurals) in one pass.
+
+        Args:
+            text: Text to scan (case-insensitive)
+
+        Returns:
+            Dict of category -> label -> set of keywords found.
+            Every category is present; labels appear only when hit.
+        """
+        hits: KeywordHits = {category: {} for category in self.categories}
+        if not text:
+            return hits
+
+        text_lower = text.lower()
+        text_len = len(text_lower)
+        goto, fail, output = self._goto, self._fail, self._output
+        root = goto[0]
+        state = 0
+
+        for index, char in enumerate(text_lower):
+            # Fast path: most characters never leave the root state
+            if not state:
+                state = root.get(char, 0)
+                if not state:
+                    continue
+            else:
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+
+            matches = output[state]
+            if not matches:
+                continue
+
+            # Right boundary: end of text or next char is not alphanumeric,
+            # possibly after a plural suffix ("streets", "lunches")
+            plural = ""
+            if index + 1 < text_len and text_lower[index + 1].isalnum():
+                if text_lower[index + 1] == "s" and _is_word_end(text_lower, index + 2):
+                    plural = "s"
+                elif text_lower.startswith("es", index + 1) and _is_word_end(text_lower, index + 3):
+                    plural = "es"
+                else:
+                    continue
+
+            for length, category, label, keyword in matches:
+                if plural and plural_suffix(keyword) != plural:
+                    continue
+                start = index - length + 1
+                # Left boundary: start of text or previous char is not alphanumeric
+                if start > 0 and text_lower[start - 1].isalnum():
+                    continue
+                hits[category].setdefault(label, set()).add(keyword)
+
+        return hits
+
+
+def main():
+    """Test keyword matcher with sample tables."""
+    tables = {
+        "character": {"wei": ["wei"], "emma": ["emma"]},
+        "setting": {"factory": ["factory", "assembly line"], "car": ["car"]},
+        "action": {"reading": ["read", "reading", "looked at"]},
+    }
+    matcher = KeywordMatcher(tables)
+
+    samples = [
+        "Wei read the report on the assembly line.",
+        "Something weird was already in the cart.",
+        "Careful drivers parked their cars by the assembly lines.",
+        "Emma looked at the factory floor, reading the tablet.",
+    ]
+
+    print("Keyword Matcher Test")
+    print("=" * 80)
+    for sample in samples:
+        print(f"\nText: {sample}")
+        for category, labels in matcher.match(sample).items():
+            print(f"  {category:10s}: {labels}")
+    print("\n" + "=" * 80)
+
+
+if __name__ == "__main__":
+    main()
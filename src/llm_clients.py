@@ -0,0 +1,255 @@
+"""
+Shared, pooled HTTP clients for the LLM backends (Ollama and Anthropic).
+
+Creating a client per call pays TCP/TLS setup for every sentence. This module
+keeps one client per backend for the whole process:
+
+- Ollama: a requests.Session with a pooled, keep-alive HTTPAdapter and a
+  retry loop with jittered exponential backoff for connection errors,
+  timeouts, 429 and 5xx responses.
+- Anthropic: one anthropic.Anthropic client per (api_key, base_url) with a
+  bounded httpx connection pool, explicit timeouts and the SDK's own retries
+  (jittered exponential backoff that also honours retry-after headers).
+
+Used by prompt_generator (Ollama/Haiku prompts) and StoryboardAnalyzer.
+Clients are created lazily and are safe to share between threads.
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from config import (
+    OLLAMA_BASE_URL,
+    OLLAMA_MODEL,
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    LLM_POOL_SIZE
+)
+
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying (rate limit, overloaded/unavailable servers)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+
+_lock = threading.Lock()
+_ollama_session = None
+_anthropic_clients: Dict[Tuple[Optional[str], Optional[str]], object] = {}
+
+
+def backoff_delay(attempt: int, base_delay: float = LLM_RETRY_BASE_DELAY,
+                  max_delay: float = LLM_RETRY_MAX_DELAY) -> float:
+    """
+    Jittered exponential backoff ("full jitter").
+
+    Args:
+        attempt: Retry number, starting at 0
+        base_delay: Delay cap for the first retry (seconds)
+        max_delay: Upper bound for any delay (seconds)
+
+    Returns:
+        Random delay in [0, min(max_delay, base_delay * 2**attempt)]
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_call(
+    func: Callable[[], T],
+    is_retryable: Callable[[Exception], bool],
+    max_retries: int = LLM_MAX_RETRIES,
+    sleep: Callable[[float], None] = time.sleep
+) -> T:
+    """
+    Call func, retrying retryable errors with jittered backoff.
+
+    Args:
+        func: Zero-argument callable performing one attempt
+        is_retryable: Returns True for exceptions worth another attempt
+        max_retries: Retries after the first attempt
+        sleep: Sleep function (replaceable in benchmarks)
+
+    Returns:
+        Result of the first successful attempt
+
+    Raises:
+        The last exception when attempts are exhausted or it is not retryable
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            sleep(backoff_delay(attempt))
+
+
+# ============================================================================
+# OLLAMA
+# ============================================================================
+
+def get_ollama_session():
+    """
+    Return the shared requests.Session for Ollama (created on first use).
+
+    Returns:
+        requests.Session with a keep-alive connection pool of LLM_POOL_SIZE
+
+    Raises:
+        ImportError: If requests is not installed
+    """
+    global _ollama_session
+    with _lock:
+        if _ollama_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            # Retries are handled by retry_call() so they get jittered backoff
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_POOL_SIZE, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _ollama_session = session
+        return _ollama_session
+
+
+def _is_retryable_http_error(error: Exception) -> bool:
+    """True for connection errors, timeouts and retryable HTTP statuses."""
+    import requests
+
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def ollama_generate(
+    prompt: str,
+    model: str = OLLAMA_MODEL,
+    base_url: str = OLLAMA_BASE_URL,
+    timeout: Tuple[float, float] = (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT),
+    max_retries: int = LLM_MAX_RETRIES
+) -> Dict:
+    """
+    Call Ollama /api/generate (non-streaming) over the shared session.
+
+    Args:
+        prompt: Prompt text
+        model: Ollama model name
+        base_url: Ollama server URL
+        timeout: (connect, read) timeouts in seconds
+        max_retries: Retries for retryable failures
+
+    Returns:
+        Parsed JSON response
+
+    Raises:
+        requests.exceptions.RequestException: When all attempts fail
+    """
+    session = get_ollama_session()
+
+    def attempt():
+        response = session.post(
+            f"{base_url}/api/generate",
+            json={
+                "model": model,
+                "prompt": prompt,
+                "stream": False
+            },
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    return retry_call(attempt, _is_retryable_http_error, max_retries=max_retries)
+
+
+# ============================================================================
+# ANTHROPIC
+# ============================================================================
+
+def get_anthropic_client(api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """
+    Return the shared Anthropic client for an API key and base URL.
+
+    Args:
+        api_key: API key (None: ANTHROPIC_API_KEY from the environment)
+        base_url: API base URL (None: the SDK default or ANTHROPIC_BASE_URL)
+
+    Returns:
+        anthropic.Anthropic with a pooled httpx client, timeouts and retries
+
+    Raises:
+        ImportError: If the anthropic library is not installed
+    """
+    key = (api_key, base_url)
+    with _lock:
+        client = _anthropic_clients.get(key)
+        if client is None:
+            import anthropic
+            import httpx
+
+            client = anthropic.Anthropic(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=LLM_MAX_RETRIES,
+                timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                http_client=anthropic.DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=LLM_POOL_SIZE,
+                        max_keepalive_connections=LLM_POOL_SIZE
+                    )
+                )
+            )
+            _anthropic_clients[key] = client
+        return client
+
+
+def close_clients():
+    """Close all shared clients (their connection pools are released)."""
+    global _ollama_session
+    with _lock:
+        if _ollama_session is not None:
+            _ollama_session.close()
+            _ollama_session = None
+        for client in _anthropic_clients.values():
+            client.close()
+        _anthropic_clients.clear()
+
+
+def main():
+    """Show the retry schedule and exercise retry_call without any network access."""
+    print("Backoff caps and sample delays (seconds):")
+    for attempt in range(LLM_MAX_RETRIES):
+        cap = min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * (2 ** attempt))
+        print(f"  Retry {attempt + 1}: cap {cap:.2f}, sampled {backoff_delay(attempt):.2f}")
+
+    failures = [ConnectionError("refused"), TimeoutError("slow")]
+
+    def flaky():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    delays = []
+    result = retry_call(
+        flaky,
+        lambda e: isinstance(e, (ConnectionError, TimeoutError)),
+        sleep=delays.append
+    )
+    print(f"\nflaky() -> {result!r} after {len(delays)} retries "
+          f"(slept {', '.join(f'{d:.2f}' for d in delays)})")
+
+    try:
+        retry_call(lambda: 1 / 0, lambda e: isinstance(e, ConnectionError), sleep=delays.append)
+    except ZeroDivisionError:
+        print("Non-retryable errors are raised immediately")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Read-through cache for LLM-generated SDXL prompts (Ollama and Haiku).
+
+Each entry is keyed by method, model, sentence hash, scene-context hash and
+prompt-template version, so a rerun with unchanged text skips the LLM
+entirely, while changing the model, the template or the text is a miss.
+Entries are small JSON files under <PROMPT_CACHE_DIR>/llm/<method>/.
+
+The human-readable per-image .txt files written by generate_scene_images
+remain as they were; this cache is what prompt generation reads back.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from config import PROMPT_CACHE_DIR, LLM_PROMPT_CACHE_ENABLED
+
+
+def _short_hash(text: str) -> str:
+    """Stable 16-hex-digit hash of a string."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class LLMPromptCache:
+    """Read-through cache of generated prompts with hit/miss statistics."""
+
+    def __init__(self, cache_dir: str = os.path.join(PROMPT_CACHE_DIR, "llm"),
+                 enabled: bool = LLM_PROMPT_CACHE_ENABLED):
+        """
+        Initialize prompt cache.
+
+        Args:
+            cache_dir: Directory for cache entries
+            enabled: If False, every lookup is a miss and nothing is stored
+        """
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+        self.hits_by_method: Dict[str, int] = {}
+        self._lock = threading.Lock()  # Lookups may run in parallel (compare mode)
+
+    @staticmethod
+    def make_key(method: str, model: str, sentence: str, scene_context: Optional[str],
+                 template_version: str) -> str:
+        """
+        Build the cache key for a prompt request.
+
+        Args:
+            method: "ollama" or "haiku"
+            model: Model name used by the method
+            sentence: Sentence text
+            scene_context: Scene text passed to the prompt template (or None)
+            template_version: Version of the LLM prompt template
+
+        Returns:
+            Cache key (also used as the entry filename)
+        """
+        sentence_hash = _short_hash(sentence)
+        context_hash = _short_hash(scene_context or "")
+        request_hash = _short_hash(f"{method}|{model}|{template_version}|{sentence_hash}|{context_hash}")
+        return f"{sentence_hash}_{request_hash}"
+
+    def _path(self, method: str, key: str) -> str:
+        return os.path.join(self.cache_dir, method, f"{key}.json")
+
+    def get(self, method: str, key: str) -> Optional[str]:
+        """
+        Look up a cached prompt.
+
+        Args:
+            method: "ollama" or "haiku"
+            key: Key from make_key()
+
+        Returns:
+            Cached prompt, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        path = self._path(method, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                prompt = json.load(f).get("prompt")
+        except FileNotFoundError:
+            prompt = None
+        except (OSError, ValueError) as e:
+            print(f"  Warning: Failed to load prompt cache {path}: {e}")
+            prompt = None
+
+        with self._lock:
+            if prompt:
+                self.stats["hits"] += 1
+                self.hits_by_method[method] = self.hits_by_method.get(method, 0) + 1
+                return prompt
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, method: str, key: str, prompt: str, model: str, template_version: str,
+            sentence: str, input_tokens: int = 0, output_tokens: int = 0):
+        """
+        Store a generated prompt (failed generations are never stored).
+
+        Args:
+            method: "ollama" or "haiku"
+            key: Key from make_key()
+            prompt: Generated prompt
+            model: Model that generated it
+            template_version: Template version used
+            sentence: Sentence text (kept for inspection)
+            input_tokens: API input tokens spent on the prompt
+            output_tokens: API output tokens spent on the prompt
+        """
+        if not self.enabled or not prompt:
+            return
+
+        path = self._path(method, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "method": method,
+            "model": model,
+            "template_version": template_version,
+            "sentence": sentence,
+            "prompt": prompt,
+            "tokens": {"input": input_tokens, "output": output_tokens},
+            "created_at": datetime.now().isoformat(),
+        }
+        # Write atomically so concurrent runs never read a partial entry
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=2)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.stats["stores"] += 1
+
+    def get_summary(self) -> str:
+        """
+        Format hit/miss statistics for run summaries.
+
+        Returns:
+            One-line summary string
+        """
+        lookups = self.stats["hits"] + self.stats["misses"]
+        if not self.enabled:
+            return "LLM prompt cache: disabled"
+        if lookups == 0:
+            return "LLM prompt cache: no LLM prompts requested"
+
+        hit_rate = self.stats["hits"] / lookups * 100
+        by_method = ", ".join(f"{method} {count}" for method, count in sorted(self.hits_by_method.items()))
+        summary = f"LLM prompt cache: {self.stats['hits']}/{lookups} hits ({hit_rate:.0f}%)"
+        if by_method:
+            summary += f" [{by_method}]"
+        return summary
+
+
+# Process-wide cache used by prompt_generator
+_default_cache: Optional[LLMPromptCache] = None
+
+
+def get_llm_prompt_cache() -> LLMPromptCache:
+    """Return the process-wide prompt cache (created on first use)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMPromptCache()
+    return _default_cache
+
+
+def set_llm_prompt_cache_enabled(enabled: bool):
+    """Enable or disable the process-wide prompt cache (e.g. --no-prompt-cache)."""
+    get_llm_prompt_cache().enabled = enabled
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+Manuscript diff engine: compute the minimal regeneration set after an edit.
+
+Every generated artifact is named after a sentence position
+(chapter_01_scene_02_sent_015_<keywords>.png/.wav), so editing a chapter
+used to mean --rebuild-storyboard or --clear-cache for the whole chapter.
+This module keeps a snapshot of each chapter's sentences (text, artifact
+filename, storyboard key) and aligns the snapshot with the current
+manuscript by content similarity. Snapshots are only written by this
+script (--save-snapshot, and --apply after invalidating artifacts), not by
+the generators, so save one once a chapter has been generated:
+
+- unchanged: same text at the same position -> nothing to do
+- moved:     same text at a new position (e.g., after an insert) -> the
+             image, prompt and audio files are renamed, not regenerated
+- modified:  similar text (edited sentence) -> artifacts are regenerated
+- inserted / deleted -> artifacts are generated / removed
+
+Storyboard entries are content-addressed (see storyboard_analyzer), so only
+keys that no current sentence uses any more are invalidated. The chapter
+video is invalidated whenever anything in the chapter changed.
+
+Usage:
+    # Record the current manuscript as the baseline (first run)
+    python manuscript_diff.py --all --save-snapshot
+
+    # After editing: show what would be regenerated
+    python manuscript_diff.py --chapters 3
+
+    # Apply: delete/rename invalidated artifacts and update the snapshot
+    python manuscript_diff.py --chapters 3 --apply
+
+    # Apply and rerun audio, image and video generation for changed chapters
+    python manuscript_diff.py --all --apply --regenerate --image-args "--llm haiku"
+"""
+
+import argparse
+import difflib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from scene_parser import Sentence, parse_all_chapters, parse_scene_sentences
+from prompt_generator import generate_filename
+from storyboard_analyzer import content_cache_key, previous_sentence_text
+from audio_manifest import ChapterManifest
+from image_mapping_metadata import load_image_mapping
+from config import (
+    OUTPUT_DIR,
+    PROMPT_CACHE_DIR,
+    AUDIO_DIR,
+    AUDIO_CACHE_DIR,
+    VIDEO_DIR,
+    IMAGE_MAPPING_DIR,
+    STORYBOARD_CACHE_DIR,
+    MANUSCRIPT_SNAPSHOT_DIR,
+    MANUSCRIPT_DIFF_SIMILARITY
+)
+
+
+# Prompt files are saved as <image stem><suffix>.txt (see save_prompt_to_cache)
+PROMPT_SUFFIXES = ("", "_OLLAMA", "_HAIKU")
+AUDIO_CACHE_SUFFIXES = ("_metadata.json", "_dialogue.json")
+
+
+@dataclass
+class SentenceRecord:
+    """Snapshot of one sentence and the names of its artifacts."""
+    scene_num: int
+    sentence_num: int
+    content: str
+    filename: str        # Image filename; audio uses the same stem with .wav
+    storyboard_key: str
+
+
+@dataclass
+class SentenceChange:
+    """Alignment result for one old and/or new sentence."""
+    kind: str  # "unchanged", "moved", "modified", "inserted", "deleted"
+    old: Optional[SentenceRecord] = None
+    new: Optional[SentenceRecord] = None
+    similarity: float = 1.0
+
+
+@dataclass
+class RegenerationSet:
+    """Everything a chapter edit invalidates, and what can be kept by renaming."""
+    chapter_num: int
+    changes: List[SentenceChange] = field(default_factory=list)
+    storyboard_keys: List[str] = field(default_factory=list)        # Cache entries to delete
+    stale_images: List[str] = field(default_factory=list)           # Image files to delete
+    renames: List[Tuple[str, str]] = field(default_factory=list)    # (old image filename, new image filename)
+    images_to_render: List[str] = field(default_factory=list)
+    audio_to_render: List[str] = field(default_factory=list)
+    video_segments: List[int] = field(default_factory=list)         # Chapter-order indices of new/changed sentences
+
+    def count(self, kind: str) -> int:
+        """Number of sentence changes of a kind."""
+        return sum(1 for change in self.changes if change.kind == kind)
+
+    @property
+    def is_empty(self) -> bool:
+        """True if the chapter did not change at all."""
+        return all(change.kind == "unchanged" for change in self.changes)
+
+    @property
+    def video_file(self) -> str:
+        """Chapter video invalidated by any change."""
+        return f"The_Obsolescence_Chapter_{self.chapter_num:02d}.mp4"
+
+    def summary(self) -> str:
+        """One-line summary of the chapter diff."""
+        if self.is_empty:
+            return f"Chapter {self.chapter_num}: unchanged"
+        return (f"Chapter {self.chapter_num}: {self.count('modified')} modified, {self.count('inserted')} inserted, "
+                f"{self.count('deleted')} deleted, {self.count('moved')} moved | "
+                f"render {len(self.images_to_render)} images, {len(self.audio_to_render)} audio files, "
+                f"rename {len(self.renames)}, drop {len(self.storyboard_keys)} storyboard entries")
+
+
+def build_records(sentences: List[Sentence]) -> List[SentenceRecord]:
+    """
+    Build snapshot records for a chapter's sentences.
+
+    Args:
+        sentences: Sentences of one chapter, in reading order
+
+    Returns:
+        One SentenceRecord per sentence
+    """
+    return [
+        SentenceRecord(
+            scene_num=sentence.scene_num,
+            sentence_num=sentence.sentence_num,
+            content=sentence.content,
+            filename=generate_filename(sentence.chapter_num, sentence.scene_num, sentence.content,
+                                       sentence_num=sentence.sentence_num, scene_context=sentence.scene_context),
+            storyboard_key=content_cache_key(sentence.chapter_num, sentence.content, previous_sentence_text(sentence))
+        )
+        for sentence in sentences
+    ]
+
+
+def load_chapter_sentences(chapter_numbers: Optional[List[int]] = None) -> Dict[int, List[Sentence]]:
+    """
+    Parse the current manuscript into sentences grouped by chapter.
+
+    Args:
+        chapter_numbers: Chapters to parse (None: all)
+
+    Returns:
+        Dict of chapter number -> sentences in reading order
+    """
+    by_chapter: Dict[int, List[Sentence]] = {}
+    for scene in parse_all_chapters(chapter_numbers=chapter_numbers):
+        by_chapter.setdefault(scene.chapter_num, []).extend(parse_scene_sentences(scene))
+    return by_chapter
+
+
+def _snapshot_path(chapter_num: int, snapshot_dir: str) -> str:
+    return os.path.join(snapshot_dir, f"chapter_{chapter_num:02d}_snapshot.json")
+
+
+def load_snapshot(chapter_num: int, snapshot_dir: str = MANUSCRIPT_SNAPSHOT_DIR) -> Optional[List[SentenceRecord]]:
+    """
+    Load a chapter's last saved sentence snapshot.
+
+    Args:
+        chapter_num: Chapter number
+        snapshot_dir: Snapshot directory
+
+    Returns:
+        Snapshot records, or None if the chapter has no snapshot
+    """
+    filepath = _snapshot_path(chapter_num, snapshot_dir)
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [SentenceRecord(**record) for record in data["sentences"]]
+
+
+def save_snapshot(chapter_num: int, records: List[SentenceRecord], snapshot_dir: str = MANUSCRIPT_SNAPSHOT_DIR) -> str:
+    """
+    Save a chapter's sentence snapshot (atomically).
+
+    Args:
+        chapter_num: Chapter number
+        records: Records from build_records()
+        snapshot_dir: Snapshot directory
+
+    Returns:
+        Path to the snapshot file
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    filepath = _snapshot_path(chapter_num, snapshot_dir)
+    data = {
+        "chapter": chapter_num,
+        "saved_at": datetime.now().isoformat(),
+        "sentences": [asdict(record) for record in records],
+    }
+    temp_path = f"{filepath}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, filepath)
+    return filepath
+
+
+def _similarity(a: str, b: str) -> float:
+    """Character-level similarity ratio of two sentences (0.0-1.0)."""
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    if matcher.real_quick_ratio() < MANUSCRIPT_DIFF_SIMILARITY or matcher.quick_ratio() < MANUSCRIPT_DIFF_SIMILARITY:
+        return 0.0
+    return matcher.ratio()
+
+
+def _pair_block(old_block: List[SentenceRecord], new_block: List[SentenceRecord],
+                threshold: float) -> List[SentenceChange]:
+    """
+    Pair the sentences of a changed block by similarity, keeping reading order.
+
+    Each new sentence is matched to the most similar remaining old sentence
+    after the previous match; sentences without a partner above the threshold
+    are inserted or deleted.
+
+    Args:
+        old_block: Old sentences replaced by the block
+        new_block: New sentences of the block
+        threshold: Minimum similarity for a "modified" pair
+
+    Returns:
+        Changes in reading order
+    """
+    changes = []
+    next_old = 0
+    for new in new_block:
+        best_index, best_score = None, threshold
+        for index in range(next_old, len(old_block)):
+            score = _similarity(old_block[index].content, new.content)
+            if score >= best_score:
+                best_index, best_score = index, score
+        if best_index is None:
+            changes.append(SentenceChange("inserted", new=new, similarity=0.0))
+            continue
+        changes.extend(SentenceChange("deleted", old=old, similarity=0.0) for old in old_block[next_old:best_index])
+        changes.append(SentenceChange("modified", old=old_block[best_index], new=new, similarity=best_score))
+        next_old = best_index + 1
+    changes.extend(SentenceChange("deleted", old=old, similarity=0.0) for old in old_block[next_old:])
+    return changes
+
+
+def align_sentences(old: List[SentenceRecord], new: List[SentenceRecord],
+                    threshold: float = MANUSCRIPT_DIFF_SIMILARITY) -> List[SentenceChange]:
+    """
+    Align old and new sentence lists of a chapter.
+
+    Identical sentences are matched first (longest common subsequence via
+    difflib); the remaining blocks are paired by similarity.
+
+    Args:
+        old: Snapshot records
+        new: Records for the current manuscript
+        threshold: Minimum similarity for an edited sentence to count as modified
+
+    Returns:
+        Changes in reading order
+    """
+    matcher = difflib.SequenceMatcher(None, [r.content for r in old], [r.content for r in new], autojunk=False)
+    changes = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for old_record, new_record in zip(old[i1:i2], new[j1:j2]):
+                kind = "unchanged" if old_record.filename == new_record.filename else "moved"
+                changes.append(SentenceChange(kind, old=old_record, new=new_record))
+        else:
+            changes.extend(_pair_block(old[i1:i2], new[j1:j2], threshold))
+    return changes
+
+
+def compute_regeneration_set(chapter_num: int, old: List[SentenceRecord],
+                             new: List[SentenceRecord]) -> RegenerationSet:
+    """
+    Diff a chapter and derive the artifacts to delete, rename and render.
+
+    Args:
+        chapter_num: Chapter number
+        old: Snapshot records
+        new: Records for the current manuscript
+
+    Returns:
+        RegenerationSet for the chapter
+    """
+    regen = RegenerationSet(chapter_num, changes=align_sentences(old, new))
+
+    new_keys = {record.storyboard_key for record in new}
+    regen.storyboard_keys = sorted({record.storyboard_key for record in old} - new_keys)
+
+    for change in regen.changes:
+        if change.kind == "moved":
+            regen.renames.append((change.old.filename, change.new.filename))
+        elif change.kind in ("modified", "deleted"):
+            regen.stale_images.append(change.old.filename)
+        if change.kind in ("modified", "inserted"):
+            regen.images_to_render.append(change.new.filename)
+            regen.audio_to_render.append(change.new.filename.replace('.png', '.wav'))
+
+    position = {id(record): index for index, record in enumerate(new)}
+    regen.video_segments = [position[id(change.new)] for change in regen.changes
+                            if change.kind in ("modified", "inserted")]
+    return regen
+
+
+def _artifact_paths(image_filename: str) -> List[str]:
+    """Every file derived from a sentence's image filename."""
+    stem = image_filename[:-len('.png')]
+    paths = [os.path.join(OUTPUT_DIR, image_filename), os.path.join(AUDIO_DIR, f"{stem}.wav")]
+    paths += [os.path.join(PROMPT_CACHE_DIR, f"{stem}{suffix}.txt") for suffix in PROMPT_SUFFIXES]
+    paths += [os.path.join(AUDIO_CACHE_DIR, f"{stem}{suffix}") for suffix in AUDIO_CACHE_SUFFIXES]
+    return paths
+
+
+def images_used_by_other_chapters(chapter_num: int, mapping_dir: str = IMAGE_MAPPING_DIR) -> set:
+    """
+    Image files that the image mappings of other chapters point to.
+
+    With similarity reuse (see image_similarity.py) a chapter can show an
+    image rendered under another chapter's sentence filename.
+
+    Args:
+        chapter_num: Chapter being invalidated
+        mapping_dir: Directory holding the image mappings
+
+    Returns:
+        Set of image filenames
+    """
+    used = set()
+    for path in Path(mapping_dir).glob("chapter_*_image_mapping.json"):
+        other_chapter = int(path.name.split('_')[1])
+        if other_chapter == chapter_num:
+            continue
+        used.update(mapping['image_file'] for mapping in load_image_mapping(other_chapter, mapping_dir).get_mappings())
+    return used
+
+
+def apply_regeneration_set(regen: RegenerationSet, storyboard_cache_dir: str = STORYBOARD_CACHE_DIR) -> Dict[str, int]:
+    """
+    Delete invalidated artifacts and rename moved ones.
+
+    Images that other chapters' mappings still point to are never removed:
+    stale ones are kept and moved ones are copied (hard-linked) to their
+    new name.
+
+    Args:
+        regen: Result of compute_regeneration_set()
+        storyboard_cache_dir: Storyboard cache directory
+
+    Returns:
+        Counts of deleted files, renamed files, kept shared images and
+        dropped storyboard entries
+    """
+    counts = {"deleted": 0, "renamed": 0, "shared": 0, "storyboard": 0}
+    shared = images_used_by_other_chapters(regen.chapter_num)
+
+    for image_filename in regen.stale_images:
+        for path in _artifact_paths(image_filename):
+            if os.path.basename(path) in shared:
+                counts["shared"] += 1
+                continue
+            if os.path.exists(path):
+                os.remove(path)
+                counts["deleted"] += 1
+
+    # Two phases so a chain of shifted filenames never overwrites a file still to be moved
+    staged = []
+    for old_filename, new_filename in regen.renames:
+        for old_path, new_path in zip(_artifact_paths(old_filename), _artifact_paths(new_filename)):
+            if os.path.exists(old_path):
+                temp_path = f"{old_path}.moving"
+                if os.path.basename(old_path) in shared:
+                    try:
+                        os.link(old_path, temp_path)
+                    except OSError:
+                        shutil.copy2(old_path, temp_path)
+                    counts["shared"] += 1
+                else:
+                    os.replace(old_path, temp_path)
+                staged.append((temp_path, new_path))
+    for temp_path, new_path in staged:
+        os.replace(temp_path, new_path)
+        counts["renamed"] += 1
+
+    # Renames keep size and mtime, so moved audio stays valid in the audio manifest
+    manifest = ChapterManifest.load(regen.chapter_num)
+    if manifest.entries:
+        new_records = {change.new.filename: change.new for change in regen.changes if change.new is not None}
+        moved = [(old, new, manifest.entries.pop(f"{old[:-len('.png')]}.wav", None)) for old, new in regen.renames]
+        for image_filename in regen.stale_images:
+            manifest.entries.pop(f"{image_filename[:-len('.png')]}.wav", None)
+        for _, new_filename, entry in moved:
+            if entry is not None:
+                entry.filename = f"{new_filename[:-len('.png')]}.wav"
+                record = new_records.get(new_filename)
+                if record is not None:
+                    entry.scene_num, entry.sentence_num = record.scene_num, record.sentence_num
+                manifest.entries[entry.filename] = entry
+        manifest.save()
+
+    # Storyboard cache entries no current sentence uses any more
+    chapter_dir = Path(storyboard_cache_dir) / f"{regen.chapter_num:02d}"
+    for key in regen.storyboard_keys:
+        cache_file = chapter_dir / f"{key}.json"
+        if cache_file.exists():
+            cache_file.unlink()
+            counts["storyboard"] += 1
+    index_file = Path(storyboard_cache_dir) / "index.json"
+    if counts["storyboard"] and index_file.exists():
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        for key in regen.storyboard_keys:
+            index.pop(key, None)
+        temp_path = index_file.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, index_file)
+
+    # Mapping and video are rebuilt from the surviving per-sentence files
+    for path in (os.path.join(IMAGE_MAPPING_DIR, f"chapter_{regen.chapter_num:02d}_image_mapping.json"),
+                 os.path.join(VIDEO_DIR, regen.video_file)):
+        if os.path.exists(path):
+            os.remove(path)
+            counts["deleted"] += 1
+
+    return counts
+
+
+def diff_chapters(chapter_numbers: Optional[List[int]] = None,
+                  snapshot_dir: str = MANUSCRIPT_SNAPSHOT_DIR) -> Tuple[List[RegenerationSet], Dict[int, List[SentenceRecord]]]:
+    """
+    Diff the current manuscript against the saved snapshots.
+
+    Args:
+        chapter_numbers: Chapters to diff (None: all)
+        snapshot_dir: Snapshot directory
+
+    Returns:
+        Tuple of (regeneration sets for chapters with a snapshot,
+                  current records of every parsed chapter)
+    """
+    current = {chapter_num: build_records(sentences)
+               for chapter_num, sentences in load_chapter_sentences(chapter_numbers).items()}
+    results = []
+    for chapter_num, records in sorted(current.items()):
+        old = load_snapshot(chapter_num, snapshot_dir)
+        if old is not None:
+            results.append(compute_regeneration_set(chapter_num, old, records))
+    return results, current
+
+
+def print_regeneration_set(regen: RegenerationSet, verbose: bool = False):
+    """Print a chapter's diff (every changed sentence with --verbose)."""
+    print(regen.summary())
+    if regen.is_empty:
+        return
+    for change in regen.changes:
+        if change.kind == "unchanged" or (change.kind == "moved" and not verbose):
+            continue
+        record = change.new or change.old
+        text = record.content.replace('\n', ' ')
+        print(f"  {change.kind:9s} sc{record.scene_num:02d} s{record.sentence_num:03d}: {text[:70]}")
+    print(f"  Video: {regen.video_file} (changed segments: {len(regen.video_segments)})")
+
+
+def run_generators(chapters: List[int], image_args: str = ""):
+    """
+    Rerun audio, image and video generation for changed chapters.
+
+    The generators skip every artifact that still exists, so only the
+    invalidated sentences are rendered.
+
+    Args:
+        chapters: Chapters with changes
+        image_args: Extra arguments for generate_scene_images.py
+    """
+    chapter_args = [str(chapter) for chapter in chapters]
+    commands = [
+        [sys.executable, "generate_scene_audio.py", "--chapters", *chapter_args, "--all-scenes"],
+        [sys.executable, "generate_scene_images.py", "--plan", "--chapters", *chapter_args, "--all-scenes",
+         *shlex.split(image_args)],
+        [sys.executable, "generate_video.py", "--chapters", *chapter_args],
+    ]
+    for command in commands:
+        print(f"\n$ {' '.join(command[1:])}")
+        result = subprocess.run(command)
+        if result.returncode != 0:
+            print(f"ERROR: {command[1]} exited with code {result.returncode}, stopping")
+            return
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Diff the manuscript against the last snapshot and regenerate only what changed'
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--chapters', type=int, nargs='+', help='Chapters to diff')
+    group.add_argument('--all', action='store_true', help='Diff all chapters')
+
+    parser.add_argument('--apply', action='store_true',
+                        help='Delete/rename invalidated artifacts and update the snapshot')
+    parser.add_argument('--save-snapshot', action='store_true',
+                        help='Record the current manuscript as the baseline without touching artifacts')
+    parser.add_argument('--regenerate', action='store_true',
+                        help='After --apply, rerun audio, image and video generation for changed chapters')
+    parser.add_argument('--image-args', type=str, default='',
+                        help='Extra arguments for generate_scene_images.py (e.g. "--llm haiku")')
+    parser.add_argument('--snapshot-dir', type=str, default=MANUSCRIPT_SNAPSHOT_DIR, help='Snapshot directory')
+    parser.add_argument('--verbose', action='store_true', help='Also list moved sentences')
+    args = parser.parse_args()
+
+    if args.regenerate and not args.apply:
+        parser.error("--regenerate requires --apply")
+
+    results, current = diff_chapters(None if args.all else args.chapters, args.snapshot_dir)
+
+    if args.save_snapshot:
+        for chapter_num, records in sorted(current.items()):
+            print(f"Snapshot saved: {save_snapshot(chapter_num, records, args.snapshot_dir)} ({len(records)} sentences)")
+        return
+
+    diffed = {regen.chapter_num for regen in results}
+    for chapter_num in sorted(set(current) - diffed):
+        print(f"Chapter {chapter_num}: no snapshot (run with --save-snapshot after generating it)")
+
+    for regen in results:
+        print_regeneration_set(regen, verbose=args.verbose)
+
+    changed = [regen for regen in results if not regen.is_empty]
+    if not changed:
+        print("\nNothing to regenerate")
+        return
+
+    if not args.apply:
+        print("\nRun with --apply to invalidate these artifacts")
+        return
+
+    for regen in changed:
+        counts = apply_regeneration_set(regen)
+        save_snapshot(regen.chapter_num, current[regen.chapter_num], args.snapshot_dir)
+        print(f"Chapter {regen.chapter_num}: deleted {counts['deleted']} files, renamed {counts['renamed']}, "
+              f"kept {counts['shared']} images shared with other chapters, "
+              f"dropped {counts['storyboard']} storyboard entries")
+
+    if args.regenerate:
+        run_generators([regen.chapter_num for regen in changed], args.image_args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,22 @@ Supports both keyword-based (legacy) and LLM-based prompt generation.
 import re
 import os
 import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Tuple, Optional, List, Dict
 from config import BASE_STYLE, NEGATIVE_PROMPT, OLLAMA_BASE_URL, OLLAMA_MODEL, ANTHROPIC_MODEL, ANTHROPIC_MAX_TOKENS
+from config import COMPARE_OLLAMA_WORKERS, COMPARE_HAIKU_WORKERS, COMPARE_PIPELINE_DEPTH
+from llm_clients import ollama_generate, get_anthropic_client
+from llm_prompt_cache import get_llm_prompt_cache
 from character_attributes import (
     CHARACTER_CANONICAL_ATTRIBUTES,
     get_full_description,
     get_compressed_description
 )
+from keyword_matcher import KeywordMatcher, KeywordHits
+from stage_metrics import span
 
 
 def filter_acting_characters(characters_present: List[str], character_roles: Dict[str, str]) -> List[str]:
@@ -104,6 +113,19 @@ ACTION_KEYWORDS = {
     "watching": ["watched", "watching", "observed", "monitored", "stared"]
 }
 
+# Characters detected by name in scene text (in priority order)
+KNOWN_CHARACTERS = ["emma", "maxim", "elena", "tyler", "amara", "wei"]
+
+# Single automaton over all keyword tables - one pass per text instead of
+# one substring scan per keyword, and whole-word only ("wei" != "weird")
+KEYWORD_MATCHER = KeywordMatcher({
+    "setting": SETTINGS,
+    "mood": MOOD_KEYWORDS,
+    "time": TIME_INDICATORS,
+    "action": ACTION_KEYWORDS,
+    "character": {char: [char] for char in KNOWN_CHARACTERS},
+})
+
 
 def normalize_character_name(full_name: str) -> str:
     """
@@ -137,38 +159,40 @@ def normalize_character_name(full_name: str) -> str:
     return name_mapping.get(normalized, normalized.split()[0])  # Default to first name
 
 
-def extract_characters(text: str) -> list:
+def match_keywords(text: str) -> KeywordHits:
+    """
+    Scan text once for every setting, mood, time, action and character keyword.
+
+    Args:
+        text: Sentence or scene text
+
+    Returns:
+        Dict of category -> label -> set of matched keywords, with categories
+        "setting", "mood", "time", "action" and "character"
+    """
+    return KEYWORD_MATCHER.match(text)
+
+
+def extract_characters(text: str, hits: KeywordHits = None) -> list:
     """Extract character names mentioned in the scene."""
-    characters = []
-    text_lower = text.lower()
-
-    # Check for each known character
-    if "emma" in text_lower:
-        characters.append("emma")
-    if "maxim" in text_lower:
-        characters.append("maxim")
-    if "elena" in text_lower:
-        characters.append("elena")
-    if "tyler" in text_lower:
-        characters.append("tyler")
-    if "amara" in text_lower:
-        characters.append("amara")
-    if "wei" in text_lower:
-        characters.append("wei")
-
-    return characters
-
-
-def extract_setting(text: str) -> str:
-    """Extract primary setting from scene text."""
-    text_lower = text.lower()
+    if hits is None:
+        hits = match_keywords(text)
+
+    # Preserve canonical ordering of known characters
+    return [char for char in KNOWN_CHARACTERS if char in hits["character"]]
 
-    # Count keyword matches for each setting
-    setting_scores = {}
-    for setting, keywords in SETTINGS.items():
-        score = sum(1 for keyword in keywords if keyword in text_lower)
-        if score > 0:
-            setting_scores[setting] = score
+
+def extract_setting(text: str, hits: KeywordHits = None) -> str:
+    """Extract primary setting from scene text."""
+    if hits is None:
+        hits = match_keywords(text)
+
+    # Count keyword matches for each setting (ties resolve in SETTINGS order)
+    setting_scores = {
+        setting: len(hits["setting"][setting])
+        for setting in SETTINGS
+        if setting in hits["setting"]
+    }
 
     # Return setting with highest score
     if setting_scores:
@@ -177,28 +201,30 @@ def extract_setting(text: str) -> str:
     return "interior scene"
 
 
-def extract_time_of_day(text: str) -> str:
+def extract_time_of_day(text: str, hits: KeywordHits = None) -> str:
     """Extract time of day from scene text."""
-    text_lower = text.lower()
+    if hits is None:
+        hits = match_keywords(text)
 
-    # Check for time indicators
-    for time_period, keywords in TIME_INDICATORS.items():
-        if any(keyword in text_lower for keyword in keywords):
+    # First time period (in TIME_INDICATORS order) with any indicator wins
+    for time_period in TIME_INDICATORS:
+        if time_period in hits["time"]:
             return time_period
 
     return "daytime"
 
 
-def extract_mood(text: str, time_of_day: str = "daytime") -> str:
+def extract_mood(text: str, time_of_day: str = "daytime", hits: KeywordHits = None) -> str:
     """Extract dominant mood/atmosphere from scene text and combine with lighting."""
-    text_lower = text.lower()
+    if hits is None:
+        hits = match_keywords(text)
 
     # Count keyword matches for each mood
-    mood_scores = {}
-    for mood, keywords in MOOD_KEYWORDS.items():
-        score = sum(1 for keyword in keywords if keyword in text_lower)
-        if score > 0:
-            mood_scores[mood] = score
+    mood_scores = {
+        mood: len(hits["mood"][mood])
+        for mood in MOOD_KEYWORDS
+        if mood in hits["mood"]
+    }
 
     # Time-based lighting descriptors
     time_lighting = {
@@ -224,13 +250,14 @@ def extract_mood(text: str, time_of_day: str = "daytime") -> str:
     return f"neutral mood, {lighting}"
 
 
-def extract_action(text: str) -> str:
+def extract_action(text: str, hits: KeywordHits = None) -> str:
     """Extract primary action from scene text."""
-    text_lower = text.lower()
+    if hits is None:
+        hits = match_keywords(text)
 
-    # Check for action keywords
-    for action, keywords in ACTION_KEYWORDS.items():
-        if any(keyword in text_lower for keyword in keywords):
+    # First action (in ACTION_KEYWORDS order) with any keyword wins
+    for action in ACTION_KEYWORDS:
+        if action in hits["action"]:
             action_descriptors = {
                 "reading": "reading document or screen",
                 "working": "working with equipment or tools",
@@ -243,6 +270,41 @@ def extract_action(text: str) -> str:
     return ""
 
 
+@dataclass(frozen=True)
+class SceneFeatures:
+    """Keyword-derived features of a whole scene, shared by all its sentences."""
+    setting: str
+    time_of_day: str
+    mood: str
+    characters: Tuple[str, ...]
+
+
+@lru_cache(maxsize=256)
+def get_scene_features(scene_context: str) -> SceneFeatures:
+    """
+    Compute setting, time of day, mood and character roster for a scene once.
+
+    Memoized on the scene text itself. Every Sentence of a scene shares the
+    same scene_context string object, and Python caches a string's hash on
+    the object, so repeated lookups for the same scene are O(1) rather than a
+    rescan of the scene text per sentence.
+
+    Args:
+        scene_context: Full scene text
+
+    Returns:
+        SceneFeatures for the scene
+    """
+    hits = match_keywords(scene_context)
+    time_of_day = extract_time_of_day(scene_context, hits=hits)
+    return SceneFeatures(
+        setting=extract_setting(scene_context, hits=hits),
+        time_of_day=time_of_day,
+        mood=extract_mood(scene_context, time_of_day, hits=hits),
+        characters=tuple(extract_characters(scene_context, hits=hits))
+    )
+
+
 def extract_key_words(text: str, scene_context: str = None, max_words: int = 4) -> str:
     """
     Extract key visual words from scene for filename generation.
@@ -258,11 +320,12 @@ def extract_key_words(text: str, scene_context: str = None, max_words: int = 4)
     # Get setting from scene context if provided, otherwise from text
     # Use scene_context for setting to ensure consistency across sentences in the scene
     context_text = scene_context if scene_context else text
-    setting = extract_setting(context_text)
+    setting = get_scene_features(context_text).setting
 
-    # Get characters and action from the specific sentence text
-    characters = extract_characters(text)
-    action = extract_action(text)
+    # Get characters and action from the specific sentence text (single scan)
+    sentence_hits = match_keywords(text)
+    characters = extract_characters(text, hits=sentence_hits)
+    action = extract_action(text, hits=sentence_hits)
 
     # Build key words list
     key_words = []
@@ -302,12 +365,14 @@ def generate_prompt(scene_content: str, scene_context: str = None) -> str:
     # Extract visual elements
     # Use scene_context for setting/environment to ensure consistency across sentences
     # Use scene_content for characters/action to focus on the specific sentence
-    characters = extract_characters(scene_content)
+    sentence_hits = match_keywords(scene_content)
     context_text = scene_context if scene_context else scene_content
-    setting = extract_setting(context_text)
-    time_of_day = extract_time_of_day(context_text)
-    mood = extract_mood(context_text, time_of_day)
-    action = extract_action(scene_content)
+    scene_features = get_scene_features(context_text)
+
+    characters = extract_characters(scene_content, hits=sentence_hits)
+    setting = scene_features.setting
+    mood = scene_features.mood
+    action = extract_action(scene_content, hits=sentence_hits)
 
     # Build natural language description
     prompt_parts = []
@@ -366,7 +431,8 @@ def count_tokens(prompt: str) -> int:
         )
 
         # Tokenize the prompt
-        tokens = tokenizer(prompt, truncation=False, add_special_tokens=True)
+        with span("tokenizer"):
+            tokens = tokenizer(prompt, truncation=False, add_special_tokens=True)
         token_count = len(tokens["input_ids"])
 
         return token_count
@@ -457,19 +523,9 @@ def generate_prompt_with_ollama(sentence: str, scene_context: str = None) -> Opt
     # Build LLM prompt
     llm_prompt = _build_llm_prompt(sentence, scene_context)
 
-    # Call Ollama API
+    # Call Ollama API (pooled session, retried with backoff)
     try:
-        response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/generate",
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": llm_prompt,
-                "stream": False
-            },
-            timeout=120
-        )
-        response.raise_for_status()
-        result = response.json()
+        result = ollama_generate(llm_prompt, model=OLLAMA_MODEL, base_url=OLLAMA_BASE_URL)
         generated_prompt = result.get("response", "").strip()
 
         if not generated_prompt:
@@ -501,7 +557,7 @@ def generate_prompt_with_haiku(sentence: str, scene_context: str = None, cost_tr
         Returns (None, 0, 0) if failed
     """
     try:
-        import anthropic
+        import anthropic  # noqa: F401 - client comes from llm_clients
     except ImportError:
         print("  WARNING: anthropic library not available. Install with: pip install anthropic")
         return None, 0, 0
@@ -516,9 +572,9 @@ def generate_prompt_with_haiku(sentence: str, scene_context: str = None, cost_tr
     # Build LLM prompt
     llm_prompt = _build_llm_prompt(sentence, scene_context)
 
-    # Call Claude API
+    # Call Claude API (shared pooled client)
     try:
-        client = anthropic.Anthropic(api_key=api_key)
+        client = get_anthropic_client(api_key=api_key)
         message = client.messages.create(
             model=ANTHROPIC_MODEL,
             max_tokens=ANTHROPIC_MAX_TOKENS,
@@ -548,6 +604,21 @@ def generate_prompt_with_haiku(sentence: str, scene_context: str = None, cost_tr
         return None, 0, 0
 
 
+# Bump when _build_llm_prompt() changes in a way that should invalidate cached LLM prompts
+LLM_PROMPT_TEMPLATE_VERSION = 1
+
+
+def llm_prompt_template_version() -> str:
+    """
+    Version string of the LLM prompt template used in prompt cache keys.
+
+    Combines LLM_PROMPT_TEMPLATE_VERSION with a hash of the style and character
+    descriptions the template embeds, so editing either invalidates the cache.
+    """
+    embedded = BASE_STYLE + json.dumps(CHARACTER_DESCRIPTIONS, sort_keys=True)
+    return f"v{LLM_PROMPT_TEMPLATE_VERSION}-{hashlib.md5(embedded.encode()).hexdigest()[:8]}"
+
+
 def _build_llm_prompt(sentence: str, scene_context: str = None) -> str:
     """
     Build the prompt to send to the LLM for generating SDXL prompts.
@@ -569,7 +640,7 @@ def _build_llm_prompt(sentence: str, scene_context: str = None) -> str:
     # Get character descriptions for characters in scene
     characters_in_scene = extract_characters(sentence)
     if scene_context:
-        characters_in_scene.extend(extract_characters(scene_context))
+        characters_in_scene.extend(get_scene_features(scene_context).characters)
     characters_in_scene = list(set(characters_in_scene))  # Remove duplicates
 
     char_desc_text = ""
@@ -614,6 +685,10 @@ def generate_prompt_with_llm(sentence: str, scene_context: str = None, method: s
     """
     Generate SDXL prompt using specified LLM method.
 
+    Reads through the LLM prompt cache: a prompt generated before for the
+    same method, model, sentence, scene context and template version is
+    returned without calling the LLM (with zero tokens).
+
     Args:
         sentence: The specific sentence to generate prompt for
         scene_context: Full scene text for continuity
@@ -623,22 +698,44 @@ def generate_prompt_with_llm(sentence: str, scene_context: str = None, method: s
     Returns:
         For haiku: Tuple of (generated_prompt, input_tokens, output_tokens)
         For ollama: Tuple of (generated_prompt, 0, 0)
+        For cache hits: Tuple of (cached_prompt, 0, 0)
         Returns (None, 0, 0) if failed
     """
     if method == "ollama":
-        prompt = generate_prompt_with_ollama(sentence, scene_context)
-        return prompt, 0, 0
+        model = OLLAMA_MODEL
     elif method == "haiku":
-        return generate_prompt_with_haiku(sentence, scene_context, cost_tracker)
+        model = ANTHROPIC_MODEL
     else:
         print(f"  WARNING: Unknown LLM method: {method}")
         return None, 0, 0
 
+    # Read-through cache: unchanged sentence/context/model/template skips the LLM
+    prompt_cache = get_llm_prompt_cache()
+    template_version = llm_prompt_template_version()
+    cache_key = prompt_cache.make_key(method, model, sentence, scene_context, template_version)
+    cached_prompt = prompt_cache.get(method, cache_key)
+    if cached_prompt:
+        print(f"  [PROMPT CACHE HIT] {method}")
+        return cached_prompt, 0, 0
+
+    if method == "ollama":
+        prompt, input_tokens, output_tokens = generate_prompt_with_ollama(sentence, scene_context), 0, 0
+    else:
+        prompt, input_tokens, output_tokens = generate_prompt_with_haiku(sentence, scene_context, cost_tracker)
+
+    prompt_cache.put(method, cache_key, prompt, model, template_version, sentence,
+                     input_tokens=input_tokens, output_tokens=output_tokens)
+    return prompt, input_tokens, output_tokens
+
 
 def generate_prompts_comparison(sentence: str, scene_context: str = None, cost_tracker=None) -> dict:
     """
     Generate prompts using all methods (keyword, ollama, haiku) for comparison.
 
+    The Ollama and Haiku requests run concurrently while the keyword prompt is
+    built, so the wall time is that of the slowest backend. For many
+    sentences, ComparisonPipeline also overlaps consecutive sentences.
+
     Args:
         sentence: The specific sentence to generate prompt for
         scene_context: Full scene text for continuity
@@ -649,26 +746,122 @@ def generate_prompts_comparison(sentence: str, scene_context: str = None, cost_t
         Each prompt value is the generated prompt (or None if failed)
         "tokens" contains dict with "input" and "output" for haiku usage
     """
-    results = {}
-    tokens = {"input": 0, "output": 0}
-
-    # Keyword-based (original method)
-    print("  Generating keyword-based prompt...")
-    results["keyword"] = generate_prompt(sentence, scene_context)
+    print("  Generating keyword, Ollama and Haiku prompts concurrently...")
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="compare") as executor:
+        ollama_future = executor.submit(generate_prompt_with_llm, sentence, scene_context, "ollama")
+        haiku_future = executor.submit(generate_prompt_with_llm, sentence, scene_context, "haiku", cost_tracker)
+        keyword_prompt = generate_prompt(sentence, scene_context)
+
+        return _comparison_results(keyword_prompt, ollama_future.result(), haiku_future.result())
+
+
+def _comparison_results(keyword_prompt: str, ollama_result: tuple, haiku_result: tuple) -> dict:
+    """Assemble the generate_prompts_comparison() result dict."""
+    haiku_prompt, input_tokens, output_tokens = haiku_result
+    return {
+        "keyword": keyword_prompt,
+        "ollama": ollama_result[0],
+        "haiku": haiku_prompt,
+        "tokens": {"input": input_tokens, "output": output_tokens},
+    }
 
-    # Ollama
-    print("  Generating Ollama prompt...")
-    results["ollama"] = generate_prompt_with_ollama(sentence, scene_context)
 
-    # Claude Haiku
-    print("  Generating Haiku prompt...")
-    haiku_prompt, input_tokens, output_tokens = generate_prompt_with_haiku(sentence, scene_context, cost_tracker)
-    results["haiku"] = haiku_prompt
-    tokens["input"] = input_tokens
-    tokens["output"] = output_tokens
+class ComparisonPipeline:
+    """
+    Cross-sentence pipelining for --llm compare runs.
+
+    Ollama and Haiku requests for upcoming sentences are submitted ahead
+    (up to `depth` sentences) to one worker pool per backend, so each backend
+    stays busy while earlier sentences are logged and saved. A chapter then
+    takes about as long as the slowest backend alone. Results are returned
+    in reading order through get().
+
+    Usage:
+        with ComparisonPipeline(sentences, cost_tracker) as pipeline:
+            for sentence in sentences:
+                prompts = pipeline.get(sentence)
+    """
 
-    results["tokens"] = tokens
-    return results
+    def __init__(
+        self,
+        sentences: list,
+        cost_tracker=None,
+        depth: int = COMPARE_PIPELINE_DEPTH,
+        ollama_workers: int = COMPARE_OLLAMA_WORKERS,
+        haiku_workers: int = COMPARE_HAIKU_WORKERS
+    ):
+        """
+        Initialize pipeline (nothing is submitted until the first get()).
+
+        Args:
+            sentences: Sentence objects (content, scene_context) in processing order
+            cost_tracker: Optional CostTracker instance for haiku
+            depth: Sentences kept in flight ahead of the one requested
+            ollama_workers: Concurrent Ollama requests
+            haiku_workers: Concurrent Haiku requests
+        """
+        self.sentences = list(sentences)
+        self.cost_tracker = cost_tracker
+        self.depth = max(1, depth)
+        self.ollama_executor = ThreadPoolExecutor(max_workers=ollama_workers, thread_name_prefix="compare-ollama")
+        self.haiku_executor = ThreadPoolExecutor(max_workers=haiku_workers, thread_name_prefix="compare-haiku")
+        self.index = {self._key(sentence): i for i, sentence in enumerate(self.sentences)}
+        self.futures: Dict[int, tuple] = {}
+        self.next_submit = 0
+
+    @staticmethod
+    def _key(sentence) -> tuple:
+        return (sentence.chapter_num, sentence.scene_num, sentence.sentence_num)
+
+    def _submit_until(self, position: int):
+        """Submit every sentence up to (excluding) position."""
+        while self.next_submit < min(position, len(self.sentences)):
+            sentence = self.sentences[self.next_submit]
+            self.futures[self.next_submit] = (
+                self.ollama_executor.submit(
+                    generate_prompt_with_llm, sentence.content, sentence.scene_context, "ollama"
+                ),
+                self.haiku_executor.submit(
+                    generate_prompt_with_llm, sentence.content, sentence.scene_context, "haiku", self.cost_tracker
+                ),
+            )
+            self.next_submit += 1
+
+    def get(self, sentence) -> dict:
+        """
+        Return the comparison prompts for a sentence (blocks until ready).
+
+        Args:
+            sentence: One of the pipeline's sentences
+
+        Returns:
+            Dict as returned by generate_prompts_comparison()
+        """
+        position = self.index.get(self._key(sentence))
+        if position is None:
+            return generate_prompts_comparison(sentence.content, sentence.scene_context, self.cost_tracker)
+
+        self._submit_until(position + 1 + self.depth)
+        ollama_future, haiku_future = self.futures.pop(position)
+
+        keyword_prompt = generate_prompt(sentence.content, sentence.scene_context)
+        return _comparison_results(keyword_prompt, ollama_future.result(), haiku_future.result())
+
+    def close(self):
+        """Cancel requests that were submitted ahead but never collected."""
+        for ollama_future, haiku_future in self.futures.values():
+            ollama_future.cancel()
+            haiku_future.cancel()
+        self.futures.clear()
+        # Don't block on requests still running (e.g. after Ctrl+C); their results are unused
+        self.ollama_executor.shutdown(wait=False)
+        self.haiku_executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 
 # ============================================================================
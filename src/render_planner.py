@@ -0,0 +1,806 @@
+"""
+Whole-chapter render planning for scene image generation.
+
+Runs storyboard lookup, attribute tracking, prompt building and visual change
+detection over every sentence of a chapter on CPU, before any GPU work. The
+result is a RenderPlan: the unique images a run will render, each with its
+prompt, seed, character reference and the sentences it covers. The GPU stage
+can then render the plan's jobs in any order or batch size.
+
+Chapters whose storyboard analyses are all cached need no API calls, so
+plan_cached_chapters_parallel() can plan them in a process pool.
+"""
+
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from scene_parser import Sentence
+from prompt_generator import (
+    generate_prompt,
+    generate_filename,
+    get_negative_prompt,
+    generate_prompt_with_llm,
+    extract_characters,
+    get_scene_features,
+    generate_storyboard_informed_prompt
+)
+from image_mapping_metadata import ImageMappingMetadata
+from stage_metrics import span, start_run
+
+
+# Map character full names to short names for reference lookup
+CHARACTER_REFERENCE_NAMES = {
+    'emma': 'emma', 'emma chen': 'emma',
+    'tyler': 'tyler', 'tyler chen': 'tyler',
+    'elena': 'elena', 'elena volkov': 'elena',
+    'maxim': 'maxim', 'maxim orlov': 'maxim',
+    'amara': 'amara', 'amara okafor': 'amara',
+    'wei': 'wei', 'wei chen': 'wei'
+}
+
+
+def calculate_seed(sentence: Sentence) -> int:
+    """
+    Deterministic seed based on chapter, scene, and sentence for variety.
+
+    Args:
+        sentence: Sentence the image is generated for
+
+    Returns:
+        Integer seed
+    """
+    return 42 + (sentence.chapter_num * 1000) + (sentence.scene_num * 100) + sentence.sentence_num
+
+
+def prepare_chapter_character_context(storyboard_analyzer, novel_context, sentences: List[Sentence]):
+    """
+    Give the storyboard analyzer the character context for a whole chapter.
+
+    The context lists every known character appearing in the chapter's
+    scenes, so it is identical for all of the chapter's API calls and can be
+    sent as a cacheable prompt prefix.
+
+    Args:
+        storyboard_analyzer: StoryboardAnalyzer instance (or None)
+        novel_context: NovelContext for character descriptions (or None)
+        sentences: Sentences of a single chapter
+    """
+    if not storyboard_analyzer or not novel_context or not sentences:
+        return
+
+    characters = []
+    for scene_context in dict.fromkeys(sentence.scene_context for sentence in sentences):
+        for character in get_scene_features(scene_context).characters:
+            if character not in characters:
+                characters.append(character)
+
+    storyboard_analyzer.set_chapter_character_context(
+        sentences[0].chapter_num,
+        novel_context.get_all_character_contexts(characters)
+    )
+
+
+def sentence_character_context(sentence: Sentence, novel_context=None) -> str:
+    """
+    Character descriptions for the characters named in a sentence.
+
+    Args:
+        sentence: Sentence to analyze
+        novel_context: NovelContext for character descriptions (or None)
+
+    Returns:
+        Character context for the storyboard request ("" without a NovelContext)
+    """
+    if not novel_context:
+        return ""
+    return novel_context.get_all_character_contexts(extract_characters(sentence.content))
+
+
+def analyze_with_storyboard(
+    sentence: Sentence,
+    storyboard_analyzer,
+    novel_context=None,
+    scene_history=None,
+    attribute_manager=None
+):
+    """
+    Run storyboard analysis for a sentence and update continuity state.
+
+    Args:
+        sentence: Sentence to analyze
+        storyboard_analyzer: StoryboardAnalyzer instance
+        novel_context: Optional NovelContext for character descriptions
+        scene_history: Optional SceneVisualHistory for continuity tracking
+        attribute_manager: Optional AttributeStateManager for attribute changes
+
+    Returns:
+        StoryboardAnalysis for the sentence
+    """
+    # Get character context
+    char_context = sentence_character_context(sentence, novel_context)
+
+    # Get scene continuity context
+    scene_continuity = ""
+    if scene_history:
+        scene_continuity = scene_history.get_continuity_context(manager=attribute_manager)
+
+    # Analyze sentence with storyboard
+    with span("storyboard_lookup"):
+        storyboard_analysis = storyboard_analyzer.analyze_sentence(
+            sentence,
+            character_context=char_context,
+            scene_continuity=scene_continuity
+        )
+
+    # Apply attribute changes to manager (if detected)
+    if attribute_manager and storyboard_analysis.attribute_changes:
+        storyboard_analyzer.apply_attribute_changes_to_manager(
+            storyboard_analysis,
+            attribute_manager,
+            sentence.sentence_num
+        )
+
+    # Update scene history with manager
+    if scene_history:
+        scene_history.update_from_storyboard(storyboard_analysis, manager=attribute_manager)
+
+    return storyboard_analysis
+
+
+def group_scene_sentences(sentences: List[Sentence]) -> Dict[Tuple[int, int], List[Sentence]]:
+    """
+    Group sentences by (chapter, scene), preserving reading order.
+
+    Args:
+        sentences: Sentences in reading order
+
+    Returns:
+        Dict of (chapter_num, scene_num) -> sentences of that scene
+    """
+    scenes: Dict[Tuple[int, int], List[Sentence]] = {}
+    for sentence in sentences:
+        scenes.setdefault((sentence.chapter_num, sentence.scene_num), []).append(sentence)
+    return scenes
+
+
+def prefetch_scene_storyboard(
+    scene_sentences: List[Sentence],
+    storyboard_analyzer,
+    novel_context=None,
+    scene_history=None,
+    attribute_manager=None
+):
+    """
+    Analyze a whole scene at once when scene-batch mode is enabled.
+
+    Call at the first sentence of each scene. The analyses are cached and
+    handed out by the following per-sentence analyze_with_storyboard() calls,
+    which still apply attribute changes and update the scene history.
+
+    Args:
+        scene_sentences: Sentences of one scene, in reading order
+        storyboard_analyzer: StoryboardAnalyzer instance (or None)
+        novel_context: Optional NovelContext for character descriptions
+        scene_history: Optional SceneVisualHistory for continuity tracking
+        attribute_manager: Optional AttributeStateManager for attribute changes
+    """
+    if not storyboard_analyzer or not storyboard_analyzer.scene_batch or not scene_sentences:
+        return
+
+    char_context = ""
+    if novel_context:
+        characters = []
+        for sentence in scene_sentences:
+            for character in extract_characters(sentence.content):
+                if character not in characters:
+                    characters.append(character)
+        char_context = novel_context.get_all_character_contexts(characters)
+
+    scene_continuity = ""
+    if scene_history:
+        scene_continuity = scene_history.get_continuity_context(manager=attribute_manager)
+
+    with span("storyboard_scene", sentences=len(scene_sentences)):
+        storyboard_analyzer.analyze_scene(
+            scene_sentences,
+            character_context=char_context,
+            scene_continuity=scene_continuity
+        )
+
+
+def decide_image_reuse(
+    detector,
+    sentence: Sentence,
+    storyboard_analysis=None,
+    current_image_filename: str = None
+) -> Tuple[bool, str]:
+    """
+    Decide whether a sentence needs a new image or can reuse the current one.
+
+    Updates the detector's state when a new image is needed.
+
+    Args:
+        detector: VisualChangeDetector or EmbeddingChangeDetector (None disables reuse)
+        sentence: Sentence being processed
+        storyboard_analysis: Optional StoryboardAnalysis for enhanced detection
+        current_image_filename: Image currently on screen (None at chapter start)
+
+    Returns:
+        Tuple of (needs_new_image: bool, reason: str)
+    """
+    if not detector or not current_image_filename:
+        return (True, "generation_mode")
+
+    if storyboard_analysis:
+        # Use storyboard-enhanced detection
+        needs_new_image, reason = detector.analyze_with_storyboard(sentence, storyboard_analysis)
+        if needs_new_image:
+            detector.update_storyboard_state(storyboard_analysis)
+    else:
+        # Analyze visual state (non-storyboard mode)
+        visual_state = detector.analyze_sentence(sentence)
+        needs_new_image, reason = detector.needs_new_image(visual_state)
+        if needs_new_image:
+            detector.update_state(visual_state)
+
+    return (needs_new_image, reason)
+
+
+def build_sentence_prompt(
+    sentence: Sentence,
+    llm_method: str = "keyword",
+    storyboard_analysis=None,
+    attribute_manager=None,
+    cost_tracker=None,
+    log: Callable[[str], None] = print
+) -> str:
+    """
+    Build the SDXL prompt for a sentence with the configured method.
+
+    Storyboard analysis takes precedence, then LLM (ollama/haiku) with keyword
+    fallback, then keyword-based generation.
+
+    Args:
+        sentence: Sentence to build a prompt for
+        llm_method: "keyword", "ollama" or "haiku"
+        storyboard_analysis: Optional StoryboardAnalysis
+        attribute_manager: Optional AttributeStateManager for current attributes
+        cost_tracker: Optional CostTracker for haiku usage
+        log: Callable used to report mode and fallbacks
+
+    Returns:
+        Prompt string
+    """
+    with span("prompt_build", method="storyboard" if storyboard_analysis else llm_method):
+        if storyboard_analysis:
+            # Use storyboard-informed prompt generation
+            log("Mode: STORYBOARD")
+            return generate_storyboard_informed_prompt(
+                sentence.content,
+                storyboard_analysis,
+                scene_context=sentence.scene_context,
+                attribute_manager=attribute_manager
+            )
+
+        if llm_method in ["ollama", "haiku"]:
+            log(f"Mode: LLM ({llm_method})")
+            prompt, input_tokens, output_tokens = generate_prompt_with_llm(
+                sentence.content,
+                scene_context=sentence.scene_context,
+                method=llm_method,
+                cost_tracker=cost_tracker
+            )
+            if not prompt:
+                log(f"Failed to generate prompt with {llm_method}, falling back to keyword method")
+                return generate_prompt(sentence.content, scene_context=sentence.scene_context)
+            if llm_method == "haiku" and input_tokens > 0:
+                log(f"Tokens: {input_tokens} in / {output_tokens} out")
+            return prompt
+
+        # Default: keyword-based
+        log("Mode: KEYWORD")
+        return generate_prompt(sentence.content, scene_context=sentence.scene_context)
+
+
+def refresh_job_prompt(job: "RenderJob", sentence: Sentence, storyboard_analysis,
+                       log: Callable[[str], None] = print):
+    """
+    Rebuild a job's prompt from an analysis recovered after the plan was made.
+
+    Used for jobs planned from a placeholder analysis whose storyboard call
+    succeeded on a background retry. The attribute state at plan time is not
+    kept, so the prompt uses canonical character attributes.
+
+    Args:
+        job: RenderJob with storyboard_failed set
+        sentence: Sentence that first shows the job's image
+        storyboard_analysis: Recovered StoryboardAnalysis
+        log: Callable used for progress messages
+    """
+    job.prompt = build_sentence_prompt(sentence, storyboard_analysis=storyboard_analysis, log=log)
+    job.character_name = select_character_reference(sentence, storyboard_analysis)
+    job.storyboard_failed = False
+
+
+def select_character_reference(sentence: Sentence, storyboard_analysis=None) -> Optional[str]:
+    """
+    Pick the character whose reference images should guide IP-Adapter.
+
+    Storyboard characters are preferred (acting over referenced), falling back
+    to names found in the sentence text.
+
+    Args:
+        sentence: Sentence being illustrated
+        storyboard_analysis: Optional StoryboardAnalysis
+
+    Returns:
+        Short character name (e.g., "emma"), or None if no known character
+    """
+    character_name = None
+
+    # Try storyboard analysis first (more reliable than keyword extraction)
+    if storyboard_analysis and storyboard_analysis.characters_present:
+        characters = []
+        for char in storyboard_analysis.characters_present:
+            char_lower = char.lower()
+            if char_lower in CHARACTER_REFERENCE_NAMES:
+                characters.append(CHARACTER_REFERENCE_NAMES[char_lower])
+
+        # Prioritize "acting" characters over "referenced" ones
+        if characters and storyboard_analysis.character_roles:
+            acting_chars = [
+                char for char in characters
+                if any(
+                    role in ['acting', 'acting/speaking', 'acting/listening']
+                    for name, role in storyboard_analysis.character_roles.items()
+                    if name.lower() in CHARACTER_REFERENCE_NAMES and CHARACTER_REFERENCE_NAMES[name.lower()] == char
+                )
+            ]
+            character_name = acting_chars[0] if acting_chars else characters[0]
+        elif characters:
+            character_name = characters[0]
+
+    # Fallback: Extract characters from sentence text (original method)
+    if not character_name:
+        for char in extract_characters(sentence.content):
+            if char in CHARACTER_REFERENCE_NAMES:
+                character_name = CHARACTER_REFERENCE_NAMES[char]
+                break
+
+    return character_name
+
+
+@dataclass
+class RenderJob:
+    """A single unique image to render, and the sentences that display it."""
+    image_filename: str
+    chapter_num: int
+    scene_num: int
+    sentence_num: int
+    prompt: str
+    negative_prompt: str
+    seed: int
+    character_name: Optional[str]
+    reason: str
+    covers: List[Tuple[int, int]] = field(default_factory=list)  # Contiguous (scene_num, sentence_num) pairs
+    storyboard_failed: bool = False  # Prompt built from a placeholder analysis (API call failed)
+
+    @property
+    def sentence_range(self) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """First and last (scene_num, sentence_num) shown with this image."""
+        return (self.covers[0], self.covers[-1])
+
+
+@dataclass
+class RenderPlan:
+    """All rendering decisions for a chapter, made before any GPU work."""
+    chapter_num: int
+    jobs: List[RenderJob] = field(default_factory=list)
+    mappings: List[Dict] = field(default_factory=list)  # Same shape as ImageMappingMetadata
+    attribute_statistics: Dict = field(default_factory=dict)
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def total_sentences(self) -> int:
+        return len(self.mappings)
+
+    def pending_jobs(self, output_dir: str) -> List[RenderJob]:
+        """
+        Jobs whose image does not exist yet.
+
+        Args:
+            output_dir: Directory where images are saved
+
+        Returns:
+            List of RenderJob objects still to render
+        """
+        return [
+            job for job in self.jobs
+            if not os.path.exists(os.path.join(output_dir, job.image_filename))
+        ]
+
+    def iter_batches(self, batch_size: int = 1, output_dir: str = None) -> Iterator[List[RenderJob]]:
+        """
+        Yield jobs in batches, grouped by character reference.
+
+        Jobs are independent (prompt and seed are fixed in the plan), so they
+        are ordered to keep consecutive renders on the same character and
+        reuse cached reference embeddings.
+
+        Args:
+            batch_size: Number of jobs per batch
+            output_dir: If given, skip jobs whose image already exists
+
+        Yields:
+            Lists of RenderJob objects
+        """
+        jobs = self.pending_jobs(output_dir) if output_dir else list(self.jobs)
+        jobs.sort(key=lambda job: job.character_name or "")
+        for start in range(0, len(jobs), max(1, batch_size)):
+            yield jobs[start:start + batch_size]
+
+    def to_image_mapping(self) -> ImageMappingMetadata:
+        """Convert the plan's sentence mappings to ImageMappingMetadata."""
+        metadata = ImageMappingMetadata(self.chapter_num)
+        for mapping in self.mappings:
+            metadata.add_mapping(**mapping)
+        return metadata
+
+    def save(self, output_dir: str) -> str:
+        """
+        Save plan to JSON.
+
+        Args:
+            output_dir: Directory to save the plan
+
+        Returns:
+            Path to the saved plan file
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        filepath = os.path.join(output_dir, f"chapter_{self.chapter_num:02d}_render_plan.json")
+
+        data = asdict(self)
+        data['unique_images'] = len(self.jobs)
+        data['total_sentences'] = self.total_sentences
+
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+        return filepath
+
+    @classmethod
+    def load(cls, chapter_num: int, input_dir: str) -> Optional["RenderPlan"]:
+        """
+        Load a saved plan.
+
+        Args:
+            chapter_num: Chapter number
+            input_dir: Directory containing plan files
+
+        Returns:
+            RenderPlan, or None if no plan exists or it is unreadable
+        """
+        filepath = os.path.join(input_dir, f"chapter_{chapter_num:02d}_render_plan.json")
+        if not os.path.exists(filepath):
+            return None
+
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            jobs = []
+            for job_data in data['jobs']:
+                job_data['covers'] = [tuple(pair) for pair in job_data.get('covers', [])]
+                jobs.append(RenderJob(**job_data))
+
+            return cls(
+                chapter_num=data['chapter_num'],
+                jobs=jobs,
+                mappings=data.get('mappings', []),
+                attribute_statistics=data.get('attribute_statistics', {}),
+                created_at=data.get('created_at', "")
+            )
+
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"  WARNING: Error loading render plan from {filepath}: {e}")
+            return None
+
+    def print_summary(self):
+        """Print human-readable plan summary."""
+        total = self.total_sentences
+        unique = len(self.jobs)
+        reduction = ((total - unique) / total * 100) if total > 0 else 0
+
+        print(f"\nRender Plan for Chapter {self.chapter_num}:")
+        print("=" * 80)
+        print(f"Total sentences:      {total}")
+        print(f"Unique images:        {unique}")
+        print(f"Reduction:            {reduction:.1f}%")
+        with_refs = sum(1 for job in self.jobs if job.character_name)
+        print(f"With character ref:   {with_refs}")
+        print("=" * 80)
+
+
+def plan_chapter(
+    sentences: List[Sentence],
+    storyboard_analyzer=None,
+    novel_context=None,
+    enable_smart_detection: bool = False,
+    llm_method: str = "keyword",
+    cost_tracker=None,
+    similarity_index=None,
+    detection_strategy: str = "rules",
+    log: Callable[[str], None] = print
+) -> RenderPlan:
+    """
+    Plan every image for one chapter without touching the GPU.
+
+    Per-chapter state (visual history, attribute manager, change detector)
+    is created here and advanced sentence by sentence exactly as the
+    per-sentence generation loop does, so prompts reflect attribute changes
+    up to the sentence that first shows each image.
+
+    With a similarity index, a sentence that needs a new image first asks the
+    index for an existing image of a similar shot (this or earlier chapters)
+    and shows that instead of planning a render. The chapter's previous
+    entries are dropped from the index first, and every planned render is
+    added to it.
+
+    Args:
+        sentences: Sentences of a single chapter, in reading order
+        storyboard_analyzer: Optional StoryboardAnalyzer (cache-first lookups)
+        novel_context: Optional NovelContext for character descriptions
+        enable_smart_detection: Reuse images when the visual state is unchanged
+        llm_method: "keyword", "ollama" or "haiku" (used without storyboard)
+        cost_tracker: Optional CostTracker for haiku usage
+        similarity_index: Optional ImageSimilarityIndex for reuse across sentences and chapters
+        detection_strategy: Smart detection strategy, "rules" or "embedding"
+        log: Callable used for progress messages
+
+    Returns:
+        RenderPlan for the chapter
+    """
+    from visual_change_detector import create_change_detector
+    from attribute_state_manager import AttributeStateManager
+
+    if not sentences:
+        raise ValueError("Cannot plan a chapter with no sentences")
+
+    chapter_num = sentences[0].chapter_num
+    plan = RenderPlan(chapter_num=chapter_num)
+
+    detector = create_change_detector(sentences, detection_strategy) if enable_smart_detection else None
+    attribute_manager = AttributeStateManager(chapter_num)
+    scene_history = None
+    if storyboard_analyzer:
+        from storyboard_analyzer import SceneVisualHistory, is_placeholder_analysis
+        scene_history = SceneVisualHistory()
+        prepare_chapter_character_context(storyboard_analyzer, novel_context, sentences)
+    if similarity_index is not None:
+        similarity_index.drop_chapter(chapter_num)
+
+    negative_prompt = get_negative_prompt()
+    current_job: Optional[RenderJob] = None  # Job of the image on screen (None if a reused image is shown)
+    current_image: Optional[str] = None
+    scenes = group_scene_sentences(sentences)
+    previous_scene = None
+
+    for sentence in sentences:
+        storyboard_analysis = None
+        if storyboard_analyzer:
+            if sentence.scene_num != previous_scene:
+                prefetch_scene_storyboard(
+                    scenes[(sentence.chapter_num, sentence.scene_num)],
+                    storyboard_analyzer,
+                    novel_context=novel_context,
+                    scene_history=scene_history,
+                    attribute_manager=attribute_manager
+                )
+                previous_scene = sentence.scene_num
+            storyboard_analysis = analyze_with_storyboard(
+                sentence,
+                storyboard_analyzer,
+                novel_context=novel_context,
+                scene_history=scene_history,
+                attribute_manager=attribute_manager
+            )
+
+        needs_new_image, reason = decide_image_reuse(
+            detector,
+            sentence,
+            storyboard_analysis,
+            current_image
+        )
+
+        audio_filename = generate_filename(
+            sentence.chapter_num,
+            sentence.scene_num,
+            sentence.content,
+            sentence.sentence_num,
+            scene_context=sentence.scene_context
+        )
+
+        similarity_score = None
+        if needs_new_image and similarity_index is not None:
+            vector, cast = similarity_index.describe(sentence, storyboard_analysis)
+            match = None
+            if storyboard_analysis is None or not is_placeholder_analysis(storyboard_analysis):
+                match = similarity_index.propose(vector, cast, exclude=current_image)
+            if match:
+                current_image, similarity_score = match
+                # Reuse is recorded in the mappings only, so each job covers one contiguous run
+                current_job = None
+                reason = "similar_image"
+                needs_new_image = False
+                log(f"Reusing similar image {current_image} (similarity {similarity_score:.3f})")
+
+        if needs_new_image:
+            prompt = build_sentence_prompt(
+                sentence,
+                llm_method=llm_method,
+                storyboard_analysis=storyboard_analysis,
+                attribute_manager=attribute_manager,
+                cost_tracker=cost_tracker,
+                log=log
+            )
+            current_job = RenderJob(
+                image_filename=audio_filename,
+                chapter_num=sentence.chapter_num,
+                scene_num=sentence.scene_num,
+                sentence_num=sentence.sentence_num,
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                seed=calculate_seed(sentence),
+                character_name=select_character_reference(sentence, storyboard_analysis),
+                reason=reason,
+                storyboard_failed=storyboard_analysis is not None and is_placeholder_analysis(storyboard_analysis)
+            )
+            plan.jobs.append(current_job)
+            current_image = current_job.image_filename
+            if similarity_index is not None and not current_job.storyboard_failed:
+                similarity_index.add(current_image, vector, cast, chapter_num)
+
+        if current_job:
+            current_job.covers.append((sentence.scene_num, sentence.sentence_num))
+        mapping = {
+            'audio_file': audio_filename.replace('.png', '.wav'),
+            'image_file': current_image,
+            'sentence_num': sentence.sentence_num,
+            'scene_num': sentence.scene_num,
+            'reason': reason
+        }
+        if similarity_score is not None:
+            mapping['similarity_score'] = similarity_score
+        plan.mappings.append(mapping)
+
+    plan.attribute_statistics = attribute_manager.get_statistics()
+    log(f"-> Planned Chapter {chapter_num}: {len(plan.jobs)} images for {plan.total_sentences} sentences")
+
+    return plan
+
+
+@dataclass
+class ChapterPlanResult:
+    """A chapter planned in a worker process, with everything it would have logged."""
+    plan: RenderPlan
+    log_messages: List[str]  # Messages passed to the log callable, in order
+    output: str  # Captured stdout (storyboard cache hits etc.)
+    storyboard_stats: Dict  # StoryboardAnalyzer.stats of the worker's analyzer
+    spans: List[Dict]  # Stage metrics spans recorded in the worker
+
+
+def _plan_cached_chapter(
+    sentences: List[Sentence],
+    storyboard_cache_dir: str,
+    images_dir: str,
+    enable_smart_detection: bool,
+    detection_strategy: str
+) -> Optional[ChapterPlanResult]:
+    """
+    Worker: plan one chapter if every storyboard analysis is cached.
+
+    Cache entries are checked first (by their content-addressed files, then
+    loaded to rule out stale placeholders), so the worker never calls the
+    API and never writes the shared cache index or negative cache.
+
+    Returns:
+        ChapterPlanResult, or None if the chapter needs API calls
+    """
+    from storyboard_analyzer import StoryboardAnalyzer
+    from novel_context import NovelContext
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        storyboard_analyzer = StoryboardAnalyzer(cache_dir=storyboard_cache_dir, images_dir=images_dir,
+                                                 scene_batch=False)
+        for sentence in sentences:
+            cache_key = storyboard_analyzer._generate_cache_key(sentence)
+            if not storyboard_analyzer._get_cache_filepath(sentence.chapter_num, cache_key).exists():
+                return None
+            if storyboard_analyzer.get_cached_analysis(cache_key, sentence.chapter_num) is None:
+                return None
+        storyboard_analyzer.stats["cache_hits"] = 0
+
+        metrics = start_run(f"plan_chapter_{sentences[0].chapter_num:02d}")
+        log_messages: List[str] = []
+        plan = plan_chapter(
+            sentences,
+            storyboard_analyzer=storyboard_analyzer,
+            novel_context=NovelContext(),
+            enable_smart_detection=enable_smart_detection,
+            detection_strategy=detection_strategy,
+            log=log_messages.append
+        )
+
+    return ChapterPlanResult(plan, log_messages, output.getvalue(), dict(storyboard_analyzer.stats), metrics.spans)
+
+
+def plan_cached_chapters_parallel(
+    sentences_by_chapter: Dict[int, List[Sentence]],
+    workers: int,
+    storyboard_cache_dir: str,
+    images_dir: str,
+    enable_smart_detection: bool = False,
+    detection_strategy: str = "rules"
+) -> Dict[int, Optional[ChapterPlanResult]]:
+    """
+    Plan fully storyboard-cached chapters in a process pool.
+
+    Each worker builds its own StoryboardAnalyzer, NovelContext and, inside
+    plan_chapter(), the chapter's AttributeStateManager and
+    SceneVisualHistory, so no state is shared between chapters. Results
+    come back keyed by chapter in input order; the caller merges logs,
+    metadata and statistics in that order, so the outcome does not depend
+    on which worker finished first.
+
+    Args:
+        sentences_by_chapter: Chapter number -> sentences in reading order
+        workers: Number of worker processes
+        storyboard_cache_dir: Storyboard cache directory
+        images_dir: Directory where generated images are stored
+        enable_smart_detection: Reuse images when the visual state is unchanged
+        detection_strategy: Smart detection strategy, "rules" or "embedding"
+
+    Returns:
+        Dict of chapter number -> ChapterPlanResult, or None for chapters that
+        need storyboard API calls (plan those in the parent process)
+    """
+    chapters = list(sentences_by_chapter)
+    # Spawn, not fork: the parent runs the storyboard retry thread and HTTP client pools
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(chapters)), mp_context=context) as executor:
+        futures = [
+            executor.submit(_plan_cached_chapter, sentences_by_chapter[chapter_num], storyboard_cache_dir,
+                            images_dir, enable_smart_detection, detection_strategy)
+            for chapter_num in chapters
+        ]
+        return {chapter_num: future.result() for chapter_num, future in zip(chapters, futures)}
+
+
+def main():
+    """Plan chapter 1 with keyword prompts and smart detection (no API, no GPU)."""
+    from scene_parser import parse_all_chapters, parse_scene_sentences
+
+    scenes = parse_all_chapters(chapter_numbers=[1])
+    sentences = [s for scene in scenes for s in parse_scene_sentences(scene)]
+
+    plan = plan_chapter(sentences, enable_smart_detection=True)
+    plan.print_summary()
+
+    for job in plan.jobs[:5]:
+        first, last = job.sentence_range
+        print(f"\n{job.image_filename}")
+        print(f"  Sentences: sc{first[0]:02d} s{first[1]:03d} -> sc{last[0]:02d} s{last[1]:03d} ({len(job.covers)})")
+        print(f"  Seed: {job.seed}  Character: {job.character_name}")
+        print(f"  Prompt: {job.prompt[:100]}...")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ Splits chapters on '* * *' separators and excludes CRAFT NOTES sections.
 import re
 import glob
 from dataclasses import dataclass
-from typing import List
+from typing import Iterator, List, Optional, Pattern, Tuple
 from config import CHAPTER_DIR, CHAPTER_NAMES
 
 
@@ -29,6 +29,15 @@ class Sentence:
     content: str
     word_count: int
     scene_context: str = ""  # Full scene text for context
+    start_offset: int = -1  # Offset of content within scene_context (-1 if unknown)
+    end_offset: int = -1    # End offset (exclusive) of content within scene_context
+
+    @property
+    def span(self) -> Optional[Tuple[int, int]]:
+        """(start, end) offsets of this sentence in scene_context, or None if unknown."""
+        if self.start_offset < 0:
+            return None
+        return (self.start_offset, self.end_offset)
 
 
 def extract_chapter_number(filename: str) -> int:
@@ -95,11 +104,83 @@ def split_scenes(content: str) -> List[str]:
     return scenes
 
 
+# Abbreviations whose trailing period must not end a sentence.
+# Extend this tuple (or pass a custom one to build_sentence_boundary_pattern)
+# to teach the segmenter new abbreviations.
+ABBREVIATIONS = ('Mr.', 'Mrs.', 'Ms.', 'Dr.', 'vs.', 'etc.', 'i.e.', 'e.g.')
+
+
+def build_sentence_boundary_pattern(abbreviations: Tuple[str, ...] = ABBREVIATIONS) -> Pattern:
+    """
+    Compile the sentence boundary regex for a given abbreviation table.
+
+    A boundary is a run of sentence-ending punctuation (.!?) followed by
+    whitespace, unless the punctuation run is the final period of a known
+    abbreviation. Each abbreviation becomes a fixed-width negative lookbehind,
+    so the whole table is checked in the same single regex pass.
+
+    Args:
+        abbreviations: Abbreviations including their final period (e.g., 'Dr.')
+
+    Returns:
+        Compiled regex whose matches are the inter-sentence separators
+    """
+    lookbehinds = "".join(
+        f"(?<!\\b{re.escape(abbr[:-1])})"
+        for abbr in sorted(set(abbreviations), key=len, reverse=True)
+        if abbr.endswith('.')
+    )
+    return re.compile(lookbehinds + r'[.!?]+\s+')
+
+
+SENTENCE_BOUNDARY_PATTERN = build_sentence_boundary_pattern()
+
+
+def iter_sentence_spans(text: str, pattern: Pattern = SENTENCE_BOUNDARY_PATTERN) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) character spans of the sentences in text.
+
+    Single pass over the text: no copies are made, each span indexes directly
+    into the original string with surrounding whitespace excluded, so
+    text[start:end] is the sentence including its closing punctuation.
+
+    Args:
+        text: Text to segment (typically a full scene)
+        pattern: Compiled boundary pattern (see build_sentence_boundary_pattern)
+
+    Yields:
+        Tuple of (start, end) offsets for each non-empty sentence
+    """
+    position = 0
+    for match in pattern.finditer(text):
+        # Separator = punctuation + whitespace; the sentence keeps the punctuation
+        end = match.end() - len(match.group()) + len(match.group().rstrip())
+        span = _strip_span(text, position, end)
+        if span:
+            yield span
+        position = match.end()
+
+    # Remaining text after the last boundary is the final sentence
+    span = _strip_span(text, position, len(text))
+    if span:
+        yield span
+
+
+def _strip_span(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+    """Shrink a span to exclude leading/trailing whitespace, or None if empty."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
 def split_into_sentences(text: str) -> List[str]:
     """
     Split text into sentences at sentence boundaries.
 
     Handles standard punctuation (.!?) and preserves dialogue formatting.
+    Thin wrapper over iter_sentence_spans for callers that need strings.
 
     Args:
         text: Text to split into sentences
@@ -107,43 +188,7 @@ def split_into_sentences(text: str) -> List[str]:
     Returns:
         List of sentences
     """
-    # Replace common abbreviations to avoid false splits
-    text = text.replace('Mr.', 'Mr~')
-    text = text.replace('Mrs.', 'Mrs~')
-    text = text.replace('Ms.', 'Ms~')
-    text = text.replace('Dr.', 'Dr~')
-    text = text.replace('vs.', 'vs~')
-    text = text.replace('etc.', 'etc~')
-    text = text.replace('i.e.', 'i~e~')
-    text = text.replace('e.g.', 'e~g~')
-
-    # Split on sentence boundaries (. ! ?) followed by space and capital letter
-    # This regex captures the punctuation with the sentence
-    sentence_pattern = r'([.!?]+\s+)'
-    parts = re.split(sentence_pattern, text)
-
-    # Reconstruct sentences by pairing text with punctuation
-    sentences = []
-    current_sentence = ""
-
-    for part in parts:
-        current_sentence += part
-        # If this part ends with sentence-ending punctuation followed by whitespace
-        if re.search(r'[.!?]+\s+$', part):
-            # Restore abbreviations
-            sentence = current_sentence.strip()
-            sentence = sentence.replace('~', '.')
-            if sentence:
-                sentences.append(sentence)
-            current_sentence = ""
-
-    # Add any remaining text as the last sentence
-    if current_sentence.strip():
-        sentence = current_sentence.strip()
-        sentence = sentence.replace('~', '.')
-        sentences.append(sentence)
-
-    return [s for s in sentences if s.strip()]
+    return [text[start:end] for start, end in iter_sentence_spans(text)]
 
 
 def parse_scene_sentences(scene: Scene) -> List[Sentence]:
@@ -156,10 +201,9 @@ def parse_scene_sentences(scene: Scene) -> List[Sentence]:
     Returns:
         List of Sentence objects
     """
-    sentence_texts = split_into_sentences(scene.content)
-
     sentences = []
-    for i, sentence_text in enumerate(sentence_texts, start=1):
+    for i, (start, end) in enumerate(iter_sentence_spans(scene.content), start=1):
+        sentence_text = scene.content[start:end]
         word_count = len(sentence_text.split())
         sentence = Sentence(
             chapter_num=scene.chapter_num,
@@ -167,7 +211,9 @@ def parse_scene_sentences(scene: Scene) -> List[Sentence]:
             sentence_num=i,
             content=sentence_text,
             word_count=word_count,
-            scene_context=scene.content  # Include full scene for context
+            scene_context=scene.content,  # Shared reference to the full scene, not a copy
+            start_offset=start,
+            end_offset=end
         )
         sentences.append(sentence)
 
@@ -0,0 +1,339 @@
+"""
+Per-stage timing and resource instrumentation for the generation scripts.
+
+Stages (storyboard lookup, prompt build, diffusion, TTS inference, FFmpeg
+subprocesses, ...) are wrapped in spans. Each span records wall time, CPU
+time (including waited-for child processes such as FFmpeg), the process
+peak RSS at the end of the span and, when PyTorch with CUDA is already in
+use, the peak CUDA memory of the span.
+
+The RSS figure is ru_maxrss: the high-water mark of the whole process so
+far, not of the span. It only shows which stage first pushed the process to
+a new peak; CUDA peaks are per span.
+
+A generation script starts a run, library code opens spans with span(),
+and finish_run() writes a per-run metrics file and prints p50/p95 summaries.
+When no run is active, span() does nothing, so instrumented library code
+behaves exactly as before when used on its own.
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows - peak RSS not available
+    resource = None
+
+from config import METRICS_DIR
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process plus any waited-for child processes."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _process_peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process since it started, in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _cuda():
+    """
+    Return torch.cuda if CUDA is already initialized, else None.
+
+    Never imports torch itself, so CPU-only scripts stay lightweight.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available() or not torch.cuda.is_initialized():
+        return None
+    return torch.cuda
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Linear-interpolated percentile of a list of values.
+
+    Args:
+        values: Sample values (need not be sorted)
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        Percentile value (0.0 for an empty list)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class StageMetrics:
+    """Collects spans for one run of a generation script."""
+
+    def __init__(self, run_name: str):
+        """
+        Initialize metrics collector.
+
+        Args:
+            run_name: Name identifying this run (used in the metrics filename)
+        """
+        self.run_name = run_name
+        self.started_at = datetime.now()
+        self.spans: List[Dict] = []
+        # Running CUDA peaks of currently open spans (innermost last)
+        self._cuda_peaks: List[int] = []
+
+    @contextmanager
+    def span(self, stage: str, **attributes) -> Iterator[Dict]:
+        """
+        Time a stage and record its resource usage.
+
+        Args:
+            stage: Stage name, e.g. "diffusion" or "ffmpeg_segment"
+            **attributes: Extra JSON-serializable values stored with the span
+
+        Yields:
+            The span record, so callers may add attributes while it runs
+        """
+        cuda = _cuda()
+        if cuda is not None:
+            # Nested spans reset the peak counter, so fold the outer peak so far
+            if self._cuda_peaks:
+                self._cuda_peaks[-1] = max(self._cuda_peaks[-1], cuda.max_memory_allocated())
+            cuda.reset_peak_memory_stats()
+        self._cuda_peaks.append(0)
+
+        record = {"stage": stage, "depth": len(self._cuda_peaks) - 1}
+        record.update(attributes)
+
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_seconds()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall_start
+            record["cpu_seconds"] = _cpu_seconds() - cpu_start
+            record["process_peak_rss_mb"] = _process_peak_rss_mb()
+
+            cuda_peak = self._cuda_peaks.pop()
+            cuda = _cuda()
+            if cuda is not None:
+                cuda_peak = max(cuda_peak, cuda.max_memory_allocated())
+                record["peak_cuda_mb"] = cuda_peak / (1024 * 1024)
+                if self._cuda_peaks:
+                    self._cuda_peaks[-1] = max(self._cuda_peaks[-1], cuda_peak)
+
+            self.spans.append(record)
+
+    def summarize(self) -> Dict[str, Dict]:
+        """
+        Aggregate spans per stage.
+
+        Returns:
+            Dict of stage -> count, total/p50/p95 wall seconds, p50/p95 CPU
+            seconds, max process peak RSS and max peak CUDA memory (MB)
+        """
+        by_stage: Dict[str, List[Dict]] = {}
+        for record in self.spans:
+            by_stage.setdefault(record["stage"], []).append(record)
+
+        summary = {}
+        for stage, records in by_stage.items():
+            wall = [r["wall_seconds"] for r in records]
+            cpu = [r["cpu_seconds"] for r in records]
+            rss = [r["process_peak_rss_mb"] for r in records if r.get("process_peak_rss_mb") is not None]
+            cuda = [r["peak_cuda_mb"] for r in records if r.get("peak_cuda_mb") is not None]
+            summary[stage] = {
+                "count": len(records),
+                "total_wall_seconds": sum(wall),
+                "p50_wall_seconds": percentile(wall, 0.50),
+                "p95_wall_seconds": percentile(wall, 0.95),
+                "p50_cpu_seconds": percentile(cpu, 0.50),
+                "p95_cpu_seconds": percentile(cpu, 0.95),
+                "max_process_peak_rss_mb": max(rss) if rss else None,
+                "max_peak_cuda_mb": max(cuda) if cuda else None,
+            }
+        return summary
+
+    def save(self, output_dir: str = METRICS_DIR) -> str:
+        """
+        Write all spans and the per-stage summary to a JSON file.
+
+        Args:
+            output_dir: Directory for metrics files
+
+        Returns:
+            Path to the saved metrics file
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = self.started_at.strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(output_dir, f"{self.run_name}_{timestamp}.json")
+
+        data = {
+            "run_name": self.run_name,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "summary": self.summarize(),
+            "spans": self.spans,
+        }
+
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=2)
+
+        return filepath
+
+    def print_summary(self):
+        """Print a p50/p95 table per stage."""
+        summary = self.summarize()
+
+        print("\n" + "=" * 80)
+        print(f"Stage Metrics: {self.run_name}")
+        print("=" * 80)
+
+        if not summary:
+            print("No spans recorded")
+            print("=" * 80)
+            return
+
+        print(f"{'Stage':24s} {'Count':>6s} {'Total s':>9s} {'p50 s':>8s} {'p95 s':>8s} "
+              f"{'p95 CPU':>8s} {'ProcRSS':>8s} {'CUDA MB':>8s}")
+        print("-" * 80)
+        for stage, stats in sorted(summary.items(), key=lambda item: -item[1]["total_wall_seconds"]):
+            rss = f"{stats['max_process_peak_rss_mb']:.0f}" if stats["max_process_peak_rss_mb"] is not None else "-"
+            cuda = f"{stats['max_peak_cuda_mb']:.0f}" if stats["max_peak_cuda_mb"] is not None else "-"
+            print(f"{stage:24s} {stats['count']:6d} {stats['total_wall_seconds']:9.2f} "
+                  f"{stats['p50_wall_seconds']:8.3f} {stats['p95_wall_seconds']:8.3f} "
+                  f"{stats['p95_cpu_seconds']:8.3f} {rss:>8s} {cuda:>8s}")
+        print("=" * 80)
+
+
+# Metrics for the currently running script (None when not instrumented)
+_active_run: Optional[StageMetrics] = None
+
+
+def start_run(run_name: str) -> StageMetrics:
+    """
+    Start collecting metrics for this process.
+
+    Args:
+        run_name: Name identifying this run (e.g. "images", "audio", "video")
+
+    Returns:
+        The active StageMetrics collector
+    """
+    global _active_run
+    _active_run = StageMetrics(run_name)
+    return _active_run
+
+
+def finish_run(output_dir: str = METRICS_DIR) -> Optional[str]:
+    """
+    Save and print metrics for the active run, then stop collecting.
+
+    Args:
+        output_dir: Directory for metrics files
+
+    Returns:
+        Path to the saved metrics file, or None if no run was active
+    """
+    global _active_run
+    if _active_run is None:
+        return None
+
+    metrics = _active_run
+    _active_run = None
+
+    filepath = metrics.save(output_dir)
+    metrics.print_summary()
+    print(f"Metrics saved to: {filepath}")
+    return filepath
+
+
+def record_spans(spans: List[Dict]):
+    """
+    Add spans recorded in another process (e.g. a planning worker) to the active run.
+
+    Args:
+        spans: Span records from that process's StageMetrics
+    """
+    if _active_run is not None:
+        _active_run.spans.extend(spans)
+
+
+@contextmanager
+def span(stage: str, **attributes) -> Iterator[Optional[Dict]]:
+    """
+    Record a span on the active run (no-op when no run is active).
+
+    Args:
+        stage: Stage name
+        **attributes: Extra JSON-serializable values stored with the span
+
+    Yields:
+        The span record, or None when not instrumented
+    """
+    if _active_run is None:
+        yield None
+        return
+
+    with _active_run.span(stage, **attributes) as record:
+        yield record
+
+
+def instrument_method(obj, method_name: str, stage: str):
+    """
+    Wrap a bound method of an object so every call is recorded as a span.
+
+    Used for stages that run inside third-party code, e.g. the VAE decode
+    and prompt encoding steps called from within a diffusers pipeline.
+
+    Args:
+        obj: Object whose method should be wrapped (instance attribute is set)
+        method_name: Name of the method to wrap
+        stage: Stage name for the recorded spans
+    """
+    original = getattr(obj, method_name)
+
+    @wraps(original)
+    def wrapper(*args, **kwargs):
+        with span(stage):
+            return original(*args, **kwargs)
+
+    setattr(obj, method_name, wrapper)
+
+
+def main():
+    """Test stage metrics with synthetic stages."""
+    start_run("stage_metrics_test")
+
+    for i in range(20):
+        with span("prompt_build", index=i):
+            sum(x * x for x in range(20000))
+        with span("sleep"):
+            time.sleep(0.01)
+
+    with span("outer"):
+        with span("inner"):
+            sum(range(100000))
+
+    finish_run(output_dir=os.path.join(METRICS_DIR, "test"))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,40 @@ Storyboard analysis engine for visual scene planning.
 Uses Claude Haiku API to analyze sentences for detailed visual composition,
 camera angles, character expressions, and mood. Implements aggressive caching
 to minimize API costs.
+
+Cache keys are content-addressed: a hash of the sentence text plus a hash of
+its context (chapter and preceding sentence). Inserting or deleting a
+sentence therefore only invalidates the sentence right after the edit;
+scene and sentence numbers are kept as metadata in the cache index.
 """
 
+import bisect
 import hashlib
 import json
 import os
+import re
+import threading
 from dataclasses import dataclass, asdict
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
-from anthropic import Anthropic
-from scene_parser import Sentence
-from config import ANTHROPIC_MODEL, ANTHROPIC_MAX_TOKENS, HAIKU_INPUT_COST_PER_MILLION, HAIKU_OUTPUT_COST_PER_MILLION
+from scene_parser import Sentence, iter_sentence_spans
+from cost_tracker import calculate_cost
+from config import (
+    ANTHROPIC_MODEL,
+    ANTHROPIC_MAX_TOKENS,
+    HAIKU_INPUT_COST_PER_MILLION,
+    HAIKU_OUTPUT_COST_PER_MILLION,
+    HAIKU_CACHE_WRITE_COST_PER_MILLION,
+    HAIKU_CACHE_READ_COST_PER_MILLION,
+    STORYBOARD_PROMPT_CACHING,
+    STORYBOARD_CACHE_MIN_PREFIX_TOKENS,
+    STORYBOARD_SCENE_BATCH,
+    STORYBOARD_SCENE_WINDOW,
+    STORYBOARD_SCENE_MAX_OUTPUT_TOKENS,
+    STORYBOARD_FAILURE_TTL_SECONDS
+)
 
 
 @dataclass
@@ -100,6 +122,74 @@ class StoryboardAnalysis:
             self.api_tokens = {"input": 0, "output": 0}
 
 
+def is_placeholder_analysis(analysis: StoryboardAnalysis) -> bool:
+    """
+    True for the stand-in analysis used when the API call failed.
+
+    Earlier versions cached these placeholders permanently; they are now
+    treated as cache misses.
+    """
+    return (
+        analysis.confidence == 0.0
+        and not analysis.characters_present
+        and not any(analysis.api_tokens.values())
+    )
+
+
+# Position-based keys written before content addressing (see storyboard_cache_migrate)
+LEGACY_CACHE_KEY_PATTERN = re.compile(r"^ch(\d{2})_sc(\d{2})_s(\d{3})_([0-9a-f]{8})$")
+
+
+@lru_cache(maxsize=64)
+def _scene_sentence_spans(scene_text: str) -> Tuple[Tuple[int, int], ...]:
+    """Sentence spans of a scene, computed once per scene text."""
+    return tuple(iter_sentence_spans(scene_text))
+
+
+def previous_sentence_text(sentence: Sentence) -> str:
+    """
+    Text of the sentence before this one in its scene.
+
+    Args:
+        sentence: Sentence with scene_context and offsets
+
+    Returns:
+        Previous sentence text, or "" for the first sentence of a scene
+        (or when the sentence carries no scene context)
+    """
+    if sentence.start_offset < 0 or not sentence.scene_context:
+        return ""
+    spans = _scene_sentence_spans(sentence.scene_context)
+    index = bisect.bisect_left(spans, (sentence.start_offset,))
+    if index == 0:
+        return ""
+    start, end = spans[index - 1]
+    return sentence.scene_context[start:end]
+
+
+def content_cache_key(chapter_num: int, content: str, previous_content: str) -> str:
+    """
+    Build a content-addressed storyboard cache key.
+
+    Args:
+        chapter_num: Chapter of the sentence
+        content: Sentence text
+        previous_content: Text of the preceding sentence in the scene ("" if first)
+
+    Returns:
+        Cache key "<content hash>_<context hash>"
+    """
+    content_hash = hashlib.sha256(content.encode()).hexdigest()[:16]
+    context_hash = hashlib.sha256(f"ch{chapter_num}|{previous_content}".encode()).hexdigest()[:8]
+    return f"{content_hash}_{context_hash}"
+
+
+def legacy_cache_key(chapter_num: int, scene_num: int, sentence_num: int, content: str) -> str:
+    """Position-based cache key used before content addressing."""
+    content_hash = hashlib.md5(content.encode()).hexdigest()[:8]
+    return f"ch{chapter_num:02d}_sc{scene_num:02d}_s{sentence_num:03d}_{content_hash}"
+
+
 class SceneVisualHistory:
     """Tracks visual state across sentences for continuity."""
 
@@ -240,7 +330,12 @@ Respond ONLY with valid JSON matching this structure:
 }"""
 
     def __init__(self, cache_dir: str = "../storyboard_cache", rebuild_cache: bool = False,
-                 images_dir: str = "../images"):
+                 images_dir: str = "../images", client=None,
+                 prompt_caching: bool = STORYBOARD_PROMPT_CACHING, cost_tracker=None,
+                 scene_batch: bool = STORYBOARD_SCENE_BATCH,
+                 failure_ttl: float = STORYBOARD_FAILURE_TTL_SECONDS,
+                 model: str = ANTHROPIC_MODEL,
+                 cache_min_prefix_tokens: int = STORYBOARD_CACHE_MIN_PREFIX_TOKENS):
         """
         Initialize storyboard analyzer.
 
@@ -248,19 +343,52 @@ Respond ONLY with valid JSON matching this structure:
             cache_dir: Directory for caching analysis results
             rebuild_cache: If True, ignore existing cache and force re-analysis
             images_dir: Directory where generated images are stored
+            client: Anthropic-compatible client (default: the shared pooled
+                    client from llm_clients; benchmarks pass a fake client)
+            prompt_caching: Mark the system prompt and chapter character context
+                            as cacheable prompt prefixes
+            cost_tracker: Optional CostTracker to record API usage
+            scene_batch: Analyze whole scenes per API call (see analyze_scene())
+            failure_ttl: Seconds a failed sentence is not retried synchronously
+            model: Anthropic model used for analysis requests
+            cache_min_prefix_tokens: Minimum cacheable prefix length of the model;
+                                     shorter chapter contexts stay per-sentence
         """
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True, parents=True)
         self.rebuild_cache = rebuild_cache
         self.images_dir = Path(images_dir)
 
-        # Initialize Anthropic client
-        self.client = Anthropic()  # Uses ANTHROPIC_API_KEY from environment
+        # Initialize Anthropic client (shared, pooled; uses ANTHROPIC_API_KEY from environment)
+        if client is None:
+            from llm_clients import get_anthropic_client
+            client = get_anthropic_client()
+        self.client = client
+        self.model = model
+        self.prompt_caching = prompt_caching
+        self.cache_min_prefix_tokens = cache_min_prefix_tokens
+        self.cost_tracker = cost_tracker
+
+        # Per-chapter character context sent as a cacheable prefix
+        self.chapter_character_context: Dict[int, str] = {}
+
+        # Scene-level analyses not yet handed out by analyze_sentence()
+        self.scene_batch = scene_batch
+        self.prefetched: Dict[str, StoryboardAnalysis] = {}
 
         # Cache index for quick lookups
         self.index_file = self.cache_dir / "index.json"
         self.cache_index = self._load_cache_index()
 
+        # Negative cache: failed API calls (never cached as analyses)
+        self.failure_ttl = failure_ttl
+        self.failures_file = self.cache_dir / "failures.json"
+        self.failures = self._load_failures()
+        self.retry_queue = None  # Optional StoryboardRetryQueue for background retries
+
+        # Cache writes and stats updates may come from the retry thread as well
+        self._lock = threading.RLock()
+
         # Statistics tracking
         self.stats = {
             "cache_hits": 0,
@@ -268,6 +396,15 @@ Respond ONLY with valid JSON matching this structure:
             "api_calls": 0,
             "total_input_tokens": 0,
             "total_output_tokens": 0,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "batch_requests": 0,
+            "cost_adjustment_usd": 0.0,
+            "scene_calls": 0,
+            "scene_sentences": 0,
+            "scene_fallbacks": 0,
+            "api_failures": 0,
+            "negative_hits": 0,
         }
 
     def _load_cache_index(self) -> Dict:
@@ -284,7 +421,7 @@ Respond ONLY with valid JSON matching this structure:
 
     def _generate_cache_key(self, sentence: Sentence) -> str:
         """
-        Generate cache key from sentence content hash.
+        Generate content-addressed cache key (sentence text + context hash).
 
         Args:
             sentence: Sentence to generate key for
@@ -292,8 +429,7 @@ Respond ONLY with valid JSON matching this structure:
         Returns:
             Cache key string
         """
-        content_hash = hashlib.md5(sentence.content.encode()).hexdigest()[:8]
-        return f"ch{sentence.chapter_num:02d}_sc{sentence.scene_num:02d}_s{sentence.sentence_num:03d}_{content_hash}"
+        return content_cache_key(sentence.chapter_num, sentence.content, previous_sentence_text(sentence))
 
     def _get_cache_filepath(self, chapter_num: int, cache_key: str) -> Path:
         """Get filepath for cached analysis."""
@@ -301,13 +437,64 @@ Respond ONLY with valid JSON matching this structure:
         chapter_dir.mkdir(exist_ok=True)
         return chapter_dir / f"{cache_key}.json"
 
-    def get_cached_analysis(self, cache_key: str, chapter_num: int) -> Optional[StoryboardAnalysis]:
+    @staticmethod
+    def _index_entry(chapter_num: int, scene_num: int, sentence_num: int, cache_file: Path) -> Dict:
+        """Cache index entry: file path plus the position it was analyzed at."""
+        return {
+            "path": str(cache_file),
+            "chapter_num": chapter_num,
+            "scene_num": scene_num,
+            "sentence_num": sentence_num,
+        }
+
+    def _adopt_legacy_entry(self, cache_key: str, sentence: Sentence) -> bool:
+        """
+        Re-key an entry stored under the old position-based key, if present.
+
+        Lets an unmigrated cache keep working: the first lookup of each
+        sentence moves its file to the content-addressed key.
+
+        Args:
+            cache_key: Content-addressed key of the sentence
+            sentence: Sentence being looked up
+
+        Returns:
+            True if a legacy entry was moved to cache_key
+        """
+        legacy_key = legacy_cache_key(sentence.chapter_num, sentence.scene_num,
+                                      sentence.sentence_num, sentence.content)
+        legacy_file = self._get_cache_filepath(sentence.chapter_num, legacy_key)
+        if not legacy_file.exists():
+            return False
+
+        cache_file = self._get_cache_filepath(sentence.chapter_num, cache_key)
+        with self._lock:
+            os.replace(legacy_file, cache_file)
+            self.cache_index.pop(legacy_key, None)
+            self.cache_index[cache_key] = self._index_entry(
+                sentence.chapter_num, sentence.scene_num, sentence.sentence_num, cache_file)
+            self._save_cache_index()
+        return True
+
+    def is_cached(self, cache_key: str, sentence: Sentence) -> bool:
+        """True if an analysis for the sentence exists (under its new or legacy key)."""
+        if self._get_cache_filepath(sentence.chapter_num, cache_key).exists():
+            return True
+        legacy_key = legacy_cache_key(sentence.chapter_num, sentence.scene_num,
+                                      sentence.sentence_num, sentence.content)
+        return self._get_cache_filepath(sentence.chapter_num, legacy_key).exists()
+
+    def get_cached_analysis(self, cache_key: str, chapter_num: int,
+                            sentence: Optional[Sentence] = None) -> Optional[StoryboardAnalysis]:
         """
         Retrieve cached analysis if available.
 
         Args:
             cache_key: Cache key to look up
             chapter_num: Chapter number for file organization
+            sentence: Sentence being looked up; the cached analysis is moved to
+                      its current scene/sentence position, and a legacy
+                      position-based entry is re-keyed on the fly
 
         Returns:
             StoryboardAnalysis if cached, None otherwise
@@ -316,6 +503,8 @@ Respond ONLY with valid JSON matching this structure:
             return None
 
         cache_file = self._get_cache_filepath(chapter_num, cache_key)
+        if sentence is not None and not cache_file.exists():
+            self._adopt_legacy_entry(cache_key, sentence)
 
         if cache_file.exists():
             try:
@@ -326,13 +515,25 @@ Respond ONLY with valid JSON matching this structure:
                 if 'analysis_timestamp' in data and isinstance(data['analysis_timestamp'], str):
                     data['analysis_timestamp'] = datetime.fromisoformat(data['analysis_timestamp'])
 
-                self.stats["cache_hits"] += 1
-                return StoryboardAnalysis(**data)
+                analysis = StoryboardAnalysis(**data)
+                if is_placeholder_analysis(analysis):
+                    # Placeholder cached by an earlier version after a failed call
+                    print(f"  [STALE PLACEHOLDER] {cache_key} - re-analyzing")
+                    self._count("cache_misses")
+                    return None
+
+                if sentence is not None:
+                    # Same text and context at a new position (e.g., after an insert)
+                    analysis.scene_num = sentence.scene_num
+                    analysis.sentence_num = sentence.sentence_num
+
+                self._count("cache_hits")
+                return analysis
             except Exception as e:
                 print(f"Warning: Failed to load cache {cache_file}: {e}")
                 return None
 
-        self.stats["cache_misses"] += 1
+        self._count("cache_misses")
         return None
 
     def save_analysis(self, cache_key: str, analysis: StoryboardAnalysis):
@@ -350,21 +551,104 @@ Respond ONLY with valid JSON matching this structure:
         if isinstance(data.get('analysis_timestamp'), datetime):
             data['analysis_timestamp'] = data['analysis_timestamp'].isoformat()
 
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        with self._lock:
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+
+            # Update index
+            self.cache_index[cache_key] = self._index_entry(
+                analysis.chapter_num, analysis.scene_num, analysis.sentence_num, cache_file)
+            self._save_cache_index()
+
+    def _load_failures(self) -> Dict:
+        """Load negative cache entries from disk."""
+        if self.failures_file.exists():
+            try:
+                with open(self.failures_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Failed to load {self.failures_file}: {e}")
+        return {}
+
+    def _save_failures(self):
+        """Write negative cache entries atomically."""
+        temp_path = self.failures_file.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.failures, f, indent=2)
+        os.replace(temp_path, self.failures_file)
+
+    def record_failure(self, cache_key: str, sentence: Sentence, error: Exception):
+        """
+        Store a negative cache entry for a failed API call.
 
-        # Update index
-        self.cache_index[cache_key] = str(cache_file)
-        self._save_cache_index()
+        Args:
+            cache_key: Cache key of the sentence
+            sentence: Sentence whose analysis failed
+            error: Exception raised by the API call
+        """
+        with self._lock:
+            previous = self.failures.get(cache_key, {})
+            self.failures[cache_key] = {
+                "chapter_num": sentence.chapter_num,
+                "scene_num": sentence.scene_num,
+                "sentence_num": sentence.sentence_num,
+                "error": f"{type(error).__name__}: {str(error)[:200]}",
+                "attempts": previous.get("attempts", 0) + 1,
+                "first_failed_at": previous.get("first_failed_at", datetime.now().isoformat()),
+                "failed_at": datetime.now().isoformat(),
+            }
+            self._save_failures()
+
+    def clear_failure(self, cache_key: str):
+        """Remove a negative cache entry after a successful analysis."""
+        with self._lock:
+            if self.failures.pop(cache_key, None) is not None:
+                self._save_failures()
+
+    def get_fresh_failure(self, cache_key: str) -> Optional[Dict]:
+        """
+        Negative cache entry for a key, if it is younger than the failure TTL.
 
-    def _call_haiku_api(
+        Args:
+            cache_key: Cache key to look up
+
+        Returns:
+            Failure entry, or None if there is none or it has expired
+        """
+        if self.rebuild_cache:
+            return None
+        entry = self.failures.get(cache_key)
+        if entry is None:
+            return None
+        age = (datetime.now() - datetime.fromisoformat(entry["failed_at"])).total_seconds()
+        return entry if age < self.failure_ttl else None
+
+    def set_chapter_character_context(self, chapter_num: int, character_context: str):
+        """
+        Set the character context shared by every sentence of a chapter.
+
+        With prompt caching enabled and a prefix long enough to be cached (see
+        cached_chapter_context()), this block follows the system prompt as a
+        second cacheable prefix and replaces the per-sentence character context,
+        so consecutive calls within a chapter share an identical prefix.
+
+        Args:
+            chapter_num: Chapter number
+            character_context: Descriptions of all characters in the chapter
+        """
+        if character_context:
+            self.chapter_character_context[chapter_num] = character_context
+        else:
+            self.chapter_character_context.pop(chapter_num, None)
+
+    def _build_request(
         self,
         sentence: Sentence,
         character_context: str = "",
         scene_continuity: str = ""
-    ) -> StoryboardAnalysis:
+    ) -> Tuple[object, List[Dict]]:
         """
-        Call Claude Haiku API for storyboard analysis.
+        Build the system prompt and messages for a storyboard request.
 
         Args:
             sentence: Sentence to analyze
@@ -372,8 +656,10 @@ Respond ONLY with valid JSON matching this structure:
             scene_continuity: Visual continuity from previous sentences
 
         Returns:
-            StoryboardAnalysis object
+            Tuple of (system, messages) for messages.create()
         """
+        character_context = self._request_character_context(sentence.chapter_num, character_context)
+
         # Build user prompt
         user_prompt = f"""Analyze this sentence for visual storyboard:
 
@@ -390,102 +676,335 @@ CONTINUITY FROM PREVIOUS:
 
 Provide detailed visual analysis as JSON."""
 
-        try:
-            # Call Haiku API
-            response = self.client.messages.create(
-                model=ANTHROPIC_MODEL,
-                max_tokens=ANTHROPIC_MAX_TOKENS * 2,  # Allow more tokens for storyboard analysis
-                system=self.SYSTEM_PROMPT,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ]
-            )
+        return self._wrap_user_prompt(sentence.chapter_num, user_prompt)
+
+    def cached_chapter_context(self, chapter_num: int) -> str:
+        """
+        Chapter character context sent as a cacheable prefix, if any.
+
+        Only used when prompt caching is on and the system prompt plus the
+        chapter context reach the model's minimum cacheable length; below it
+        nothing would be cached, so requests keep per-sentence context.
+
+        Args:
+            chapter_num: Chapter number
 
-            # Track token usage
-            input_tokens = response.usage.input_tokens
-            output_tokens = response.usage.output_tokens
+        Returns:
+            Chapter context, or "" if requests carry per-sentence context
+        """
+        chapter_context = self.chapter_character_context.get(chapter_num, "")
+        if not self.prompt_caching or not chapter_context:
+            return ""
+        prefix_tokens = (len(self.SYSTEM_PROMPT) + len(chapter_context)) // 4
+        return chapter_context if prefix_tokens >= self.cache_min_prefix_tokens else ""
+
+    def _request_character_context(self, chapter_num: int, character_context: str) -> str:
+        """Character context for the user prompt (a pointer when sent in the cached prefix)."""
+        if self.cached_chapter_context(chapter_num):
+            # Chapter-wide context is sent in the cached prefix instead
+            return "(see chapter character context above)"
+        return character_context
+
+    def _wrap_user_prompt(self, chapter_num: int, user_prompt: str) -> Tuple[object, List[Dict]]:
+        """
+        Combine the system prompt, chapter context and user prompt into a request.
+
+        Args:
+            chapter_num: Chapter whose character context is sent
+            user_prompt: Request-specific user prompt
+
+        Returns:
+            Tuple of (system, messages) for messages.create()
+        """
+        if not self.prompt_caching:
+            return self.SYSTEM_PROMPT, [{"role": "user", "content": user_prompt}]
+
+        # Cacheable prefixes: system prompt, then chapter character context
+        cache_control = {"type": "ephemeral"}
+        system = [{"type": "text", "text": self.SYSTEM_PROMPT, "cache_control": cache_control}]
+
+        content = []
+        chapter_context = self.cached_chapter_context(chapter_num)
+        if chapter_context:
+            content.append({
+                "type": "text",
+                "text": f"CHAPTER CHARACTER CONTEXT (Chapter {chapter_num}):\n{chapter_context}",
+                "cache_control": cache_control
+            })
+        content.append({"type": "text", "text": user_prompt})
+
+        return system, [{"role": "user", "content": content}]
+
+    def _count(self, stat: str, amount: int = 1):
+        """Add to a stats counter (under the lock; the retry thread updates stats too)."""
+        with self._lock:
+            self.stats[stat] += amount
+
+    def _record_usage(self, usage, cost_multiplier: float = 1.0) -> Tuple[int, int]:
+        """
+        Add API usage to stats and the cost tracker.
+
+        Args:
+            usage: Usage object from a messages.create() response
+            cost_multiplier: Price multiplier (STORYBOARD_BATCH_COST_MULTIPLIER for batches)
+
+        Returns:
+            Tuple of (input_tokens, output_tokens); input excludes cached tokens
+        """
+        input_tokens = usage.input_tokens
+        output_tokens = usage.output_tokens
+        # Absent (or None) when the request used no cacheable prefix
+        cache_read_tokens = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write_tokens = getattr(usage, "cache_creation_input_tokens", None) or 0
+
+        # Background retries record usage from the retry thread
+        with self._lock:
             self.stats["api_calls"] += 1
             self.stats["total_input_tokens"] += input_tokens
             self.stats["total_output_tokens"] += output_tokens
+            self.stats["cache_read_input_tokens"] += cache_read_tokens
+            self.stats["cache_creation_input_tokens"] += cache_write_tokens
+
+            if cost_multiplier != 1.0:
+                self.stats["batch_requests"] += 1
+                call_cost = calculate_cost(input_tokens, output_tokens, cache_read_tokens, cache_write_tokens)
+                self.stats["cost_adjustment_usd"] += (cost_multiplier - 1.0) * call_cost
+
+        if self.cost_tracker:
+            self.cost_tracker.add_api_call(
+                input_tokens,
+                output_tokens,
+                cache_read_tokens=cache_read_tokens,
+                cache_write_tokens=cache_write_tokens,
+                cost_multiplier=cost_multiplier,
+                model=self.model
+            )
 
-            # Parse JSON response
-            response_text = response.content[0].text
+        return input_tokens, output_tokens
 
-            # Extract JSON from response (handle markdown code blocks)
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
+    def build_message_params(
+        self,
+        sentence: Sentence,
+        character_context: str = "",
+        scene_continuity: str = ""
+    ) -> Dict:
+        """
+        Build the messages.create() parameters for a sentence.
 
-            analysis_data = json.loads(response_text)
+        Also used as the per-request params of a Message Batches job.
 
-            # Parse attribute changes
-            attribute_changes = []
-            raw_changes = analysis_data.get("attribute_changes", [])
-            for change_data in raw_changes:
-                try:
-                    change = AttributeChange(
-                        character_name=change_data.get("character_name", "").lower(),
-                        attribute_type=change_data.get("attribute_type", ""),
-                        old_state=change_data.get("old_state", ""),
-                        new_state=change_data.get("new_state", ""),
-                        explicit_mention=change_data.get("explicit_mention", ""),
-                        confidence=change_data.get("confidence", 0.0)
-                    )
-                    attribute_changes.append(change)
-                except Exception as e:
-                    print(f"  Warning: Failed to parse attribute change: {e}")
-
-            # Create StoryboardAnalysis object
-            analysis = StoryboardAnalysis(
-                chapter_num=sentence.chapter_num,
-                scene_num=sentence.scene_num,
-                sentence_num=sentence.sentence_num,
-                sentence_content=sentence.content,
-                characters_present=analysis_data.get("characters_present", []),
-                character_roles=analysis_data.get("character_roles", {}),
-                camera_framing=analysis_data.get("camera_framing", "medium shot"),
-                camera_angle=analysis_data.get("camera_angle", "level"),
-                camera_movement=analysis_data.get("camera_movement"),
-                composition=analysis_data.get("composition", ""),
-                visual_focus=analysis_data.get("visual_focus", ""),
-                depth_cues=analysis_data.get("depth_cues", ""),
-                expressions=analysis_data.get("expressions", {}),
-                body_language=analysis_data.get("body_language", {}),
-                movement=analysis_data.get("movement"),
-                props=analysis_data.get("props", []),
-                clothing_state=analysis_data.get("clothing_state"),
-                spatial_context=analysis_data.get("spatial_context", ""),
-                special_techniques=analysis_data.get("special_techniques", []),
-                mood=analysis_data.get("mood", ""),
-                tone=analysis_data.get("tone", ""),
-                lighting_suggestion=analysis_data.get("lighting_suggestion", ""),
-                continuity_from_previous=analysis_data.get("continuity_from_previous"),
-                continuity_to_next=analysis_data.get("continuity_to_next"),
-                confidence=analysis_data.get("confidence", 1.0),
-                attribute_changes=attribute_changes,
-                analysis_timestamp=datetime.now(),
-                api_tokens={"input": input_tokens, "output": output_tokens}
-            )
+        Args:
+            sentence: Sentence to analyze
+            character_context: Character descriptions from Novel Bible
+            scene_continuity: Visual continuity from previous sentences
+
+        Returns:
+            Dict with model, max_tokens, system and messages
+        """
+        system, messages = self._build_request(sentence, character_context, scene_continuity)
+        return {
+            "model": self.model,
+            "max_tokens": ANTHROPIC_MAX_TOKENS * 2,  # Allow more tokens for storyboard analysis
+            "system": system,
+            "messages": messages,
+        }
 
-            return analysis
+    def analysis_from_response(self, sentence: Sentence, response,
+                               cost_multiplier: float = 1.0) -> StoryboardAnalysis:
+        """
+        Record usage and parse a Messages API response into an analysis.
+
+        Args:
+            sentence: Sentence the response belongs to
+            response: Message returned by messages.create() or a batch result
+            cost_multiplier: Price multiplier for usage accounting
+
+        Returns:
+            StoryboardAnalysis object
+
+        Raises:
+            ValueError: If the response text is not valid analysis JSON
+        """
+        # Track token usage
+        input_tokens, output_tokens = self._record_usage(response.usage, cost_multiplier)
+
+        analysis_data = json.loads(self._response_json_text(response))
+        if not isinstance(analysis_data, dict):
+            raise ValueError(f"Expected a JSON object, got {type(analysis_data).__name__}")
+
+        return self._analysis_from_data(
+            sentence, analysis_data, {"input": input_tokens, "output": output_tokens}
+        )
+
+    @staticmethod
+    def _response_json_text(response) -> str:
+        """Extract the JSON text of a response (handles markdown code blocks)."""
+        response_text = response.content[0].text
+
+        if "```json" in response_text:
+            response_text = response_text.split("```json")[1].split("```")[0].strip()
+        elif "```" in response_text:
+            response_text = response_text.split("```")[1].split("```")[0].strip()
+
+        return response_text
+
+    def _analysis_from_data(self, sentence: Sentence, analysis_data: Dict,
+                            api_tokens: Dict[str, int]) -> StoryboardAnalysis:
+        """
+        Build a StoryboardAnalysis from one parsed analysis object.
+
+        Args:
+            sentence: Sentence the analysis belongs to
+            analysis_data: Parsed JSON object matching SYSTEM_PROMPT's structure
+            api_tokens: Tokens attributed to this sentence
+
+        Returns:
+            StoryboardAnalysis object
+        """
+        # Parse attribute changes
+        attribute_changes = []
+        raw_changes = analysis_data.get("attribute_changes", [])
+        for change_data in raw_changes:
+            try:
+                change = AttributeChange(
+                    character_name=change_data.get("character_name", "").lower(),
+                    attribute_type=change_data.get("attribute_type", ""),
+                    old_state=change_data.get("old_state", ""),
+                    new_state=change_data.get("new_state", ""),
+                    explicit_mention=change_data.get("explicit_mention", ""),
+                    confidence=change_data.get("confidence", 0.0)
+                )
+                attribute_changes.append(change)
+            except Exception as e:
+                print(f"  Warning: Failed to parse attribute change: {e}")
+
+        # Create StoryboardAnalysis object
+        analysis = StoryboardAnalysis(
+            chapter_num=sentence.chapter_num,
+            scene_num=sentence.scene_num,
+            sentence_num=sentence.sentence_num,
+            sentence_content=sentence.content,
+            characters_present=analysis_data.get("characters_present", []),
+            character_roles=analysis_data.get("character_roles", {}),
+            camera_framing=analysis_data.get("camera_framing", "medium shot"),
+            camera_angle=analysis_data.get("camera_angle", "level"),
+            camera_movement=analysis_data.get("camera_movement"),
+            composition=analysis_data.get("composition", ""),
+            visual_focus=analysis_data.get("visual_focus", ""),
+            depth_cues=analysis_data.get("depth_cues", ""),
+            expressions=analysis_data.get("expressions", {}),
+            body_language=analysis_data.get("body_language", {}),
+            movement=analysis_data.get("movement"),
+            props=analysis_data.get("props", []),
+            clothing_state=analysis_data.get("clothing_state"),
+            spatial_context=analysis_data.get("spatial_context", ""),
+            special_techniques=analysis_data.get("special_techniques", []),
+            mood=analysis_data.get("mood", ""),
+            tone=analysis_data.get("tone", ""),
+            lighting_suggestion=analysis_data.get("lighting_suggestion", ""),
+            continuity_from_previous=analysis_data.get("continuity_from_previous"),
+            continuity_to_next=analysis_data.get("continuity_to_next"),
+            confidence=analysis_data.get("confidence", 1.0),
+            attribute_changes=attribute_changes,
+            analysis_timestamp=datetime.now(),
+            api_tokens=api_tokens
+        )
 
+        return analysis
+
+    def _fallback_analysis(self, sentence: Sentence) -> StoryboardAnalysis:
+        """Minimal analysis (confidence 0.0) used when the API call fails."""
+        return StoryboardAnalysis(
+            chapter_num=sentence.chapter_num,
+            scene_num=sentence.scene_num,
+            sentence_num=sentence.sentence_num,
+            sentence_content=sentence.content,
+            characters_present=[],
+            character_roles={},
+            camera_framing="medium shot",
+            camera_angle="level",
+            confidence=0.0,
+            analysis_timestamp=datetime.now(),
+            api_tokens={"input": 0, "output": 0}
+        )
+
+    def request_analysis(
+        self,
+        sentence: Sentence,
+        character_context: str = "",
+        scene_continuity: str = ""
+    ) -> StoryboardAnalysis:
+        """
+        Call Claude Haiku API for storyboard analysis, raising on failure.
+
+        Args:
+            sentence: Sentence to analyze
+            character_context: Character descriptions from Novel Bible
+            scene_continuity: Visual continuity from previous sentences
+
+        Returns:
+            StoryboardAnalysis object
+
+        Raises:
+            Exception: API errors and unparseable responses
+        """
+        params = self.build_message_params(sentence, character_context, scene_continuity)
+        response = self.client.messages.create(**params)
+        return self.analysis_from_response(sentence, response)
+
+    def _analyze_uncached(
+        self,
+        cache_key: str,
+        sentence: Sentence,
+        character_context: str = "",
+        scene_continuity: str = ""
+    ) -> StoryboardAnalysis:
+        """
+        Call the API and cache the result; failures become negative entries.
+
+        A failed call returns the placeholder analysis without caching it,
+        records a negative entry and queues the sentence for background retry.
+
+        Returns:
+            StoryboardAnalysis (placeholder on failure)
+        """
+        try:
+            analysis = self.request_analysis(sentence, character_context, scene_continuity)
         except Exception as e:
             print(f"Error calling Haiku API: {e}")
-            # Return minimal analysis on error
-            return StoryboardAnalysis(
-                chapter_num=sentence.chapter_num,
-                scene_num=sentence.scene_num,
-                sentence_num=sentence.sentence_num,
-                sentence_content=sentence.content,
-                characters_present=[],
-                character_roles={},
-                camera_framing="medium shot",
-                camera_angle="level",
-                confidence=0.0,
-                analysis_timestamp=datetime.now(),
-                api_tokens={"input": 0, "output": 0}
-            )
+            self._count("api_failures")
+            self.record_failure(cache_key, sentence, e)
+            if self.retry_queue:
+                self.retry_queue.enqueue(cache_key, sentence, character_context, scene_continuity)
+            return self._fallback_analysis(sentence)
+
+        self.save_analysis(cache_key, analysis)
+        self.clear_failure(cache_key)
+        return analysis
+
+    def _negative_cache_hit(
+        self,
+        cache_key: str,
+        sentence: Sentence,
+        character_context: str = "",
+        scene_continuity: str = ""
+    ) -> Optional[StoryboardAnalysis]:
+        """
+        Placeholder analysis if the sentence failed recently (no API call).
+
+        Returns:
+            Placeholder StoryboardAnalysis, or None if there is no fresh failure
+        """
+        failure = self.get_fresh_failure(cache_key)
+        if failure is None:
+            return None
+
+        print(f"  [NEGATIVE CACHE] Ch{sentence.chapter_num} Sc{sentence.scene_num} S{sentence.sentence_num} "
+              f"(failed {failure['attempts']}x: {failure['error'][:60]})")
+        self._count("negative_hits")
+        if self.retry_queue:
+            self.retry_queue.enqueue(cache_key, sentence, character_context, scene_continuity)
+        return self._fallback_analysis(sentence)
 
     def analyze_sentence(
         self,
@@ -507,20 +1026,239 @@ Provide detailed visual analysis as JSON."""
         # Generate cache key
         cache_key = self._generate_cache_key(sentence)
 
+        # Analyzed moments ago as part of its scene (already saved to cache)
+        prefetched = self.prefetched.pop(cache_key, None)
+        if prefetched:
+            print(f"  [SCENE BATCH] Ch{sentence.chapter_num} Sc{sentence.scene_num} S{sentence.sentence_num}")
+            return prefetched
+
         # Check cache FIRST
-        cached = self.get_cached_analysis(cache_key, sentence.chapter_num)
+        cached = self.get_cached_analysis(cache_key, sentence.chapter_num, sentence)
         if cached:
             print(f"  [CACHE HIT] Ch{sentence.chapter_num} Sc{sentence.scene_num} S{sentence.sentence_num}")
             return cached
 
-        # Cache miss - call API
+        # Failed recently - don't hammer the API, the retry queue will try again
+        placeholder = self._negative_cache_hit(cache_key, sentence, character_context, scene_continuity)
+        if placeholder:
+            return placeholder
+
+        # Cache miss - call API (saved to cache on success)
         print(f"  [API CALL] Ch{sentence.chapter_num} Sc{sentence.scene_num} S{sentence.sentence_num}")
-        analysis = self._call_haiku_api(sentence, character_context, scene_continuity)
+        return self._analyze_uncached(cache_key, sentence, character_context, scene_continuity)
 
-        # Save to cache
-        self.save_analysis(cache_key, analysis)
+    def scene_window_size(self) -> int:
+        """Sentences per scene request (bounded by the output token limit)."""
+        per_sentence_tokens = ANTHROPIC_MAX_TOKENS * 2
+        return max(1, min(STORYBOARD_SCENE_WINDOW, STORYBOARD_SCENE_MAX_OUTPUT_TOKENS // per_sentence_tokens))
 
-        return analysis
+    def build_scene_message_params(
+        self,
+        sentences: List[Sentence],
+        character_context: str = "",
+        scene_continuity: str = ""
+    ) -> Dict:
+        """
+        Build the messages.create() parameters for a window of one scene.
+
+        Uses the same system prompt and chapter context as sentence requests,
+        so both share the cached prompt prefix.
+
+        Args:
+            sentences: Consecutive sentences of one scene
+            character_context: Character descriptions from Novel Bible
+            scene_continuity: Visual continuity from before the first sentence
+
+        Returns:
+            Dict with model, max_tokens, system and messages
+        """
+        first = sentences[0]
+        character_context = self._request_character_context(first.chapter_num, character_context)
+        # One line per sentence (paragraph breaks inside a sentence would split the list)
+        numbered = "\n".join(
+            f'[{sentence.sentence_num}] "{" ".join(sentence.content.split())}"' for sentence in sentences
+        )
+
+        user_prompt = f"""Analyze each numbered sentence of this scene for visual storyboard, in order:
+
+SENTENCES:
+{numbered}
+
+SCENE CONTEXT (for reference):
+{first.scene_context[:500]}...
+
+CHARACTER CONTEXT:
+{character_context}
+
+CONTINUITY FROM PREVIOUS:
+{scene_continuity}
+
+Respond ONLY with a JSON array containing one analysis object per sentence, in the same order.
+Each object must match the structure above plus "sentence_num" (the number in brackets).
+Use continuity_from_previous/continuity_to_next to link consecutive sentences."""
+
+        system, messages = self._wrap_user_prompt(first.chapter_num, user_prompt)
+        return {
+            "model": self.model,
+            "max_tokens": min(ANTHROPIC_MAX_TOKENS * 2 * len(sentences), STORYBOARD_SCENE_MAX_OUTPUT_TOKENS),
+            "system": system,
+            "messages": messages,
+        }
+
+    def analyses_from_scene_response(self, sentences: List[Sentence], response,
+                                     cost_multiplier: float = 1.0) -> Dict[int, StoryboardAnalysis]:
+        """
+        Record usage and split a scene response into per-sentence analyses.
+
+        Objects are matched to sentences by "sentence_num" (or by position
+        when the array has exactly one object per sentence and no numbers).
+        Objects that are not JSON objects, name unknown sentences or repeat
+        a sentence are dropped; callers analyze missing sentences on their own.
+
+        Args:
+            sentences: Sentences sent in the request
+            response: Message returned by messages.create()
+            cost_multiplier: Price multiplier for usage accounting
+
+        Returns:
+            Dict of sentence_num -> StoryboardAnalysis for the valid objects
+
+        Raises:
+            ValueError: If the response is not a JSON array of analyses
+        """
+        input_tokens, output_tokens = self._record_usage(response.usage, cost_multiplier)
+        self._count("scene_calls")
+
+        if getattr(response, "stop_reason", None) == "max_tokens":
+            raise ValueError("Scene response was truncated at max_tokens")
+
+        data = json.loads(self._response_json_text(response))
+        if isinstance(data, dict):
+            # Tolerate {"analyses": [...]} / {"sentences": [...]} wrappers
+            data = data.get("analyses", data.get("sentences"))
+        if not isinstance(data, list):
+            raise ValueError("Expected a JSON array of sentence analyses")
+
+        by_num = {sentence.sentence_num: sentence for sentence in sentences}
+        positional = len(data) == len(sentences) and not any(
+            isinstance(item, dict) and "sentence_num" in item for item in data
+        )
+
+        # Attribute the call's tokens evenly to its sentences
+        share = {
+            "input": input_tokens // len(sentences),
+            "output": output_tokens // len(sentences)
+        }
+
+        analyses = {}
+        for position, item in enumerate(data):
+            if not isinstance(item, dict):
+                continue
+            if positional:
+                sentence = sentences[position]
+            else:
+                try:
+                    sentence = by_num.get(int(item.get("sentence_num")))
+                except (TypeError, ValueError):
+                    sentence = None
+            if sentence is None or sentence.sentence_num in analyses:
+                continue
+            analyses[sentence.sentence_num] = self._analysis_from_data(sentence, item, dict(share))
+
+        return analyses
+
+    def _call_haiku_scene_api(
+        self,
+        sentences: List[Sentence],
+        character_context: str = "",
+        scene_continuity: str = ""
+    ) -> Dict[int, StoryboardAnalysis]:
+        """
+        Call Claude Haiku API for one window of a scene.
+
+        Returns:
+            Dict of sentence_num -> StoryboardAnalysis (empty on failure)
+        """
+        params = self.build_scene_message_params(sentences, character_context, scene_continuity)
+
+        try:
+            response = self.client.messages.create(**params)
+            return self.analyses_from_scene_response(sentences, response)
+
+        except Exception as e:
+            print(f"Error calling Haiku API for scene window: {e}")
+            return {}
+
+    def analyze_scene(
+        self,
+        sentences: List[Sentence],
+        character_context: str = "",
+        scene_continuity: str = ""
+    ) -> List[StoryboardAnalysis]:
+        """
+        Analyze a scene's sentences with one API call per window.
+
+        Cached sentences are skipped. The rest are sent in windows of
+        scene_window_size() sentences; each window gets the continuity of
+        the window before it. Analyses are validated, split into the usual
+        per-sentence cache entries and kept for analyze_sentence(), so the
+        per-sentence loop afterwards makes no further API calls. Sentences
+        missing from a response are analyzed individually.
+
+        Args:
+            sentences: Sentences of one scene, in reading order
+            character_context: Character descriptions from Novel Bible
+            scene_continuity: Visual continuity from before the scene
+
+        Returns:
+            StoryboardAnalysis per sentence, in input order
+        """
+        analyses: Dict[str, StoryboardAnalysis] = {}
+        misses = []
+        for sentence in sentences:
+            cache_key = self._generate_cache_key(sentence)
+            cached = self.get_cached_analysis(cache_key, sentence.chapter_num, sentence)
+            if cached:
+                analyses[cache_key] = cached
+                continue
+
+            placeholder = self._negative_cache_hit(cache_key, sentence, character_context, scene_continuity)
+            if placeholder:
+                analyses[cache_key] = placeholder
+                self.prefetched[cache_key] = placeholder
+                continue
+
+            misses.append((cache_key, sentence))
+
+        window_size = self.scene_window_size()
+        history = SceneVisualHistory()
+        continuity = scene_continuity
+
+        for start in range(0, len(misses), window_size):
+            window = misses[start:start + window_size]
+            window_sentences = [sentence for _, sentence in window]
+            first, last = window_sentences[0], window_sentences[-1]
+            print(f"  [API CALL] Ch{first.chapter_num} Sc{first.scene_num} "
+                  f"S{first.sentence_num}-S{last.sentence_num} (scene batch)")
+
+            results = self._call_haiku_scene_api(window_sentences, character_context, continuity)
+            self._count("scene_sentences", len(results))
+
+            for cache_key, sentence in window:
+                analysis = results.get(sentence.sentence_num)
+                if analysis is None:
+                    self._count("scene_fallbacks")
+                    analysis = self._analyze_uncached(cache_key, sentence, character_context, continuity)
+                else:
+                    self.save_analysis(cache_key, analysis)
+                    self.clear_failure(cache_key)
+
+                self.prefetched[cache_key] = analysis
+                analyses[cache_key] = analysis
+                history.update_from_storyboard(analysis)
+                continuity = history.get_continuity_context()
+
+        return [analyses[self._generate_cache_key(sentence)] for sentence in sentences]
 
     def apply_attribute_changes_to_manager(
         self,
@@ -612,7 +1350,8 @@ Provide detailed visual analysis as JSON."""
 
         # Update cache index to remove deleted entries
         keys_to_remove = []
-        for key, path in self.cache_index.items():
+        for key, entry in self.cache_index.items():
+            path = entry["path"] if isinstance(entry, dict) else entry  # Older indexes stored bare paths
             if chapter_cache_dir in Path(path).parents:
                 keys_to_remove.append(key)
 
@@ -633,7 +1372,9 @@ Provide detailed visual analysis as JSON."""
         """
         input_cost = (self.stats["total_input_tokens"] / 1_000_000) * HAIKU_INPUT_COST_PER_MILLION
         output_cost = (self.stats["total_output_tokens"] / 1_000_000) * HAIKU_OUTPUT_COST_PER_MILLION
-        total_cost = input_cost + output_cost
+        cache_write_cost = (self.stats["cache_creation_input_tokens"] / 1_000_000) * HAIKU_CACHE_WRITE_COST_PER_MILLION
+        cache_read_cost = (self.stats["cache_read_input_tokens"] / 1_000_000) * HAIKU_CACHE_READ_COST_PER_MILLION
+        total_cost = input_cost + output_cost + cache_write_cost + cache_read_cost + self.stats["cost_adjustment_usd"]
 
         report = f"""Storyboard Analysis Cost:
 - Cache hits: {self.stats['cache_hits']}
@@ -641,8 +1382,15 @@ Provide detailed visual analysis as JSON."""
 - API calls: {self.stats['api_calls']}
 - Input tokens: {self.stats['total_input_tokens']:,}
 - Output tokens: {self.stats['total_output_tokens']:,}
+- Cache write tokens: {self.stats['cache_creation_input_tokens']:,}
+- Cache read tokens: {self.stats['cache_read_input_tokens']:,}
 - Input cost: ${input_cost:.4f}
 - Output cost: ${output_cost:.4f}
+- Cache write cost: ${cache_write_cost:.4f}
+- Cache read cost: ${cache_read_cost:.4f}
+- Batch requests: {self.stats['batch_requests']} (discount: ${-self.stats['cost_adjustment_usd']:.4f})
+- Scene calls: {self.stats['scene_calls']} ({self.stats['scene_sentences']} sentences, {self.stats['scene_fallbacks']} fallbacks)
+- Failed calls: {self.stats['api_failures']} (negative cache hits: {self.stats['negative_hits']})
 - Total cost: ${total_cost:.4f}"""
 
         return total_cost, report
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Offline bulk storyboard analysis via the Anthropic Message Batches API.
+
+For full-novel rebuilds, submits every cache-missing sentence of the selected
+chapters as asynchronous batch jobs, polls until they end and ingests the
+results into the storyboard cache. Batches cost half of the synchronous API.
+Image generation afterwards is served entirely from the cache.
+
+Batch progress is recorded in <cache_dir>/batches/batch_state.json before and
+after every API call, so an interrupted run resumes by simply running the
+same command again (or with --resume to only finish pending batches).
+
+Each request carries the same per-sentence character context as interactive
+analysis (see render_planner.analyze_with_storyboard). Scene continuity from
+previous sentences is not available in bulk mode, because all sentences are
+analyzed at once.
+
+Usage:
+    # Analyze chapters 1-3, then generate images from the cache
+    python storyboard_batch.py --chapters 1 2 3
+    python generate_scene_images.py --chapters 1 2 3
+
+    # Re-analyze the whole novel, ignoring cached analyses
+    python storyboard_batch.py --all --rebuild
+
+    # Finish batches left pending by an interrupted run
+    python storyboard_batch.py --resume
+
+    # Dry-run against the fake batch endpoint (no API key needed)
+    python storyboard_batch.py --chapters 1 --fake --poll-interval 1
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from scene_parser import parse_all_chapters, parse_scene_sentences, Sentence
+from storyboard_analyzer import StoryboardAnalyzer
+from render_planner import prepare_chapter_character_context, sentence_character_context
+from config import (
+    STORYBOARD_CACHE_DIR,
+    STORYBOARD_BATCH_POLL_SECONDS,
+    STORYBOARD_BATCH_MAX_REQUESTS,
+    STORYBOARD_BATCH_COST_MULTIPLIER
+)
+
+
+STATE_FILENAME = "batch_state.json"
+
+
+class StoryboardBatchJob:
+    """Submits, polls and ingests storyboard analysis batches with on-disk state."""
+
+    def __init__(
+        self,
+        analyzer: StoryboardAnalyzer,
+        poll_interval: float = STORYBOARD_BATCH_POLL_SECONDS,
+        max_requests: int = STORYBOARD_BATCH_MAX_REQUESTS,
+        log: Callable[[str], None] = print,
+        novel_context=None
+    ):
+        """
+        Initialize batch job.
+
+        Args:
+            analyzer: StoryboardAnalyzer whose client, prompts and cache are used
+            poll_interval: Seconds between status checks
+            max_requests: Maximum requests per submitted batch
+            log: Callable used for progress messages
+            novel_context: NovelContext for per-sentence character descriptions
+        """
+        self.analyzer = analyzer
+        self.novel_context = novel_context
+        self.poll_interval = poll_interval
+        self.max_requests = max_requests
+        self.log = log
+
+        self.state_dir = analyzer.cache_dir / "batches"
+        self.state_dir.mkdir(exist_ok=True, parents=True)
+        self.state_path = self.state_dir / STATE_FILENAME
+        self.state = self._load_state()
+        # Cache keys saved by this job (so a resumed rebuild does not redo them)
+        self.ingested_keys = set()
+
+    def _load_state(self) -> Dict:
+        """Load batch state from disk."""
+        if self.state_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {"batches": []}
+
+    def _save_state(self):
+        """Write batch state atomically (a crash never leaves a partial file)."""
+        temp_path = self.state_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    def pending_batches(self) -> List[Dict]:
+        """Batches that were submitted but not yet ingested."""
+        return [entry for entry in self.state["batches"] if not entry["ingested"]]
+
+    def select_sentences(self, sentences: List[Sentence], rebuild: bool = False) -> List[Tuple[str, Sentence]]:
+        """
+        Pick the sentences that need analysis.
+
+        Args:
+            sentences: Candidate sentences
+            rebuild: If True, include sentences that are already cached
+
+        Returns:
+            List of (cache_key, sentence), one per distinct cache key
+        """
+        selected = {}
+        for sentence in sentences:
+            cache_key = self.analyzer._generate_cache_key(sentence)
+            if cache_key in selected:
+                continue
+            if not rebuild and self.analyzer.is_cached(cache_key, sentence):
+                continue
+            selected[cache_key] = sentence
+        return list(selected.items())
+
+    def submit(self, items: List[Tuple[str, Sentence]]) -> List[str]:
+        """
+        Submit sentences as one or more batches.
+
+        The state entry (with every request's sentence) is saved before the
+        API call, and again with the batch id right after it.
+
+        Args:
+            items: List of (cache_key, sentence) from select_sentences()
+
+        Returns:
+            List of submitted batch ids
+        """
+        batch_ids = []
+        for start in range(0, len(items), self.max_requests):
+            chunk = items[start:start + self.max_requests]
+
+            entry = {
+                "batch_id": None,
+                "processing_status": "submitting",
+                "submitted_at": datetime.now().isoformat(),
+                "ingested": False,
+                "request_counts": {},
+                "requests": {
+                    cache_key: {
+                        "chapter_num": sentence.chapter_num,
+                        "scene_num": sentence.scene_num,
+                        "sentence_num": sentence.sentence_num,
+                        "content": sentence.content,
+                    }
+                    for cache_key, sentence in chunk
+                },
+                "failed": [],
+            }
+            self.state["batches"].append(entry)
+            self._save_state()
+
+            requests = [
+                {"custom_id": cache_key, "params": self.analyzer.build_message_params(
+                    sentence, character_context=sentence_character_context(sentence, self.novel_context))}
+                for cache_key, sentence in chunk
+            ]
+            batch = self.analyzer.client.messages.batches.create(requests=requests)
+
+            entry["batch_id"] = batch.id
+            entry["processing_status"] = batch.processing_status
+            self._save_state()
+
+            self.log(f"  Submitted batch {batch.id} ({len(chunk)} requests)")
+            batch_ids.append(batch.id)
+
+        return batch_ids
+
+    def wait(self, entry: Dict):
+        """
+        Poll a batch until it has ended.
+
+        Args:
+            entry: State entry of the batch
+        """
+        while True:
+            batch = self.analyzer.client.messages.batches.retrieve(entry["batch_id"])
+            entry["processing_status"] = batch.processing_status
+            entry["request_counts"] = {
+                name: getattr(batch.request_counts, name, 0)
+                for name in ("processing", "succeeded", "errored", "canceled", "expired")
+            }
+            self._save_state()
+
+            if batch.processing_status == "ended":
+                return
+
+            counts = entry["request_counts"]
+            self.log(f"  Batch {entry['batch_id']}: {batch.processing_status} "
+                     f"({counts.get('processing', 0)} processing, {counts.get('succeeded', 0)} succeeded)")
+            time.sleep(self.poll_interval)
+
+    def ingest(self, entry: Dict) -> Tuple[int, int]:
+        """
+        Save the results of an ended batch to the storyboard cache.
+
+        Failed requests are not cached (unlike the synchronous error path),
+        so a later run picks them up again.
+
+        Args:
+            entry: State entry of the batch
+
+        Returns:
+            Tuple of (succeeded, failed) counts
+        """
+        succeeded = 0
+        failed = []
+
+        for item in self.analyzer.client.messages.batches.results(entry["batch_id"]):
+            request = entry["requests"].get(item.custom_id)
+            if request is None:
+                continue
+
+            sentence = Sentence(
+                chapter_num=request["chapter_num"],
+                scene_num=request["scene_num"],
+                sentence_num=request["sentence_num"],
+                content=request["content"],
+                word_count=len(request["content"].split())
+            )
+
+            if item.result.type != "succeeded":
+                failed.append(item.custom_id)
+                continue
+
+            try:
+                analysis = self.analyzer.analysis_from_response(
+                    sentence, item.result.message, cost_multiplier=STORYBOARD_BATCH_COST_MULTIPLIER
+                )
+            except (ValueError, KeyError, IndexError) as e:
+                self.log(f"  Warning: Unparseable result for {item.custom_id}: {e}")
+                failed.append(item.custom_id)
+                continue
+
+            self.analyzer.save_analysis(item.custom_id, analysis)
+            self.ingested_keys.add(item.custom_id)
+            succeeded += 1
+
+        entry["ingested"] = True
+        entry["failed"] = failed
+        self._save_state()
+
+        self.log(f"  Ingested batch {entry['batch_id']}: {succeeded} cached, {len(failed)} failed")
+        return succeeded, len(failed)
+
+    def finish(self, entry: Dict) -> Tuple[int, int]:
+        """
+        Wait for a batch to end and ingest its results.
+
+        Args:
+            entry: State entry of the batch
+
+        Returns:
+            Tuple of (succeeded, failed) counts
+        """
+        self.wait(entry)
+        return self.ingest(entry)
+
+    def resume_pending(self) -> Tuple[int, int]:
+        """
+        Finish every batch left pending by this or an earlier run.
+
+        Returns:
+            Tuple of (succeeded, failed) counts
+        """
+        succeeded = failed = 0
+        for entry in self.pending_batches():
+            if entry["batch_id"] is None:
+                # Died during batches.create(); the batch may or may not exist
+                self.log(f"  Warning: Dropping batch submitted at {entry['submitted_at']} "
+                         f"with no batch id (interrupted during submission)")
+                self.state["batches"].remove(entry)
+                self._save_state()
+                continue
+
+            self.log(f"  Resuming batch {entry['batch_id']} ({len(entry['requests'])} requests)")
+            ok, bad = self.finish(entry)
+            succeeded += ok
+            failed += bad
+
+        return succeeded, failed
+
+    def run(self, sentences: List[Sentence], rebuild: bool = False) -> Tuple[int, int]:
+        """
+        Resume pending batches, then submit and ingest the remaining sentences.
+
+        Args:
+            sentences: Sentences of the selected chapters
+            rebuild: Re-analyze sentences that are already cached
+
+        Returns:
+            Tuple of (succeeded, failed) counts
+        """
+        succeeded, failed = self.resume_pending()
+
+        # Results just ingested from an interrupted rebuild are not rebuilt again
+        items = [(key, sentence) for key, sentence in self.select_sentences(sentences, rebuild)
+                 if key not in self.ingested_keys]
+
+        if not items:
+            self.log("  No sentences need analysis")
+            return succeeded, failed
+
+        self.log(f"  {len(items)} sentences need analysis")
+        self.submit(items)
+        for entry in self.pending_batches():
+            ok, bad = self.finish(entry)
+            succeeded += ok
+            failed += bad
+        return succeeded, failed
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Bulk storyboard analysis with the Anthropic Message Batches API'
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--chapters', type=int, nargs='+', help='Chapters to analyze')
+    group.add_argument('--all', action='store_true', help='Analyze all chapters')
+    group.add_argument('--resume', action='store_true', help='Only finish batches left pending by an earlier run')
+
+    parser.add_argument('--rebuild', action='store_true', help='Re-analyze sentences that are already cached')
+    parser.add_argument('--cache-dir', type=str, default=STORYBOARD_CACHE_DIR, help='Storyboard cache directory')
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=STORYBOARD_BATCH_POLL_SECONDS,
+        help=f'Seconds between status checks (default: {STORYBOARD_BATCH_POLL_SECONDS})'
+    )
+    parser.add_argument('--base-url', type=str, help='Anthropic API base URL (e.g. a local FakeAnthropicServer)')
+    parser.add_argument(
+        '--fake',
+        action='store_true',
+        help='Use the in-process fake batch endpoint (state kept in <cache-dir>/batches/fake)'
+    )
+    parser.add_argument('--fake-processing-seconds', type=float, default=5.0,
+                        help='How long fake batches stay in progress (default: 5)')
+
+    args = parser.parse_args()
+    if not (args.chapters or args.all or args.resume):
+        parser.error("one of --chapters, --all or --resume is required")
+
+    # Build client
+    client = None
+    if args.fake:
+        from fake_backends import FakeAnthropicClient
+        client = FakeAnthropicClient(
+            batch_dir=str(Path(args.cache_dir) / "batches" / "fake"),
+            batch_processing_seconds=args.fake_processing_seconds
+        )
+    elif args.base_url:
+        from llm_clients import get_anthropic_client
+        client = get_anthropic_client(base_url=args.base_url)
+
+    from cost_tracker import CostTracker
+
+    session_name = "storyboard_batch_" + ("resume" if args.resume else
+                                          "all" if args.all else "_".join(map(str, args.chapters)))
+    with CostTracker(session_name) as cost_tracker:
+        from novel_context import NovelContext
+
+        analyzer = StoryboardAnalyzer(cache_dir=args.cache_dir, client=client, cost_tracker=cost_tracker)
+        novel_context = NovelContext()
+        job = StoryboardBatchJob(analyzer, poll_interval=args.poll_interval, novel_context=novel_context)
+
+        print("=" * 80)
+        print("Bulk Storyboard Analysis (Message Batches)")
+        print("=" * 80)
+
+        try:
+            if args.resume:
+                pending = job.pending_batches()
+                print(f"Pending batches: {len(pending)}")
+                succeeded, failed = job.resume_pending()
+            else:
+                scenes = parse_all_chapters(chapter_numbers=None if args.all else args.chapters)
+                sentences = []
+                for scene in scenes:
+                    sentences.extend(parse_scene_sentences(scene))
+                print(f"Found {len(sentences)} sentences")
+
+                # Chapter-wide character context (cacheable prefix within each batch)
+                sentences_by_chapter = {}
+                for sentence in sentences:
+                    sentences_by_chapter.setdefault(sentence.chapter_num, []).append(sentence)
+                for chapter_sentences in sentences_by_chapter.values():
+                    prepare_chapter_character_context(analyzer, novel_context, chapter_sentences)
+
+                succeeded, failed = job.run(sentences, rebuild=args.rebuild)
+
+        except KeyboardInterrupt:
+            print("\n\nInterrupted - batch state saved, run again (or with --resume) to continue")
+            sys.exit(1)
+
+        print("\n" + "=" * 80)
+        print(f"Cached analyses: {succeeded}")
+        print(f"Failed requests: {failed}" + (" (run again to retry)" if failed else ""))
+        print(f"Batch state: {job.state_path}")
+        total_cost, cost_report = analyzer.get_cost_estimate()
+        print(cost_report)
+        print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Re-key an existing storyboard cache to content-addressed keys (no API calls).
+
+Older caches name each analysis after its position
+(ch01_sc02_s015_<md5>.json), so inserting one sentence shifted every later
+key in the scene. Current keys hash the sentence text plus its context
+(chapter and preceding sentence, see storyboard_analyzer.content_cache_key).
+
+The preceding sentence of each entry is taken from the cached entry one
+position earlier, i.e. the manuscript as it was when the entry was analyzed.
+When that neighbour is missing or ambiguous, the current manuscript is used
+if the entry still matches it; otherwise the entry is left untouched and
+reported as unresolved (StoryboardAnalyzer still adopts it on the fly if the
+sentence is looked up at its old position).
+
+Usage:
+    # Show what would change
+    python storyboard_cache_migrate.py --dry-run
+
+    # Migrate ../storyboard_cache in place
+    python storyboard_cache_migrate.py
+"""
+
+import argparse
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from scene_parser import parse_all_chapters, parse_scene_sentences
+from storyboard_analyzer import (
+    StoryboardAnalyzer,
+    LEGACY_CACHE_KEY_PATTERN,
+    content_cache_key,
+    legacy_cache_key,
+    previous_sentence_text
+)
+from config import STORYBOARD_CACHE_DIR
+
+
+@dataclass
+class LegacyEntry:
+    """A cache file stored under a position-based key."""
+    path: Path
+    chapter_num: int
+    scene_num: int
+    sentence_num: int
+    content: str
+    new_key: Optional[str] = None
+    context_source: str = ""  # "cache", "manuscript" or "" (unresolved)
+
+
+def load_legacy_entries(cache_dir: Path) -> List[LegacyEntry]:
+    """
+    Find cache files with position-based keys.
+
+    Args:
+        cache_dir: Storyboard cache directory
+
+    Returns:
+        Legacy entries in chapter/scene/sentence order
+    """
+    entries = []
+    for cache_file in sorted(cache_dir.glob("[0-9][0-9]/*.json")):
+        match = LEGACY_CACHE_KEY_PATTERN.match(cache_file.stem)
+        if not match:
+            continue
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                content = json.load(f)["sentence_content"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Skipping unreadable cache file {cache_file}: {e}")
+            continue
+        chapter_num, scene_num, sentence_num = (int(group) for group in match.groups()[:3])
+        entries.append(LegacyEntry(cache_file, chapter_num, scene_num, sentence_num, content))
+    return entries
+
+
+def load_manuscript_context(chapter_numbers: List[int]) -> Dict[str, str]:
+    """
+    Map legacy keys of the current manuscript to their preceding sentence.
+
+    Args:
+        chapter_numbers: Chapters to parse
+
+    Returns:
+        Dict of legacy cache key -> previous sentence text
+    """
+    context = {}
+    if not chapter_numbers:
+        return context
+    for scene in parse_all_chapters(chapter_numbers):
+        for sentence in parse_scene_sentences(scene):
+            key = legacy_cache_key(sentence.chapter_num, sentence.scene_num,
+                                   sentence.sentence_num, sentence.content)
+            context[key] = previous_sentence_text(sentence)
+    return context
+
+
+def resolve_keys(entries: List[LegacyEntry], manuscript_context: Dict[str, str]):
+    """
+    Compute the content-addressed key of every legacy entry (in place).
+
+    Args:
+        entries: Entries from load_legacy_entries()
+        manuscript_context: Output of load_manuscript_context()
+    """
+    by_position: Dict[Tuple[int, int, int], List[LegacyEntry]] = defaultdict(list)
+    for entry in entries:
+        by_position[(entry.chapter_num, entry.scene_num, entry.sentence_num)].append(entry)
+
+    for entry in entries:
+        previous: Optional[str] = None
+        if entry.sentence_num == 1:
+            previous, entry.context_source = "", "cache"
+        else:
+            neighbours = by_position.get((entry.chapter_num, entry.scene_num, entry.sentence_num - 1), [])
+            if len(neighbours) == 1:
+                previous, entry.context_source = neighbours[0].content, "cache"
+            elif entry.path.stem in manuscript_context:
+                previous, entry.context_source = manuscript_context[entry.path.stem], "manuscript"
+
+        if previous is not None:
+            entry.new_key = content_cache_key(entry.chapter_num, entry.content, previous)
+
+
+def migrate(cache_dir: Path, entries: List[LegacyEntry], dry_run: bool = False) -> Dict[str, int]:
+    """
+    Move resolved entries to their new keys and rebuild the cache index.
+
+    Args:
+        cache_dir: Storyboard cache directory
+        entries: Entries with keys from resolve_keys()
+        dry_run: Only count what would change
+
+    Returns:
+        Counts of moved, duplicate, unresolved and dropped-failure entries
+    """
+    counts = {"moved": 0, "duplicates": 0, "unresolved": 0, "failures_dropped": 0}
+
+    for entry in entries:
+        if entry.new_key is None:
+            counts["unresolved"] += 1
+            continue
+        target = entry.path.with_name(f"{entry.new_key}.json")
+        if target.exists():
+            # Same text and context analyzed twice under different positions
+            counts["duplicates"] += 1
+            if not dry_run:
+                entry.path.unlink()
+        else:
+            counts["moved"] += 1
+            if not dry_run:
+                os.replace(entry.path, target)
+
+    # Negative cache entries are short-lived; legacy ones are simply dropped
+    failures_file = cache_dir / "failures.json"
+    if failures_file.exists():
+        with open(failures_file, 'r', encoding='utf-8') as f:
+            failures = json.load(f)
+        kept = {key: value for key, value in failures.items() if not LEGACY_CACHE_KEY_PATTERN.match(key)}
+        counts["failures_dropped"] = len(failures) - len(kept)
+        if counts["failures_dropped"] and not dry_run:
+            with open(failures_file, 'w', encoding='utf-8') as f:
+                json.dump(kept, f, indent=2)
+
+    if not dry_run:
+        rebuild_index(cache_dir)
+
+    return counts
+
+
+def rebuild_index(cache_dir: Path):
+    """
+    Rewrite index.json from the cache files on disk.
+
+    Args:
+        cache_dir: Storyboard cache directory
+    """
+    index = {}
+    for cache_file in sorted(cache_dir.glob("[0-9][0-9]/*.json")):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Skipping unreadable cache file {cache_file}: {e}")
+            continue
+        index[cache_file.stem] = StoryboardAnalyzer._index_entry(
+            data["chapter_num"], data["scene_num"], data["sentence_num"], cache_file)
+
+    temp_path = cache_dir / "index.json.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(temp_path, cache_dir / "index.json")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(
+        description='Re-key the storyboard cache to content-addressed keys (no API calls)'
+    )
+    parser.add_argument('--cache-dir', type=str, default=STORYBOARD_CACHE_DIR, help='Storyboard cache directory')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without touching files')
+    parser.add_argument('--no-manuscript', action='store_true',
+                        help='Resolve context from cached neighbours only (do not parse the manuscript)')
+    args = parser.parse_args()
+
+    cache_dir = Path(args.cache_dir)
+    entries = load_legacy_entries(cache_dir)
+    print(f"Legacy cache entries: {len(entries)}")
+    if not entries:
+        print("Nothing to migrate")
+        return
+
+    chapters = [] if args.no_manuscript else sorted({entry.chapter_num for entry in entries})
+    resolve_keys(entries, load_manuscript_context(chapters))
+
+    for entry in entries:
+        target = entry.new_key or "(unresolved: previous sentence unknown)"
+        print(f"  {entry.path.stem} -> {target}" + (" [manuscript]" if entry.context_source == "manuscript" else ""))
+
+    counts = migrate(cache_dir, entries, dry_run=args.dry_run)
+    print(f"\n{'Would move' if args.dry_run else 'Moved'}: {counts['moved']}")
+    print(f"Duplicates {'to remove' if args.dry_run else 'removed'}: {counts['duplicates']}")
+    print(f"Unresolved (left as is): {counts['unresolved']}")
+    print(f"Legacy negative cache entries dropped: {counts['failures_dropped']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Deferred retry queue for failed storyboard API calls.
+
+When a storyboard call fails, StoryboardAnalyzer records a negative cache
+entry and hands the sentence to this queue. A background thread retries it
+with jittered exponential backoff while the main thread keeps going (e.g.
+the GPU renders other sentences). Successful retries are written to the
+storyboard cache and clear the negative entry; at the end of the run the
+queue reports which sentences recovered and which are still failing.
+
+Usage:
+    retry_queue = StoryboardRetryQueue(storyboard_analyzer).start()
+    ...  # analyze sentences, render images
+    retry_queue.finish()
+    print(retry_queue.report())
+"""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from scene_parser import Sentence
+from llm_clients import backoff_delay
+from config import (
+    STORYBOARD_REPORT_DIR,
+    STORYBOARD_RETRY_MAX_ATTEMPTS,
+    STORYBOARD_RETRY_BASE_DELAY,
+    STORYBOARD_RETRY_MAX_DELAY,
+    STORYBOARD_RETRY_DRAIN_SECONDS
+)
+
+
+@dataclass
+class RetryItem:
+    """A failed sentence waiting for another attempt."""
+    cache_key: str
+    sentence: Sentence
+    character_context: str = ""
+    scene_continuity: str = ""
+    attempts: int = 0
+    last_error: str = ""
+    queued_at: float = field(default_factory=time.time)
+
+
+class StoryboardRetryQueue:
+    """Background retries for sentences whose storyboard call failed."""
+
+    def __init__(
+        self,
+        analyzer,
+        max_attempts: int = STORYBOARD_RETRY_MAX_ATTEMPTS,
+        base_delay: float = STORYBOARD_RETRY_BASE_DELAY,
+        max_delay: float = STORYBOARD_RETRY_MAX_DELAY,
+        log: Callable[[str], None] = print
+    ):
+        """
+        Initialize retry queue and attach it to the analyzer.
+
+        Args:
+            analyzer: StoryboardAnalyzer whose failures are retried
+            max_attempts: Background attempts per sentence before giving up
+            base_delay: Backoff cap for the first retry (seconds)
+            max_delay: Upper bound for any retry delay (seconds)
+            log: Callable used for progress messages
+        """
+        self.analyzer = analyzer
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.log = log
+
+        self._heap: List[tuple] = []  # (due_time, sequence, RetryItem)
+        self._sequence = itertools.count()
+        self._queued: Dict[str, RetryItem] = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._in_flight = 0
+        self._thread: Optional[threading.Thread] = None
+
+        self.recovered: Dict[str, object] = {}  # cache_key -> StoryboardAnalysis
+        self.gave_up: Dict[str, RetryItem] = {}
+
+        analyzer.retry_queue = self
+
+    def _delay(self, attempt: int) -> float:
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+    def start(self) -> "StoryboardRetryQueue":
+        """Start the background retry thread."""
+        self._thread = threading.Thread(target=self._run, name="storyboard-retry", daemon=True)
+        self._thread.start()
+        return self
+
+    def enqueue(self, cache_key: str, sentence: Sentence, character_context: str = "",
+                scene_continuity: str = ""):
+        """
+        Queue a failed sentence for background retry (duplicates are ignored).
+
+        Args:
+            cache_key: Storyboard cache key of the sentence
+            sentence: Sentence to analyze
+            character_context: Character context of the failed call
+            scene_continuity: Continuity context of the failed call
+        """
+        with self._condition:
+            if self._stopping or cache_key in self._queued or cache_key in self.recovered \
+                    or cache_key in self.gave_up:
+                return
+            item = RetryItem(cache_key, sentence, character_context, scene_continuity)
+            self._queued[cache_key] = item
+            heapq.heappush(self._heap, (time.time() + self._delay(0), next(self._sequence), item))
+            self._condition.notify()
+
+    def _run(self):
+        """Worker loop: wait for the next due item and retry it."""
+        while True:
+            with self._condition:
+                while not self._stopping and (not self._heap or self._heap[0][0] > time.time()):
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+                _, _, item = heapq.heappop(self._heap)
+                self._in_flight += 1
+
+            try:
+                self._attempt(item)
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def _attempt(self, item: RetryItem):
+        """Retry one sentence and reschedule or finish it."""
+        item.attempts += 1
+        sentence = item.sentence
+        try:
+            analysis = self.analyzer.request_analysis(sentence, item.character_context, item.scene_continuity)
+        except Exception as e:
+            item.last_error = f"{type(e).__name__}: {str(e)[:200]}"
+            self.analyzer.record_failure(item.cache_key, sentence, e)
+            with self._condition:
+                if item.attempts >= self.max_attempts or self._stopping:
+                    self._queued.pop(item.cache_key, None)
+                    self.gave_up[item.cache_key] = item
+                else:
+                    due = time.time() + self._delay(item.attempts)
+                    heapq.heappush(self._heap, (due, next(self._sequence), item))
+            return
+
+        self.analyzer.save_analysis(item.cache_key, analysis)
+        self.analyzer.clear_failure(item.cache_key)
+        with self._condition:
+            self._queued.pop(item.cache_key, None)
+            self.recovered[item.cache_key] = analysis
+        self.log(f"  [RETRY OK] Ch{sentence.chapter_num} Sc{sentence.scene_num} S{sentence.sentence_num} "
+                 f"(attempt {item.attempts})")
+
+    @property
+    def pending(self) -> int:
+        """Sentences still waiting for (or in) a retry."""
+        with self._condition:
+            return len(self._queued)
+
+    def wait_idle(self, timeout: float = STORYBOARD_RETRY_DRAIN_SECONDS) -> bool:
+        """
+        Wait until no retries are pending or the timeout expires.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the queue drained
+        """
+        deadline = time.time() + timeout
+        with self._condition:
+            while self._queued and self._thread is not None and self._thread.is_alive():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(min(remaining, 1.0))
+            return not self._queued
+
+    def finish(self, timeout: float = STORYBOARD_RETRY_DRAIN_SECONDS):
+        """
+        Give pending retries up to `timeout` seconds, then stop the thread.
+
+        Sentences that have not recovered by then count as still failed.
+
+        Args:
+            timeout: Maximum seconds to wait for pending retries
+        """
+        if self.pending:
+            self.log(f"\nWaiting up to {timeout:.0f}s for {self.pending} storyboard retries...")
+        self.wait_idle(timeout)
+
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+        with self._condition:
+            for cache_key, item in self._queued.items():
+                self.gave_up[cache_key] = item
+            self._queued.clear()
+            self._heap.clear()
+        self.analyzer.retry_queue = None
+
+    def still_failed(self) -> List[str]:
+        """Cache keys that did not recover during this run."""
+        return sorted(self.gave_up)
+
+    def report(self) -> str:
+        """
+        Format the per-run retry report.
+
+        Returns:
+            Report listing recovered and still-failed sentences
+        """
+        lines = [
+            "Storyboard Retry Report:",
+            f"- Recovered: {len(self.recovered)}",
+            f"- Still failed: {len(self.gave_up)}",
+        ]
+        for cache_key in self.still_failed():
+            item = self.gave_up[cache_key]
+            lines.append(f"  {cache_key} ({item.attempts} retries): {item.last_error or 'not retried yet'}")
+        if self.gave_up:
+            lines.append("Still-failed sentences keep their negative cache entry and are retried on the next run")
+        return "\n".join(lines)
+
+    def save_report(self, output_dir: str = STORYBOARD_REPORT_DIR) -> str:
+        """
+        Write recovered and still-failed keys to a JSON report.
+
+        Args:
+            output_dir: Directory for the report
+
+        Returns:
+            Path to the saved report
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        filepath = os.path.join(output_dir, f"storyboard_retries_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        data = {
+            "recovered": sorted(self.recovered),
+            "still_failed": [
+                {
+                    "cache_key": cache_key,
+                    "chapter_num": item.sentence.chapter_num,
+                    "scene_num": item.sentence.scene_num,
+                    "sentence_num": item.sentence.sentence_num,
+                    "retries": item.attempts,
+                    "last_error": item.last_error,
+                }
+                for cache_key, item in sorted(self.gave_up.items())
+            ],
+        }
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        return filepath
+
+
+def main():
+    """Demonstrate negative caching and background retries with a flaky fake client."""
+    import tempfile
+    from storyboard_analyzer import StoryboardAnalyzer
+    from fake_backends import FakeAnthropicClient
+
+    class FlakyClient(FakeAnthropicClient):
+        """Fails the first `failures` calls."""
+
+        def __init__(self, failures: int):
+            super().__init__()
+            self.remaining_failures = failures
+            create = self.messages.create
+
+            def flaky_create(**kwargs):
+                if self.remaining_failures > 0:
+                    self.remaining_failures -= 1
+                    raise ConnectionError("Simulated overloaded API")
+                return create(**kwargs)
+
+            self.messages.create = flaky_create
+
+    sentences = [
+        Sentence(chapter_num=1, scene_num=1, sentence_num=i, content=text, word_count=len(text.split()))
+        for i, text in enumerate([
+            "Emma checked the tablet and smiled.",
+            "Tyler leaned against the doorway.",
+            "The factory floor hummed with machines.",
+        ], start=1)
+    ]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        analyzer = StoryboardAnalyzer(cache_dir=cache_dir, client=FlakyClient(failures=3))
+        retry_queue = StoryboardRetryQueue(analyzer, base_delay=0.1, max_delay=0.5).start()
+
+        for sentence in sentences:
+            analysis = analyzer.analyze_sentence(sentence)
+            print(f"    confidence {analysis.confidence}")
+
+        # A second lookup while the failure is fresh makes no API call
+        analyzer.analyze_sentence(sentences[0])
+
+        retry_queue.finish(timeout=10)
+        print(retry_queue.report())
+        print(f"Negative entries left: {len(analyzer.failures)}")
+
+        cached = analyzer.analyze_sentence(sentences[0])
+        print(f"After retry: confidence {cached.confidence}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,14 @@ Detects when visual context changes significantly enough to warrant generating
 a new image, versus reusing the current image.
 """
 
-from typing import Tuple
+from typing import List, Tuple
 from scene_parser import Sentence
+from config import SMART_DETECTION_STRATEGY
 from prompt_generator import (
     extract_characters,
-    extract_setting,
     extract_action,
-    extract_time_of_day,
+    get_scene_features,
+    match_keywords,
     ACTION_KEYWORDS
 )
 
@@ -44,15 +45,18 @@ class VisualChangeDetector:
         Returns:
             Dictionary with visual state: character, setting, action, time_of_day
         """
-        # Extract visual elements
-        characters = extract_characters(sentence.content)
+        # Extract visual elements (one keyword scan per text)
+        sentence_hits = match_keywords(sentence.content)
+        characters = extract_characters(sentence.content, hits=sentence_hits)
 
         # Use scene_context for setting and time to ensure consistency within scene
-        setting = extract_setting(sentence.scene_context)
-        time_of_day = extract_time_of_day(sentence.scene_context)
+        # (computed once per scene and shared across its sentences)
+        scene_features = get_scene_features(sentence.scene_context)
+        setting = scene_features.setting
+        time_of_day = scene_features.time_of_day
 
         # Use sentence content for action (specific to this moment)
-        action = extract_action(sentence.content)
+        action = extract_action(sentence.content, hits=sentence_hits)
 
         return {
             'character': characters[0] if characters else None,
@@ -367,6 +371,29 @@ class VisualChangeDetector:
         return old_category != new_category
 
 
+DETECTION_STRATEGIES = ("rules", "embedding")
+
+
+def create_change_detector(sentences: List[Sentence], strategy: str = SMART_DETECTION_STRATEGY):
+    """
+    Create the visual change detector for a smart detection strategy.
+
+    Args:
+        sentences: Sentences the detector will be asked about (the embedding
+            strategy decides all of them up front)
+        strategy: "rules" (VisualChangeDetector) or "embedding" (EmbeddingChangeDetector)
+
+    Returns:
+        Detector usable with render_planner.decide_image_reuse()
+    """
+    if strategy == "embedding":
+        from embedding_change_detector import EmbeddingChangeDetector
+        return EmbeddingChangeDetector().prepare(sentences)
+    if strategy != "rules":
+        raise ValueError(f"Unknown smart detection strategy: {strategy} (expected one of {DETECTION_STRATEGIES})")
+    return VisualChangeDetector()
+
+
 def main():
     """Test visual change detection logic."""
     from scene_parser import Sentence